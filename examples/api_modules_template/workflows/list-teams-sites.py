@@ -21,13 +21,13 @@ from api_modules.sharepoint import get_client
 # Initialize the SharePoint API client
 client = get_client()
 
-# Make API request to list Teams-related SharePoint sites
-response = client.make_api_request("get", "/sites?search=Teams")
+# List Teams-related SharePoint sites across all result pages
+sites = list(client.iter_items("/sites?search=Teams"))
 
 # Print formatted output
-if response and "value" in response:
-    print("\n📌 Microsoft Teams SharePoint Sites Found:\n")
-    for site in response["value"]:
+if sites:
+    print(f"\n📌 Microsoft Teams SharePoint Sites Found ({len(sites)}):\n")
+    for site in sites:
         print(f"- {site['displayName']} ({site['webUrl']})")
 else:
     print("\n⚠️ No Teams SharePoint sites found or insufficient permissions.")
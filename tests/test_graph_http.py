@@ -0,0 +1,192 @@
+import threading
+
+import pytest
+
+from workflows.common import graph_http
+from workflows.common import sp_metadata_utils as sp
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, data=None):
+        self.status_code = status_code
+        self.data = data or {}
+        self.content = b"{}"
+        self.headers = {}
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+    def __init__(self):
+        self.sent = []
+
+    def request(self, method, url, headers=None, **kwargs):
+        self.sent.append((method, url, dict(headers or {})))
+        if url.endswith("/$batch"):
+            return FakeResponse(data={"responses": [
+                {"id": entry["id"], "status": 200, "body": {}} for entry in kwargs["json"]["requests"]]})
+        return FakeResponse()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(graph_http, "get_session", lambda: session)
+    graph_http.forget_responses()
+    yield session
+    graph_http.forget_responses()
+
+
+def test_identical_gets_reuse_the_response(session):
+    url = f"{graph_http.GRAPH_API_ENDPOINT}/sites/root"
+    first = graph_http.get(url, headers={"Authorization": "Bearer a"})
+    assert graph_http.get(url, headers={"Authorization": "Bearer a"}) is first
+    assert len(session.sent) == 1
+
+
+def test_other_headers_are_part_of_the_key(session):
+    url = f"{graph_http.GRAPH_API_ENDPOINT}/users?$count=true"
+    plain = graph_http.get(url, headers={"Authorization": "Bearer a"})
+    advanced = graph_http.get(url, headers={"Authorization": "Bearer a", "ConsistencyLevel": "eventual"})
+    conditional = graph_http.get(url, headers={"Authorization": "Bearer a", "If-None-Match": "etag"})
+    assert len({id(plain), id(advanced), id(conditional)}) == 3
+    assert [headers.get("ConsistencyLevel") for _, _, headers in session.sent] == [None, "eventual", None]
+
+
+def test_read_only_batch_keeps_remembered_responses(session):
+    url = f"{graph_http.GRAPH_API_ENDPOINT}/sites/root"
+    first = graph_http.get(url)
+
+    graph_http.batch({"1": {"method": "GET", "url": "/sites/root/lists"}})
+    assert graph_http.get(url) is first
+
+    graph_http.batch({"1": {"method": "PATCH", "url": "/sites/root/lists/l1", "body": {}}})
+    assert graph_http.get(url) is not first
+
+
+def test_writes_end_the_reuse_window(session):
+    url = f"{graph_http.GRAPH_API_ENDPOINT}/sites/root"
+    first = graph_http.get(url)
+    graph_http.post(f"{graph_http.GRAPH_API_ENDPOINT}/sites/root/lists", json={})
+    assert graph_http.get(url) is not first
+
+
+def test_site_collections_are_coalesced(session):
+    assert sp.get_site_columns("token", "s1") == []
+    assert sp.get_content_types("token", "s1") == []
+    assert sp.get_site_columns("token", "s1") == []
+    assert [url.rsplit("/", 1)[-1] for _, url, _ in session.sent] == ["columns", "contentTypes"]
+
+
+class GatedSession:
+    """Holds every request until the test opens the gate."""
+
+    def __init__(self, status_code=200, error=None):
+        self.status_code = status_code
+        self.error = error
+        self.calls = 0
+        self.entered = threading.Event()
+        self.gate = threading.Event()
+
+    def request(self, method, url, headers=None, **kwargs):
+        self.calls += 1
+        self.entered.set()
+        assert self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return FakeResponse(self.status_code)
+
+
+def _concurrent_gets(monkeypatch, session, count):
+    """Send count identical GETs, opening the gate once every follower waits on the leader."""
+    waiting = threading.Semaphore(0)
+
+    class CountingFlight(graph_http._Flight):
+        def __init__(self):
+            super().__init__()
+            wait = self.done.wait
+
+            def counted_wait(timeout=None):
+                waiting.release()
+                return wait(timeout)
+            self.done.wait = counted_wait
+
+    monkeypatch.setattr(graph_http, "_Flight", CountingFlight)
+    monkeypatch.setattr(graph_http, "get_session", lambda: session)
+    monkeypatch.setattr(graph_http, "COALESCE_MEMO_SECONDS", 0)
+    graph_http.forget_responses()
+
+    results = [None] * count
+
+    def call(index):
+        try:
+            results[index] = graph_http.get(f"{graph_http.GRAPH_API_ENDPOINT}/sites/root/columns")
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(count)]
+    threads[0].start()
+    assert session.entered.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    for _ in threads[1:]:
+        assert waiting.acquire(timeout=5)
+    session.gate.set()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_concurrent_gets_share_one_request(monkeypatch):
+    session = GatedSession()
+    results = _concurrent_gets(monkeypatch, session, 8)
+    assert session.calls == 1
+    assert all(result is results[0] for result in results)
+    assert isinstance(results[0], FakeResponse)
+
+
+def test_followers_raise_the_leaders_error(monkeypatch):
+    error = ConnectionError("reset")
+    session = GatedSession(error=error)
+    results = _concurrent_gets(monkeypatch, session, 4)
+    assert session.calls == 1
+    assert all(result is error for result in results)
+
+    # A failed request is not remembered
+    session.error = None
+    assert graph_http.get(f"{graph_http.GRAPH_API_ENDPOINT}/sites/root/columns").status_code == 200
+    assert session.calls == 2
+
+
+def test_error_responses_are_not_reused(monkeypatch):
+    session = GatedSession(status_code=404)
+    session.gate.set()
+    monkeypatch.setattr(graph_http, "get_session", lambda: session)
+    graph_http.forget_responses()
+    url = f"{graph_http.GRAPH_API_ENDPOINT}/sites/missing"
+    assert graph_http.get(url) is not graph_http.get(url)
+    assert session.calls == 2
+
+
+def test_batch_retry_logs_the_throttling_statuses(monkeypatch):
+    attempts = []
+
+    class ThrottlingSession:
+        def request(self, method, url, headers=None, json=None):
+            attempts.append([entry["id"] for entry in json["requests"]])
+            statuses = {"1": 503, "2": 504} if len(attempts) == 1 else {}
+            return FakeResponse(data={"responses": [
+                {"id": entry["id"], "status": statuses.get(entry["id"], 200), "body": {}}
+                for entry in json["requests"]]})
+
+    warnings = []
+    monkeypatch.setattr(graph_http, "get_session", lambda: ThrottlingSession())
+    monkeypatch.setattr(graph_http.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(graph_http.log_utils, "warning", lambda message, *args: warnings.append(args))
+
+    results = graph_http.batch({"0": {"method": "GET", "url": "/a"}, "1": {"method": "GET", "url": "/b"},
+                                "2": {"method": "GET", "url": "/c"}})
+    assert attempts == [["0", "1", "2"], ["1", "2"]]
+    assert {request_id: result["status"] for request_id, result in results.items()} == {"0": 200, "1": 200, "2": 200}
+    assert warnings == [("$batch", "503, 504", graph_http.DEFAULT_RETRY_AFTER)]
@@ -0,0 +1,47 @@
+import pytest
+
+from workflows.common import graph_runtime
+
+
+def test_check_version():
+    graph_runtime.check_version(graph_runtime.RUNTIME_VERSION)
+    with pytest.raises(RuntimeError):
+        graph_runtime.check_version(graph_runtime.RUNTIME_VERSION + 1)
+
+
+def test_resolve_url_keeps_next_links():
+    assert graph_runtime.resolve_url("/me") == f"{graph_runtime.GRAPH_API_ENDPOINT}/me"
+    next_link = "https://graph.microsoft.com/v1.0/users?$skiptoken=abc"
+    assert graph_runtime.resolve_url(next_link) == next_link
+
+
+def test_load_credentials_from_secret_file(tmp_path, monkeypatch):
+    for name in ("SHAREPOINT_CLIENT_ID", "SHAREPOINT_CLIENT_SECRET", "TENANT_ID"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".env.sharepoint.secret").write_text(
+        "# comment\nSHAREPOINT_CLIENT_ID=client\nSHAREPOINT_CLIENT_SECRET=se=cret\nTENANT_ID=tenant\n")
+
+    assert graph_runtime.load_credentials("sharepoint") == ("client", "se=cret", "tenant")
+    with pytest.raises(ValueError):
+        graph_runtime.load_credentials("other")
+
+
+def test_iter_items_follows_next_links():
+    pages = {
+        "/users": {"value": [1, 2], "@odata.nextLink": "https://graph.microsoft.com/v1.0/users?$skiptoken=2"},
+        "https://graph.microsoft.com/v1.0/users?$skiptoken=2": {"value": [3]}
+    }
+    requests = []
+
+    class PagedClient(graph_runtime.GraphClient):
+        def __init__(self):
+            pass
+
+        def make_api_request(self, method, endpoint, data=None, params=None):
+            requests.append((endpoint, params))
+            return pages[endpoint]
+
+    assert list(PagedClient().iter_items("/users", params={"$top": 2})) == [1, 2, 3]
+    # The query is carried by the next link, so params only go with the first request
+    assert requests[1][1] is None
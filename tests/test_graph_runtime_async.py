@@ -0,0 +1,53 @@
+import asyncio
+import warnings
+
+import pytest
+
+from workflows.common import graph_runtime
+from workflows.common import graph_runtime_async
+
+httpx = pytest.importorskip("httpx")
+
+
+@pytest.fixture(autouse=True)
+def no_credentials(monkeypatch):
+    # The async client shares the blocking client's tokens; none are needed here
+    monkeypatch.setattr(graph_runtime, "get_client", lambda app_name, scopes=None, secret_dir=None: object())
+    monkeypatch.setattr(graph_runtime_async, "_clients", {})
+
+
+def test_get_client_per_concurrency():
+    small = graph_runtime_async.get_client("sharepoint", concurrency=4)
+    assert graph_runtime_async.get_client("sharepoint", concurrency=4) is small
+    large = graph_runtime_async.get_client("sharepoint", concurrency=64)
+    assert large is not small
+    assert (small.concurrency, large.concurrency) == (4, 64)
+
+
+def test_pool_is_closed_when_its_loop_ends():
+    client = graph_runtime_async.AsyncGraphClient("sharepoint")
+
+    async def use():
+        http = client._get_http()
+        assert client._get_http() is http
+        return http
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", ResourceWarning)
+        first = asyncio.run(use())
+        assert first.is_closed
+        second = asyncio.run(use())
+    assert second is not first
+    assert second.is_closed
+
+
+def test_aclose():
+    client = graph_runtime_async.AsyncGraphClient("sharepoint")
+
+    async def use():
+        async with client:
+            http = client._get_http()
+        return http
+
+    assert asyncio.run(use()).is_closed
+    assert client._http is None
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from workflows.common import graph_http, graph_stream, graph_trace
+
+
+class StreamedResponse:
+    def __init__(self, body, status_code=200):
+        self.body = body.encode("utf-8")
+        self.status_code = status_code
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+PAGE = {
+    "@odata.context": "https://graph.microsoft.com/v1.0/$metadata#columns",
+    "value": [
+        {"name": "Title", "size": 12345, "ratio": -1.5e3, "flag": True, "none": None},
+        {"name": "Bestätigt ✓", "text": "quote \" and \\ backslash", "nested": {"list": [1, [2, 3]]}},
+        12345678,
+        "plain"
+    ],
+    "@odata.nextLink": "https://graph.microsoft.com/v1.0/next"
+}
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_every_chunk_boundary(indent):
+    body = json.dumps(PAGE, indent=indent, ensure_ascii=False)
+    # Cut the body at every position, including inside numbers, strings and multi-byte characters
+    for chunk_size in range(1, 40):
+        response = StreamedResponse(body)
+        stream = graph_stream.ValueStream(response, chunk_size=chunk_size)
+        assert list(stream) == PAGE["value"], chunk_size
+        assert stream.next_link == PAGE["@odata.nextLink"]
+        assert stream.properties["@odata.context"] == PAGE["@odata.context"]
+        assert response.closed
+
+
+def test_empty_and_value_last():
+    stream = graph_stream.ValueStream(StreamedResponse('{"@odata.nextLink": "n", "value": []}'), chunk_size=3)
+    assert list(stream) == []
+    assert stream.next_link == "n"
+
+
+def test_malformed_body():
+    with pytest.raises(ValueError):
+        list(graph_stream.ValueStream(StreamedResponse('[1, 2]')))
+    with pytest.raises(ValueError):
+        list(graph_stream.ValueStream(StreamedResponse('{"value": [1, 2'), chunk_size=4))
+
+
+def test_iter_collection_follows_next_links(monkeypatch):
+    pages = {
+        "page1": StreamedResponse(json.dumps({"value": [1, 2], "@odata.nextLink": "page2"})),
+        "page2": StreamedResponse(json.dumps({"value": [3]}))
+    }
+    monkeypatch.setattr(graph_stream.graph_http, "request",
+                        lambda method, url, headers=None, limiter=None, stream=False: pages[url])
+    assert list(graph_stream.iter_collection("page1")) == [1, 2, 3]
+
+
+class StreamingSession:
+    def __init__(self, body):
+        self.body = body
+
+    def request(self, method, url, headers=None, **kwargs):
+        return StreamedResponse(self.body)
+
+
+def test_streamed_bytes_are_traced(monkeypatch):
+    body = json.dumps({"value": PAGE["value"]}, ensure_ascii=False)
+    tracer = graph_trace.Tracer()
+    monkeypatch.setattr(graph_trace, "_tracer", tracer)
+    monkeypatch.setattr(graph_http, "get_session", lambda: StreamingSession(body))
+
+    assert list(graph_stream.iter_collection(f"{graph_http.GRAPH_API_ENDPOINT}/sites/s1/lists/l1/columns")) \
+        == PAGE["value"]
+    assert [event["bytes"] for event in tracer.events] == [len(body.encode("utf-8"))]
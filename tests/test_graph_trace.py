@@ -0,0 +1,42 @@
+import json
+
+from workflows.common import graph_trace
+
+
+def test_endpoint_template_replaces_ids_and_query_values():
+    url = ("https://graph.microsoft.com/v1.0/sites/contoso.sharepoint.com,1a2b,3c4d/lists/"
+           "5c1e2f3a-0000-4a4a-8b8b-123456789abc/items?$expand=fields&$top=200")
+    assert graph_trace.endpoint_template(url) == "/sites/{id}/lists/{id}/items?$expand&$top"
+    assert graph_trace.endpoint_template(
+        "https://graph.microsoft.com/v1.0/sites/contoso.sharepoint.com:/sites/Legal:") == "/sites/{site-path}"
+    assert graph_trace.endpoint_template("https://graph.microsoft.com/v1.0/drives/b!abc/root") == "/drives/{id}/root"
+
+
+def test_summary_groups_by_endpoint_slowest_first():
+    tracer = graph_trace.Tracer()
+    tracer.record("get", "https://graph.microsoft.com/v1.0/sites/a,b,c/lists", 0.0, 0.1, 200, 10, 0)
+    tracer.record("get", "https://graph.microsoft.com/v1.0/sites/d,e,f/lists", 0.0, 0.3, 429, 20, 2)
+    tracer.record("get", "https://graph.microsoft.com/v1.0/me", 0.0, 0.05, None, None, 0)
+
+    summary = tracer.summary()
+    assert summary[0]["endpoint"] == "GET /sites/{id}/lists"
+    assert summary[0]["count"] == 2
+    assert summary[0]["total_ms"] == 400.0
+    assert summary[0]["max_ms"] == 300.0
+    assert summary[0]["bytes"] == 30
+    assert summary[0]["retries"] == 2
+    assert summary[0]["errors"] == 1
+    assert summary[1]["errors"] == 1
+
+
+def test_write_chrome_trace(tmp_path):
+    tracer = graph_trace.Tracer(str(tmp_path / "trace.json"))
+    tracer.record("GET", "https://graph.microsoft.com/v1.0/me", tracer.origin, tracer.origin + 0.002, 200, 5, 0)
+    tracer.write()
+
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    complete = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert complete[0]["name"] == "GET /me"
+    assert complete[0]["dur"] == 2000
+    assert any(event["ph"] == "M" for event in trace["traceEvents"])
+    assert trace["otherData"]["requests"] == 1
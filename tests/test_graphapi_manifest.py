@@ -0,0 +1,151 @@
+import json
+
+from workflows.common import graphapi_manifest
+from workflows.common.graphapi_permissions import GRAPH_RESOURCE_APP_ID
+
+
+class FakeCatalog:
+    ids = {"Sites.Read.All": "role-sites", "Mail.Read": "role-mail"}
+
+    def permission_names(self, required_resource_access):
+        names = {entry_id: name for name, entry_id in self.ids.items()}
+        return sorted(names[access["id"]] for resource in required_resource_access or []
+                      if resource["resourceAppId"] == GRAPH_RESOURCE_APP_ID
+                      for access in resource["resourceAccess"])
+
+
+SHAREPOINT_ACCESS = {"resourceAppId": "00000003-0000-0ff1-ce00-000000000000",
+                     "resourceAccess": [{"id": "sp-role", "type": "Role"}]}
+
+
+class FakeResponse:
+    status_code = 200
+
+
+class FakeHttp:
+    def __init__(self):
+        self.patched = []
+
+    def patch(self, url, headers=None, json=None):
+        self.patched.append(json)
+        return FakeResponse()
+
+
+class FakeOrchestrator:
+    def __init__(self, permissions_set=True):
+        self.config = {"app_registrations": []}
+        self.token = "token"
+        self.http = FakeHttp()
+        self.permissions_set = permissions_set
+        self.permission_updates = []
+        self.saved_secrets = []
+        self.granted = []
+        self.config_saves = 0
+
+    def _set_permissions(self, object_id, permissions, current=None):
+        self.permission_updates.append((object_id, permissions, current))
+        return self.permissions_set
+
+    def _create_client_secret(self, object_id, display_name, duration_days=365):
+        return {"value": "adopted-secret", "id": "key", "end_date": "2027-04-17T00:00:00Z"}
+
+    def _register_app(self, name, description, permissions, secret_lifetime_days):
+        config = {"name": f"Automation-{name}", "client_id": f"{name}-client", "object_id": f"{name}-object",
+                  "description": description, "creation_date": "2026-10-19T00:00:00",
+                  "permissions": permissions, "secret_expiry": "2027-10-19T00:00:00"}
+        return config, {"value": "secret", "end_date": "2027-10-19T00:00:00"}, self.permissions_set
+
+    def _save_app_secrets(self, name, client_id, value):
+        self.saved_secrets.append(name)
+
+    def _grant_permissions(self, client_id, permissions, service_principal_id=None):
+        self.granted.append(client_id)
+        return "sp-id"
+
+    def _save_config(self):
+        self.config_saves += 1
+
+
+def _load(tmp_path, apps):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"apps": apps}))
+    return graphapi_manifest.load_manifest(str(path))
+
+
+def test_build_plan_actions(tmp_path):
+    apps = _load(tmp_path, [
+        {"name": "new", "permissions": ["Sites.Read.All"]},
+        {"name": "same", "permissions": ["Sites.Read.All"], "description": "Same"},
+        {"name": "changed", "permissions": ["Sites.Read.All", "Mail.Read"], "description": "Changed"},
+        {"name": "adopted", "permissions": [], "description": "Adopted"}
+    ])
+    access = [{"resourceAppId": GRAPH_RESOURCE_APP_ID, "resourceAccess": [{"id": "role-sites", "type": "Role"}]}]
+    tenant_apps = {
+        "Automation-same": {"id": "1", "appId": "a1", "notes": "Same", "requiredResourceAccess": access},
+        "Automation-changed": {"id": "2", "appId": "a2", "notes": "Changed", "requiredResourceAccess": access},
+        "Automation-adopted": {"id": "3", "appId": "a3", "notes": "Adopted", "requiredResourceAccess": []}
+    }
+    config = {"app_registrations": [{"name": "Automation-same"}, {"name": "Automation-changed"},
+                                    {"name": "Automation-gone"}]}
+
+    plan = graphapi_manifest.build_plan(apps, config, FakeCatalog(), tenant_apps, {"a1": "sp1"})
+    actions = {change["name"]: change["action"] for change in plan["changes"]}
+    assert actions == {"new": "create", "same": "none", "changed": "update", "adopted": "adopt"}
+    assert plan["unmanaged"] == ["Automation-gone"]
+
+
+def test_apply_plan_reports_create_with_failed_permissions(tmp_path):
+    apps = _load(tmp_path, [{"name": "new", "permissions": ["Sites.Read.All"], "grant": True}])
+    plan = graphapi_manifest.build_plan(apps, {"app_registrations": []}, FakeCatalog(), {}, {})
+    orchestrator = FakeOrchestrator(permissions_set=False)
+
+    applied, failed = graphapi_manifest.apply_plan(orchestrator, plan, max_workers=1)
+
+    assert (applied, failed) == (0, ["Automation-new"])
+    # The app exists in the tenant, so it is recorded with its secret but consent is not granted
+    assert orchestrator.saved_secrets == ["new"]
+    assert [app["name"] for app in orchestrator.config["app_registrations"]] == ["Automation-new"]
+    assert orchestrator.granted == []
+
+
+def test_apply_plan_create(tmp_path):
+    apps = _load(tmp_path, [{"name": "new", "permissions": ["Sites.Read.All"], "grant": True}])
+    plan = graphapi_manifest.build_plan(apps, {"app_registrations": []}, FakeCatalog(), {}, {})
+    orchestrator = FakeOrchestrator()
+
+    assert graphapi_manifest.apply_plan(orchestrator, plan, max_workers=1) == (1, [])
+    assert orchestrator.granted == ["new-client"]
+    assert orchestrator.config_saves == 1
+
+
+def _tenant_app(notes, access):
+    return {"Automation-app": {"id": "obj", "appId": "client", "notes": notes, "requiredResourceAccess": access}}
+
+
+def test_adopt_creates_a_secret_and_keeps_other_api_permissions(tmp_path):
+    apps = _load(tmp_path, [{"name": "app", "permissions": ["Mail.Read"], "description": "App"}])
+    graph_access = {"resourceAppId": GRAPH_RESOURCE_APP_ID, "resourceAccess": [{"id": "role-sites", "type": "Role"}]}
+    plan = graphapi_manifest.build_plan(apps, {"app_registrations": []}, FakeCatalog(),
+                                        _tenant_app("App", [SHAREPOINT_ACCESS, graph_access]), {})
+    orchestrator = FakeOrchestrator()
+
+    assert graphapi_manifest.apply_plan(orchestrator, plan, max_workers=1) == (1, [])
+    assert orchestrator.permission_updates == [("obj", ["Mail.Read"], [SHAREPOINT_ACCESS, graph_access])]
+    assert orchestrator.saved_secrets == ["app"]
+    assert orchestrator.config["app_registrations"][0]["secret_expiry"] == "2027-04-17T00:00:00Z"
+
+
+def test_removing_all_graph_permissions_keeps_other_apis(tmp_path):
+    apps = _load(tmp_path, [{"name": "app", "permissions": [], "description": "App"}])
+    graph_access = {"resourceAppId": GRAPH_RESOURCE_APP_ID, "resourceAccess": [{"id": "role-mail", "type": "Role"}]}
+    config = {"app_registrations": [{"name": "Automation-app", "secret_expiry": "2027-01-01T00:00:00Z"}]}
+    plan = graphapi_manifest.build_plan(apps, config, FakeCatalog(),
+                                        _tenant_app("App", [SHAREPOINT_ACCESS, graph_access]), {})
+    assert [change["action"] for change in plan["changes"]] == ["update"]
+    orchestrator = FakeOrchestrator()
+    orchestrator.config = config
+
+    assert graphapi_manifest.apply_plan(orchestrator, plan, max_workers=1) == (1, [])
+    assert orchestrator.http.patched == [{"notes": "App", "requiredResourceAccess": [SHAREPOINT_ACCESS]}]
+    assert orchestrator.saved_secrets == []
+    assert config["app_registrations"][0]["secret_expiry"] == "2027-01-01T00:00:00Z"
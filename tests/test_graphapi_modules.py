@@ -0,0 +1,48 @@
+import importlib.util
+import json
+
+from workflows.common import graph_runtime
+from workflows.common.graphapi_orchestrator import GraphAPIOrchestrator
+
+
+def _write_profile(directory, client_id):
+    directory.mkdir(parents=True)
+    (directory / "GraphAPI_config.json").write_text(json.dumps({
+        "app_registrations": [{"name": "Automation-sharepoint", "client_id": client_id}]}))
+    (directory / ".env.sharepoint.secret").write_text(
+        f"SHAREPOINT_CLIENT_ID={client_id}\nSHAREPOINT_CLIENT_SECRET={client_id}-secret\nTENANT_ID={client_id}-tenant\n")
+
+
+def _load_module(path):
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_tenant_modules_read_their_profile_secret(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # A default-tenant secret and environment must not leak into tenant modules
+    _write_profile(tmp_path / "default", "default")
+    (tmp_path / ".env.sharepoint.secret").write_text(
+        (tmp_path / "default" / ".env.sharepoint.secret").read_text())
+    monkeypatch.setenv("SHAREPOINT_CLIENT_ID", "env")
+    monkeypatch.setenv("SHAREPOINT_CLIENT_SECRET", "env-secret")
+    monkeypatch.setenv("TENANT_ID", "env-tenant")
+
+    for tenant in ("prod", "test"):
+        _write_profile(tmp_path / "tenants" / tenant, tenant)
+        orchestrator = GraphAPIOrchestrator(base_dir=tmp_path / "tenants" / tenant)
+        assert orchestrator.generate_api_module("sharepoint", tenant=tenant)
+
+    for tenant in ("prod", "test"):
+        module = _load_module(tmp_path / "api_modules" / f"{tenant}_sharepoint" / "sharepoint_api.py")
+        assert module.SECRET_DIR == str((tmp_path / "tenants" / tenant).resolve())
+        assert graph_runtime.load_credentials(module.APP_NAME, module.SECRET_DIR) == (
+            tenant, f"{tenant}-secret", f"{tenant}-tenant")
+
+    # Without a tenant the module keeps the environment-first lookup
+    assert GraphAPIOrchestrator(base_dir=tmp_path / "default").generate_api_module("sharepoint")
+    module = _load_module(tmp_path / "api_modules" / "sharepoint" / "sharepoint_api.py")
+    assert module.SECRET_DIR is None
+    assert graph_runtime.load_credentials(module.APP_NAME, module.SECRET_DIR)[0] == "env"
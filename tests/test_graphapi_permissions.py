@@ -0,0 +1,83 @@
+import json
+from datetime import datetime, timedelta
+
+from workflows.common import graphapi_permissions
+from workflows.common.graphapi_permissions import PermissionCatalog, GRAPH_RESOURCE_APP_ID
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class FakeHttp:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, headers=None):
+        self.calls += 1
+        return FakeResponse(200, {"value": [{
+            "id": "sp-id",
+            "appRoles": [{"value": "Sites.Read.All", "id": "role-sites", "displayName": "Read sites"},
+                         {"value": "User.Read", "id": "role-user", "displayName": "Read users"}],
+            "oauth2PermissionScopes": [{"value": "User.Read", "id": "scope-user"},
+                                       {"value": "Mail.Read", "id": "scope-mail"}]
+        }]})
+
+
+def test_catalog_is_fetched_once_and_cached(tmp_path):
+    http = FakeHttp()
+    path = tmp_path / "catalog.json"
+    assert PermissionCatalog(path, http=http).load("token")
+    assert PermissionCatalog(path, http=http).load("token")
+    assert http.calls == 1
+
+
+def test_stale_or_old_version_cache_is_refetched(tmp_path):
+    http = FakeHttp()
+    path = tmp_path / "catalog.json"
+    PermissionCatalog(path, http=http).load("token")
+
+    data = json.loads(path.read_text())
+    data["fetched"] = (datetime.now() - timedelta(days=30)).isoformat()
+    path.write_text(json.dumps(data))
+    PermissionCatalog(path, http=http).load("token")
+
+    data = json.loads(path.read_text())
+    data["version"] = graphapi_permissions.CATALOG_VERSION - 1
+    path.write_text(json.dumps(data))
+    PermissionCatalog(path, http=http).load("token")
+    assert http.calls == 3
+
+
+def test_required_resource_access_round_trip(tmp_path):
+    catalog = PermissionCatalog(tmp_path / "catalog.json", http=FakeHttp())
+    catalog.load("token")
+
+    required, unknown = catalog.required_resource_access(["Sites.Read.All", "User.Read", "Mail.Read",
+                                                          "Sites.Read.All", "Nope.All"])
+    assert unknown == ["Nope.All"]
+    assert required == [{"resourceAppId": GRAPH_RESOURCE_APP_ID, "resourceAccess": [
+        {"id": "role-sites", "type": "Role"},
+        {"id": "role-user", "type": "Role"},
+        {"id": "scope-mail", "type": "Scope"}
+    ]}]
+    assert catalog.permission_names(required) == ["Mail.Read", "Sites.Read.All", "User.Read"]
+
+
+def test_required_resource_access_keeps_other_apis(tmp_path):
+    catalog = PermissionCatalog(tmp_path / "catalog.json", http=FakeHttp())
+    catalog.load("token")
+    sharepoint = {"resourceAppId": "00000003-0000-0ff1-ce00-000000000000",
+                  "resourceAccess": [{"id": "sp-role", "type": "Role"}]}
+    current = [sharepoint, {"resourceAppId": GRAPH_RESOURCE_APP_ID,
+                            "resourceAccess": [{"id": "role-user", "type": "Role"}]}]
+
+    required, _ = catalog.required_resource_access(["Mail.Read"], current)
+    assert required == [sharepoint, {"resourceAppId": GRAPH_RESOURCE_APP_ID,
+                                     "resourceAccess": [{"id": "scope-mail", "type": "Scope"}]}]
+    assert catalog.required_resource_access([], current)[0] == [sharepoint]
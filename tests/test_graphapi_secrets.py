@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+
+from workflows.common import graphapi_secrets
+
+
+def _iso(days):
+    return (datetime.now(timezone.utc) + timedelta(days=days, hours=1)).strftime("%Y-%m-%dT%H:%M:%S.0000000Z")
+
+
+class FakeHttp:
+    def __init__(self, apps):
+        self.apps = apps
+
+    def iter_values(self, url, headers=None):
+        return iter(self.apps)
+
+
+class FakeOrchestrator:
+    def __init__(self, apps, registrations):
+        self.token = "token"
+        self.http = FakeHttp(apps)
+        self.config = {"app_registrations": registrations}
+        self.rotated = []
+        self.saves = 0
+
+    def _save_config(self):
+        self.saves += 1
+
+    def rotate_client_secret(self, name, save):
+        self.rotated.append(name)
+        return {"name": name}
+
+
+def test_summarize_credentials_uses_newest_secret():
+    credentials, expiry = graphapi_secrets.summarize_credentials([
+        {"keyId": "new", "endDateTime": "2027-01-01T10:00:00.1234567Z"},
+        {"keyId": "old", "endDateTime": "2026-11-01T10:00:00Z"}
+    ])
+    assert [credential["key_id"] for credential in credentials] == ["old", "new"]
+    assert expiry == "2027-01-01T10:00:00Z"
+    assert graphapi_secrets.summarize_credentials([]) == ([], None)
+
+
+def test_scan_and_rotate_apps_inside_window():
+    apps = [
+        {"id": "o1", "passwordCredentials": [{"keyId": "k1", "endDateTime": _iso(10)}]},
+        {"id": "o2", "passwordCredentials": [{"keyId": "k2", "endDateTime": _iso(200)}]},
+        {"id": "o3", "passwordCredentials": []},
+        {"id": "o4", "passwordCredentials": [{"keyId": "k4", "endDateTime": _iso(-5)}]}
+    ]
+    registrations = [{"name": f"Automation-app{i}", "object_id": f"o{i}"} for i in range(1, 6)]
+    orchestrator = FakeOrchestrator(apps, registrations)
+
+    index = graphapi_secrets.scan_secret_expiry(orchestrator, 30)
+    assert [(entry["name"], entry["days_left"]) for entry in index] == [
+        ("Automation-app3", None), ("Automation-app4", -5), ("Automation-app1", 10), ("Automation-app2", 200)]
+    assert registrations[0]["secret_expiry"] == _iso(10)[:19] + "Z"
+
+    rotated, failed = graphapi_secrets.rotate_expiring(orchestrator, 30, max_workers=2)
+    assert rotated == ["Automation-app1", "Automation-app3", "Automation-app4"]
+    assert failed == []
+    assert sorted(orchestrator.rotated) == ["app1", "app3", "app4"]
@@ -0,0 +1,131 @@
+import pytest
+
+from workflows.common import graphapi_sync
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class FakeHttp:
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def get(self, url, headers=None):
+        self.requested.append(url)
+        return self.pages[url]
+
+
+class FakeCatalog:
+    loaded = True
+
+    def permission_names(self, required_resource_access):
+        return sorted(access["id"] for resource in required_resource_access
+                      for access in resource["resourceAccess"])
+
+
+class FakeOrchestrator:
+    def __init__(self, pages, registrations, delta_sync=None):
+        self.token = "token"
+        self.http = FakeHttp(pages)
+        self.permission_catalog = FakeCatalog()
+        self.config = {"app_registrations": registrations}
+        if delta_sync is not None:
+            self.config["delta_sync"] = delta_sync
+        self.saves = 0
+
+    def _save_config(self):
+        self.saves += 1
+
+
+def test_read_delta_follows_next_links():
+    http = FakeHttp({
+        "page1": FakeResponse(200, {"value": [{"id": "a"}], "@odata.nextLink": "page2"}),
+        "page2": FakeResponse(200, {"value": [{"id": "b"}], "@odata.deltaLink": "delta"})
+    })
+    assert graphapi_sync.read_delta("page1", {}, http) == ([{"id": "a"}, {"id": "b"}], "delta", 2)
+
+    with pytest.raises(graphapi_sync.DeltaExpired):
+        graphapi_sync.read_delta("gone", {}, FakeHttp({"gone": FakeResponse(410)}))
+    with pytest.raises(RuntimeError):
+        graphapi_sync.read_delta("bad", {}, FakeHttp({"bad": FakeResponse(500)}))
+
+
+def test_full_sync_adds_updates_and_removes():
+    pages = {
+        graphapi_sync.APPLICATION_DELTA_URL: FakeResponse(200, {
+            "value": [
+                {"id": "o1", "appId": "c1", "displayName": "Automation-one", "notes": "edited",
+                 "requiredResourceAccess": [{"resourceAccess": [{"id": "Sites.Read.All"}]}],
+                 "passwordCredentials": []},
+                {"id": "o3", "appId": "c3", "displayName": "Automation-new",
+                 "createdDateTime": "2026-01-01T00:00:00Z"},
+                {"id": "o4", "appId": "c4", "displayName": "Other app"}
+            ],
+            "@odata.deltaLink": "apps-delta"
+        }),
+        graphapi_sync.SERVICE_PRINCIPAL_DELTA_URL: FakeResponse(200, {
+            "value": [{"id": "sp3", "appId": "c3", "accountEnabled": False}],
+            "@odata.deltaLink": "sps-delta"
+        })
+    }
+    registrations = [
+        {"name": "Automation-one", "object_id": "o1", "client_id": "c1", "description": "old"},
+        {"name": "Automation-gone", "object_id": "o2", "client_id": "c2"}
+    ]
+    orchestrator = FakeOrchestrator(pages, registrations)
+
+    report = graphapi_sync.sync_config(orchestrator)
+    assert report == {"added": ["Automation-new"], "updated": ["Automation-one"], "removed": ["Automation-gone"]}
+    assert [app["name"] for app in registrations] == ["Automation-one", "Automation-new"]
+    assert registrations[0]["description"] == "edited"
+    assert registrations[0]["permissions"] == ["Sites.Read.All"]
+    assert registrations[1]["service_principal_id"] == "sp3"
+    assert registrations[1]["service_principal_enabled"] is False
+    assert orchestrator.config["delta_sync"]["applications"] == "apps-delta"
+    assert orchestrator.config["delta_sync"]["servicePrincipals"] == "sps-delta"
+    assert orchestrator.saves == 1
+
+
+def test_incremental_sync_uses_stored_delta_links():
+    pages = {
+        "apps-delta": FakeResponse(200, {
+            "value": [{"id": "o2", "@removed": {"reason": "changed"}}],
+            "@odata.deltaLink": "apps-delta-2"
+        }),
+        "sps-delta": FakeResponse(200, {"value": [], "@odata.deltaLink": "sps-delta-2"})
+    }
+    registrations = [
+        {"name": "Automation-one", "object_id": "o1", "client_id": "c1"},
+        {"name": "Automation-two", "object_id": "o2", "client_id": "c2"}
+    ]
+    orchestrator = FakeOrchestrator(pages, registrations,
+                                    {"applications": "apps-delta", "servicePrincipals": "sps-delta"})
+
+    report = graphapi_sync.sync_config(orchestrator)
+    # Only the removed app changes; apps missing from an incremental delta are kept
+    assert report == {"added": [], "updated": [], "removed": ["Automation-two"]}
+    assert [app["name"] for app in registrations] == ["Automation-one"]
+    assert orchestrator.http.requested == ["apps-delta", "sps-delta"]
+    assert orchestrator.config["delta_sync"]["applications"] == "apps-delta-2"
+
+
+def test_expired_delta_link_falls_back_to_full_sync():
+    pages = {
+        "apps-delta": FakeResponse(410),
+        graphapi_sync.APPLICATION_DELTA_URL: FakeResponse(200, {"value": [], "@odata.deltaLink": "fresh"}),
+        "sps-delta": FakeResponse(200, {"value": [], "@odata.deltaLink": "sps-delta"})
+    }
+    registrations = [{"name": "Automation-one", "object_id": "o1", "client_id": "c1"}]
+    orchestrator = FakeOrchestrator(pages, registrations,
+                                    {"applications": "apps-delta", "servicePrincipals": "sps-delta"})
+
+    report = graphapi_sync.sync_config(orchestrator)
+    assert report["removed"] == ["Automation-one"]
+    assert orchestrator.config["delta_sync"]["applications"] == "fresh"
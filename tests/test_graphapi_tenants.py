@@ -0,0 +1,74 @@
+import json
+import argparse
+import threading
+
+import pytest
+
+from workflows.common import graphapi_orchestrator, graphapi_tenants
+from workflows.common.graphapi_tenants import TenantProfile
+
+
+def _profiles(tmp_path):
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps({"tenants": {
+        "prod": {"directory": str(tmp_path / "prod"), "requests_per_second": 10},
+        "test1": None,
+        "test2": {"directory": str(tmp_path / "test2"), "requests_per_second": 5}
+    }}))
+    return graphapi_tenants.load_profiles(str(path))
+
+
+def test_load_and_select_profiles(tmp_path):
+    profiles = _profiles(tmp_path)
+    assert str(profiles["test1"].directory) == "tenants/test1"
+    assert profiles["test1"].requests_per_second is None
+    assert profiles["prod"].requests_per_second == 10
+
+    assert [profile.name for profile in graphapi_tenants.select_profiles(profiles)] == ["prod", "test1", "test2"]
+    assert [profile.name for profile in graphapi_tenants.select_profiles(profiles, ["test2", "prod"])] == [
+        "test2", "prod"]
+    with pytest.raises(ValueError):
+        graphapi_tenants.select_profiles(profiles, ["prod", "staging"])
+
+
+def test_run_for_tenants_in_parallel_and_collects_failures():
+    profiles = [TenantProfile(name) for name in ("c", "a", "b")]
+    # Every tenant waits for the others, so this only completes when they run at once
+    barrier = threading.Barrier(len(profiles), timeout=5)
+
+    def command(profile):
+        barrier.wait()
+        if profile.name == "b":
+            raise RuntimeError("token request failed")
+        return {"ok": profile.name != "c", "summary": f"done {profile.name}"}
+
+    report = graphapi_tenants.run_for_tenants(profiles, command, "scan")
+    assert report["command"] == "scan"
+    assert list(report["tenants"]) == ["a", "b", "c"]
+    assert report["tenants"]["a"] == {"ok": True, "summary": "done a"}
+    assert report["tenants"]["b"] == {"ok": False, "summary": "error: token request failed"}
+    assert report["tenants"]["c"]["ok"] is False
+
+
+def test_each_tenant_gets_its_own_directory_and_limiter(tmp_path, monkeypatch):
+    profiles = _profiles(tmp_path)
+    orchestrators = {}
+
+    def fake_scan(orchestrator, within_days):
+        orchestrators[orchestrator.base_dir.name] = orchestrator
+        return {}
+
+    monkeypatch.setattr(graphapi_orchestrator.graphapi_secrets, "scan_secret_expiry", fake_scan)
+    args = argparse.Namespace(plan=None, apply=None, scan_secrets=True, within_days=30)
+    selected = graphapi_tenants.select_profiles(profiles, ["prod", "test2"])
+
+    report = graphapi_tenants.run_for_tenants(
+        selected, lambda profile: graphapi_orchestrator.run_tenant_command(args, profile), "scan-secrets")
+
+    assert all(result["ok"] for result in report["tenants"].values())
+    prod, test2 = orchestrators["prod"], orchestrators["test2"]
+    assert prod.config_path == tmp_path / "prod" / "GraphAPI_config.json"
+    assert test2.permission_catalog.path == tmp_path / "test2" / ".cache" / "graph_permission_catalog.json"
+    assert prod.http.limiter is not test2.http.limiter
+    assert (prod.http.limiter.rate, test2.http.limiter.rate) == (10, 5)
+    assert prod.permission_catalog.http is prod.http
@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from workflows.common import purview_file_plan, purview_label_catalog
+from workflows.common.purview_label_catalog import LabelCatalog
+
+HEADER = "Label,Retention Period,Trigger,Disposition,Behavior,Category,Subcategory,Reference\n"
+
+
+def _plan_file(tmp_path, rows):
+    path = tmp_path / "file_plan.csv"
+    path.write_text(HEADER + "".join(row + "\n" for row in rows), encoding="utf-8")
+    return str(path)
+
+
+def test_load_file_plan_normalizes_values(tmp_path):
+    entries = purview_file_plan.load_file_plan(_plan_file(tmp_path, [
+        "Legal 7y,2555,datelabeled,DELETE,retain,Contracts,NDA,LEG-01",
+        "Keep forever,Forever,dateCreated,none,retainAsRecord,,,",
+        ",,,,,,,"
+    ]))
+    assert [(entry["name"], entry["row"]) for entry in entries] == [("Legal 7y", 2), ("Keep forever", 3)]
+    legal = entries[0]
+    assert (legal["retention_days"], legal["retention_trigger"], legal["action_after_retention"]) == (
+        2555, "dateLabeled", "delete")
+    assert (legal["category"], legal["subcategory"], legal["file_plan_reference"]) == ("Contracts", "NDA", "LEG-01")
+    assert entries[1]["retention_days"] == "forever" and entries[1]["category"] is None
+
+
+@pytest.mark.parametrize("row", [
+    "Bad days,-3,dateLabeled,delete,retain,,,",
+    "Bad trigger,10,whenever,delete,retain,,,",
+    "Orphan,10,dateLabeled,delete,retain,,NDA,",
+])
+def test_load_file_plan_rejects_invalid_rows(tmp_path, row):
+    with pytest.raises(ValueError):
+        purview_file_plan.load_file_plan(_plan_file(tmp_path, [row]))
+
+
+def test_load_file_plan_rejects_duplicates(tmp_path):
+    with pytest.raises(ValueError):
+        purview_file_plan.load_file_plan(_plan_file(tmp_path, [
+            "Legal 7y,10,dateLabeled,delete,retain,,,", "legal 7Y,20,dateLabeled,delete,retain,,,"]))
+
+
+def test_build_plan_diffs_against_catalog(tmp_path):
+    entries = purview_file_plan.load_file_plan(_plan_file(tmp_path, [
+        "Legal 7y,2555,dateLabeled,delete,retain,contracts,NDA,LEG-01",
+        "Finance 10y,3650,dateCreated,startDispositionReview,retain,Finance,Invoices,",
+        "HR 5y,1825,dateLabeled,delete,retain,,,",
+        "Incomplete,,,,,,,"
+    ]))
+    catalog = LabelCatalog([
+        {"id": "lbl-legal", "displayName": "Legal 7y", "retentionDuration": {"days": 2555},
+         "retentionTrigger": "dateLabeled", "actionAfterRetentionPeriod": "delete",
+         "behaviorDuringRetentionPeriod": "retain",
+         "descriptors": {"category": {"displayName": "Contracts", "subcategory": {"displayName": "NDA"}},
+                         "filePlanReference": {"displayName": "LEG-01"}}},
+        {"id": "lbl-hr", "displayName": "HR 5y", "retentionDuration": {"days": 365},
+         "retentionTrigger": "dateLabeled", "actionAfterRetentionPeriod": "delete",
+         "behaviorDuringRetentionPeriod": "retain"},
+        {"id": "lbl-old", "displayName": "Retired"}
+    ])
+    templates = {"authority": {}, "category": {"contracts": "cat-1"}, "citation": {}, "department": {},
+                 "file_plan_reference": {"leg-01": "ref-1"}, "subcategory": {"cat-1": {"nda": "sub-1"}}}
+
+    plan = purview_file_plan.build_plan(entries, catalog, templates)
+    actions = {change["name"]: (change["action"], change["label_id"], change["differences"])
+               for change in plan["changes"]}
+    # Descriptors match case-insensitively
+    assert actions["Legal 7y"] == ("none", "lbl-legal", [])
+    assert actions["HR 5y"] == ("update", "lbl-hr", ["retention_days"])
+    assert actions["Finance 10y"][0] == "create"
+    assert plan["templates"] == [{"column": "category", "category": None, "name": "Finance"},
+                                 {"column": "subcategory", "category": "Finance", "name": "Invoices"}]
+    assert plan["unmanaged"] == ["Retired"]
+    assert [error["name"] for error in plan["errors"]] == ["Incomplete"]
+
+
+def test_plan_fails_when_the_catalog_cannot_be_revalidated(tmp_path, monkeypatch):
+    cache = str(tmp_path / "labels.json")
+    LabelCatalog([{"id": "lbl-hr", "displayName": "HR 5y"}], time.time(), "etag-1").save(cache)
+
+    class Unavailable:
+        status_code = 503
+        text = "Service unavailable"
+
+    monkeypatch.setattr(purview_label_catalog.graph_http, "request", lambda method, url, headers=None: Unavailable())
+    with pytest.raises(RuntimeError):
+        purview_file_plan.plan_file_plan(_plan_file(tmp_path, ["HR 5y,1825,dateLabeled,delete,retain,,,"]),
+                                         cache, token_provider=lambda: "token")
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+from workflows.common import purview_label_catalog
+from workflows.common.purview_label_catalog import LabelCatalog
+
+LABELS = [
+    {"id": "lbl-1", "displayName": "Legal 7y", "retentionDuration": {"days": 2555},
+     "descriptors": {"category": {"displayName": "Contracts", "subcategory": {"displayName": "NDA"}},
+                     "filePlanReference": {"displayName": "LEG-01"}}},
+    {"id": "lbl-2", "displayName": "Keep forever",
+     "retentionDuration": {"@odata.type": "#microsoft.graph.security.retentionDurationForever"}}
+]
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, etag=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = {"ETag": etag} if etag else {}
+        self.text = ""
+
+    def json(self):
+        return self.data
+
+
+def test_lookup_and_summary():
+    catalog = LabelCatalog(LABELS)
+    assert catalog.find("legal 7Y")["id"] == "lbl-1"
+    assert catalog.resolve("lbl-2")["displayName"] == "Keep forever"
+    assert catalog.resolve("Keep forever")["id"] == "lbl-2"
+    assert catalog.find(None) is None and catalog.name_of("missing") is None
+    assert "lbl-1" in catalog and len(catalog) == 2
+
+    summary = LabelCatalog.summary(LABELS[0])
+    assert (summary["retention_days"], summary["category"], summary["subcategory"], summary["file_plan_reference"]) == (
+        2555, "Contracts", "NDA", "LEG-01")
+    assert LabelCatalog.summary(LABELS[1])["retention_days"] == "forever"
+
+
+def test_sync_uses_fresh_cache_and_revalidates_stale(tmp_path, monkeypatch):
+    path = str(tmp_path / "labels.json")
+    requests = []
+
+    def fake_request(method, url, headers=None):
+        requests.append(headers.get("If-None-Match"))
+        if headers.get("If-None-Match") == "etag-1":
+            return FakeResponse(304)
+        return FakeResponse(200, {"value": [dict(label, **{"@odata.etag": "x"}) for label in LABELS]}, "etag-1")
+
+    monkeypatch.setattr(purview_label_catalog.graph_http, "request", fake_request)
+    catalog = purview_label_catalog.sync_catalog(path, token_provider=lambda: "token")
+    assert [label["id"] for label in catalog] == ["lbl-1", "lbl-2"]
+    assert "@odata.etag" not in catalog.get("lbl-1")
+
+    # Fresh cache: no request
+    assert len(purview_label_catalog.sync_catalog(path, token_provider=lambda: "token")) == 2
+    assert requests == [None]
+
+    # Stale cache: conditional request, unchanged labels keep the cache
+    stale = LabelCatalog.load(path)
+    LabelCatalog(stale.labels, time.time() - 2 * purview_label_catalog.DEFAULT_TTL, stale.etag).save(path)
+    revalidated = purview_label_catalog.sync_catalog(path, token_provider=lambda: "token")
+    assert requests == [None, "etag-1"]
+    assert len(revalidated) == 2 and revalidated.age() < 60
+
+
+def test_sync_failure_falls_back_to_cache(tmp_path, monkeypatch):
+    path = str(tmp_path / "labels.json")
+    monkeypatch.setattr(purview_label_catalog.graph_http, "request",
+                        lambda method, url, headers=None: FakeResponse(503))
+
+    with pytest.raises(RuntimeError):
+        purview_label_catalog.sync_catalog(path, token_provider=lambda: "token")
+
+    LabelCatalog(LABELS, time.time() - 2 * purview_label_catalog.DEFAULT_TTL, "etag-1").save(path)
+    catalog = purview_label_catalog.sync_catalog(path, token_provider=lambda: "token")
+    assert len(catalog) == 2
+
+    with pytest.raises(RuntimeError):
+        purview_label_catalog.sync_catalog(path, force=True, strict=True, token_provider=lambda: "token")
+
+
+def test_get_catalog_waits_before_retrying_a_failed_sync(tmp_path, monkeypatch):
+    path = str(tmp_path / "labels.json")
+    LabelCatalog(LABELS, time.time() - 2 * purview_label_catalog.DEFAULT_TTL, "etag-1").save(path)
+    attempts = []
+
+    def unavailable(method, url, headers=None):
+        attempts.append(url)
+        return FakeResponse(503)
+
+    monkeypatch.setattr(purview_label_catalog.graph_http, "request", unavailable)
+    purview_label_catalog.forget_catalogs()
+    clock = [1000.0]
+    monkeypatch.setattr(purview_label_catalog.time, "monotonic", lambda: clock[0])
+    try:
+        for _ in range(3):
+            assert len(purview_label_catalog.get_catalog(path, token_provider=lambda: "token")) == 2
+        assert len(attempts) == 1
+
+        clock[0] += purview_label_catalog.SYNC_RETRY_SECONDS
+        purview_label_catalog.get_catalog(path, token_provider=lambda: "token")
+        assert len(attempts) == 2
+    finally:
+        purview_label_catalog.forget_catalogs()
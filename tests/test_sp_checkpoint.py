@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from workflows.common.sp_checkpoint import ExtractionCheckpoint, CheckpointExists, CheckpointMismatch
+
+RUN_KEY = {"sites": ["https://contoso/sites/Legal"], "list": None, "detailed": False}
+SITE = "https://contoso/sites/Legal"
+
+
+def _interrupted_run(path):
+    checkpoint = ExtractionCheckpoint(path, RUN_KEY)
+    checkpoint.record_site_header(SITE, {"site_id": "1", "site_columns": []})
+    checkpoint.record_list_page(SITE, [{"id": "a"}, {"id": "b"}], "https://graph/next")
+    checkpoint.record_list(SITE, "a", {"name": "Contracts"})
+    checkpoint.close()
+    return checkpoint
+
+
+def test_resume_replays_progress(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    first = _interrupted_run(path)
+
+    resumed = ExtractionCheckpoint(path, RUN_KEY, resume=True)
+    assert resumed.started == first.started
+    assert resumed.site_header(SITE) == {"site_id": "1", "site_columns": []}
+    assert resumed.list_enumeration(SITE) == ([{"id": "a"}, {"id": "b"}], "https://graph/next", False)
+    assert resumed.list_entry(SITE, "a") == {"name": "Contracts"}
+    assert resumed.list_entry(SITE, "b") is None
+    resumed.close()
+
+
+def test_resume_ignores_partial_last_record(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    _interrupted_run(str(path))
+    with open(path, "a") as f:
+        f.write('{"type": "list", "site_url"')
+
+    resumed = ExtractionCheckpoint(str(path), RUN_KEY, resume=True)
+    resumed.record_list(SITE, "b", {"name": "Invoices"})
+    resumed.close()
+
+    again = ExtractionCheckpoint(str(path), RUN_KEY, resume=True)
+    assert again.list_entry(SITE, "b") == {"name": "Invoices"}
+    again.close()
+
+
+def test_resume_with_other_run_key_is_refused(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    _interrupted_run(path)
+    with pytest.raises(CheckpointMismatch):
+        ExtractionCheckpoint(path, dict(RUN_KEY, detailed=True), resume=True)
+
+
+def test_new_run_does_not_truncate_interrupted_journal(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    _interrupted_run(str(path))
+    journal = path.read_text()
+
+    with pytest.raises(CheckpointExists):
+        ExtractionCheckpoint(str(path), RUN_KEY)
+    assert path.read_text() == journal
+
+    restarted = ExtractionCheckpoint(str(path), RUN_KEY, overwrite=True)
+    assert restarted.site_header(SITE) is None
+    restarted.complete()
+    assert not path.exists()
+
+
+def test_default_checkpoint_path_per_site_list():
+    from workflows.common import sp_metadata_tool
+
+    legal = sp_metadata_tool.default_checkpoint_path([SITE])
+    assert legal == sp_metadata_tool.default_checkpoint_path([SITE])
+    assert legal != sp_metadata_tool.default_checkpoint_path([SITE, "https://contoso/sites/Finance"])
+    assert os.path.dirname(legal) == sp_metadata_tool.DEFAULT_CHECKPOINT_DIR
@@ -0,0 +1,47 @@
+import json
+
+from workflows.common import sp_column_index
+
+
+def _write_extraction(path, extraction_date, columns):
+    path.write_text(json.dumps({
+        "site_url": "https://contoso/sites/Legal",
+        "extraction_date": extraction_date,
+        "lists": [{"name": "Contracts", "columns": [
+            {"name": display_name, "internal_name": internal_name, "type": "Text"}
+            for internal_name, display_name in columns
+        ]}]
+    }, indent=2))
+
+
+def test_build_index_keeps_newest_extraction_of_a_site(tmp_path):
+    source = tmp_path / "extracted"
+    source.mkdir()
+    index = str(tmp_path / "index.db")
+    _write_extraction(source / "site_legal_20261001.json", "2026-10-01T00:00:00", [("Vendor", "Vendor")])
+    sp_column_index.build_index(str(source), index)
+
+    _write_extraction(source / "site_legal_20261019.json", "2026-10-19T00:00:00",
+                      [("Vendor", "Vendor"), ("Amount", "Amount")])
+    assert sp_column_index.build_index(str(source), index) == 2
+
+    assert len(sp_column_index.query_index(index, name="Vendor")) == 1
+
+
+def test_wildcard_query_treats_underscore_and_percent_literally(tmp_path):
+    source = tmp_path / "extracted"
+    source.mkdir()
+    index = str(tmp_path / "index.db")
+    _write_extraction(source / "site_legal.json", "2026-10-19T00:00:00", [
+        ("_UIVersionString", "Version"),
+        ("XUIVersionString", "Other"),
+        ("Rate_x0025_", "Rate %"),
+        ("Rate", "Rate x")
+    ])
+    sp_column_index.build_index(str(source), index)
+
+    assert [usage["internal_name"] for usage in sp_column_index.query_index(index, name="_UIVersion*")] \
+        == ["_UIVersionString"]
+    assert [usage["display_name"] for usage in sp_column_index.query_index(index, display_name="Rate %*")] \
+        == ["Rate %"]
+    assert len(sp_column_index.query_index(index, name="Rate")) == 1
@@ -0,0 +1,55 @@
+import json
+import os
+
+from workflows.common import sp_conformance
+from workflows.common import sp_metadata_utils as sp
+
+
+def _write_extraction(directory, name, site_url, extraction_date, columns):
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        json.dump({
+            "site_url": site_url,
+            "site_id": "site-id",
+            "extraction_date": extraction_date,
+            "site_columns": [],
+            "lists": [{"name": "Contracts", "id": "list-id",
+                       "columns": [{"name": column, "type": "Text"} for column in columns]}]
+        }, f, indent=2)
+    return path
+
+
+def test_latest_extraction_files_keeps_newest_per_site(tmp_path):
+    old = _write_extraction(tmp_path, "site_legal_2.json", "https://contoso/sites/Legal", "2026-10-01T00:00:00", [])
+    new = _write_extraction(tmp_path, "site_legal_1.json", "https://contoso/sites/Legal", "2026-10-19T00:00:00", [])
+    other = _write_extraction(tmp_path, "site_hr.json", "https://contoso/sites/HR", "2026-10-01T00:00:00", [])
+    single = tmp_path / "schema.json"
+    single.write_text(json.dumps({"workflow": "contracts", "metadata": []}))
+
+    paths = sorted([old, new, other, str(single)])
+    assert sp.latest_extraction_files(paths) == sorted([new, other, str(single)])
+
+
+def test_latest_extraction_files_reads_compact_json(tmp_path):
+    old = tmp_path / "a.json"
+    old.write_text(json.dumps({"site_url": "https://contoso/sites/Legal", "extraction_date": "2026-10-01"}))
+    new = tmp_path / "b.json"
+    new.write_text(json.dumps({"site_url": "https://contoso/sites/Legal", "extraction_date": "2026-10-19"}))
+
+    assert sp.latest_extraction_files([str(old), str(new)]) == [str(new)]
+
+
+def test_cached_conformance_counts_each_site_once(tmp_path):
+    target = tmp_path / "metadata-schema.json"
+    target.write_text(json.dumps({"workflow": "contracts", "metadata": [{"name": "Vendor", "type": "Text"}]}))
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    _write_extraction(cache, "site_legal_1.json", "https://contoso/sites/Legal", "2026-10-01T00:00:00", [])
+    _write_extraction(cache, "site_legal_2.json", "https://contoso/sites/Legal", "2026-10-19T00:00:00", ["Vendor"])
+
+    rules = [{"site": "https://contoso/sites/Legal", "library": "Contracts", "schema": str(target)}]
+    report = sp_conformance.run_conformance(rules, cache_dir=str(cache), max_workers=1)
+
+    assert report["summary"]["libraries"] == 1
+    assert report["summary"]["conformant"] == 1
+    assert report["libraries"][0]["source"].endswith("site_legal_2.json")
@@ -0,0 +1,144 @@
+import json
+
+from workflows.common import sp_content_types, sp_inventory
+from workflows.common.sp_content_types import ContentTypeGraph
+
+SITE = "https://contoso/sites/Legal"
+CONTRACT = "0x010100AA"
+GUID = "0123456789ABCDEF0123456789ABCDEF"
+
+
+def _columns(*names, required=()):
+    return [{"name": name, "displayName": name, "required": name in required} for name in names]
+
+
+def _list_ct(list_id, name, columns=None, suffix=GUID, base=CONTRACT):
+    raw = {"id": f"{base}00{suffix}", "name": name}
+    if columns is not None:
+        raw["columns"] = columns
+    return sp_content_types._node("list", raw, SITE, "site-1", list_id, list_id.title())
+
+
+def _graph():
+    return ContentTypeGraph([
+        sp_content_types._node("hub", {"id": "0x0101", "name": "Document"}),
+        sp_content_types._node("hub", {"id": CONTRACT, "name": "Contract",
+                                       "columns": _columns("Title", "Counterparty")}),
+        # Published from the hub, so it carries the hub content type's id
+        sp_content_types._node("site", {"id": CONTRACT, "name": "Contract",
+                                        "columns": _columns("Title", "Counterparty")}, SITE, "site-1"),
+        sp_content_types._node("site", {"id": CONTRACT + "01", "name": "NDA"}, SITE, "site-1"),
+        sp_content_types._node("site", {"id": "0x0120D5", "name": "Matter", "parentId": CONTRACT},
+                               SITE, "site-1"),
+        _list_ct("matches", "Contract", _columns("Title", "Counterparty")),
+        _list_ct("diverged", "Contract", _columns("Title", "Counterparty", "Extra", required=("Counterparty",))),
+        _list_ct("renamed", "Agreement"),
+        _list_ct("orphan", "Lost", _columns("Title"), base="0x010100BB")
+    ])
+
+
+def _key(scope, content_type_id, owner=None):
+    return (scope, owner, content_type_id.lower())
+
+
+def test_parent_resolution():
+    graph = _graph()
+    hub = _key("hub", CONTRACT)
+    site = _key("site", CONTRACT, SITE)
+
+    assert graph.nodes[hub]["parent"] == _key("hub", "0x0101")
+    assert graph.nodes[site]["parent"] == hub
+    # A site-only child prefers the site content type over the hub one with the same id
+    assert graph.nodes[_key("site", CONTRACT + "01", SITE)]["parent"] == site
+    # No id prefix matches, so the parentId field is used
+    assert graph.nodes[_key("site", "0x0120D5", SITE)]["parent"] == site
+    assert graph.nodes[_key("list", f"{CONTRACT}00{GUID}", "matches")]["parent"] == site
+    assert graph.nodes[_key("list", f"0x010100BB00{GUID}", "orphan")]["parent"] is None
+    assert graph.ancestors(_key("list", f"{CONTRACT}00{GUID}", "matches")) == [site, hub, _key("hub", "0x0101")]
+
+
+def test_effective_columns_and_origin():
+    graph = _graph()
+    nda = _key("site", CONTRACT + "01", SITE)
+    diverged = _key("list", f"{CONTRACT}00{GUID}", "diverged")
+
+    assert sorted(graph.effective_columns(nda)) == ["Counterparty", "Title"]
+    assert graph.effective_columns(_key("hub", "0x0101")) is None
+    assert graph.origin(diverged, "Title") == _key("hub", CONTRACT)
+    assert graph.origin(diverged, "Extra") == diverged
+
+
+def test_compared_and_needed():
+    graph = _graph()
+    compared = set(graph.compared())
+
+    assert _key("site", CONTRACT, SITE) in compared
+    assert _key("site", CONTRACT + "01", SITE) not in compared
+    assert {key[1] for key in compared if key[0] == "list"} == {"matches", "diverged", "renamed", "orphan"}
+    assert _key("hub", "0x0101") in graph.needed()
+    assert _key("site", "0x0120D5", SITE) not in graph.needed()
+
+
+def test_compare_statuses():
+    graph = _graph()
+
+    assert graph.compare(_key("list", f"{CONTRACT}00{GUID}", "matches"))["status"] == "matches"
+    assert graph.compare(_key("site", CONTRACT, SITE))["status"] == "matches"
+    assert graph.compare(_key("list", f"{CONTRACT}00{GUID}", "renamed"))["status"] == "unknown"
+    assert graph.compare(_key("list", f"0x010100BB00{GUID}", "orphan"))["status"] == "orphaned"
+
+    result = graph.compare(_key("list", f"{CONTRACT}00{GUID}", "diverged"))
+    assert result["status"] == "diverged"
+    assert not result["renamed"]
+    assert result["added"] == ["Extra"]
+    assert result["removed"] == []
+    assert result["changed"] == [{"column": "Counterparty", "property": "required", "parent": False, "value": True}]
+
+
+def test_compare_renamed_and_removed():
+    graph = _graph()
+    key = _key("list", f"{CONTRACT}00{GUID}", "renamed")
+    graph.nodes[key]["columns"] = [sp_content_types._column_entry(column) for column in _columns("Title")]
+    graph.effective_columns.cache_clear()
+
+    result = graph.compare(key)
+    assert result["status"] == "diverged"
+    assert result["renamed"]
+    assert result["removed"] == ["Counterparty"]
+
+
+def test_build_report():
+    report = sp_content_types.build_report(_graph(), "test")
+
+    summary = report["summary"]
+    assert summary["content_types"] == {"hub": 2, "site": 3, "list": 4}
+    assert (summary["list_content_types"], summary["matches"], summary["diverged"],
+            summary["unknown"], summary["orphaned"]) == (4, 1, 1, 1, 1)
+    assert summary["site_content_types_diverged"] == 0
+    assert report["by_parent"] == [{"site_url": SITE, "id": CONTRACT, "name": "Contract", "scope": "site",
+                                    "lists": 3, "diverged": 1}]
+    diverged = next(entry for entry in report["divergences"] if entry["status"] == "diverged")
+    assert diverged["added_from"] == {"Extra": {"scope": "list", "id": f"{CONTRACT}00{GUID}", "name": "Contract"}}
+
+
+def test_from_inventory(tmp_path):
+    conn = sp_inventory.connect(str(tmp_path / "inventory.db"))
+    site_ct = {"id": CONTRACT, "name": "Contract", "columns": _columns("Title")}
+    list_ct = {"id": f"{CONTRACT}00{GUID}", "name": "Contract"}
+    conn.executemany("INSERT INTO content_types VALUES (?, ?, ?, ?, ?, ?)", [
+        (SITE, None, site_ct["id"], site_ct["name"], None, json.dumps(site_ct)),
+        (SITE, "list-1", list_ct["id"], list_ct["name"], CONTRACT, json.dumps(list_ct)),
+        ("https://contoso/sites/Other", None, "0x0101", "Document", None, json.dumps({"id": "0x0101"}))
+    ])
+
+    graph = ContentTypeGraph.from_inventory(conn, SITE)
+    assert len(graph) == 2
+    list_key = _key("list", list_ct["id"], "list-1")
+    assert graph.nodes[list_key]["parent"] == _key("site", CONTRACT, SITE)
+    assert list(graph.effective_columns(list_key)) == ["Title"]
+
+
+def test_main_without_inventory_exits_with_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(sp_content_types.sys, "argv",
+                        ["sp_content_types.py", "--db", str(tmp_path / "missing.db"), "--hub", "--offline"])
+    assert sp_content_types.main() == 1
@@ -0,0 +1,73 @@
+import json
+
+from workflows.common import sp_inventory
+
+
+def _item(item_id, name="a.docx"):
+    return {"record": "item", "site_url": "https://contoso/sites/Legal", "drive_id": "d1", "list_id": "l1",
+            "library": "Contracts", "item_id": item_id, "name": name, "fields": {}, "deleted": False}
+
+
+def _deleted(item_id):
+    return {"record": "item", "drive_id": "d1", "item_id": item_id, "deleted": True}
+
+
+def _names(conn):
+    return dict(conn.execute("SELECT item_id, name FROM items ORDER BY item_id").fetchall())
+
+
+def test_records_apply_in_queue_order(tmp_path):
+    conn = sp_inventory.connect(str(tmp_path / "inventory.db"))
+    with sp_inventory.ItemLoader(conn) as loader:
+        loader.add(_item("kept"))
+        loader.add(_item("restored"))
+    with sp_inventory.ItemLoader(conn) as loader:
+        loader.add(_deleted("restored"))
+        loader.add(_item("restored", "b.docx"))
+        loader.add(_item("removed"))
+        loader.add(_deleted("removed"))
+        loader.add(_item("renamed", "old.docx"))
+        loader.add(_item("renamed", "new.docx"))
+        assert loader.pending == 3
+    assert _names(conn) == {"kept": "a.docx", "restored": "b.docx", "renamed": "new.docx"}
+    assert (loader.loaded, loader.deleted) == (2, 1)
+
+
+def test_batches_flush_at_batch_size(tmp_path):
+    conn = sp_inventory.connect(str(tmp_path / "inventory.db"))
+    loader = sp_inventory.ItemLoader(conn, batch_size=2)
+    loader.add(_item("a"))
+    loader.add(_item("b"))
+    assert loader.pending == 0 and loader.loaded == 2
+    loader.add(_deleted("a"))
+    loader.flush()
+    assert _names(conn) == {"b": "a.docx"}
+
+
+def test_load_item_files_in_order(tmp_path):
+    first = tmp_path / "crawl1.jsonl"
+    second = tmp_path / "crawl2.jsonl"
+    first.write_text("\n".join(json.dumps(record) for record in [_item("a"), _item("b"), _deleted("a")]) + "\n")
+    # A crawl killed mid-write leaves a partial last line
+    second.write_text(json.dumps(_item("a", "again.docx")) + "\n" + '{"record": "item", "dri')
+
+    conn = sp_inventory.connect(str(tmp_path / "inventory.db"))
+    assert sp_inventory.load_item_files(conn, [str(first), str(second)]) == (2, 0)
+    assert _names(conn) == {"a": "again.docx", "b": "a.docx"}
+
+
+def test_load_schema_files_keeps_the_newest_extraction(tmp_path):
+    source = tmp_path / "schemas"
+    source.mkdir()
+    site_url = "https://contoso/sites/Legal"
+    # The newer extraction sorts first by path, so file order alone would load the older one last
+    for name, date, list_name in (("a_newer.json", "2026-10-01T00:00:00", "Contracts"),
+                                  ("b_older.json", "2026-09-01T00:00:00", "Drafts")):
+        (source / name).write_text(json.dumps({
+            "site_url": site_url, "site_id": "s1", "extraction_date": date,
+            "lists": [{"id": f"l-{list_name}", "name": list_name, "columns": []}]}))
+
+    conn = sp_inventory.connect(str(tmp_path / "inventory.db"))
+    assert sp_inventory.load_schema_files(conn, str(source)) == 1
+    assert conn.execute("SELECT extraction_date FROM sites").fetchall() == [("2026-10-01T00:00:00",)]
+    assert conn.execute("SELECT name FROM lists").fetchall() == [("Contracts",)]
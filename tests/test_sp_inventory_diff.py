@@ -0,0 +1,54 @@
+from workflows.common import sp_inventory
+from workflows.common import sp_inventory_diff
+
+SITE = "https://contoso/sites/Legal"
+
+
+def test_merge_join_pairs_sorted_streams():
+    pairs = list(sp_inventory_diff.merge_join([1, 3, 4, 6], [2, 3, 6, 7], key=lambda value: value))
+    assert pairs == [(1, None), (None, 2), (3, 3), (4, None), (6, 6), (None, 7)]
+    assert list(sp_inventory_diff.merge_join([], [1], key=lambda value: value)) == [(None, 1)]
+    assert list(sp_inventory_diff.merge_join([1], [], key=lambda value: value)) == [(1, None)]
+    # Generators are consumed lazily, one row at a time
+    assert list(sp_inventory_diff.merge_join(iter([]), iter([]), key=lambda value: value)) == []
+
+
+def _snapshot(path, columns, items, default_label=None):
+    conn = sp_inventory.connect(path)
+    sp_inventory.load_site_schema(conn, {
+        "site_url": SITE, "site_id": "s1", "extraction_date": "2026-10-19T00:00:00",
+        "lists": [{"id": "l1", "name": "Contracts", "columns": columns}]
+    })
+    with sp_inventory.ItemLoader(conn) as loader:
+        loader.add({"record": "library", "list_id": "l1", "site_url": SITE, "name": "Contracts",
+                    "drive_id": "d1", "default_label": default_label, "crawled": "2026-10-19T00:00:00"})
+        for item_id, label, fields in items:
+            loader.add({"record": "item", "site_url": SITE, "drive_id": "d1", "list_id": "l1",
+                        "library": "Contracts", "item_id": item_id, "name": f"{item_id}.docx",
+                        "retention_label": label, "fields": fields, "deleted": False})
+    conn.close()
+
+
+def test_diff_inventories(tmp_path):
+    old_path, new_path = str(tmp_path / "old.db"), str(tmp_path / "new.db")
+    _snapshot(old_path, [{"name": "Client", "type": "Text"}, {"name": "Year", "type": "Number"}],
+              [("a", None, {"Client": "Fabrikam"}), ("b", None, {}), ("c", "Legal 7y", {"Client": "X", "Year": 1})])
+    _snapshot(new_path, [{"name": "Client", "type": "Choice", "options": ["Fabrikam"]}, {"name": "Owner", "type": "Text"}],
+              [("a", "Legal 7y", {"Client": "Fabrikam"}), ("c", "Legal 7y", {"Year": 1, "Client": "X"}),
+               ("d", None, {})], default_label="Legal 7y")
+
+    changes = list(sp_inventory_diff.diff_inventories(old_path, new_path))
+    summary = [(change["level"], change["change"], change.get("field") or change.get("item_id") or change.get("list_id"))
+               for change in changes]
+    assert summary == [
+        ("list", "changed", "l1"),
+        ("field", "added", "Owner"), ("field", "removed", "Year"), ("field", "changed", "Client"),
+        ("item", "changed", "a"), ("item", "removed", "b"), ("item", "added", "d")
+    ]
+    assert changes[0]["changes"] == {"default_label": [None, "Legal 7y"]}
+    assert changes[4]["changes"] == {"retention_label": [None, "Legal 7y"]}
+    # Item c only differs in the key order of its fields JSON
+    assert changes[4]["fields"] == []
+
+    items_only = list(sp_inventory_diff.diff_inventories(old_path, new_path, levels=("items",)))
+    assert [change["level"] for change in items_only] == ["item"] * 3
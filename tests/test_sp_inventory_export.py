@@ -0,0 +1,60 @@
+import pytest
+
+from workflows.common import sp_inventory
+from workflows.common import sp_inventory_export
+
+pa = pytest.importorskip("pyarrow")
+
+
+def _item(site, item_id, **values):
+    record = {"record": "item", "site_url": site, "drive_id": f"d-{site}", "list_id": f"l-{site}",
+              "library": "Documents", "item_id": item_id, "name": f"{item_id}.docx", "size": 10,
+              "fields": {}, "deleted": False}
+    record.update(values)
+    return record
+
+
+def test_export_more_sites_than_default_partition_limit(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "inventory.db")
+    conn = sp_inventory.connect(db_path)
+    sites = [f"https://contoso/sites/S{i:04d}" for i in range(1100)]
+    with sp_inventory.ItemLoader(conn) as loader:
+        for site in sites:
+            loader.add(_item(site, "a"))
+            loader.add(_item(site, "b"))
+    conn.close()
+
+    # Fewer open files than sites, so partition files are closed and reopened
+    monkeypatch.setattr(sp_inventory_export, "MAX_OPEN_FILES", 64)
+    counts = sp_inventory_export.export_inventory(db_path, str(tmp_path / "export"), tables=("items",))
+    assert counts == {"items": 2200}
+
+    table = pa.dataset.dataset(str(tmp_path / "export" / "items"), partitioning="hive").to_table()
+    assert table.num_rows == 2200
+    assert len(set(table.column("site_url").to_pylist())) == 1100
+
+
+def test_export_item_types(tmp_path):
+    db_path = str(tmp_path / "inventory.db")
+    conn = sp_inventory.connect(db_path)
+    with sp_inventory.ItemLoader(conn) as loader:
+        loader.add(_item("https://contoso/sites/Legal", "a", created="2026-01-02T03:04:05.1234567Z",
+                         retention_label="Legal 7y"))
+        loader.add(_item("https://contoso/sites/Legal", "b", created="2026-01-02T03:04:05", fields=None,
+                         fields_error=True))
+    conn.close()
+
+    sp_inventory_export.export_inventory(db_path, str(tmp_path / "export"), tables=("items",))
+    rows = {row["item_id"]: row for row in pa.dataset.dataset(
+        str(tmp_path / "export" / "items"), partitioning="hive").to_table().to_pylist()}
+    assert rows["a"]["created"].isoformat() == "2026-01-02T03:04:05.123456+00:00"
+    assert rows["b"]["created"].isoformat() == "2026-01-02T03:04:05+00:00"
+    assert rows["a"]["retention_label"] == "Legal 7y"
+    assert (rows["a"]["fields_error"], rows["b"]["fields_error"]) == (False, True)
+    assert rows["b"]["fields"] is None
+
+
+def test_parse_timestamp():
+    assert sp_inventory_export._parse_timestamp("2026-01-02T03:04:05Z", None).isoformat() == "2026-01-02T03:04:05"
+    assert sp_inventory_export._parse_timestamp("not a date", None) is None
+    assert sp_inventory_export._parse_timestamp(None, "UTC") is None
@@ -0,0 +1,122 @@
+import io
+import json
+
+from workflows.common import sp_inventory, sp_item_crawler
+
+LIBRARY = {"site_url": "https://contoso/sites/Legal", "drive_id": "d1", "list_id": "l1", "name": "Contracts",
+           "web_url": "https://contoso/sites/Legal/Contracts"}
+ITEM = {"id": "i1", "name": "nda.docx", "webUrl": "https://contoso/sites/Legal/Contracts/2026/nda.docx",
+        "size": 100, "file": {"mimeType": "application/msword", "hashes": {"quickXorHash": "h"}}}
+
+
+def test_item_record_reads_label_and_folder():
+    list_item = {"id": "7", "contentType": {"name": "Contract"},
+                 "fields": {"@odata.etag": "x", "_ComplianceTag": "Legal 7y", "Client": "Fabrikam"}}
+    record = sp_item_crawler.item_record(ITEM, list_item, LIBRARY)
+    assert record["folder"] == "/2026"
+    assert record["retention_label"] == "Legal 7y"
+    assert record["fields"] == {"_ComplianceTag": "Legal 7y", "Client": "Fabrikam"}
+    assert record["fields_error"] is False
+
+    unlabeled = sp_item_crawler.item_record(ITEM, {"id": "7", "fields": {}}, LIBRARY)
+    assert unlabeled["retention_label"] is None and unlabeled["fields_error"] is False
+
+
+def test_item_record_marks_unreadable_fields():
+    record = sp_item_crawler.item_record(ITEM, None, LIBRARY)
+    assert record["fields_error"] is True
+    assert record["fields"] is None and record["retention_label"] is None
+    assert record["name"] == "nda.docx" and record["list_item_id"] is None
+
+
+def test_fetch_list_items_leaves_out_failed_reads(monkeypatch):
+    def fake_batch(requests, headers=None):
+        return {request_id: {"id": request_id, "status": 200 if request_id == "0" else 404,
+                             "body": {"id": "7", "fields": {}}} for request_id in requests}
+
+    class Executor:
+        def map(self, function, items):
+            return map(function, items)
+
+    monkeypatch.setattr(sp_item_crawler.graph_http, "batch", fake_batch)
+    list_items = sp_item_crawler.fetch_list_items({}, "d1", ["i1", "i2"], Executor())
+    assert list(list_items) == ["i1"]
+
+
+class StreamedResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.body = json.dumps(data or {}).encode("utf-8")
+        self.text = self.body.decode("utf-8")
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+    def close(self):
+        pass
+
+
+class Executor:
+    def map(self, function, items):
+        return map(function, items)
+
+
+def test_expired_delta_link_resyncs_and_drops_missing_files(tmp_path, monkeypatch):
+    conn = sp_inventory.connect(str(tmp_path / "inventory.db"))
+    with sp_inventory.ItemLoader(conn) as loader:
+        loader.add(dict(LIBRARY, record="library", crawled="2026-01-01T00:00:00"))
+        for item_id in ("i1", "gone"):
+            loader.add({"record": "item", "drive_id": "d1", "item_id": item_id, "name": f"{item_id}.docx"})
+
+    page = {"value": [ITEM, {"id": "f1", "deleted": {}, "folder": {}}, {"id": "x", "deleted": {}}],
+            "@odata.deltaLink": "delta-2"}
+
+    def fake_request(method, url, headers=None, stream=False):
+        return StreamedResponse(410) if url == "delta-1" else StreamedResponse(200, page)
+
+    monkeypatch.setattr(sp_item_crawler.sp, "get_access_token", lambda: "token")
+    monkeypatch.setattr(sp_item_crawler.graph_http, "request", fake_request)
+    monkeypatch.setattr(sp_item_crawler.graph_http, "batch", lambda requests, headers=None: {
+        request_id: {"status": 200, "body": {"id": "7", "fields": {}}} for request_id in requests})
+
+    state = sp_item_crawler.CrawlState(str(tmp_path / "state.json"))
+    state.drive("d1")["delta_link"] = "delta-1"
+    writer = io.StringIO()
+    loader = sp_inventory.ItemLoader(conn, batch_size=None)
+
+    assert sp_item_crawler.crawl_library(LIBRARY, state, writer, Executor(), loader=loader) == (1, 1)
+    records = [json.loads(line) for line in writer.getvalue().splitlines()]
+    assert [record["record"] for record in records] == ["library", "item", "item", "resync"]
+    assert records[-1]["since"] == records[0]["crawled"]
+    assert state.drive("d1")["delta_link"] == "delta-2" and "resync_since" not in state.drive("d1")
+    assert [row[0] for row in conn.execute("SELECT item_id FROM items")] == ["i1"]
+
+    # Replaying the JSON Lines output gives the same inventory
+    replayed = sp_inventory.connect(str(tmp_path / "replayed.db"))
+    path = tmp_path / "items.jsonl"
+    path.write_text(json.dumps(dict(LIBRARY, record="library", crawled="2026-01-01T00:00:00")) + "\n"
+                    + json.dumps({"record": "item", "drive_id": "d1", "item_id": "gone"}) + "\n"
+                    + writer.getvalue())
+    sp_inventory.load_item_files(replayed, [str(path)])
+    assert [row[0] for row in replayed.execute("SELECT item_id FROM items")] == ["i1"]
+
+
+def test_document_libraries_on_every_page(monkeypatch):
+    pages = {
+        "https://graph.microsoft.com/v1.0/sites/s1/lists": {
+            "value": [{"id": "l1", "list": {"template": "documentLibrary"}}, {"id": "l2", "list": {}}],
+            "@odata.nextLink": "page-2"},
+        "page-2": {"value": [{"id": "l3", "list": {"template": "documentLibrary"}}]}
+    }
+
+    class Response:
+        status_code = 200
+
+        def __init__(self, data):
+            self.data = data
+
+        def json(self):
+            return self.data
+
+    monkeypatch.setattr(sp_item_crawler.graph_http, "get", lambda url, headers=None: Response(pages[url]))
+    assert [lst["id"] for lst in sp_item_crawler.sp.list_document_libraries("token", "s1")] == ["l1", "l3"]
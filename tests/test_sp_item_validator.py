@@ -0,0 +1,65 @@
+import json
+import sqlite3
+import sys
+
+from workflows.common import sp_inventory
+from workflows.common import sp_item_validator
+
+SITE = "https://contoso/sites/Legal"
+
+
+def _record(item_id, **fields):
+    return {"record": "item", "site_url": SITE, "drive_id": "d1", "list_id": "l1", "library": "Contracts",
+            "item_id": item_id, "name": f"{item_id}.docx", "fields": fields, "deleted": False}
+
+
+def _schema(tmp_path):
+    path = tmp_path / "metadata-schema.json"
+    path.write_text(json.dumps({"metadata": [
+        {"name": "Status", "internal_name": "Status", "type": "Choice", "options": ["Draft", "Final"],
+         "required": True}
+    ]}))
+    return str(path)
+
+
+def test_unreadable_lines_are_skipped(tmp_path, monkeypatch):
+    lines = [json.dumps(_record("a", Status="Draft")), json.dumps(_record("b", Status="Other")),
+             '{"record": "item", "site_url": "trunc', "[1, 2]", "",
+             json.dumps({"record": "library", "list_id": "l1"}), json.dumps(_record("c", Owner="x")), json.dumps(_record("d")),
+             json.dumps({"record": "item", "drive_id": "d1", "item_id": "a", "deleted": True})]
+    items = tmp_path / "items.jsonl"
+    items.write_text("\n".join(lines) + "\n")
+    # Small chunks, so lines are also split between chunks
+    monkeypatch.setattr(sp_item_validator, "CHUNK_BYTES", 64)
+
+    report = sp_item_validator.validate_items([str(items)], schema_path=_schema(tmp_path), max_workers=1)
+    summary = report["summary"]
+    assert (summary["items"], summary["invalid"], summary["bad_lines"], summary["failed_chunks"]) == (3, 2, 2, 0)
+    assert summary["violations"]["invalid_choice"] == 1 and summary["violations"]["missing"] == 1
+    assert summary["skipped"] == 1
+    assert report["failed_chunks"] == []
+
+
+def test_failed_chunks_are_reported_and_fail_the_run(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "inventory.db")
+    conn = sp_inventory.connect(db_path)
+    with sp_inventory.ItemLoader(conn) as loader:
+        loader.add(_record("a", Status="Draft"))
+        loader.add(_record("b", Status="Final"))
+    conn.close()
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("UPDATE items SET fields = '{not json' WHERE item_id = 'b'")
+    conn.close()
+    monkeypatch.setattr(sp_item_validator, "CHUNK_ROWS", 1)
+
+    report = sp_item_validator.validate_items(inventory=db_path, schema_path=_schema(tmp_path), max_workers=1)
+    assert report["summary"]["items"] == 1
+    assert report["summary"]["failed_chunks"] == 1
+    assert report["failed_chunks"][0]["source"] == db_path and report["failed_chunks"][0]["range"] == [2, 2]
+
+    output = tmp_path / "report.json"
+    monkeypatch.setattr(sys, "argv", ["sp_item_validator.py", "--inventory", db_path, "--schema",
+                                      _schema(tmp_path), "--workers", "1", "--output", str(output)])
+    assert sp_item_validator.main() == 1
+    assert json.loads(output.read_text())["summary"]["failed_chunks"] == 1
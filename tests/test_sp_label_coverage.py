@@ -0,0 +1,102 @@
+import sqlite3
+
+import pytest
+
+from workflows.common import sp_inventory
+from workflows.common import sp_item_crawler
+from workflows.common import sp_label_coverage
+from workflows.common import purview_label_catalog
+
+LIBRARY = {"site_url": "https://contoso/sites/Legal", "drive_id": "d1", "list_id": "l1", "name": "Contracts",
+           "web_url": "https://contoso/sites/Legal/Contracts", "default_label": None}
+
+
+def _item(item_id, label=None, size=10, failed=False):
+    list_item = None if failed else {"id": item_id, "fields": {"_ComplianceTag": label} if label else {}}
+    return sp_item_crawler.item_record({"id": item_id, "name": f"{item_id}.docx", "size": size, "file": {}},
+                                       list_item, LIBRARY)
+
+
+def _inventory(path, records):
+    conn = sp_inventory.connect(path)
+    with sp_inventory.ItemLoader(conn) as loader:
+        loader.add(dict(LIBRARY, record="library", crawled="2026-10-19T00:00:00"))
+        for record in records:
+            loader.add(record)
+    conn.close()
+
+
+def test_unreadable_items_are_left_out_of_coverage(tmp_path):
+    path = str(tmp_path / "inventory.db")
+    _inventory(path, [_item("a", "Legal 7y", 30), _item("b", size=10), _item("c", failed=True, size=99),
+                      _item("d", failed=True)])
+
+    report = sp_label_coverage.label_coverage(path)
+    summary = report["summary"]
+    assert (summary["items"], summary["bytes"], summary["labeled_items"]) == (2, 40, 1)
+    assert summary["item_coverage"] == 0.5
+    assert summary["fields_unavailable_items"] == 2
+    assert report["labels"] == {"Legal 7y": {"items": 1, "bytes": 30}}
+
+    (group,) = report["groups"]
+    assert (group["library"], group["items"], group["unlabeled_items"], group["fields_unavailable_items"]) == (
+        "Contracts", 2, 1, 2)
+    assert report["libraries_without_default_label"][0]["unlabeled_items"] == 1
+
+
+def test_inventory_without_fields_error_column(tmp_path):
+    path = str(tmp_path / "old.db")
+    _inventory(path, [_item("a", "Legal 7y"), _item("b")])
+    conn = sqlite3.connect(path)
+    conn.execute("DROP INDEX idx_items_site")
+    conn.execute("ALTER TABLE items DROP COLUMN fields_error")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    # Read-only reports still work on an inventory from before the column
+    assert sp_label_coverage.label_coverage(path)["summary"]["item_coverage"] == 0.5
+
+    # Opening it for writing adds the column
+    conn = sp_inventory.connect(path)
+    assert sp_inventory.has_column(conn, "items", "fields_error")
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == sp_inventory.SCHEMA_VERSION
+    conn.close()
+
+
+def test_export_and_inventory_agree_by_content_type(tmp_path):
+    pytest.importorskip("pyarrow")
+    from workflows.common import sp_inventory_export
+
+    path = str(tmp_path / "inventory.db")
+    records = []
+    for index, (content_type, label) in enumerate([("Contract", "Legal 7y"), ("Contract", None),
+                                                   ("Invoice", None), ("Invoice", "Finance 10y")]):
+        record = _item(f"i{index}", label, size=index + 1)
+        record["content_type"] = content_type
+        records.append(record)
+    _inventory(path, records + [_item("x", failed=True)])
+    sp_inventory_export.export_inventory(path, str(tmp_path / "export"))
+
+    group_by = ("site", "content_type")
+    from_inventory = sp_label_coverage.label_coverage(path, group_by=group_by)
+    from_export = sp_label_coverage.label_coverage(export_dir=str(tmp_path / "export"), group_by=group_by)
+    for key in ("summary", "labels", "groups", "libraries_without_default_label"):
+        assert from_inventory[key] == from_export[key], key
+
+    groups = {group["content_type"]: group for group in from_inventory["groups"]}
+    assert (groups["Contract"]["items"], groups["Contract"]["coverage"]) == (2, 0.5)
+    assert groups["Invoice"]["labels"] == {"Finance 10y": {"items": 1, "bytes": 4}}
+
+
+def test_catalog_annotates_labels():
+    catalog = purview_label_catalog.LabelCatalog([
+        {"id": "lbl-1", "displayName": "Legal 7y", "retentionDuration": {"days": 2555},
+         "actionAfterRetentionPeriod": "delete"}
+    ])
+    rows = [("s", "l1", "legal 7y", False, 3, 30), ("s", "l1", "Retired", False, 1, 5), ("s", "l1", None, False, 2, 8)]
+    report = sp_label_coverage.build_report(rows, ["site_url", "list_id"], {}, catalog=catalog)
+    assert report["labels"]["legal 7y"]["id"] == "lbl-1"
+    assert report["labels"]["legal 7y"]["retention_days"] == 2555
+    assert report["summary"]["unknown_labels"] == ["Retired"]
+    assert report["summary"]["item_coverage"] == round(4 / 6, 4)
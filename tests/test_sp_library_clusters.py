@@ -0,0 +1,47 @@
+import json
+
+from workflows.common import sp_library_clusters as clusters
+
+
+def _schema(*columns):
+    return {"metadata": [{"name": name, "type": "Text"} for name in columns]}
+
+
+def test_lsh_parameters_threshold_close_to_requested():
+    bands, rows = clusters.lsh_parameters(128, 0.8)
+    assert bands * rows <= 128
+    assert abs((1 / bands) ** (1 / rows) - 0.8) < 0.05
+
+
+def test_minhash_signature_estimates_jaccard():
+    hasher = clusters.MinHasher(256)
+    a = {f"column{i}" for i in range(100)}
+    b = {f"column{i}" for i in range(20, 120)}
+    sig_a, sig_b = hasher.signature(a), hasher.signature(b)
+    estimate = sum(x == y for x, y in zip(sig_a, sig_b)) / 256
+    assert abs(estimate - clusters.jaccard(a, b)) < 0.1
+
+
+def test_find_clusters_groups_near_duplicates_only():
+    base = [f"Column {i}" for i in range(20)]
+    sets = [
+        clusters.schema_signatures(_schema(*base)),
+        clusters.schema_signatures(_schema(*base, "Extra")),
+        clusters.schema_signatures(_schema(*base)),
+        clusters.schema_signatures(_schema(*[f"Other {i}" for i in range(20)]))
+    ]
+    found = clusters.find_clusters(sets, threshold=0.8)
+    assert sorted(found[0]) == [0, 1, 2]
+    assert [3] in found
+
+
+def test_load_libraries_keeps_newest_extraction_of_a_site(tmp_path):
+    for name, date in (("site_legal_1.json", "2026-10-01T00:00:00"), ("site_legal_2.json", "2026-10-19T00:00:00")):
+        (tmp_path / name).write_text(json.dumps({
+            "site_url": "https://contoso/sites/Legal",
+            "extraction_date": date,
+            "lists": [{"name": "Contracts", "columns": []}]
+        }, indent=2))
+
+    libraries = clusters.load_libraries(str(tmp_path))
+    assert [(library["site"], library["name"]) for library in libraries] == [("https://contoso/sites/Legal", "Contracts")]
@@ -0,0 +1,46 @@
+from workflows.common import sp_metadata_utils as sp
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+def test_lookup_targets_are_fetched_once(monkeypatch):
+    list_reads = []
+    column_reads = []
+
+    def fake_get(url, headers=None):
+        list_reads.append(url)
+        if "/lists/missing" in url:
+            return FakeResponse(404)
+        return FakeResponse(200, {"id": "l1", "displayName": "Customers"})
+
+    def fake_list_columns(token, site_id, list_id):
+        column_reads.append(list_id)
+        return [{"name": "Title", "displayName": "Customer name", "text": {"maxLength": 255}},
+                {"name": "Since", "displayName": "Customer since", "dateTime": {"format": "dateOnly"}}]
+
+    monkeypatch.setattr(sp.graph_http, "get", fake_get)
+    monkeypatch.setattr(sp, "get_list_columns", fake_list_columns)
+    resolver = sp.LookupResolver("site1")
+
+    assert resolver.resolve("token", {"listId": "l1", "columnName": "Title"}) == {
+        "list_id": "l1", "list_name": "Customers", "column_name": "Title",
+        "column_display_name": "Customer name", "column_type": "Text"}
+    assert resolver.resolve("token", {"lookupListId": "l1", "columnName": "Since"})["column_type"] == "Date"
+    assert resolver.resolve("token", {"listId": "l1", "columnName": "Gone"})["column_display_name"] is None
+    assert len(list_reads) == 1 and column_reads == ["l1"]
+
+    # Missing targets are remembered too
+    for _ in range(2):
+        missing = resolver.resolve("token", {"listId": "missing", "columnName": "Title"})
+        assert missing["list_name"] is None and missing["list_id"] == "missing"
+    assert len(list_reads) == 2 and column_reads == ["l1"]
+
+    assert resolver.resolve("token", {"columnName": "Title"})["list_id"] is None
+    assert len(list_reads) == 2
@@ -0,0 +1,116 @@
+import time
+
+from workflows.common import sp_term_store
+from workflows.common.sp_term_store import TermResolver
+
+SET_ID = "set-1"
+
+
+def _term(term_id, label, parent_id=None, synonyms=(), translations=None):
+    return {"id": term_id, "set_id": SET_ID, "parent_id": parent_id, "label": label,
+            "synonyms": list(synonyms), "translations": translations or {}}
+
+
+DATA = {
+    "groups": [{"id": "g1", "name": "Corporate"}],
+    "sets": [{"id": SET_ID, "name": "Departments", "group_id": "g1"}],
+    "terms": [
+        _term("t-legal", "Legal", synonyms=["Law"]),
+        _term("t-contracts", "Contracts", "t-legal", translations={"de-DE": "Verträge"}),
+        _term("t-nda", "NDA", "t-contracts"),
+        _term("t-orphan", "Orphan", "t-missing")
+    ]
+}
+
+
+def test_term_paths():
+    resolver = TermResolver(DATA)
+    assert resolver.path("t-nda") == "Legal;Contracts;NDA"
+    assert resolver.path("T-NDA") == "Legal;Contracts;NDA"
+    assert resolver.path("t-nda", True) == "Departments;Legal;Contracts;NDA"
+    # A term whose parent is not in the export starts its own path
+    assert resolver.path("t-orphan") == "Orphan"
+    assert resolver.path("unknown") is None and resolver.path(None) is None
+    assert resolver.term_set("t-contracts") == "Departments"
+    assert resolver.path.cache_info().currsize >= 3
+
+
+def test_resolve_value_and_find():
+    resolver = TermResolver(DATA)
+    value = [{"Label": "old label", "TermGuid": "t-nda"}, {"TermGuid": "gone"}, {"Label": "no guid"}]
+    assert resolver.resolve_value(value) == ["Legal;Contracts;NDA", None]
+    assert resolver.resolve_value({"TermGuid": "t-legal"}, include_set=True) == ["Departments;Legal"]
+    assert [term["id"] for term in resolver.find("law")] == ["t-legal"]
+    assert [term["id"] for term in resolver.find("VERTRÄGE")] == ["t-contracts"]
+    assert resolver.find("") == []
+
+
+def test_term_entry_prefers_default_label_in_store_language():
+    entry = sp_term_store._term_entry({"id": "ABC", "labels": [
+        {"name": "Verträge", "languageTag": "de-DE", "isDefault": True},
+        {"name": "Contracts", "languageTag": "en-US", "isDefault": True},
+        {"name": "Agreements", "languageTag": "en-US", "isDefault": False}
+    ]}, SET_ID, None, "en-US")
+    assert entry["id"] == "abc" and entry["label"] == "Contracts"
+    assert entry["synonyms"] == ["Agreements"] and entry["translations"] == {"de-DE": "Verträge"}
+
+
+def test_export_term_set_reads_each_level_in_batches(monkeypatch):
+    children = {"root": [{"id": "A", "labels": [{"name": "A", "isDefault": True}]}],
+                "a": [{"id": "B", "labels": [{"name": "B", "isDefault": True}]},
+                      {"id": "C", "labels": [{"name": "C", "isDefault": True}]}],
+                "b": [], "c": []}
+    batches = []
+
+    def fake_iter_values(url, headers=None):
+        return iter(children["root"])
+
+    def fake_batch(requests, headers=None):
+        batches.append(sorted(request["url"].split("/")[-2] for request in requests.values()))
+        return {request_id: {"status": 200, "body": {"value": children[request["url"].split("/")[-2]]}}
+                for request_id, request in requests.items()}
+
+    class Executor:
+        def map(self, function, items):
+            return map(function, items)
+
+    monkeypatch.setattr(sp_term_store.graph_http, "iter_values", fake_iter_values)
+    monkeypatch.setattr(sp_term_store.graph_http, "batch", fake_batch)
+    terms = sp_term_store.export_term_set({}, "/sites/root/termStore", {"id": "SET-1"}, "en-US", Executor())
+    assert [(term["id"], term["parent_id"], term["set_id"]) for term in terms] == [
+        ("a", None, "set-1"), ("b", "a", "set-1"), ("c", "a", "set-1")]
+    assert batches == [["a"], ["b", "c"]]
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "term_store.json")
+    TermResolver(DATA, fetched=1000.0).save(path)
+    loaded = TermResolver.load(path)
+    assert loaded.fetched == 1000.0 and len(loaded) == 4
+    assert loaded.path("t-nda") == "Legal;Contracts;NDA"
+    assert TermResolver.load(str(tmp_path / "missing.json")) is None
+
+
+def test_get_resolver_waits_before_retrying_a_failed_export(tmp_path, monkeypatch):
+    path = str(tmp_path / "term_store.json")
+    TermResolver(DATA, time.time() - 2 * sp_term_store.DEFAULT_TTL).save(path)
+    attempts = []
+
+    def no_token():
+        attempts.append(1)
+        return None
+
+    monkeypatch.setattr(sp_term_store.sp, "get_access_token", no_token)
+    sp_term_store.forget_resolvers()
+    clock = [1000.0]
+    monkeypatch.setattr(sp_term_store.time, "monotonic", lambda: clock[0])
+    try:
+        for _ in range(3):
+            assert sp_term_store.get_resolver(path).path("t-nda") == "Legal;Contracts;NDA"
+        assert len(attempts) == 1
+
+        clock[0] += sp_term_store.EXPORT_RETRY_SECONDS
+        sp_term_store.get_resolver(path)
+        assert len(attempts) == 2
+    finally:
+        sp_term_store.forget_resolvers()
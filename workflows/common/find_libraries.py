@@ -8,6 +8,7 @@ import argparse
 sys.path.append(os.path.dirname(__file__))
 
 import sp_metadata_utils as sp
+from workflows.common import graph_trace
 
 def main():
     """List all document libraries in a SharePoint site."""
@@ -16,9 +17,14 @@ def main():
     )
     
     parser.add_argument('--site', required=True, help='SharePoint site URL')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='Write a Chrome trace-event timeline of all Graph requests to FILE')
     
     args = parser.parse_args()
     
+    if args.trace:
+        graph_trace.enable(args.trace)
+    
     print(f"\n📚 SharePoint Library Finder")
     print("=========================")
     print(f"Site URL: {args.site}")
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# file: workflows/common/graph_http.py
+"""
+Shared HTTP layer for Microsoft Graph requests.
+
+The SharePoint metadata tools and the GraphAPI orchestrator send their Graph
+calls through this module so that connection pooling, throttling retries
+and request tracing are handled in one place.
+
+Identical GETs issued concurrently (same URL, query and headers) are
+coalesced: one request goes out and every caller receives its response.
+Successful responses are also reused for a short moment afterwards, which
+absorbs the bursts of duplicate lookups (site, site columns, content types)
+that parallel extraction workers send at the same time. Any write request
+(including a $batch with write sub-requests) ends the reuse window, so a
+GET never returns data from before a change made through this module.
+"""
+
+import time
+import threading
+import requests
+
+from workflows.common import log_utils
+from workflows.common import graph_trace
+from workflows.common.log_utils import Messages
+
+# API endpoints
+GRAPH_API_ENDPOINT = "https://graph.microsoft.com/v1.0"
+
+# Throttling / transient failure handling
+RETRY_STATUS_CODES = (429, 503, 504)
+MAX_RETRIES = 3
+DEFAULT_RETRY_AFTER = 2
+
+# Maximum sub-requests in one $batch request
+BATCH_LIMIT = 20
+
+# Seconds a successful GET response is reused by identical GETs
+# (0 only coalesces requests that are in flight at the same time)
+COALESCE_MEMO_SECONDS = 2.0
+
+# Cap on remembered responses before expired ones are swept
+COALESCE_SWEEP_SIZE = 1024
+
+# One pooled session per worker thread
+_local = threading.local()
+
+# In-flight and recently completed GETs by request key
+_flights = {}
+_flights_lock = threading.Lock()
+_generation = 0
+
+
+def get_session():
+    """Get the pooled requests session for the current thread."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        _local.session = session
+    return session
+
+
+def auth_headers(token):
+    """Build the standard Graph request headers for a bearer token."""
+    return {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json"
+    }
+
+
+def retry_delay(response, attempt):
+    """Seconds to wait before retrying a throttled request."""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return int(retry_after)
+    return DEFAULT_RETRY_AFTER * (2 ** attempt)
+
+
+class RateLimiter:
+    """
+    Token bucket limiting the request rate, shared by all threads using it.
+
+    Args:
+        rate: Requests per second
+        burst: Requests allowed at once after an idle period (default: rate)
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class _Flight:
+    """One GET shared by every caller asking for the same request."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+        self.expires = None
+
+    def expired(self, now):
+        return self.expires is not None and now >= self.expires
+
+
+def forget_responses():
+    """Drop all remembered GET responses; later GETs go to Graph again."""
+    global _generation
+    with _flights_lock:
+        _generation += 1
+        _flights.clear()
+
+
+def _response_size(response, streamed):
+    """
+    Body size for tracing. Streamed bodies are not read here; their bytes
+    are added to the trace event as they are consumed (see graph_stream).
+    """
+    if response is None or streamed:
+        return 0
+    return len(response.content)
+
+
+def request(method, url, headers=None, limiter=None, **kwargs):
+    """
+    Send a Graph request, retrying throttled and transient failures.
+
+    Args:
+        method: HTTP method (GET, POST, PATCH, DELETE)
+        url: Absolute Graph URL
+        headers: Request headers
+        limiter: RateLimiter to wait on before each attempt (optional)
+        **kwargs: Passed through to requests (json, params, data, ...)
+
+    Returns:
+        requests.Response of the last attempt
+    """
+    if method.upper() != "GET":
+        forget_responses()
+    return _send(method, url, headers, limiter, **kwargs)
+
+
+def _send(method, url, headers, limiter, **kwargs):
+    """Send a request with throttling retries and tracing (see request())."""
+    start = time.time()
+    retries = 0
+    response = None
+
+    try:
+        while True:
+            if limiter is not None:
+                limiter.acquire()
+            response = get_session().request(method, url, headers=headers, **kwargs)
+            if response.status_code not in RETRY_STATUS_CODES or retries >= MAX_RETRIES:
+                return response
+
+            delay = retry_delay(response, retries)
+            log_utils.warning(Messages.Http.RETRYING, method.upper(), response.status_code, delay)
+            # Release the connection of a streamed response before retrying
+            response.close()
+            time.sleep(delay)
+            retries += 1
+    finally:
+        event = graph_trace.record(
+            method, url, start, time.time(),
+            response.status_code if response is not None else None,
+            _response_size(response, kwargs.get("stream")),
+            retries
+        )
+        if kwargs.get("stream") and response is not None:
+            response.trace_event = event
+
+
+def get(url, headers=None, limiter=None, **kwargs):
+    """
+    Send a GET request to Graph, sharing the response with identical
+    concurrent GETs.
+
+    Callers that wait on another caller's request get the same
+    requests.Response; each parses its own copy with .json(). Every header
+    (Authorization, ConsistencyLevel, Prefer, If-None-Match, ...) is part
+    of the match. Requests with options other than params (e.g. stream) are
+    always sent on their own.
+    """
+    if set(kwargs) - {"params"}:
+        return request("GET", url, headers=headers, limiter=limiter, **kwargs)
+
+    header_key = tuple(sorted((name.lower(), value) for name, value in (headers or {}).items()))
+    now = time.monotonic()
+    with _flights_lock:
+        key = (_generation, url, header_key, repr(kwargs.get("params")))
+        flight = _flights.get(key)
+        if flight is not None and flight.expired(now):
+            flight = None
+        leader = flight is None
+        if leader:
+            flight = _Flight()
+            _flights[key] = flight
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.response
+
+    try:
+        flight.response = request("GET", url, headers=headers, limiter=limiter, **kwargs)
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            if flight.error is None and flight.response.status_code == 200 and COALESCE_MEMO_SECONDS > 0:
+                flight.expires = time.monotonic() + COALESCE_MEMO_SECONDS
+            elif _flights.get(key) is flight:
+                del _flights[key]
+            if len(_flights) > COALESCE_SWEEP_SIZE:
+                now = time.monotonic()
+                for stale in [k for k, f in _flights.items() if f.expired(now)]:
+                    del _flights[stale]
+        flight.done.set()
+    return flight.response
+
+
+def post(url, headers=None, **kwargs):
+    """Send a POST request to Graph."""
+    return request("POST", url, headers=headers, **kwargs)
+
+
+def patch(url, headers=None, **kwargs):
+    """Send a PATCH request to Graph."""
+    return request("PATCH", url, headers=headers, **kwargs)
+
+
+def delete(url, headers=None, **kwargs):
+    """Send a DELETE request to Graph."""
+    return request("DELETE", url, headers=headers, **kwargs)
+
+
+def batch(sub_requests, headers=None, limiter=None):
+    """
+    Send up to BATCH_LIMIT requests in one Graph $batch call, retrying
+    throttled sub-requests.
+
+    Args:
+        sub_requests: Dict of request id to sub-request dict with method, url
+                  (relative, e.g. "/sites/{id}") and optionally body
+        headers: Authorization headers
+        limiter: RateLimiter to wait on before each $batch call (optional)
+
+    Returns:
+        Dict of request id to sub-response dict (status, body, headers)
+
+    Raises:
+        RuntimeError: If the $batch request itself fails
+    """
+    # $batch is always a POST; only write sub-requests end the GET reuse window
+    if any(sub_request["method"].upper() != "GET" for sub_request in sub_requests.values()):
+        forget_responses()
+
+    results = {}
+    pending = dict(sub_requests)
+    for attempt in range(MAX_RETRIES + 1):
+        entries = []
+        for request_id, sub_request in pending.items():
+            entry = {"id": request_id, "method": sub_request["method"], "url": sub_request["url"]}
+            if "body" in sub_request:
+                entry["body"] = sub_request["body"]
+                entry["headers"] = {"Content-Type": "application/json"}
+            entries.append(entry)
+
+        response = _send("POST", f"{GRAPH_API_ENDPOINT}/$batch", headers, limiter,
+                         json={"requests": entries})
+        if response.status_code != 200:
+            raise RuntimeError(f"$batch request failed with status {response.status_code}: {response.text}")
+
+        # Throttled sub-requests were not executed, so resending them is safe
+        throttled = {}
+        statuses = set()
+        delay = 0
+        for sub_response in response.json().get("responses", []):
+            request_id = sub_response["id"]
+            if sub_response.get("status") in RETRY_STATUS_CODES and attempt < MAX_RETRIES:
+                throttled[request_id] = pending[request_id]
+                statuses.add(sub_response["status"])
+                retry_after = str((sub_response.get("headers") or {}).get("Retry-After", ""))
+                delay = max(delay, int(retry_after) if retry_after.isdigit()
+                            else DEFAULT_RETRY_AFTER * (2 ** attempt))
+            else:
+                results[request_id] = sub_response
+
+        if not throttled:
+            break
+        log_utils.warning(Messages.Http.RETRYING, "$batch", ", ".join(map(str, sorted(statuses))), delay)
+        time.sleep(delay)
+        pending = throttled
+
+    return results
+
+
+def iter_values(url, headers=None, limiter=None):
+    """
+    Yield every item of a paged Graph collection, following @odata.nextLink.
+
+    Raises:
+        RuntimeError: If a page request fails
+    """
+    while url:
+        response = get(url, headers=headers, limiter=limiter)
+        if response.status_code != 200:
+            raise RuntimeError(f"Graph request failed with status {response.status_code}: {url}")
+        data = response.json()
+        yield from data.get("value", [])
+        url = data.get("@odata.nextLink")
+
+
+class GraphHttpClient:
+    """
+    The request helpers of this module bound to one rate limiter.
+
+    Used to keep the traffic of one tenant (or app) within its own budget
+    while several run in parallel; without a limiter it behaves exactly like
+    the module-level functions.
+    """
+
+    def __init__(self, limiter=None):
+        self.limiter = limiter
+
+    def request(self, method, url, headers=None, **kwargs):
+        """Send a Graph request through this client's limiter."""
+        return request(method, url, headers=headers, limiter=self.limiter, **kwargs)
+
+    def get(self, url, headers=None, **kwargs):
+        """Send a GET request to Graph (coalesced like get())."""
+        return get(url, headers=headers, limiter=self.limiter, **kwargs)
+
+    def post(self, url, headers=None, **kwargs):
+        """Send a POST request to Graph."""
+        return self.request("POST", url, headers=headers, **kwargs)
+
+    def patch(self, url, headers=None, **kwargs):
+        """Send a PATCH request to Graph."""
+        return self.request("PATCH", url, headers=headers, **kwargs)
+
+    def delete(self, url, headers=None, **kwargs):
+        """Send a DELETE request to Graph."""
+        return self.request("DELETE", url, headers=headers, **kwargs)
+
+    def iter_values(self, url, headers=None):
+        """Yield every item of a paged Graph collection."""
+        return iter_values(url, headers=headers, limiter=self.limiter)
+
+    def batch(self, sub_requests, headers=None):
+        """Send requests through Graph $batch."""
+        return batch(sub_requests, headers=headers, limiter=self.limiter)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# file: workflows/common/graph_runtime.py
+"""
+Shared runtime for generated Graph API modules.
+
+Modules created with `setup_graphapi.py --generate-module` contain only
+their configuration (app name, scopes, runtime version) and get their
+client from here. Every module therefore shares one implementation of
+credential loading, token caching, pooled sessions with throttling retries
+(via graph_http) and paging, and fixes to the runtime reach all modules
+without regenerating them.
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+
+from workflows.common import log_utils
+from workflows.common import graph_http
+
+# Bump on incompatible changes to the client surface; generated modules
+# record the version they were generated for
+RUNTIME_VERSION = 2
+
+GRAPH_API_ENDPOINT = graph_http.GRAPH_API_ENDPOINT
+DEFAULT_SCOPES = ["https://graph.microsoft.com/.default"]
+
+# Refresh tokens this long before they expire
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class GraphAPIError(Exception):
+    """Raised when a Graph request fails."""
+
+    def __init__(self, status_code, text):
+        super().__init__(f"API request failed: {status_code} - {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+def check_version(module_version):
+    """
+    Verify that a generated module is compatible with this runtime.
+
+    Raises:
+        RuntimeError: If the module was generated for a newer runtime
+    """
+    if module_version > RUNTIME_VERSION:
+        raise RuntimeError(
+            f"API module requires graph_runtime version {module_version}, "
+            f"but version {RUNTIME_VERSION} is installed. Update the repository."
+        )
+
+
+def _read_secret_file(secret_file, prefix):
+    """Read (client_id, client_secret, tenant_id) from a secret file; missing values are None."""
+    values = {}
+    if os.path.exists(secret_file):
+        with open(secret_file, "r") as f:
+            for line in f:
+                if '=' in line and not line.strip().startswith('#'):
+                    key, value = line.strip().split('=', 1)
+                    values[key] = value
+    return values.get(f"{prefix}_CLIENT_ID"), values.get(f"{prefix}_CLIENT_SECRET"), values.get("TENANT_ID")
+
+
+def load_credentials(app_name, secret_dir=None):
+    """
+    Load app credentials from the environment or the .env.<app>.secret file.
+
+    Args:
+        app_name: App registration name (without the Automation- prefix)
+        secret_dir: Tenant profile directory holding the secret file. Its
+            file takes precedence over the environment, which may belong
+            to another tenant; without it the current directory's file is
+            only a fallback for the environment.
+
+    Returns:
+        Tuple of (client_id, client_secret, tenant_id)
+    """
+    prefix = app_name.upper()
+    from_env = (os.getenv(f"{prefix}_CLIENT_ID"), os.getenv(f"{prefix}_CLIENT_SECRET"), os.getenv("TENANT_ID"))
+    secret_file = os.path.join(secret_dir or ".", f".env.{app_name}.secret")
+
+    if secret_dir is not None:
+        client_id, client_secret, tenant_id = _read_secret_file(secret_file, prefix)
+    else:
+        client_id, client_secret, tenant_id = from_env
+        # If not available, try the secret file
+        if not all([client_id, client_secret, tenant_id]):
+            client_id, client_secret, tenant_id = (
+                file_value or env_value for env_value, file_value
+                in zip(from_env, _read_secret_file(secret_file, prefix)))
+
+    if not all([client_id, client_secret, tenant_id]):
+        log_utils.error("Missing credentials for {} API", app_name)
+        raise ValueError(
+            f"Missing credentials for {app_name} API. "
+            "Please ensure environment variables or secret file are properly set."
+        )
+
+    return client_id, client_secret, tenant_id
+
+
+def resolve_url(endpoint):
+    """Resolve an endpoint path or an absolute URL (such as an @odata.nextLink)."""
+    if endpoint.startswith("https://"):
+        return endpoint
+    return f"{GRAPH_API_ENDPOINT}{endpoint}"
+
+
+class GraphClient:
+    """
+    Microsoft Graph client for one app registration.
+
+    Thread-safe: the token is shared and refreshed under a lock, and each
+    thread sends its requests over its own pooled session.
+    """
+
+    def __init__(self, app_name, scopes=None, secret_dir=None):
+        """Initialize the client for an app registration (secret_dir: tenant profile directory)"""
+        # Imported here so importing API modules stays cheap
+        from msal import ConfidentialClientApplication
+
+        self.app_name = app_name
+        self.scopes = list(scopes or DEFAULT_SCOPES)
+        self.token = None
+        self.token_expiry = None
+        self._token_lock = threading.Lock()
+
+        client_id, client_secret, tenant_id = load_credentials(app_name, secret_dir)
+        self.app = ConfidentialClientApplication(
+            client_id=client_id,
+            authority=f"https://login.microsoftonline.com/{tenant_id}",
+            client_credential=client_secret
+        )
+
+    def cached_token(self):
+        """Get the cached token if it is not about to expire, else None"""
+        if self.token and self.token_expiry and self.token_expiry - TOKEN_REFRESH_MARGIN > datetime.now():
+            return self.token
+        return None
+
+    def get_access_token(self):
+        """Get an access token, reusing the cached one until it nears expiry"""
+        with self._token_lock:
+            token = self.cached_token()
+            if token:
+                return token
+
+            result = self.app.acquire_token_for_client(scopes=self.scopes)
+            if "access_token" not in result:
+                error = result.get("error", "unknown")
+                error_desc = result.get("error_description", "")
+                log_utils.error("Failed to get access token: {} - {}", error, error_desc)
+                raise Exception(f"Failed to get access token: {error} - {error_desc}")
+
+            self.token = result["access_token"]
+            self.token_expiry = datetime.now() + timedelta(seconds=result.get("expires_in", 3600))
+            log_utils.debug("Obtained access token for {} API", self.app_name)
+            return self.token
+
+    def get_headers(self):
+        """Get authorization headers for API requests"""
+        return graph_http.auth_headers(self.get_access_token())
+
+    def make_api_request(self, method, endpoint, data=None, params=None):
+        """
+        Make a request to the API.
+
+        Returns:
+            Parsed JSON response, or None for empty responses
+
+        Raises:
+            GraphAPIError: If Graph returns an error status
+        """
+        if method.lower() not in ("get", "post", "patch", "put", "delete"):
+            log_utils.error("Unsupported HTTP method: {}", method)
+            raise ValueError(f"Unsupported HTTP method: {method}")
+
+        response = graph_http.request(
+            method.upper(), resolve_url(endpoint),
+            headers=self.get_headers(), json=data, params=params
+        )
+
+        if response.status_code >= 400:
+            log_utils.error("API request failed: {} - {}", response.status_code, response.text)
+            raise GraphAPIError(response.status_code, response.text)
+
+        log_utils.debug("{} API request successful: {}", self.app_name, endpoint)
+        return response.json() if response.content else None
+
+    def iter_pages(self, endpoint, params=None):
+        """
+        Yield each page of a collection, following @odata.nextLink.
+
+        The nextLink already carries the query, so params only apply to the
+        first request.
+        """
+        url = endpoint
+        while url:
+            page = self.make_api_request("get", url, params=params)
+            if page is None:
+                return
+            yield page
+            url = page.get("@odata.nextLink")
+            params = None
+
+    def iter_items(self, endpoint, params=None):
+        """Yield every item of a collection across all pages."""
+        for page in self.iter_pages(endpoint, params=params):
+            yield from page.get("value", [])
+
+
+def get_client(app_name, scopes=None, secret_dir=None):
+    """Get the shared client for an app registration (one per app, scope set and tenant profile)."""
+    key = (app_name, tuple(scopes or DEFAULT_SCOPES), secret_dir)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = GraphClient(app_name, scopes, secret_dir)
+                _clients[key] = client
+    return client
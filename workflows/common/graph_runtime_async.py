@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# file: workflows/common/graph_runtime_async.py
+"""
+Async variant of the shared runtime for generated Graph API modules.
+
+Modules generated with `--generate-module <app> --async` also get an async
+client with the same surface as the blocking one (get_access_token,
+make_api_request, iter_pages, iter_items), built on httpx. gather_requests
+runs many requests concurrently from one process with a concurrency limit.
+
+httpx is an optional dependency, needed only when an async client is
+created:
+
+    pip install httpx
+"""
+
+import time
+import asyncio
+import threading
+
+from workflows.common import log_utils
+from workflows.common import graph_http
+from workflows.common import graph_trace
+from workflows.common import graph_runtime
+from workflows.common.graph_runtime import GraphAPIError
+from workflows.common.log_utils import Messages
+
+# Requests in flight per client
+DEFAULT_CONCURRENCY = 32
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _import_httpx():
+    """Import httpx, explaining how to install it when it is missing."""
+    try:
+        import httpx
+    except ImportError:
+        raise ImportError("The async Graph client requires httpx: pip install httpx") from None
+    return httpx
+
+
+class AsyncGraphClient:
+    """
+    Asynchronous Microsoft Graph client for one app registration.
+
+    Tokens come from the blocking client of the same app, so both share one
+    token cache; the blocking MSAL call runs in a worker thread.
+    """
+
+    def __init__(self, app_name, scopes=None, concurrency=DEFAULT_CONCURRENCY, secret_dir=None):
+        """Initialize the async client for an app registration (secret_dir: tenant profile directory)"""
+        self._httpx = _import_httpx()
+        self.app_name = app_name
+        self.scopes = list(scopes or graph_runtime.DEFAULT_SCOPES)
+        self.concurrency = concurrency
+        self._sync_client = graph_runtime.get_client(app_name, self.scopes, secret_dir)
+        self._http = None
+        self._loop = None
+        self._closer = None
+
+    def _get_http(self):
+        """Get the pooled httpx client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._loop is not loop:
+            # httpx clients are bound to the loop they were first used on, and
+            # can only be closed while that loop runs
+            limits = self._httpx.Limits(max_connections=self.concurrency,
+                                        max_keepalive_connections=self.concurrency)
+            self._http = self._httpx.AsyncClient(limits=limits, timeout=60.0)
+            self._loop = loop
+            self._closer = loop.create_task(self._close_with_loop(self._http))
+        return self._http
+
+    async def _close_with_loop(self, http):
+        """
+        Close a pool when its event loop shuts down.
+
+        asyncio.run cancels the tasks still pending when the main coroutine
+        returns and lets them finish before closing the loop, so each
+        asyncio.run's connections are closed on their own loop.
+        """
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            await http.aclose()
+            if self._http is http:
+                self._http = None
+
+    async def aclose(self):
+        """Close the pooled connections."""
+        if self._http is not None:
+            http, closer = self._http, self._closer
+            self._http = self._closer = None
+            closer.cancel()
+            await http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def get_access_token(self):
+        """Get an access token, reusing the cached one until it nears expiry"""
+        return self._sync_client.cached_token() or await asyncio.to_thread(self._sync_client.get_access_token)
+
+    async def get_headers(self):
+        """Get authorization headers for API requests"""
+        return graph_http.auth_headers(await self.get_access_token())
+
+    async def make_api_request(self, method, endpoint, data=None, params=None):
+        """
+        Make a request to the API, retrying throttled and transient failures.
+
+        Returns:
+            Parsed JSON response, or None for empty responses
+
+        Raises:
+            GraphAPIError: If Graph returns an error status
+        """
+        if method.lower() not in ("get", "post", "patch", "put", "delete"):
+            log_utils.error("Unsupported HTTP method: {}", method)
+            raise ValueError(f"Unsupported HTTP method: {method}")
+
+        url = graph_runtime.resolve_url(endpoint)
+        http = self._get_http()
+        headers = await self.get_headers()
+
+        start = time.time()
+        retries = 0
+        response = None
+        try:
+            while True:
+                response = await http.request(method.upper(), url, headers=headers, json=data, params=params)
+                if response.status_code not in graph_http.RETRY_STATUS_CODES or retries >= graph_http.MAX_RETRIES:
+                    break
+                delay = graph_http.retry_delay(response, retries)
+                log_utils.warning(Messages.Http.RETRYING, method.upper(), response.status_code, delay)
+                await asyncio.sleep(delay)
+                retries += 1
+        finally:
+            graph_trace.record(
+                method.upper(), url, start, time.time(),
+                response.status_code if response is not None else None,
+                len(response.content) if response is not None else 0,
+                retries
+            )
+
+        if response.status_code >= 400:
+            log_utils.error("API request failed: {} - {}", response.status_code, response.text)
+            raise GraphAPIError(response.status_code, response.text)
+
+        log_utils.debug("{} API request successful: {}", self.app_name, endpoint)
+        return response.json() if response.content else None
+
+    async def iter_pages(self, endpoint, params=None):
+        """Yield each page of a collection, following @odata.nextLink."""
+        url = endpoint
+        while url:
+            page = await self.make_api_request("get", url, params=params)
+            if page is None:
+                return
+            yield page
+            url = page.get("@odata.nextLink")
+            params = None
+
+    async def iter_items(self, endpoint, params=None):
+        """Yield every item of a collection across all pages."""
+        async for page in self.iter_pages(endpoint, params=params):
+            for item in page.get("value", []):
+                yield item
+
+    async def gather_requests(self, requests, concurrency=None, return_exceptions=False):
+        """
+        Run many requests concurrently with at most `concurrency` in flight.
+
+        Args:
+            requests: Iterable of (method, endpoint) or (method, endpoint, data)
+                      or (method, endpoint, data, params) tuples
+            concurrency: Maximum requests in flight (default: the client's limit)
+            return_exceptions: Return failures in place of results instead of raising
+
+        Returns:
+            List of responses in the same order as the requests
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def run(request):
+            async with semaphore:
+                return await self.make_api_request(*request)
+
+        return await asyncio.gather(*(run(request) for request in requests),
+                                    return_exceptions=return_exceptions)
+
+
+def get_client(app_name, scopes=None, concurrency=DEFAULT_CONCURRENCY, secret_dir=None):
+    """Get the shared async client for an app registration (one per app, scope set, concurrency and tenant profile)."""
+    key = (app_name, tuple(scopes or graph_runtime.DEFAULT_SCOPES), concurrency, secret_dir)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = AsyncGraphClient(app_name, scopes, concurrency, secret_dir)
+                _clients[key] = client
+    return client
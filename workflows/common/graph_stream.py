@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# file: workflows/common/graph_stream.py
+"""
+Incremental parsing of large Graph collection responses.
+
+response.json() buffers the whole body and builds the complete object tree
+before the first item can be used. For multi-megabyte collections (list
+columns, expanded list queries, delta pages) the entries of value[] are
+instead decoded one at a time while the body is still streaming in, so
+peak memory stays at roughly one item plus one network chunk.
+
+Each entry is decoded with json.JSONDecoder.raw_decode, i.e. the same C
+scanner as json.loads, so throughput matches response.json() without any
+extra dependency.
+
+Streamed requests are not coalesced by graph_http.get(), so small
+collections that parallel workers share (site columns, content types) are
+read with graph_http.iter_values() instead.
+"""
+
+import json
+import codecs
+
+from workflows.common import graph_http
+from workflows.common import graph_trace
+
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class ValueStream:
+    """
+    Iterate over the value[] entries of a Graph collection response.
+
+    The response must have been requested with stream=True. Top-level
+    members other than value (such as @odata.nextLink or @odata.deltaLink)
+    are collected in `properties` and are complete once iteration ends.
+
+    Args:
+        response: Streamed requests.Response with a Graph collection body
+        chunk_size: Bytes read from the network at a time
+    """
+
+    def __init__(self, response, chunk_size=CHUNK_SIZE):
+        self.response = response
+        self.chunk_size = chunk_size
+        self.properties = {}
+        self.bytes_read = 0
+
+    @property
+    def next_link(self):
+        """The @odata.nextLink of the page, if any (available after iteration)."""
+        return self.properties.get("@odata.nextLink")
+
+    def __iter__(self):
+        try:
+            yield from self._iter_raw_decode()
+        finally:
+            self.response.close()
+            graph_trace.add_bytes(getattr(self.response, "trace_event", None), self.bytes_read)
+
+    def _iter_raw_decode(self):
+        """Parse the stream with json raw_decode over a sliding text buffer."""
+        chunks = self.response.iter_content(chunk_size=self.chunk_size)
+        text_decoder = codecs.getincrementaldecoder("utf-8")()
+        state = {"buffer": "", "pos": 0, "eof": False}
+
+        def fill():
+            """Read the next chunk, dropping already consumed text. Returns False at EOF."""
+            if state["eof"]:
+                return False
+            buffer = state["buffer"][state["pos"]:]
+            state["pos"] = 0
+            for chunk in chunks:
+                if chunk:
+                    self.bytes_read += len(chunk)
+                    state["buffer"] = buffer + text_decoder.decode(chunk)
+                    return True
+            state["buffer"] = buffer + text_decoder.decode(b"", final=True)
+            state["eof"] = True
+            return False
+
+        def peek():
+            """Skip whitespace and return the next character ('' at EOF)."""
+            while True:
+                buffer, pos = state["buffer"], state["pos"]
+                while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                    pos += 1
+                state["pos"] = pos
+                if pos < len(buffer):
+                    return buffer[pos]
+                if not fill():
+                    return ""
+
+        def expect(char):
+            if peek() != char:
+                raise ValueError(f"Malformed Graph response: expected {char!r} at offset {state['pos']}")
+            state["pos"] += 1
+
+        def decode():
+            """Decode the next complete JSON value, reading more data as needed."""
+            while True:
+                peek()
+                try:
+                    value, end = _decoder.raw_decode(state["buffer"], state["pos"])
+                    # A value ending exactly at the buffer end may be a cut-off number
+                    if end < len(state["buffer"]) or state["eof"]:
+                        state["pos"] = end
+                        return value
+                except json.JSONDecodeError:
+                    if state["eof"]:
+                        raise
+                fill()
+
+        expect("{")
+        while True:
+            char = peek()
+            if char == "}":
+                return
+            if char == ",":
+                state["pos"] += 1
+                continue
+
+            key = decode()
+            expect(":")
+            if key != "value":
+                self.properties[key] = decode()
+                continue
+
+            expect("[")
+            while True:
+                char = peek()
+                if char == "]":
+                    state["pos"] += 1
+                    break
+                if char == ",":
+                    state["pos"] += 1
+                    continue
+                if char == "":
+                    raise ValueError("Malformed Graph response: unterminated value array")
+                yield decode()
+
+
+def iter_collection(url, headers=None, limiter=None):
+    """
+    Yield every item of a paged Graph collection, parsing each page as it streams.
+
+    Raises:
+        RuntimeError: If a page request fails
+    """
+    while url:
+        response = graph_http.request("GET", url, headers=headers, limiter=limiter, stream=True)
+        if response.status_code != 200:
+            text = response.text
+            response.close()
+            raise RuntimeError(f"Graph request failed with status {response.status_code}: {text}")
+        page = ValueStream(response)
+        yield from page
+        url = page.next_link
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# file: workflows/common/graph_trace.py
+"""
+Per-request tracing for Microsoft Graph calls.
+
+When tracing is enabled every request made through graph_http is recorded
+with its start/end time, endpoint template, status, response size, retry
+count and worker thread. The trace is written in Chrome trace-event format
+so it can be opened in chrome://tracing, Perfetto or speedscope, and a
+summary of the slowest endpoints is logged when the run finishes.
+"""
+
+import re
+import json
+import time
+import atexit
+import threading
+from urllib.parse import urlparse, parse_qsl
+
+from workflows.common import log_utils
+from workflows.common.log_utils import Messages
+
+# Path segments that identify a specific object rather than an endpoint
+_GUID_RE = re.compile(r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$')
+_SITE_PATH_RE = re.compile(r'/sites/[^/]+:/[^:]*:?')
+
+# Active tracer (None when tracing is disabled)
+_tracer = None
+
+
+def endpoint_template(url):
+    """
+    Reduce a Graph URL to an endpoint template.
+
+    Object ids, composite site ids and server-relative site paths are
+    replaced by placeholders and query values are dropped, so that
+    requests to the same endpoint group together in the summary.
+    """
+    parsed = urlparse(url)
+    path = re.sub(r'^/(v1\.0|beta)', '', parsed.path)
+    path = _SITE_PATH_RE.sub('/sites/{site-path}', path)
+
+    segments = []
+    for segment in path.split('/'):
+        if _GUID_RE.match(segment) or ',' in segment or segment.startswith('b!'):
+            segments.append('{id}')
+        else:
+            segments.append(segment)
+    template = '/'.join(segments)
+
+    query_keys = sorted({key for key, _ in parse_qsl(parsed.query)})
+    if query_keys:
+        template += '?' + '&'.join(query_keys)
+    return template
+
+
+class Tracer:
+    """Collects Graph request events for one run."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.events = []
+        self.origin = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, method, url, start, end, status, nbytes, retries):
+        """Record a completed request (all retries included)."""
+        thread = threading.current_thread()
+        event = {
+            "method": method.upper(),
+            "url": url,
+            "endpoint": endpoint_template(url),
+            "start": start,
+            "end": end,
+            "status": status,
+            "bytes": nbytes,
+            "retries": retries,
+            "thread_id": thread.ident,
+            "thread_name": thread.name
+        }
+        with self._lock:
+            self.events.append(event)
+        return event
+
+    def add_bytes(self, event, nbytes):
+        """Add body bytes read after the request was recorded."""
+        with self._lock:
+            event["bytes"] = (event["bytes"] or 0) + nbytes
+
+    def to_chrome_trace(self):
+        """Build a Chrome trace-event document from the recorded events."""
+        trace_events = []
+        thread_names = {}
+
+        for event in self.events:
+            thread_names[event["thread_id"]] = event["thread_name"]
+            trace_events.append({
+                "name": f"{event['method']} {event['endpoint']}",
+                "cat": "graph",
+                "ph": "X",
+                "ts": round((event["start"] - self.origin) * 1_000_000),
+                "dur": round((event["end"] - event["start"]) * 1_000_000),
+                "pid": 1,
+                "tid": event["thread_id"],
+                "args": {
+                    "url": event["url"],
+                    "status": event["status"],
+                    "bytes": event["bytes"],
+                    "retries": event["retries"]
+                }
+            })
+
+        # Name the worker threads so the viewer shows readable lanes
+        for thread_id, thread_name in thread_names.items():
+            trace_events.append({
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": thread_id,
+                "args": {"name": thread_name}
+            })
+
+        return {
+            "traceEvents": trace_events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.origin)),
+                "requests": len(self.events),
+                "slowest_endpoints": self.summary()
+            }
+        }
+
+    def summary(self, top=10):
+        """
+        Aggregate recorded requests by endpoint template.
+
+        Returns:
+            List of per-endpoint stats sorted by total time spent, slowest first
+        """
+        endpoints = {}
+        for event in self.events:
+            key = f"{event['method']} {event['endpoint']}"
+            stats = endpoints.setdefault(key, {
+                "endpoint": key,
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "bytes": 0,
+                "retries": 0,
+                "errors": 0
+            })
+            duration_ms = (event["end"] - event["start"]) * 1000
+            stats["count"] += 1
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["bytes"] += event["bytes"] or 0
+            stats["retries"] += event["retries"]
+            if event["status"] is None or event["status"] >= 400:
+                stats["errors"] += 1
+
+        results = sorted(endpoints.values(), key=lambda s: s["total_ms"], reverse=True)
+        for stats in results:
+            stats["avg_ms"] = round(stats["total_ms"] / stats["count"], 1)
+            stats["total_ms"] = round(stats["total_ms"], 1)
+            stats["max_ms"] = round(stats["max_ms"], 1)
+        return results[:top]
+
+    def write(self, path=None):
+        """Write the Chrome trace file and log the slowest endpoints."""
+        path = path or self.path
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+
+        log_utils.info(Messages.Trace.TRACE_SAVED, len(self.events), path)
+        log_utils.info(Messages.Trace.SLOWEST_HEADER)
+        for stats in self.summary():
+            log_utils.info(Messages.Trace.SLOWEST_ITEM, stats["endpoint"], stats["count"],
+                           stats["total_ms"], stats["avg_ms"], stats["max_ms"],
+                           stats["bytes"], stats["retries"])
+        return path
+
+
+def enable(path):
+    """
+    Start tracing Graph requests for this process.
+
+    The trace is written to path when the process exits.
+    """
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer(path)
+        atexit.register(_write_on_exit)
+        log_utils.info(Messages.Trace.TRACE_ENABLED, path)
+    return _tracer
+
+
+def get_tracer():
+    """Get the active tracer, or None when tracing is disabled."""
+    return _tracer
+
+
+def record(method, url, start, end, status, nbytes, retries=0):
+    """
+    Record a request on the active tracer (no-op when disabled).
+
+    Returns:
+        The recorded event, or None when tracing is disabled
+    """
+    if _tracer is not None:
+        return _tracer.record(method, url, start, end, status, nbytes, retries)
+    return None
+
+
+def add_bytes(event, nbytes):
+    """Add the bytes of a streamed body to its request event as they are read."""
+    if _tracer is not None and event is not None:
+        _tracer.add_bytes(event, nbytes)
+
+
+def _write_on_exit():
+    """Write the trace file at interpreter exit."""
+    if _tracer is not None and _tracer.path:
+        try:
+            _tracer.write()
+        except Exception as e:
+            log_utils.error(Messages.Trace.TRACE_ERROR, e)
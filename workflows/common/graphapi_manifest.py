@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# file: workflows/common/graphapi_manifest.py
+"""
+Declarative app registration manifest for the GraphAPI orchestrator.
+
+The manifest (YAML or JSON) lists every automation app with its
+permissions, secret lifetime and whether admin consent should be granted:
+
+    apps:
+      - name: sharepoint
+        description: SharePoint operations
+        permissions: [Sites.Read.All, Sites.ReadWrite.All]
+        secret_lifetime_days: 180
+        grant: true
+
+A plan compares the manifest with GraphAPI_config.json and with the
+Automation-* app registrations in the tenant (one paged listing, not one
+lookup per app). Applying the plan creates, updates and grants apps in
+parallel and saves the configuration once at the end.
+"""
+
+import json
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from workflows.common import log_utils
+from workflows.common import graph_http
+from workflows.common.graphapi_permissions import other_resource_access
+from workflows.common.log_utils import Messages
+
+APP_PREFIX = "Automation-"
+DEFAULT_SECRET_LIFETIME_DAYS = 365
+DEFAULT_MAX_WORKERS = 4
+
+
+class ManifestMessages:
+    """App manifest related messages."""
+    MANIFEST_LOADED = "Loaded manifest {}: {} apps"
+    MANIFEST_INVALID = "Invalid manifest entry: {}"
+    TENANT_SCANNED = "Found {} automation app registrations in the tenant"
+    PLAN_HEADER = "\n===== Plan: {} to create, {} to update, {} to adopt, {} unchanged ====="
+    PLAN_ITEM = "  {} {} {}"
+    PLAN_UNMANAGED = "  ? {} is in the configuration but not in the manifest"
+    APPLY_START = "Applying {} changes with {} workers"
+    APPLY_FAILED = "Failed to apply {} for {}"
+    APPLY_SUMMARY = "Applied {} of {} changes"
+
+# Register message class
+if not hasattr(Messages, 'Manifest'):
+    setattr(Messages, 'Manifest', ManifestMessages)
+
+_PLAN_SYMBOLS = {"create": "+", "update": "~", "adopt": "<", "none": "="}
+
+
+def load_manifest(path):
+    """
+    Load and validate an app manifest.
+
+    Returns:
+        List of app definitions with defaults filled in
+    """
+    with open(path, "r") as f:
+        if str(path).endswith(('.yml', '.yaml')):
+            import yaml
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+
+    apps = manifest.get("apps", []) if isinstance(manifest, dict) else manifest
+    seen = set()
+    for app in apps:
+        if not app.get("name") or app["name"] in seen:
+            log_utils.error(Messages.Manifest.MANIFEST_INVALID, app)
+            raise ValueError(f"Manifest app without a name or listed twice: {app}")
+        seen.add(app["name"])
+        app.setdefault("description", f"App registration for {app['name']} automation")
+        app["permissions"] = sorted(set(app.get("permissions") or []))
+        app.setdefault("secret_lifetime_days", DEFAULT_SECRET_LIFETIME_DAYS)
+        app.setdefault("grant", False)
+
+    log_utils.info(Messages.Manifest.MANIFEST_LOADED, path, len(apps))
+    return apps
+
+
+def scan_tenant(token, http=graph_http):
+    """
+    List the automation app registrations and service principals in the tenant.
+
+    Args:
+        token: Master app access token
+        http: graph_http client to send requests with
+
+    Returns:
+        Tuple of (applications by displayName, service principal ids by appId)
+    """
+    headers = graph_http.auth_headers(token)
+    name_filter = f"$filter=startswith(displayName,'{APP_PREFIX}')"
+
+    applications = {
+        app["displayName"]: app
+        for app in http.iter_values(
+            "https://graph.microsoft.com/v1.0/applications"
+            f"?{name_filter}&$select=id,appId,displayName,notes,requiredResourceAccess&$top=999",
+            headers)
+    }
+    service_principals = {
+        sp["appId"]: sp["id"]
+        for sp in http.iter_values(
+            "https://graph.microsoft.com/v1.0/servicePrincipals"
+            f"?{name_filter}&$select=id,appId&$top=999",
+            headers)
+    }
+
+    log_utils.info(Messages.Manifest.TENANT_SCANNED, len(applications))
+    return applications, service_principals
+
+
+def build_plan(apps, config, catalog, tenant_apps, service_principals):
+    """
+    Diff the manifest against the configuration and the tenant.
+
+    Actions:
+        create: the app does not exist in the tenant
+        adopt:  the app exists in the tenant but not in the configuration;
+                it gets a new secret so its module can authenticate
+        update: permissions or description differ from the manifest
+        none:   nothing to do
+
+    Returns:
+        Plan dict with a list of app changes and unmanaged configured apps
+    """
+    configured = {app["name"]: app for app in config["app_registrations"]}
+    changes = []
+
+    for app in apps:
+        app_name = f"{APP_PREFIX}{app['name']}"
+        tenant_app = tenant_apps.get(app_name)
+        change = {"name": app["name"], "app_name": app_name, "app": app, "differences": []}
+
+        if tenant_app is None:
+            change["action"] = "create"
+        else:
+            change["object_id"] = tenant_app["id"]
+            change["client_id"] = tenant_app["appId"]
+            change["service_principal_id"] = service_principals.get(tenant_app["appId"])
+            change["required_resource_access"] = tenant_app.get("requiredResourceAccess") or []
+
+            current = catalog.permission_names(tenant_app.get("requiredResourceAccess"))
+            if current != app["permissions"]:
+                change["differences"].append(f"permissions {current} -> {app['permissions']}")
+            if (tenant_app.get("notes") or "") != app["description"]:
+                change["differences"].append("description")
+
+            if app_name not in configured:
+                change["action"] = "adopt"
+            elif change["differences"]:
+                change["action"] = "update"
+            else:
+                change["action"] = "none"
+
+        # Consent is (re)granted whenever permissions may have changed or was never given
+        change["grant"] = bool(app["grant"]) and (
+            change["action"] != "none" or not change.get("service_principal_id"))
+        changes.append(change)
+
+    manifest_names = {f"{APP_PREFIX}{app['name']}" for app in apps}
+    return {
+        "changes": changes,
+        "unmanaged": sorted(name for name in configured if name not in manifest_names)
+    }
+
+
+def print_plan(plan):
+    """Print a plan summary."""
+    counts = {action: 0 for action in _PLAN_SYMBOLS}
+    for change in plan["changes"]:
+        counts[change["action"]] += 1
+
+    print(Messages.Manifest.PLAN_HEADER.format(
+        counts["create"], counts["update"], counts["adopt"], counts["none"]))
+    for change in plan["changes"]:
+        details = list(change["differences"])
+        if change["action"] == "adopt":
+            details.append("new secret")
+        if change["grant"]:
+            details.append("grant consent")
+        detail = "; ".join(details)
+        print(Messages.Manifest.PLAN_ITEM.format(
+            _PLAN_SYMBOLS[change["action"]], change["app_name"], f"({detail})" if detail else "").rstrip())
+    for name in plan["unmanaged"]:
+        print(Messages.Manifest.PLAN_UNMANAGED.format(name))
+
+
+def _apply_change(orchestrator, change):
+    """
+    Apply one app change in the tenant.
+
+    Runs in a worker thread; the configuration is updated by the caller.
+
+    Returns:
+        Dict with the resulting config entry and any new secret, with
+        "failed" set when the app was created but its permissions were not
+        (it is still recorded, so its secret is not lost), or None on failure
+    """
+    app = change["app"]
+    secret_info = None
+
+    if change["action"] == "create":
+        registered = orchestrator._register_app(
+            app["name"], app["description"], app["permissions"], app["secret_lifetime_days"])
+        if not registered:
+            return None
+        app_config, secret_info, permissions_set = registered
+        orchestrator._save_app_secrets(app["name"], app_config["client_id"], secret_info["value"])
+        if not permissions_set:
+            # The next plan shows the missing permissions as an update
+            app_config["secret_lifetime_days"] = app["secret_lifetime_days"]
+            return {"config": app_config, "secret": secret_info, "failed": True}
+        service_principal_id = None
+    else:
+        current = change["required_resource_access"]
+        if change["differences"]:
+            update = {"notes": app["description"]}
+            if not app["permissions"]:
+                # Only the Graph permissions are managed; other APIs' are kept
+                update["requiredResourceAccess"] = other_resource_access(current)
+            response = orchestrator.http.patch(
+                f"https://graph.microsoft.com/v1.0/applications/{change['object_id']}",
+                headers=graph_http.auth_headers(orchestrator.token),
+                json=update
+            )
+            if response.status_code >= 400:
+                return None
+            if app["permissions"] and not orchestrator._set_permissions(
+                    change["object_id"], app["permissions"], current=current):
+                return None
+        if change["action"] == "adopt":
+            # The app's existing secrets are not known here, so it gets one of its own
+            secret_info = orchestrator._create_client_secret(
+                change["object_id"], "Adopted-Secret", duration_days=app["secret_lifetime_days"])
+            if not secret_info:
+                return None
+            orchestrator._save_app_secrets(app["name"], change["client_id"], secret_info["value"])
+        app_config = {
+            "name": change["app_name"],
+            "client_id": change["client_id"],
+            "object_id": change["object_id"],
+            "description": app["description"],
+            "creation_date": datetime.now().isoformat(),
+            "permissions": app["permissions"],
+            "secret_expiry": secret_info["end_date"] if secret_info else None
+        }
+        service_principal_id = change.get("service_principal_id")
+
+    app_config["secret_lifetime_days"] = app["secret_lifetime_days"]
+
+    if change["grant"]:
+        if not orchestrator._grant_permissions(app_config["client_id"], app["permissions"], service_principal_id):
+            return None
+
+    return {"config": app_config, "secret": secret_info}
+
+
+def apply_plan(orchestrator, plan, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Apply a plan with bounded parallelism and save the configuration once.
+
+    The plan must come from plan_manifest, which loads the master token
+    and the permission catalog the workers share.
+
+    Returns:
+        Tuple of (applied count, failed app names)
+    """
+    pending = [change for change in plan["changes"] if change["action"] != "none" or change["grant"]]
+    if not pending:
+        return 0, []
+
+    log_utils.info(Messages.Manifest.APPLY_START, len(pending), max_workers)
+
+    results = {}
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_apply_change, orchestrator, change): change for change in pending}
+        for future in as_completed(futures):
+            change = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                log_utils.error("Error applying {}: {}", change["app_name"], e)
+                result = None
+            if result is None or result.get("failed"):
+                log_utils.error(Messages.Manifest.APPLY_FAILED, change["action"], change["app_name"])
+                failed.append(change["app_name"])
+            if result is not None:
+                results[change["app_name"]] = result
+
+    # Merge results into the configuration, keeping existing history fields
+    registrations = orchestrator.config["app_registrations"]
+    by_name = {app["name"]: app for app in registrations}
+    for name, result in results.items():
+        entry = result["config"]
+        existing = by_name.get(name)
+        if existing is None:
+            registrations.append(entry)
+        else:
+            entry["creation_date"] = existing.get("creation_date", entry["creation_date"])
+            if entry["secret_expiry"] is None:
+                entry["secret_expiry"] = existing.get("secret_expiry")
+            existing.update(entry)
+
+    if results:
+        orchestrator._save_config()
+
+    applied = len(pending) - len(failed)
+    log_utils.info(Messages.Manifest.APPLY_SUMMARY, applied, len(pending))
+    return applied, sorted(failed)
+
+
+def plan_manifest(orchestrator, manifest_path):
+    """
+    Load a manifest and build its plan against the configuration and tenant.
+
+    Returns:
+        Plan dict, or None if the master token or catalog is unavailable
+    """
+    apps = load_manifest(manifest_path)
+    if not orchestrator.token and not orchestrator.get_master_token():
+        return None
+    if not orchestrator.permission_catalog.loaded and not orchestrator.permission_catalog.load(orchestrator.token):
+        return None
+
+    tenant_apps, service_principals = scan_tenant(orchestrator.token, orchestrator.http)
+    return build_plan(apps, orchestrator.config, orchestrator.permission_catalog,
+                      tenant_apps, service_principals)
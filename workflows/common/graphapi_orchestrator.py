@@ -8,14 +8,22 @@ Creates and manages specialized app registrations with least-privilege permissio
 import os
 import json
 import argparse
+import threading
 import uuid
 from datetime import datetime, timedelta
 from pathlib import Path
-import requests
 import msal
 
 # Import your logging system
 from workflows.common import log_utils
+from workflows.common import graph_http
+from workflows.common import graph_runtime
+from workflows.common import graph_trace
+from workflows.common import graphapi_manifest
+from workflows.common import graphapi_secrets
+from workflows.common import graphapi_sync
+from workflows.common import graphapi_tenants
+from workflows.common.graphapi_permissions import PermissionCatalog
 from workflows.common.log_utils import Messages
 
 # Add message definitions for GraphAPI orchestrator
@@ -31,6 +39,9 @@ class GraphAPIMessages:
     TOKEN_FAILURE = "Failed to acquire access token: {}"
     PERMISSION_ADDED = "Added permission: {}"
     PERMISSION_FAILURE = "Failed to add permission {}: {}"
+    PERMISSION_UNKNOWN = "Permission not found: {}"
+    GRANT_SUCCESS = "Granted admin consent for app {}"
+    GRANT_FAILURE = "Failed to grant {}: {}"
     MODULE_GENERATED = "Generated API module: {}"
     
 # Register message class
@@ -42,14 +53,27 @@ class GraphAPIOrchestrator:
     Orchestrates the creation and management of secure app registrations
     """
     
-    def __init__(self, config_path=None):
-        """Initialize the GraphAPI orchestrator"""
+    def __init__(self, config_path=None, base_dir=None, rate_limit=None):
+        """
+        Initialize the GraphAPI orchestrator
+        
+        Args:
+            config_path: Configuration file (default: GraphAPI_config.json in base_dir)
+            base_dir: Directory holding this tenant's configuration, master and
+                      app secrets and caches (default: current directory)
+            rate_limit: Maximum Graph requests per second for this tenant (optional)
+        """
         # Initialize logging
         log_utils.setup_logging()
         
-        self.config_path = config_path or Path("./GraphAPI_config.json")
+        self.base_dir = Path(base_dir or ".")
+        self.config_path = config_path or self.base_dir / "GraphAPI_config.json"
         self.config = self._load_config()
         self.token = None
+        self._master_app = None
+        self.http = graph_http.GraphHttpClient(graph_http.RateLimiter(rate_limit) if rate_limit else None)
+        self.permission_catalog = PermissionCatalog(
+            path=self.base_dir / ".cache" / "graph_permission_catalog.json", http=self.http)
         
     def _load_config(self):
         """Load the GraphAPI configuration file"""
@@ -72,7 +96,7 @@ class GraphAPIOrchestrator:
     def _save_config(self):
         """Save the current configuration"""
         # Ensure the directory exists
-        self.config_path.parent.mkdir(exist_ok=True)
+        self.config_path.parent.mkdir(parents=True, exist_ok=True)
         
         with open(self.config_path, "w") as f:
             json.dump(self.config, f, indent=2)
@@ -133,7 +157,7 @@ class GraphAPIOrchestrator:
             }
             
             # Get app registration details
-            response = requests.get(
+            response = self.http.get(
                 f"https://graph.microsoft.com/v1.0/applications?$filter=appId eq '{client_id}'",
                 headers=headers
             )
@@ -166,7 +190,8 @@ MASTER_CLIENT_ID={client_id}
 MASTER_CLIENT_SECRET={client_secret}
 """
         
-        with open(".env.master", "w") as f:
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.base_dir / ".env.master", "w") as f:
             f.write(env_content)
         
         log_utils.info("Master secrets saved to .env.master file")
@@ -191,14 +216,15 @@ MASTER_CLIENT_SECRET={client_secret}
     def get_master_token(self):
         """Get an access token for the master app"""
         # Load master secrets
-        if not Path(".env.master").exists():
+        master_env = self.base_dir / ".env.master"
+        if not master_env.exists():
             log_utils.error("Master app secrets not found (.env.master)")
             print("❌ Master app secrets not found (.env.master)")
             print("Please run setup_master_app first")
             return None
         
         # Load credentials from .env.master
-        with open(".env.master", "r") as f:
+        with open(master_env, "r") as f:
             env_content = f.read()
             
         # Parse environment variables
@@ -217,16 +243,18 @@ MASTER_CLIENT_SECRET={client_secret}
             print("❌ Missing master app credentials in .env.master")
             return None
         
-        # Initialize MSAL app
-        app = msal.ConfidentialClientApplication(
-            client_id=client_id,
-            authority=f"https://login.microsoftonline.com/{tenant_id}",
-            client_credential=client_secret
-        )
+        # Initialize MSAL app once per orchestrator, so later calls are
+        # served from this tenant's own token cache
+        if self._master_app is None:
+            self._master_app = msal.ConfidentialClientApplication(
+                client_id=client_id,
+                authority=f"https://login.microsoftonline.com/{tenant_id}",
+                client_credential=client_secret
+            )
         
         # Get token for Microsoft Graph
         scopes = ["https://graph.microsoft.com/.default"]
-        result = app.acquire_token_for_client(scopes=scopes)
+        result = self._master_app.acquire_token_for_client(scopes=scopes)
         
         if "access_token" in result:
             self.token = result["access_token"]
@@ -254,12 +282,6 @@ MASTER_CLIENT_SECRET={client_secret}
         if not self.token and not self.get_master_token():
             return False
         
-        # Prepare headers for Graph API
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
-        }
-        
         # Format the app name
         app_name = f"Automation-{name}"
         
@@ -272,6 +294,57 @@ MASTER_CLIENT_SECRET={client_secret}
             print(f"⚠️ App registration '{app_name}' already exists")
             return False
         
+        registered = self._register_app(name, description, api_permissions)
+        if not registered:
+            return False
+        app_config, secret_info, permissions_set = registered
+        if not permissions_set:
+            log_utils.warning("Permissions of app {} were not set; add them with the manifest or the portal",
+                              app_config["client_id"])
+            print("⚠️ Some API permissions could not be added")
+        
+        self.config["app_registrations"].append(app_config)
+        self._save_config()
+        
+        # Save the secret to a separate .env file
+        self._save_app_secrets(name, app_config["client_id"], secret_info["value"])
+        
+        # Notify about admin consent requirement
+        log_utils.warning("API permissions require admin consent for app {}", app_config["client_id"])
+        print("\n⚠️ IMPORTANT: API permissions require admin consent")
+        print(f"Please ask an admin to approve permissions at:")
+        print(f"https://portal.azure.com/#blade/Microsoft_AAD_RegisteredApps/ApplicationMenuBlade/CallAnAPI/appId/{app_config['client_id']}")
+        
+        return {
+            "name": app_name,
+            "client_id": app_config["client_id"],
+            "object_id": app_config["object_id"],
+            "secret": secret_info["value"],
+            "secret_expiry": secret_info["end_date"]
+        }
+    
+    def _register_app(self, name, description=None, api_permissions=None, secret_lifetime_days=365):
+        """
+        Create the app registration, its permissions and an initial secret in the tenant.
+        
+        The configuration is not touched, so several apps can be registered
+        concurrently and saved once.
+        
+        The app is kept (and its secret created) when setting the permissions
+        fails, so the registration is not orphaned; the caller reports it.
+        
+        Returns:
+            Tuple of (app config entry, secret info, whether the permissions
+            were set), or None on failure
+        """
+        app_name = f"Automation-{name}"
+        
+        # Prepare headers for Graph API
+        headers = {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json"
+        }
+        
         # Prepare the app registration data
         app_data = {
             "displayName": app_name,
@@ -282,7 +355,7 @@ MASTER_CLIENT_SECRET={client_secret}
         # Create the app registration
         log_utils.info("Creating app registration '{}'...", app_name)
         print(f"Creating app registration '{app_name}'...")
-        response = requests.post(
+        response = self.http.post(
             "https://graph.microsoft.com/v1.0/applications",
             headers=headers,
             json=app_data
@@ -292,7 +365,7 @@ MASTER_CLIENT_SECRET={client_secret}
             log_utils.error(Messages.GraphAPI.APP_CREATION_FAILURE, app_name, response.status_code)
             print(f"❌ Failed to create app registration: {response.status_code}")
             print(response.text)
-            return False
+            return None
         
         app_info = response.json()
         app_object_id = app_info["id"]
@@ -304,23 +377,24 @@ MASTER_CLIENT_SECRET={client_secret}
         print(f"   Client ID: {app_client_id}")
         
         # Add required permissions if specified
+        permissions_set = True
         if api_permissions:
             log_utils.info("Adding API permissions...")
             print("Adding API permissions...")
-            for permission in api_permissions:
-                self._add_permission(app_object_id, permission)
+            permissions_set = self._set_permissions(app_object_id, api_permissions, current=[])
         
         # Create a client secret
         log_utils.info("Creating client secret...")
         print("Creating client secret...")
-        secret_info = self._create_client_secret(app_object_id, "Initial-Secret")
+        secret_info = self._create_client_secret(app_object_id, "Initial-Secret",
+                                                 duration_days=secret_lifetime_days)
         
         if not secret_info:
             log_utils.error("Failed to create client secret")
             print("❌ Failed to create client secret")
-            return False
+            return None
         
-        # Update the configuration
+        # Configuration entry for the new app
         app_config = {
             "name": app_name,
             "client_id": app_client_id,
@@ -331,101 +405,170 @@ MASTER_CLIENT_SECRET={client_secret}
             "secret_expiry": secret_info["end_date"]
         }
         
-        self.config["app_registrations"].append(app_config)
-        self._save_config()
-        
-        # Save the secret to a separate .env file
-        self._save_app_secrets(name, app_client_id, secret_info["value"])
-        
-        # Notify about admin consent requirement
-        log_utils.warning("API permissions require admin consent for app {}", app_client_id)
-        print("\n⚠️ IMPORTANT: API permissions require admin consent")
-        print(f"Please ask an admin to approve permissions at:")
-        print(f"https://portal.azure.com/#blade/Microsoft_AAD_RegisteredApps/ApplicationMenuBlade/CallAnAPI/appId/{app_client_id}")
-        
-        return {
-            "name": app_name,
-            "client_id": app_client_id,
-            "object_id": app_object_id,
-            "secret": secret_info["value"],
-            "secret_expiry": secret_info["end_date"]
-        }
+        return app_config, secret_info, permissions_set
     
-    def _add_permission(self, app_object_id, permission):
-        """Add a permission to the app registration"""
+    def _current_resource_access(self, app_object_id, headers):
+        """The app's current requiredResourceAccess, or None if it cannot be read."""
+        response = self.http.get(
+            f"https://graph.microsoft.com/v1.0/applications/{app_object_id}?$select=requiredResourceAccess",
+            headers=headers
+        )
+        if response.status_code != 200:
+            log_utils.error("Error reading the permissions of app {}: Status {}", app_object_id, response.status_code)
+            print(f"❌ Failed to read current permissions: {response.status_code}")
+            return None
+        return response.json().get("requiredResourceAccess") or []
+    
+    def _set_permissions(self, app_object_id, permissions, current=None):
+        """
+        Set all Graph permissions of the app registration in a single PATCH.
+        
+        Permission ids are resolved from the cached permission catalog, so
+        no Graph lookups are needed per permission. Permissions of other
+        APIs (SharePoint, ...) are kept; they are read from the app unless
+        its current requiredResourceAccess is given.
+        """
         if not self.token:
             return False
         
+        if not self.permission_catalog.loaded and not self.permission_catalog.load(self.token):
+            return False
+        
         # Prepare headers for Graph API
         headers = {
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json"
         }
         
-        # Get the permission ID from Microsoft Graph
-        # This is a simplified example - in reality you'd need to lookup the actual permission IDs
-        resource_app_id = "00000003-0000-0000-c000-000000000000"  # Microsoft Graph
-        
-        # Get the service principal to find permission IDs
-        response = requests.get(
-            f"https://graph.microsoft.com/v1.0/servicePrincipals?$filter=appId eq '{resource_app_id}'",
-            headers=headers
-        )
+        if current is None:
+            current = self._current_resource_access(app_object_id, headers)
+            if current is None:
+                return False
         
-        if response.status_code != 200:
-            log_utils.error("Failed to get service principal: {}", response.status_code)
-            print(f"❌ Failed to get service principal: {response.status_code}")
-            return False
-        
-        graph_service_principal = response.json().get("value", [])[0]
-        sp_id = graph_service_principal["id"]
-        
-        # Find the permission ID
-        permission_id = None
-        app_roles = graph_service_principal.get("appRoles", [])
-        
-        for role in app_roles:
-            if role["value"] == permission:
-                permission_id = role["id"]
-                break
-        
-        if not permission_id:
-            log_utils.error("Permission not found: {}", permission)
+        required_resource_access, unknown = self.permission_catalog.required_resource_access(permissions, current)
+        for permission in unknown:
+            log_utils.error(Messages.GraphAPI.PERMISSION_UNKNOWN, permission)
             print(f"❌ Permission not found: {permission}")
-            return False
         
-        # Add the permission
-        permission_data = {
-            "requiredResourceAccess": [
-                {
-                    "resourceAppId": resource_app_id,
-                    "resourceAccess": [
-                        {
-                            "id": permission_id,
-                            "type": "Role"
-                        }
-                    ]
-                }
-            ]
-        }
+        if set(permissions) <= set(unknown):
+            return False
         
-        response = requests.patch(
+        # requiredResourceAccess is replaced as a whole, so send every permission at once
+        response = self.http.patch(
             f"https://graph.microsoft.com/v1.0/applications/{app_object_id}",
             headers=headers,
-            json=permission_data
+            json={"requiredResourceAccess": required_resource_access}
         )
         
         if response.status_code >= 400:
-            log_utils.error(Messages.GraphAPI.PERMISSION_FAILURE, permission, response.status_code)
-            print(f"❌ Failed to add permission {permission}: {response.status_code}")
+            log_utils.error(Messages.GraphAPI.PERMISSION_FAILURE, ", ".join(permissions), response.status_code)
+            print(f"❌ Failed to add permissions: {response.status_code}")
             print(response.text)
             return False
         
-        log_utils.info(Messages.GraphAPI.PERMISSION_ADDED, permission)
-        print(f"✅ Added permission: {permission}")
-        return True
+        for permission in permissions:
+            if permission not in unknown:
+                log_utils.info(Messages.GraphAPI.PERMISSION_ADDED, permission)
+                print(f"✅ Added permission: {permission}")
+        return not unknown
     
-    def _create_client_secret(self, app_object_id, display_name, duration_years=1):
+    def _grant_permissions(self, app_client_id, permissions, service_principal_id=None):
+        """
+        Grant tenant-wide admin consent for the app's Graph permissions.
+
+        Creates the app's service principal if needed, assigns missing
+        application permissions and sets the delegated permission grant.
+
+        Returns:
+            The app's service principal id, or None on failure
+        """
+        if not self.token:
+            return None
+
+        if not self.permission_catalog.loaded and not self.permission_catalog.load(self.token):
+            return None
+
+        headers = graph_http.auth_headers(self.token)
+        graph_sp_id = self.permission_catalog.service_principal_id
+
+        if not service_principal_id:
+            response = self.http.post(
+                "https://graph.microsoft.com/v1.0/servicePrincipals",
+                headers=headers,
+                json={"appId": app_client_id}
+            )
+            if response.status_code == 409:
+                response = self.http.get(
+                    f"https://graph.microsoft.com/v1.0/servicePrincipals?$filter=appId eq '{app_client_id}'&$select=id",
+                    headers=headers
+                )
+                found = response.json().get("value", []) if response.status_code == 200 else []
+                service_principal_id = found[0]["id"] if found else None
+            elif response.status_code < 400:
+                service_principal_id = response.json()["id"]
+
+            if not service_principal_id:
+                log_utils.error(Messages.GraphAPI.GRANT_FAILURE, app_client_id, response.status_code)
+                print(f"❌ Failed to create service principal: {response.status_code}")
+                return None
+
+        roles, scopes = [], []
+        for permission in permissions:
+            entry = self.permission_catalog.resolve(permission)
+            if entry is None:
+                continue
+            (roles if entry["type"] == "Role" else scopes).append((permission, entry["id"]))
+
+        ok = True
+        if roles:
+            response = self.http.get(
+                f"https://graph.microsoft.com/v1.0/servicePrincipals/{service_principal_id}/appRoleAssignments",
+                headers=headers
+            )
+            assigned = {assignment["appRoleId"] for assignment in response.json().get("value", [])} \
+                if response.status_code == 200 else set()
+            for permission, role_id in roles:
+                if role_id in assigned:
+                    continue
+                response = self.http.post(
+                    f"https://graph.microsoft.com/v1.0/servicePrincipals/{service_principal_id}/appRoleAssignments",
+                    headers=headers,
+                    json={"principalId": service_principal_id, "resourceId": graph_sp_id, "appRoleId": role_id}
+                )
+                if response.status_code >= 400:
+                    log_utils.error(Messages.GraphAPI.GRANT_FAILURE, permission, response.status_code)
+                    ok = False
+
+        if scopes:
+            scope = " ".join(permission for permission, _ in scopes)
+            response = self.http.get(
+                "https://graph.microsoft.com/v1.0/oauth2PermissionGrants"
+                f"?$filter=clientId eq '{service_principal_id}' and resourceId eq '{graph_sp_id}'",
+                headers=headers
+            )
+            existing = response.json().get("value", []) if response.status_code == 200 else []
+            if existing:
+                response = self.http.patch(
+                    f"https://graph.microsoft.com/v1.0/oauth2PermissionGrants/{existing[0]['id']}",
+                    headers=headers,
+                    json={"scope": scope}
+                )
+            else:
+                response = self.http.post(
+                    "https://graph.microsoft.com/v1.0/oauth2PermissionGrants",
+                    headers=headers,
+                    json={"clientId": service_principal_id, "consentType": "AllPrincipals",
+                          "resourceId": graph_sp_id, "scope": scope}
+                )
+            if response.status_code >= 400:
+                log_utils.error(Messages.GraphAPI.GRANT_FAILURE, scope, response.status_code)
+                ok = False
+
+        if ok:
+            log_utils.info(Messages.GraphAPI.GRANT_SUCCESS, app_client_id)
+        return service_principal_id if ok else None
+
+    def _create_client_secret(self, app_object_id, display_name, duration_days=365):
         """Create a client secret for the app registration"""
         if not self.token:
             return None
@@ -437,7 +580,7 @@ MASTER_CLIENT_SECRET={client_secret}
         }
         
         # Calculate expiration date
-        end_date = (datetime.now() + timedelta(days=365*duration_years)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        end_date = (datetime.now() + timedelta(days=duration_days)).strftime("%Y-%m-%dT%H:%M:%SZ")
         
         # Prepare secret data
         secret_data = {
@@ -448,7 +591,7 @@ MASTER_CLIENT_SECRET={client_secret}
         }
         
         # Create the secret
-        response = requests.post(
+        response = self.http.post(
             f"https://graph.microsoft.com/v1.0/applications/{app_object_id}/addPassword",
             headers=headers,
             json=secret_data
@@ -480,10 +623,16 @@ TENANT_ID={self.config["tenant_id"]}
         # Create secrets directory if it doesn't exist
         os.makedirs("./.secrets", exist_ok=True)
         
-        # Save to .env.[app_name].secret file
-        env_file = f".env.{app_name}.secret"
-        with open(env_file, "w") as f:
+        # Save to .env.[app_name].secret file; write a temporary file and
+        # rename it so a reader never sees a half-written secret
+        env_file = self.base_dir / f".env.{app_name}.secret"
+        tmp_file = f"{env_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
             f.write(env_content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, env_file)
         
         log_utils.info("App secrets saved to {}", env_file)
         print(f"App secrets saved to {env_file}")
@@ -491,8 +640,17 @@ TENANT_ID={self.config["tenant_id"]}
         
         return True
     
-    def generate_api_module(self, app_name, scopes=None):
-        """Generate a Python module for the app registration"""
+    def generate_api_module(self, app_name, scopes=None, async_client=False, tenant=None):
+        """
+        Generate a Python module for the app registration
+        
+        Args:
+            app_name: Name of the app (without the Automation- prefix)
+            scopes: Token scopes (default: Graph .default)
+            async_client: Also generate an async client module (requires httpx)
+            tenant: Tenant profile name; the module is named <tenant>_<app> and
+                reads its secret from this orchestrator's profile directory
+        """
         # Find the app in the configuration
         app_info = None
         for app in self.config["app_registrations"]:
@@ -513,160 +671,49 @@ TENANT_ID={self.config["tenant_id"]}
         modules_dir = Path("./api_modules")
         modules_dir.mkdir(exist_ok=True)
         
-        # Create app module directory
-        app_module_dir = modules_dir / app_name
+        # Create app module directory; tenant modules get their own name so
+        # profiles with an app of the same name do not overwrite each other
+        module_name = f"{tenant}_{app_name}" if tenant else app_name
+        app_module_dir = modules_dir / module_name
         app_module_dir.mkdir(exist_ok=True)
         
+        # Tenant secrets live in the profile directory, not the working directory
+        secret_dir = repr(str(self.base_dir.resolve())) if tenant else None
+        
         # Create __init__.py
         with open(app_module_dir / "__init__.py", "w") as f:
             f.write(f'"""API module for {app_name} operations"""\n')
             f.write(f'from .{app_name}_api import get_client, get_access_token\n')
+            if async_client:
+                f.write(f'from .{app_name}_async_api import get_client as get_async_client\n')
         
         # Create the module file
         module_path = app_module_dir / f"{app_name}_api.py"
         
-        # Fix the template string issue by properly escaping curly braces
+        # JSON list of strings is also a valid Python literal
         scopes_json = json.dumps(scopes)
         
         #Start of module content
+        # Only configuration lives here; the client comes from the shared runtime
         module_content = f'''"""
 {app_name.upper()} API Module
 Auto-generated secure access module for {app_name} operations
 Generated: {datetime.now().isoformat()}
 """
-import os
-import json
-from pathlib import Path
-from msal import ConfidentialClientApplication
-from datetime import datetime, timedelta
+from workflows.common import graph_runtime
 
-# Import logging
-from workflows.common import log_utils
+APP_NAME = "{app_name}"
+SCOPES = {scopes_json}
+# Directory of the .env.{app_name}.secret file (None: environment, then the working directory)
+SECRET_DIR = {secret_dir}
 
-# API endpoints
-GRAPH_API_ENDPOINT = "https://graph.microsoft.com/v1.0"
-
-class {app_name.capitalize()}Client:
-    """Client for {app_name} API operations"""
-    
-    def __init__(self):
-        """Initialize the {app_name} API client"""
-        self.token = None
-        self.token_expiry = None
-        self.client = None
-        
-        # Load credentials
-        client_id, client_secret, tenant_id = self._load_credentials()
-        
-        # Initialize the MSAL app
-        self.app = ConfidentialClientApplication(
-            client_id=client_id,
-            authority=f"https://login.microsoftonline.com/{{tenant_id}}",
-            client_credential=client_secret
-        )
-    
-    def _load_credentials(self):
-        """Load credentials from the environment or secret file"""
-        # First try environment variables
-        client_id = os.getenv("{app_name.upper()}_CLIENT_ID")
-        client_secret = os.getenv("{app_name.upper()}_CLIENT_SECRET")
-        tenant_id = os.getenv("TENANT_ID")
-        
-        # If not available, try the secret file
-        if not all([client_id, client_secret, tenant_id]):
-            secret_file = f".env.{app_name}.secret"
-            if os.path.exists(secret_file):
-                with open(secret_file, "r") as f:
-                    env_content = f.read()
-                
-                # Parse environment variables
-                for line in env_content.split('\\n'):
-                    if '=' in line and not line.strip().startswith('#'):
-                        key, value = line.strip().split('=', 1)
-                        if key == "{app_name.upper()}_CLIENT_ID":
-                            client_id = value
-                        elif key == "{app_name.upper()}_CLIENT_SECRET":
-                            client_secret = value
-                        elif key == "TENANT_ID":
-                            tenant_id = value
-        
-        if not all([client_id, client_secret, tenant_id]):
-            log_utils.error("Missing credentials for {app_name} API")
-            raise ValueError(
-                f"Missing credentials for {app_name} API. "
-                "Please ensure environment variables or secret file are properly set."
-            )
-        
-        return client_id, client_secret, tenant_id
-    
-    def get_access_token(self):
-        """Get an access token for the API"""
-        # Check if we have a valid token
-        if self.token and self.token_expiry and self.token_expiry > datetime.now():
-            return self.token
-        
-        # Get a new token
-        scopes = {scopes_json}
-        result = self.app.acquire_token_for_client(scopes=scopes)
-        
-        if "access_token" in result:
-            self.token = result["access_token"]
-            # Set expiry time (token typically valid for 1 hour)
-            self.token_expiry = datetime.now() + timedelta(seconds=result.get("expires_in", 3600))
-            log_utils.debug("Obtained access token for {app_name} API")
-            return self.token
-        else:
-            error = result.get("error", "unknown")
-            error_desc = result.get("error_description", "")
-            log_utils.error("Failed to get access token: {{}} - {{}}", error, error_desc)
-            raise Exception(f"Failed to get access token: {{error}} - {{error_desc}}")
-    
-    def get_headers(self):
-        """Get authorization headers for API requests"""
-        token = self.get_access_token()
-        return {{
-            "Authorization": f"Bearer {{token}}",
-            "Content-Type": "application/json"
-        }}
-    
-    # Add specialized methods for {app_name} operations below
-    # For example:
-    
-    def make_api_request(self, method, endpoint, data=None, params=None):
-        """Make a request to the API"""
-        import requests
-        
-        headers = self.get_headers()
-        url = f"{{GRAPH_API_ENDPOINT}}{{endpoint}}"
-        
-        if method.lower() == 'get':
-            response = requests.get(url, headers=headers, params=params)
-        elif method.lower() == 'post':
-            response = requests.post(url, headers=headers, json=data, params=params)
-        elif method.lower() == 'patch':
-            response = requests.patch(url, headers=headers, json=data)
-        elif method.lower() == 'delete':
-            response = requests.delete(url, headers=headers)
-        else:
-            log_utils.error("Unsupported HTTP method: {{}}", method)
-            raise ValueError(f"Unsupported HTTP method: {{method}}")
-        
-        if response.status_code >= 400:
-            log_utils.error("API request failed: {{}} - {{}}", response.status_code, response.text)
-            raise Exception(f"API request failed: {{response.status_code}} - {{response.text}}")
-        
-        log_utils.debug("{app_name} API request successful: {{}}", endpoint)
-        return response.json() if response.content else None
-
-# Create a client instance
-_client = None
+# graph_runtime version this module was generated for
+RUNTIME_VERSION = {graph_runtime.RUNTIME_VERSION}
+graph_runtime.check_version(RUNTIME_VERSION)
 
 def get_client():
     """Get the {app_name} API client"""
-    global _client
-    if _client is None:
-        _client = {app_name.capitalize()}Client()
-    return _client
+    return graph_runtime.get_client(APP_NAME, SCOPES, SECRET_DIR)
 
 def get_access_token():
     """Get an access token for {app_name} API operations"""
@@ -675,6 +722,8 @@ def get_access_token():
 # Example usage:
 # client = get_client()
 # result = client.make_api_request('get', '/me')
+# for site in client.iter_items('/sites?search=*'):
+#     print(site['webUrl'])
 '''
     #End of of module content        
         with open(module_path, "w") as f:
@@ -682,8 +731,68 @@ def get_access_token():
 
         log_utils.info(Messages.GraphAPI.MODULE_GENERATED, module_path)
         print(f"✅ Generated API module: {module_path}")
+        
+        if async_client:
+            async_module_path = app_module_dir / f"{app_name}_async_api.py"
+            async_module_content = f'''"""
+{app_name.upper()} Async API Module
+Auto-generated async access module for {app_name} operations (requires httpx)
+Generated: {datetime.now().isoformat()}
+"""
+from workflows.common import graph_runtime
+from workflows.common import graph_runtime_async
+
+APP_NAME = "{app_name}"
+SCOPES = {scopes_json}
+# Directory of the .env.{app_name}.secret file (None: environment, then the working directory)
+SECRET_DIR = {secret_dir}
+
+# graph_runtime version this module was generated for
+RUNTIME_VERSION = {graph_runtime.RUNTIME_VERSION}
+graph_runtime.check_version(RUNTIME_VERSION)
+
+def get_client(concurrency=graph_runtime_async.DEFAULT_CONCURRENCY):
+    """Get the async {app_name} API client"""
+    return graph_runtime_async.get_client(APP_NAME, SCOPES, concurrency, SECRET_DIR)
+
+async def get_access_token():
+    """Get an access token for {app_name} API operations"""
+    return await get_client().get_access_token()
+
+# Example usage:
+# import asyncio
+#
+# async def main():
+#     client = get_client()
+#     sites = [site async for site in client.iter_items('/sites?search=*')]
+#     drives = await client.gather_requests(
+#         [('get', f"/sites/{{site['id']}}/drives") for site in sites])
+#
+# asyncio.run(main())
+'''
+            with open(async_module_path, "w") as f:
+                f.write(async_module_content)
+            
+            log_utils.info(Messages.GraphAPI.MODULE_GENERATED, async_module_path)
+            print(f"✅ Generated async API module: {async_module_path}")
 
         # Create a README.md file for the module
+        async_methods = ""
+        if async_client:
+            async_methods = ("- `get_async_client()`: Get the async API client (requires httpx); same methods as "
+                             "above as coroutines/async iterators, plus "
+                             "`await client.gather_requests([(method, endpoint), ...], concurrency=32)`\n")
+        if tenant:
+            configuration = (f"This module belongs to the `{tenant}` tenant profile and reads its credentials from\n"
+                             f"`{self.base_dir.resolve() / f'.env.{app_name}.secret'}`; environment variables are not used.")
+        else:
+            configuration = f"""This module requires the following environment variables:
+
+- `{app_name.upper()}_CLIENT_ID`: The client ID of the app registration
+- `{app_name.upper()}_CLIENT_SECRET`: The client secret of the app registration
+- `TENANT_ID`: The Azure AD tenant ID
+
+Alternatively, you can create a .env.{app_name}.secret file with these variables."""
         # Start of readme_content
         readme_content = f"""# {app_name.capitalize()} API Module
 
@@ -692,7 +801,7 @@ Auto-generated secure access module for {app_name} operations.
 ## Usage
 
 ```python
-from api_modules.{app_name} import get_client
+from api_modules.{module_name} import get_client
 
 # Get a client
 client = get_client()
@@ -706,70 +815,159 @@ response = client.make_api_request('get', '/me')
 - `get_client()`: Get the API client
 - `get_access_token()`: Get an access token for API operations
 - `client.make_api_request(method, endpoint, data=None, params=None)`: Make an API request
+- `client.iter_pages(endpoint, params=None)`: Iterate over every page of a collection
+- `client.iter_items(endpoint, params=None)`: Iterate over every item of a collection, across pages
+{async_methods}
+The client itself is provided by the shared runtime in `workflows/common/graph_runtime.py`
+(pooled connections, cached tokens, throttling retries and paging). This module only holds
+the app name and scopes, so runtime fixes apply without regenerating it.
 
 ## Configuration
 
-This module requires the following environment variables:
-
-- `{app_name.upper()}_CLIENT_ID`: The client ID of the app registration
-- `{app_name.upper()}_CLIENT_SECRET`: The client secret of the app registration
-- `TENANT_ID`: The Azure AD tenant ID
-
-Alternatively, you can create a .env.{app_name}.secret file with these variables."""
+{configuration}"""
         # End of readme_content
         readme_path = app_module_dir / "README.md"
         with open(readme_path, "w") as f: f.write(readme_content)
     
-        log_utils.info("Generated README.md for {}", app_name)
-        print(f"✅ Generated README.md for {app_name}")
+        log_utils.info("Generated README.md for {}", module_name)
+        print(f"✅ Generated README.md for {module_name}")
     
         return True
 
-def rotate_client_secret(self, app_name):
-    """
-    Rotates the client secret for an existing app registration.
+    def rotate_client_secret(self, app_name, save=True):
+        """
+        Rotates the client secret for an existing app registration.
     
-    Args:
-        app_name (str): The name of the app whose secret should be rotated.
+        Args:
+            app_name (str): The name of the app whose secret should be rotated.
+            save (bool): Save the configuration afterwards; bulk rotation
+                saves once after all apps instead.
     
+        Returns:
+            dict: New secret details if successful, else None.
+        """
+        log_utils.info(f"Rotating secret for app: {app_name}")
+
+        # Ensure we have a valid token
+        if not self.token and not self.get_master_token():
+            return None
+
+        # Find the app registration in config
+        app_info = next((app for app in self.config["app_registrations"]
+                         if app["name"] == f"Automation-{app_name}"), None)
+
+        if not app_info:
+            log_utils.error(f"App registration '{app_name}' not found.")
+            print(f"❌ App registration '{app_name}' not found.")
+            return None
+
+        app_object_id = app_info["object_id"]
+
+        # Generate a new client secret
+        new_secret_info = self._create_client_secret(
+            app_object_id, "Rotated-Secret",
+            duration_days=app_info.get("secret_lifetime_days", 365)
+        )
+        if not new_secret_info:
+            log_utils.error(f"Failed to generate new secret for {app_name}.")
+            print(f"❌ Failed to generate new secret for {app_name}.")
+            return None
+
+        # Update stored credentials
+        self._save_app_secrets(app_name, app_info["client_id"], new_secret_info["value"])
+
+        # Update the expiration date in config
+        app_info["secret_expiry"] = new_secret_info["end_date"]
+        if "secret_credentials" in app_info:
+            app_info["secret_credentials"].append({
+                "key_id": new_secret_info["id"],
+                "display_name": "Rotated-Secret",
+                "end_date": new_secret_info["end_date"]
+            })
+        if save:
+            self._save_config()
+
+        log_utils.info(f"✅ Secret rotated for {app_name}. New expiry: {new_secret_info['end_date']}")
+        print(f"✅ Secret rotated for {app_name}. New expiry: {new_secret_info['end_date']}")
+
+        return new_secret_info
+
+
+def run_tenant_command(args, profile):
+    """
+    Run the selected CLI command against one tenant profile.
+
+    Each call builds its own orchestrator from the profile directory, so
+    tenants share no configuration, token or rate limiter.
+
     Returns:
-        dict: New secret details if successful, else None.
+        Dict with "ok" and a one-line "summary" for the combined report
     """
-    log_utils.info(f"Rotating secret for app: {app_name}")
+    orchestrator = GraphAPIOrchestrator(base_dir=profile.directory,
+                                        rate_limit=profile.requests_per_second)
 
-    # Ensure we have a valid token
-    if not self.token and not self.get_master_token():
-        return None
+    if args.plan or args.apply:
+        plan = graphapi_manifest.plan_manifest(orchestrator, args.plan or args.apply)
+        if plan is None:
+            return {"ok": False, "summary": "could not build plan"}
+        actions = {}
+        for change in plan["changes"]:
+            actions[change["action"]] = actions.get(change["action"], 0) + 1
+        summary = ", ".join(f"{count} {action}" for action, count in sorted(actions.items()))
+        if not args.apply:
+            return {"ok": True, "summary": summary or "no apps", "actions": actions}
+        applied, failed = graphapi_manifest.apply_plan(orchestrator, plan, max_workers=args.workers)
+        return {"ok": not failed, "summary": f"{applied} applied, {len(failed)} failed",
+                "applied": applied, "failed": failed}
 
-    # Find the app registration in config
-    app_info = next((app for app in self.config["app_registrations"]
-                     if app["name"] == f"Automation-{app_name}"), None)
+    if args.scan_secrets:
+        index = graphapi_secrets.scan_secret_expiry(orchestrator, args.within_days)
+        if index is None:
+            return {"ok": False, "summary": "scan failed"}
+        due = graphapi_secrets.due_for_rotation(index, args.within_days)
+        return {"ok": True, "summary": f"{len(index)} apps, {len(due)} due within {args.within_days} days",
+                "due": [entry["name"] for entry in due]}
 
-    if not app_info:
-        log_utils.error(f"App registration '{app_name}' not found.")
-        print(f"❌ App registration '{app_name}' not found.")
-        return None
+    if args.rotate_expiring:
+        rotated, failed = graphapi_secrets.rotate_expiring(
+            orchestrator, args.within_days, max_workers=args.workers)
+        return {"ok": not failed, "summary": f"{len(rotated)} rotated, {len(failed)} failed",
+                "rotated": rotated, "failed": failed}
 
-    app_object_id = app_info["object_id"]
+    if args.sync:
+        report = graphapi_sync.sync_config(orchestrator, full=args.full_sync)
+        if report is None:
+            return {"ok": False, "summary": "sync failed"}
+        return {"ok": True, "summary": f"{len(report['added'])} added, {len(report['updated'])} updated, "
+                                       f"{len(report['removed'])} removed", **report}
 
-    # Generate a new client secret
-    new_secret_info = self._create_client_secret(app_object_id, "Rotated-Secret")
-    if not new_secret_info:
-        log_utils.error(f"Failed to generate new secret for {app_name}.")
-        print(f"❌ Failed to generate new secret for {app_name}.")
-        return None
+    if args.refresh_permissions:
+        ok = bool(orchestrator.get_master_token()) and \
+            orchestrator.permission_catalog.load(orchestrator.token, refresh=True)
+        return {"ok": ok, "summary": "catalog refreshed" if ok else "refresh failed"}
 
-    # Update stored credentials
-    self._save_app_secrets(app_name, app_info["client_id"], new_secret_info["value"])
+    if args.create_app:
+        result = orchestrator.create_app_registration(
+            args.create_app,
+            description=args.description,
+            api_permissions=args.permissions
+        )
+        if not result:
+            return {"ok": False, "summary": f"could not create {args.create_app}"}
+        return {"ok": True, "summary": f"created {result['name']} ({result['client_id']})",
+                "client_id": result["client_id"]}
 
-    # Update the expiration date in config
-    app_info["secret_expiry"] = new_secret_info["end_date"]
-    self._save_config()
+    if args.rotate_secret:
+        result = orchestrator.rotate_client_secret(args.rotate_secret)
+        if not result:
+            return {"ok": False, "summary": f"could not rotate {args.rotate_secret}"}
+        return {"ok": True, "summary": f"rotated, expires {result['end_date']}"}
 
-    log_utils.info(f"✅ Secret rotated for {app_name}. New expiry: {new_secret_info['end_date']}")
-    print(f"✅ Secret rotated for {app_name}. New expiry: {new_secret_info['end_date']}")
+    if args.list_apps:
+        names = [app["name"] for app in orchestrator.config["app_registrations"]]
+        return {"ok": True, "summary": f"{len(names)} apps", "apps": names}
 
-    return new_secret_info
+    return {"ok": False, "summary": "command does not support tenants"}
 
 
 # Main function to handle CLI arguments    
@@ -782,17 +980,120 @@ def main():
     parser.add_argument("--description", help="Description for the app registration")
     parser.add_argument("--permissions", nargs="+", help="Required API permissions")
     parser.add_argument("--generate-module", help="Generate a Python module for an app")
+    parser.add_argument("--async", dest="async_client", action="store_true",
+                        help="With --generate-module, also generate an async client (requires httpx)")
     parser.add_argument("--list-apps", action="store_true", help="List registered applications")
     parser.add_argument("--rotate-secret", help="Rotate the client secret for an app")
+    parser.add_argument("--plan", metavar="MANIFEST",
+                        help="Show the changes needed to match an app manifest (YAML or JSON)")
+    parser.add_argument("--apply", metavar="MANIFEST",
+                        help="Create, update and grant the apps in a manifest")
+    parser.add_argument("--workers", type=int, default=graphapi_manifest.DEFAULT_MAX_WORKERS,
+                        help="Maximum apps processed in parallel with --apply/--rotate-expiring")
+    parser.add_argument("--scan-secrets", action="store_true",
+                        help="Report client secret expiry for all app registrations")
+    parser.add_argument("--rotate-expiring", action="store_true",
+                        help="Rotate every client secret expiring within --within-days")
+    parser.add_argument("--within-days", type=int, default=graphapi_secrets.DEFAULT_WINDOW_DAYS,
+                        help="Rotation window in days for --scan-secrets/--rotate-expiring")
+    parser.add_argument("--sync", action="store_true",
+                        help="Update the configuration with changes made in the tenant (delta query)")
+    parser.add_argument("--full-sync", action="store_true",
+                        help="With --sync, ignore the stored delta links and re-read every app")
+    parser.add_argument("--refresh-permissions", action="store_true",
+                        help="Refetch the cached Microsoft Graph permission catalog")
+    parser.add_argument("--tenant", action="append", metavar="NAME",
+                        help="Run against a tenant profile from the tenants file (repeatable)")
+    parser.add_argument("--all-tenants", action="store_true",
+                        help="Run against every tenant profile in the tenants file")
+    parser.add_argument("--tenants-file", default=graphapi_tenants.DEFAULT_TENANTS_FILE,
+                        help="Tenant profiles file (YAML or JSON)")
+    parser.add_argument("--tenant-workers", type=int,
+                        help="Maximum tenants processed in parallel (default: all)")
+    parser.add_argument("--report", metavar="FILE",
+                        help="With --tenant/--all-tenants, save the combined report as JSON")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Write a Chrome trace-event timeline of all Graph requests to FILE")
     
     args = parser.parse_args()
     
+    if args.trace:
+        graph_trace.enable(args.trace)
+    
+    if args.tenant or args.all_tenants:
+        profiles = graphapi_tenants.select_profiles(
+            graphapi_tenants.load_profiles(args.tenants_file), args.tenant)
+        
+        if args.setup or args.generate_module:
+            # Interactive or local commands run for one tenant at a time
+            if len(profiles) != 1:
+                parser.error("--setup and --generate-module take a single --tenant")
+            orchestrator = GraphAPIOrchestrator(base_dir=profiles[0].directory,
+                                                rate_limit=profiles[0].requests_per_second)
+            if args.setup:
+                orchestrator.setup_master_app()
+            else:
+                orchestrator.generate_api_module(args.generate_module, async_client=args.async_client,
+                                                 tenant=profiles[0].name)
+            return
+        
+        command = next((flag for flag in ("plan", "apply", "scan_secrets", "rotate_expiring", "sync",
+                                          "refresh_permissions", "create_app", "rotate_secret", "list_apps")
+                        if getattr(args, flag)), None)
+        if command is None:
+            parser.print_help()
+            return
+        
+        report = graphapi_tenants.run_for_tenants(
+            profiles, lambda profile: run_tenant_command(args, profile),
+            command.replace("_", "-"), max_workers=args.tenant_workers)
+        graphapi_tenants.print_combined_report(report)
+        if args.report:
+            graphapi_tenants.save_combined_report(report, args.report)
+        return
+    
     orchestrator = GraphAPIOrchestrator()
     
     if args.setup:
         orchestrator.setup_master_app()
     
+    elif args.plan or args.apply:
+        plan = graphapi_manifest.plan_manifest(orchestrator, args.plan or args.apply)
+        if plan is None:
+            return
+        graphapi_manifest.print_plan(plan)
+        if args.apply:
+            applied, failed = graphapi_manifest.apply_plan(orchestrator, plan, max_workers=args.workers)
+            print(f"\n✅ Applied {applied} app changes")
+            for name in failed:
+                print(f"❌ Failed: {name}")
+    
+    elif args.scan_secrets:
+        index = graphapi_secrets.scan_secret_expiry(orchestrator, args.within_days)
+        if index is not None:
+            graphapi_secrets.print_expiry_report(index, args.within_days)
+    
+    elif args.rotate_expiring:
+        rotated, failed = graphapi_secrets.rotate_expiring(
+            orchestrator, args.within_days, max_workers=args.workers)
+        print(f"\n✅ Rotated {len(rotated)} secrets")
+        for name in failed:
+            print(f"❌ Failed: {name}")
+    
+    elif args.sync:
+        report = graphapi_sync.sync_config(orchestrator, full=args.full_sync)
+        if report is not None:
+            print(f"\n✅ Sync complete: {len(report['added'])} added, "
+                  f"{len(report['updated'])} updated, {len(report['removed'])} removed")
+            for key, symbol in (("added", "+"), ("updated", "~"), ("removed", "-")):
+                for name in report[key]:
+                    print(f"  {symbol} {name}")
+    
+    elif args.refresh_permissions:
+        if orchestrator.get_master_token():
+            orchestrator.permission_catalog.load(orchestrator.token, refresh=True)
+    
     elif args.create_app:
         orchestrator.get_master_token()
         orchestrator.create_app_registration(
@@ -802,7 +1103,7 @@ def main():
         )
     
     elif args.generate_module:
-        orchestrator.generate_api_module(args.generate_module)
+        orchestrator.generate_api_module(args.generate_module, async_client=args.async_client)
         
     elif args.list_apps:
         print("\n===== Registered Applications =====")
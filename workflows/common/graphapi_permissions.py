@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# file: workflows/common/graphapi_permissions.py
+"""
+Cached Microsoft Graph permission catalog.
+
+The Microsoft Graph service principal publishes every application
+permission (appRoles) and delegated permission (oauth2PermissionScopes).
+The catalog is fetched once, indexed by permission value and cached on
+disk, so resolving the permissions of any number of app registrations
+costs no extra Graph calls until the cache expires.
+"""
+
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from workflows.common import log_utils
+from workflows.common import graph_http
+
+# Microsoft Graph resource application
+GRAPH_RESOURCE_APP_ID = "00000003-0000-0000-c000-000000000000"
+
+# Bump when the cache file layout changes; older caches are refetched
+CATALOG_VERSION = 1
+
+DEFAULT_CATALOG_PATH = Path("./.cache/graph_permission_catalog.json")
+DEFAULT_MAX_AGE_DAYS = 7
+
+
+class PermissionCatalog:
+    """
+    Microsoft Graph appRoles and oauth2PermissionScopes indexed by value.
+
+    Args:
+        path: Cache file location
+        max_age_days: Refetch the catalog when the cache is older than this
+        http: graph_http client to send requests with (default: graph_http)
+    """
+
+    def __init__(self, path=DEFAULT_CATALOG_PATH, max_age_days=DEFAULT_MAX_AGE_DAYS, http=None):
+        self.path = Path(path)
+        self.http = http or graph_http
+        self.max_age = timedelta(days=max_age_days)
+        self.service_principal_id = None
+        self.fetched = None
+        self.app_roles = {}
+        self.scopes = {}
+
+    @property
+    def loaded(self):
+        """Whether the catalog has been loaded."""
+        return self.fetched is not None
+
+    def load(self, token, refresh=False):
+        """
+        Load the catalog from the cache, fetching it from Graph when missing,
+        stale, from an older cache version, or when refresh is requested.
+
+        Returns:
+            True if the catalog is available
+        """
+        if not refresh and self._load_cache():
+            return True
+        return self.fetch(token)
+
+    def _load_cache(self):
+        """Load a current cache file, if there is one."""
+        if not self.path.exists():
+            return False
+
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            log_utils.warning("Ignoring unreadable permission catalog {}: {}", self.path, e)
+            return False
+
+        if data.get("version") != CATALOG_VERSION:
+            return False
+        fetched = datetime.fromisoformat(data["fetched"])
+        if datetime.now() - fetched > self.max_age:
+            return False
+
+        self.service_principal_id = data["service_principal_id"]
+        self.fetched = fetched
+        self.app_roles = data["app_roles"]
+        self.scopes = data["oauth2_permission_scopes"]
+        log_utils.debug("Loaded permission catalog from {}", self.path)
+        return True
+
+    def fetch(self, token):
+        """Fetch the catalog from the Microsoft Graph service principal and cache it."""
+        response = self.http.get(
+            "https://graph.microsoft.com/v1.0/servicePrincipals"
+            f"?$filter=appId eq '{GRAPH_RESOURCE_APP_ID}'"
+            "&$select=id,appId,appRoles,oauth2PermissionScopes",
+            headers=graph_http.auth_headers(token)
+        )
+
+        if response.status_code != 200 or not response.json().get("value"):
+            log_utils.error("Failed to get service principal: {}", response.status_code)
+            print(f"❌ Failed to get service principal: {response.status_code}")
+            return False
+
+        graph_service_principal = response.json()["value"][0]
+        self.service_principal_id = graph_service_principal["id"]
+        self.fetched = datetime.now()
+        self.app_roles = {
+            role["value"]: {"id": role["id"], "displayName": role.get("displayName")}
+            for role in graph_service_principal.get("appRoles", [])
+        }
+        self.scopes = {
+            scope["value"]: {"id": scope["id"], "displayName": scope.get("adminConsentDisplayName")}
+            for scope in graph_service_principal.get("oauth2PermissionScopes", [])
+        }
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump({
+                "version": CATALOG_VERSION,
+                "fetched": self.fetched.isoformat(),
+                "resource_app_id": GRAPH_RESOURCE_APP_ID,
+                "service_principal_id": self.service_principal_id,
+                "app_roles": self.app_roles,
+                "oauth2_permission_scopes": self.scopes
+            }, f, indent=2)
+
+        log_utils.info("Cached {} app roles and {} delegated scopes in {}",
+                       len(self.app_roles), len(self.scopes), self.path)
+        return True
+
+    def resolve(self, permission):
+        """
+        Resolve a permission value to a resourceAccess entry.
+
+        Application permissions (appRoles) take precedence over delegated
+        scopes with the same value.
+
+        Returns:
+            Dict with id and type ("Role" or "Scope"), or None if unknown
+        """
+        if permission in self.app_roles:
+            return {"id": self.app_roles[permission]["id"], "type": "Role"}
+        if permission in self.scopes:
+            return {"id": self.scopes[permission]["id"], "type": "Scope"}
+        return None
+
+    def permission_names(self, required_resource_access):
+        """
+        Map an app's requiredResourceAccess back to Graph permission values.
+
+        Returns:
+            Sorted list of permission values (ids missing from the catalog are
+            returned as-is)
+        """
+        by_id = {("Role", entry["id"]): value for value, entry in self.app_roles.items()}
+        by_id.update({("Scope", entry["id"]): value for value, entry in self.scopes.items()})
+
+        names = []
+        for resource in required_resource_access or []:
+            if resource.get("resourceAppId") != GRAPH_RESOURCE_APP_ID:
+                continue
+            for access in resource.get("resourceAccess", []):
+                names.append(by_id.get((access["type"], access["id"]), access["id"]))
+        return sorted(set(names))
+
+    def required_resource_access(self, permissions, current=None):
+        """
+        Build the requiredResourceAccess for a set of Graph permissions.
+
+        requiredResourceAccess is replaced as a whole, so the entries of
+        other APIs (SharePoint, ...) in the app's current list are kept.
+
+        Args:
+            permissions: Graph permission values
+            current: The app's current requiredResourceAccess (optional)
+
+        Returns:
+            Tuple of (requiredResourceAccess list, unknown permission values)
+        """
+        resource_access = []
+        unknown = []
+        for permission in permissions:
+            entry = self.resolve(permission)
+            if entry is None:
+                unknown.append(permission)
+            elif entry not in resource_access:
+                resource_access.append(entry)
+
+        required = other_resource_access(current)
+        if resource_access:
+            required.append({
+                "resourceAppId": GRAPH_RESOURCE_APP_ID,
+                "resourceAccess": resource_access
+            })
+        return required, unknown
+
+
+def other_resource_access(required_resource_access):
+    """The entries of a requiredResourceAccess list that are not for Microsoft Graph."""
+    return [resource for resource in required_resource_access or []
+            if resource.get("resourceAppId") != GRAPH_RESOURCE_APP_ID]
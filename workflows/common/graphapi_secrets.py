@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# file: workflows/common/graphapi_secrets.py
+"""
+Client secret expiry scan and bulk rotation for the GraphAPI orchestrator.
+
+The passwordCredentials of every Automation-* app registration are read in
+one paged listing of /applications rather than one request per app. The
+result is kept as an expiry index in GraphAPI_config.json (secret_expiry
+and secret_credentials per app, plus the scan time). Every app whose
+newest secret expires inside the rotation window is then rotated in
+parallel and the configuration is saved once.
+
+Rotation adds a new secret and leaves the previous one valid until it
+expires, so running jobs are not cut off mid-run.
+"""
+
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from workflows.common import log_utils
+from workflows.common import graph_http
+from workflows.common.graphapi_manifest import APP_PREFIX
+from workflows.common.log_utils import Messages
+
+DEFAULT_WINDOW_DAYS = 30
+DEFAULT_MAX_WORKERS = 8
+
+
+class SecretMessages:
+    """Secret expiry and rotation messages."""
+    SCAN_START = "Scanning client secrets of automation app registrations"
+    SCAN_SUMMARY = "Scanned {} apps: {} expiring within {} days, {} expired, {} without secrets"
+    APP_MISSING = "App registration {} is in the configuration but not in the tenant"
+    REPORT_HEADER = "\n===== Client Secret Expiry (window: {} days) ====="
+    REPORT_ITEM = "  {} {:<40} {:>6} days  {}"
+    ROTATE_START = "Rotating {} secrets with {} workers"
+    ROTATE_NONE = "No secrets expire within {} days"
+    ROTATE_FAILED = "Failed to rotate secret for {}"
+    ROTATE_SUMMARY = "Rotated {} of {} secrets"
+
+# Register message class
+if not hasattr(Messages, 'Secrets'):
+    setattr(Messages, 'Secrets', SecretMessages)
+
+
+def _parse_graph_datetime(value):
+    """Parse a Graph (or config) ISO 8601 timestamp as UTC."""
+    if not value:
+        return None
+    return datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+
+
+def summarize_credentials(password_credentials):
+    """
+    Convert an app's passwordCredentials to the expiry index format.
+
+    Returns:
+        Tuple of (credentials sorted by end date, expiry of the newest secret or None)
+    """
+    credentials = sorted(
+        ({"key_id": credential["keyId"],
+          "display_name": credential.get("displayName"),
+          "end_date": credential["endDateTime"]}
+         for credential in password_credentials or []),
+        key=lambda credential: credential["end_date"]
+    )
+    if not credentials:
+        return credentials, None
+    # The .env file holds the newest secret, so the app expires with it
+    newest = _parse_graph_datetime(credentials[-1]["end_date"])
+    return credentials, newest.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def scan_secret_expiry(orchestrator, window_days=DEFAULT_WINDOW_DAYS):
+    """
+    Read every automation app's secrets and update the expiry index in the configuration.
+
+    Returns:
+        List of index entries sorted by days left (apps without secrets first),
+        or None if the master token is unavailable
+    """
+    if not orchestrator.token and not orchestrator.get_master_token():
+        return None
+
+    log_utils.info(Messages.Secrets.SCAN_START)
+    now = datetime.now(timezone.utc)
+
+    tenant_apps = {
+        app["id"]: app
+        for app in orchestrator.http.iter_values(
+            "https://graph.microsoft.com/v1.0/applications"
+            f"?$filter=startswith(displayName,'{APP_PREFIX}')"
+            "&$select=id,appId,displayName,passwordCredentials&$top=999",
+            headers=graph_http.auth_headers(orchestrator.token))
+    }
+
+    index = []
+    for app_info in orchestrator.config["app_registrations"]:
+        tenant_app = tenant_apps.get(app_info["object_id"])
+        if tenant_app is None:
+            log_utils.warning(Messages.Secrets.APP_MISSING, app_info["name"])
+            continue
+
+        credentials, secret_expiry = summarize_credentials(tenant_app.get("passwordCredentials", []))
+        newest = _parse_graph_datetime(secret_expiry)
+
+        app_info["secret_credentials"] = credentials
+        app_info["secret_expiry"] = secret_expiry
+
+        index.append({
+            "name": app_info["name"],
+            "secret_expiry": app_info["secret_expiry"],
+            "days_left": (newest - now).days if newest else None,
+            "credentials": len(credentials)
+        })
+
+    orchestrator.config["secret_scan"] = now.strftime("%Y-%m-%dT%H:%M:%SZ")
+    orchestrator._save_config()
+
+    index.sort(key=lambda entry: (entry["days_left"] is not None, entry["days_left"] or 0))
+    expiring = sum(1 for entry in index if entry["days_left"] is not None and 0 <= entry["days_left"] <= window_days)
+    expired = sum(1 for entry in index if entry["days_left"] is not None and entry["days_left"] < 0)
+    missing = sum(1 for entry in index if entry["days_left"] is None)
+    log_utils.info(Messages.Secrets.SCAN_SUMMARY, len(index), expiring, window_days, expired, missing)
+    return index
+
+
+def due_for_rotation(index, window_days=DEFAULT_WINDOW_DAYS):
+    """Select the index entries whose newest secret expires inside the window (or is missing)."""
+    return [entry for entry in index if entry["days_left"] is None or entry["days_left"] <= window_days]
+
+
+def print_expiry_report(index, window_days=DEFAULT_WINDOW_DAYS):
+    """Print the expiry index, flagging secrets inside the rotation window."""
+    print(Messages.Secrets.REPORT_HEADER.format(window_days))
+    for entry in index:
+        days_left = entry["days_left"]
+        if days_left is None or days_left < 0:
+            marker = "❌"
+        elif days_left <= window_days:
+            marker = "⚠️"
+        else:
+            marker = "✅"
+        print(Messages.Secrets.REPORT_ITEM.format(
+            marker, entry["name"], "-" if days_left is None else days_left,
+            entry["secret_expiry"] or "no secrets"))
+
+
+def rotate_expiring(orchestrator, window_days=DEFAULT_WINDOW_DAYS, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Scan secrets and rotate every app inside the window in parallel.
+
+    Each app's new secret is written atomically to its .env.<app>.secret
+    file by the worker; the configuration is saved once at the end.
+
+    Returns:
+        Tuple of (rotated app names, failed app names)
+    """
+    index = scan_secret_expiry(orchestrator, window_days)
+    if index is None:
+        return [], []
+    due = due_for_rotation(index, window_days)
+    if not due:
+        log_utils.info(Messages.Secrets.ROTATE_NONE, window_days)
+        return [], []
+
+    log_utils.info(Messages.Secrets.ROTATE_START, len(due), max_workers)
+
+    rotated, failed = [], []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(orchestrator.rotate_client_secret, entry["name"][len(APP_PREFIX):], False): entry["name"]
+            for entry in due
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                log_utils.error("Error rotating {}: {}", name, e)
+                result = None
+            if result is None:
+                log_utils.error(Messages.Secrets.ROTATE_FAILED, name)
+                failed.append(name)
+            else:
+                rotated.append(name)
+
+    if rotated:
+        orchestrator._save_config()
+
+    log_utils.info(Messages.Secrets.ROTATE_SUMMARY, len(rotated), len(due))
+    return sorted(rotated), sorted(failed)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# file: workflows/common/graphapi_sync.py
+"""
+Incremental reconciliation of GraphAPI_config.json with the tenant.
+
+Uses Graph delta queries on /applications and /servicePrincipals. The first
+sync pages through every object once; the @odata.deltaLink returned at the
+end is stored in the configuration, and later syncs transfer only objects
+that changed since then. Delta queries cannot filter on displayName, so
+the Automation- prefix is applied locally.
+
+Apps edited in the portal get their name, description, permissions and
+secret end dates refreshed. Apps deleted (or renamed away from the prefix)
+are removed from the configuration, and Automation- apps created outside
+the orchestrator are added.
+"""
+
+from datetime import datetime
+
+from workflows.common import log_utils
+from workflows.common import graph_http
+from workflows.common.graphapi_manifest import APP_PREFIX
+from workflows.common.graphapi_secrets import summarize_credentials
+from workflows.common.log_utils import Messages
+
+APPLICATION_DELTA_URL = (
+    "https://graph.microsoft.com/v1.0/applications/delta"
+    "?$select=id,appId,displayName,notes,createdDateTime,requiredResourceAccess,passwordCredentials"
+)
+SERVICE_PRINCIPAL_DELTA_URL = (
+    "https://graph.microsoft.com/v1.0/servicePrincipals/delta"
+    "?$select=id,appId,displayName,accountEnabled"
+)
+
+
+class SyncMessages:
+    """Tenant sync related messages."""
+    SYNC_FULL = "Full sync of {} (no stored delta link)"
+    SYNC_INCREMENTAL = "Incremental sync of {}"
+    SYNC_EXPIRED = "Delta link for {} expired, running a full sync"
+    SYNC_CHANGES = "Received {} changed {} ({} pages)"
+    APP_ADDED = "Added {} from the tenant"
+    APP_UPDATED = "Updated {}: {}"
+    APP_REMOVED = "Removed {} (deleted or renamed in the tenant)"
+    SYNC_SUMMARY = "Sync complete: {} added, {} updated, {} removed"
+
+# Register message class
+if not hasattr(Messages, 'Sync'):
+    setattr(Messages, 'Sync', SyncMessages)
+
+
+class DeltaExpired(Exception):
+    """Raised when Graph no longer accepts a stored delta link."""
+
+
+def read_delta(url, headers, http=graph_http):
+    """
+    Page through a delta query.
+
+    Returns:
+        Tuple of (changed objects, new delta link, number of pages)
+
+    Raises:
+        DeltaExpired: If the delta link is no longer valid (410 Gone)
+        RuntimeError: On any other failure
+    """
+    changes = []
+    pages = 0
+    while True:
+        response = http.get(url, headers=headers)
+        if response.status_code == 410:
+            raise DeltaExpired(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"Delta query failed with status {response.status_code}: {url}")
+
+        data = response.json()
+        pages += 1
+        changes.extend(data.get("value", []))
+        if "@odata.nextLink" in data:
+            url = data["@odata.nextLink"]
+        else:
+            return changes, data.get("@odata.deltaLink"), pages
+
+
+def _sync_collection(name, initial_url, state, headers, http, full=False):
+    """
+    Run the delta query for one collection, falling back to a full sync.
+
+    Returns:
+        Tuple of (changed objects, whether this was a full sync)
+    """
+    delta_link = None if full else state.get(name)
+    if delta_link:
+        log_utils.info(Messages.Sync.SYNC_INCREMENTAL, name)
+        try:
+            changes, state[name], pages = read_delta(delta_link, headers, http)
+            log_utils.info(Messages.Sync.SYNC_CHANGES, len(changes), name, pages)
+            return changes, False
+        except DeltaExpired:
+            log_utils.warning(Messages.Sync.SYNC_EXPIRED, name)
+    else:
+        log_utils.info(Messages.Sync.SYNC_FULL, name)
+
+    changes, state[name], pages = read_delta(initial_url, headers, http)
+    log_utils.info(Messages.Sync.SYNC_CHANGES, len(changes), name, pages)
+    return changes, True
+
+
+def _apply_application(app_info, item, catalog):
+    """
+    Update a config entry from a (possibly partial) delta object.
+
+    Returns:
+        List of changed config fields
+    """
+    updates = {}
+    if "displayName" in item:
+        updates["name"] = item["displayName"]
+    if "appId" in item:
+        updates["client_id"] = item["appId"]
+    if "notes" in item:
+        updates["description"] = item["notes"]
+    if "requiredResourceAccess" in item:
+        updates["permissions"] = catalog.permission_names(item["requiredResourceAccess"])
+    if "passwordCredentials" in item:
+        updates["secret_credentials"], updates["secret_expiry"] = \
+            summarize_credentials(item["passwordCredentials"])
+
+    changed = [key for key, value in updates.items() if app_info.get(key) != value]
+    app_info.update(updates)
+    return changed
+
+
+def sync_config(orchestrator, full=False):
+    """
+    Reconcile the orchestrator configuration with the tenant.
+
+    Args:
+        orchestrator: GraphAPIOrchestrator with its configuration loaded
+        full: Ignore stored delta links and page through everything
+
+    Returns:
+        Dict with added, updated and removed app names, or None if the
+        master token or permission catalog is unavailable
+    """
+    if not orchestrator.token and not orchestrator.get_master_token():
+        return None
+    catalog = orchestrator.permission_catalog
+    if not catalog.loaded and not catalog.load(orchestrator.token):
+        return None
+
+    headers = graph_http.auth_headers(orchestrator.token)
+    state = orchestrator.config.setdefault("delta_sync", {})
+    registrations = orchestrator.config["app_registrations"]
+    by_object_id = {app["object_id"]: app for app in registrations if app.get("object_id")}
+    report = {"added": [], "updated": [], "removed": []}
+
+    applications, full_applications = _sync_collection(
+        "applications", APPLICATION_DELTA_URL, state, headers, orchestrator.http, full)
+
+    removed_ids = set()
+    seen_ids = set()
+    for item in applications:
+        object_id = item["id"]
+        app_info = by_object_id.get(object_id)
+
+        if "@removed" in item:
+            if app_info is not None:
+                removed_ids.add(object_id)
+            continue
+
+        name = item.get("displayName") or (app_info or {}).get("name", "")
+        if not name.startswith(APP_PREFIX):
+            # Renamed away from the automation prefix
+            if app_info is not None:
+                removed_ids.add(object_id)
+            continue
+
+        seen_ids.add(object_id)
+        if app_info is None and "appId" not in item:
+            # Partial delta object (e.g. renamed into the prefix); read it in full
+            response = orchestrator.http.get(
+                f"https://graph.microsoft.com/v1.0/applications/{object_id}"
+                f"?{APPLICATION_DELTA_URL.split('?', 1)[1]}",
+                headers=headers
+            )
+            if response.status_code == 200:
+                item = response.json()
+
+        if app_info is None:
+            app_info = {
+                "name": name,
+                "object_id": object_id,
+                "creation_date": item.get("createdDateTime") or datetime.now().isoformat()
+            }
+            _apply_application(app_info, item, catalog)
+            registrations.append(app_info)
+            by_object_id[object_id] = app_info
+            report["added"].append(name)
+            log_utils.info(Messages.Sync.APP_ADDED, name)
+        else:
+            changed = _apply_application(app_info, item, catalog)
+            if changed:
+                report["updated"].append(app_info["name"])
+                log_utils.info(Messages.Sync.APP_UPDATED, app_info["name"], ", ".join(changed))
+
+    # A full sync lists every app, so anything it did not return is gone
+    if full_applications:
+        removed_ids.update(object_id for object_id in by_object_id if object_id not in seen_ids)
+
+    for object_id in sorted(removed_ids):
+        app_info = by_object_id.pop(object_id)
+        registrations.remove(app_info)
+        report["removed"].append(app_info["name"])
+        log_utils.info(Messages.Sync.APP_REMOVED, app_info["name"])
+
+    service_principals, full_service_principals = _sync_collection(
+        "servicePrincipals", SERVICE_PRINCIPAL_DELTA_URL, state, headers, orchestrator.http, full)
+
+    by_client_id = {app.get("client_id"): app for app in registrations}
+    sp_seen = set()
+    for item in service_principals:
+        if "@removed" in item:
+            for app_info in registrations:
+                if app_info.get("service_principal_id") == item["id"]:
+                    app_info.pop("service_principal_id", None)
+                    app_info.pop("service_principal_enabled", None)
+            continue
+        app_info = by_client_id.get(item.get("appId"))
+        if app_info is None:
+            continue
+        sp_seen.add(app_info["name"])
+        app_info["service_principal_id"] = item["id"]
+        if "accountEnabled" in item:
+            app_info["service_principal_enabled"] = item["accountEnabled"]
+
+    if full_service_principals:
+        for app_info in registrations:
+            if app_info["name"] not in sp_seen:
+                app_info.pop("service_principal_id", None)
+                app_info.pop("service_principal_enabled", None)
+
+    state["last_sync"] = datetime.now().isoformat()
+    orchestrator._save_config()
+
+    log_utils.info(Messages.Sync.SYNC_SUMMARY,
+                   len(report["added"]), len(report["updated"]), len(report["removed"]))
+    return report
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# file: workflows/common/graphapi_tenants.py
+"""
+Tenant profiles for running the GraphAPI orchestrator against several tenants.
+
+Profiles are listed in a tenants file (YAML or JSON):
+
+    tenants:
+      prod:
+        directory: tenants/prod
+        requests_per_second: 10
+      test1: {}
+      test2:
+        requests_per_second: 5
+
+Each tenant is isolated in its own directory (default: tenants/<name>)
+holding its .env.master, GraphAPI_config.json, .env.<app>.secret files and
+permission catalog cache. Each orchestrator instance keeps its own token
+cache and, when requests_per_second is set, its own rate limiter, so one
+tenant's throttling never slows down another. Commands run for every
+selected tenant in parallel and the outcomes are collected into a combined
+report.
+"""
+
+import os
+import json
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from workflows.common import log_utils
+from workflows.common.log_utils import Messages
+
+DEFAULT_TENANTS_FILE = "tenants.yaml"
+DEFAULT_TENANTS_DIR = "tenants"
+
+
+class TenantMessages:
+    """Multi-tenant orchestration messages."""
+    PROFILES_LOADED = "Loaded {} tenant profiles from {}"
+    PROFILE_UNKNOWN = "Unknown tenant profile: {} (available: {})"
+    RUN_START = "Running {} for {} tenants"
+    TENANT_FAILED = "Tenant {} failed: {}"
+    REPORT_HEADER = "\n===== {}: {} tenants ====="
+    REPORT_ITEM = "  {} {:<20} {}"
+    REPORT_SAVED = "Saved combined report to {}"
+
+# Register message class
+if not hasattr(Messages, 'Tenants'):
+    setattr(Messages, 'Tenants', TenantMessages)
+
+
+class TenantProfile:
+    """
+    One tenant's isolated orchestrator settings.
+
+    Args:
+        name: Profile name
+        directory: Directory for the tenant's configuration, secrets and caches
+        requests_per_second: Graph request rate limit for the tenant (optional)
+    """
+
+    def __init__(self, name, directory=None, requests_per_second=None):
+        self.name = name
+        self.directory = Path(directory or os.path.join(DEFAULT_TENANTS_DIR, name))
+        self.requests_per_second = requests_per_second
+
+
+def load_profiles(path=DEFAULT_TENANTS_FILE):
+    """
+    Load tenant profiles from a tenants file.
+
+    Returns:
+        Dict of profile name to TenantProfile
+    """
+    with open(path, "r") as f:
+        if str(path).endswith(('.yml', '.yaml')):
+            import yaml
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    profiles = {}
+    for name, settings in (data.get("tenants") or {}).items():
+        settings = settings or {}
+        profiles[name] = TenantProfile(
+            name,
+            directory=settings.get("directory"),
+            requests_per_second=settings.get("requests_per_second")
+        )
+
+    log_utils.info(Messages.Tenants.PROFILES_LOADED, len(profiles), path)
+    return profiles
+
+
+def select_profiles(profiles, names=None):
+    """
+    Pick the profiles to run (all of them when no names are given).
+
+    Raises:
+        ValueError: If a requested profile does not exist
+    """
+    if not names:
+        return list(profiles.values())
+
+    selected = []
+    for name in names:
+        if name not in profiles:
+            log_utils.error(Messages.Tenants.PROFILE_UNKNOWN, name, ", ".join(sorted(profiles)))
+            raise ValueError(f"Unknown tenant profile: {name}")
+        selected.append(profiles[name])
+    return selected
+
+
+def run_for_tenants(profiles, command, description, max_workers=None):
+    """
+    Run a command for several tenants in parallel.
+
+    Args:
+        profiles: TenantProfiles to run for
+        command: Callable taking a TenantProfile and returning a result dict
+                 with "ok" (bool) and "summary" (str)
+        description: Command name for logs and the report
+        max_workers: Tenants processed at once (default: all)
+
+    Returns:
+        Combined report dict
+    """
+    log_utils.info(Messages.Tenants.RUN_START, description, len(profiles))
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers or max(1, len(profiles))) as executor:
+        futures = {executor.submit(command, profile): profile for profile in profiles}
+        for future in as_completed(futures):
+            profile = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                log_utils.error(Messages.Tenants.TENANT_FAILED, profile.name, e)
+                result = {"ok": False, "summary": f"error: {e}"}
+            results[profile.name] = result
+
+    return {
+        "command": description,
+        "generated": datetime.now().isoformat(),
+        "tenants": {name: results[name] for name in sorted(results)}
+    }
+
+
+def print_combined_report(report):
+    """Print one line per tenant."""
+    print(Messages.Tenants.REPORT_HEADER.format(report["command"], len(report["tenants"])))
+    for name, result in report["tenants"].items():
+        print(Messages.Tenants.REPORT_ITEM.format("✅" if result["ok"] else "❌", name, result["summary"]))
+
+
+def save_combined_report(report, path):
+    """Save the combined report as JSON."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)) or '.', exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    log_utils.info(Messages.Tenants.REPORT_SAVED, path)
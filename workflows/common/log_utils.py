@@ -153,11 +153,38 @@ class Messages:
         LIST_NAME = "List/Library: {}"
         COMPREHENSIVE_MODE = "Mode: Comprehensive Site Extraction"
         SUCCESS = "Operation completed successfully!"
+        SITE_REQUIRED = "Error: --site is required (or --sites-file for multi-site extraction)"
         ARG_ERROR = "Either specify a list/library with --list/--library, use --list-libraries to see available libraries, or use --comprehensive for site-wide extraction"
         SCHEMA_REQUIRED = "Error: --schema is required when using --analyze"
         LIST_REQUIRED = "Error: --list or --library parameter is required for metadata extraction"
         LIST_HINT = "Use --list-libraries to see available document libraries"
         COMPREHENSIVE_HINT = "Use --comprehensive for site-wide extraction"
+        INVENTORY_REQUIRED = "Error: --offline requires --inventory"
+        INVENTORY_LIST_MISSING = "List '{}' of {} not found in inventory {}"
+
+    class Checkpoint:
+        """Checkpoint and resume messages."""
+        STARTED = "Checkpointing progress to {}"
+        RESUMED = "Resuming from checkpoint {}: {} sites done, {} lists done"
+        MISMATCH = "Checkpoint {} belongs to a different run ({}); remove it or run without --resume"
+        EXISTS = "Checkpoint {} is from an interrupted run; continue it with --resume or discard it with --restart"
+        TRUNCATED = "Ignoring incomplete record at end of checkpoint {}"
+        SITE_SKIPPED = "Skipping site already extracted: {}"
+        LIST_SKIPPED = "Skipping list already extracted: {}"
+        COMPLETED = "Run complete, removed checkpoint {}"
+        INTERRUPTED = "Run interrupted, continue it with --resume (checkpoint: {})"
+
+    class Http:
+        """Graph HTTP layer messages."""
+        RETRYING = "{} request throttled (status {}), retrying in {}s"
+
+    class Trace:
+        """Graph request tracing messages."""
+        TRACE_ENABLED = "Tracing Graph requests to {}"
+        TRACE_SAVED = "Saved trace of {} Graph requests to {}"
+        TRACE_ERROR = "Error writing trace file: {}"
+        SLOWEST_HEADER = "Slowest endpoints (by total time):"
+        SLOWEST_ITEM = "  • {} - {} calls, {} ms total, {} ms avg, {} ms max, {} bytes, {} retries"
 
 # Get the default logger
 def get_logger():
@@ -0,0 +1,603 @@
+#!/usr/bin/env python3
+# file: workflows/common/purview_file_plan.py
+"""
+Purview File Plan Import - Create and update retention labels from a
+file-plan spreadsheet (CSV or XLSX, one row per records series).
+
+Columns (header names are case-insensitive; blank cells are left alone):
+
+    name                        Label display name (required)
+    retention_days              Number of days, or "forever"
+    retention_trigger           dateLabeled, dateCreated, dateModified, dateOfEvent
+    action_after_retention      none, delete, startDispositionReview, relabel
+    behavior_during_retention   doNotRetain, retain, retainAsRecord, retainAsRegulatoryRecord
+    default_record_behavior     startLocked, startUnlocked
+    description_for_admins, description_for_users
+    authority, category, subcategory, citation, department, file_plan_reference
+
+The file plan is compared with the local retention label catalog
+(purview_label_catalog.py): labels that do not exist are created, labels
+whose listed settings differ are updated with only the changed properties,
+and everything else is left as is, so re-importing a revised schedule only
+touches the series that changed. Labels in the tenant that the file plan
+does not list are reported, never deleted.
+
+File-plan descriptors are bound to the tenant's descriptor templates by
+name; templates that do not exist yet are created first. Changes are sent
+as Graph $batch requests of up to 20 labels, with a bounded number of
+batches in flight.
+
+Writing retention labels needs RecordsManagement.ReadWrite.All (application).
+"""
+
+import os
+import csv
+import sys
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from workflows.common import log_utils
+from workflows.common import graph_http
+from workflows.common import purview_label_catalog
+from workflows.common import sp_metadata_utils as sp
+from workflows.common.log_utils import Messages
+
+# Initialize logging
+log_utils.setup_logging()
+
+DEFAULT_MAX_WORKERS = 4
+
+FILE_PLAN_COLUMNS = (
+    "name", "retention_days", "retention_trigger", "action_after_retention", "behavior_during_retention",
+    "default_record_behavior", "description_for_admins", "description_for_users",
+    "authority", "category", "subcategory", "citation", "department", "file_plan_reference"
+)
+
+# Alternative header names, after normalization
+_COLUMN_ALIASES = {
+    "label": "name", "label_name": "name", "display_name": "name",
+    "retention_period": "retention_days", "retention": "retention_days", "days": "retention_days",
+    "trigger": "retention_trigger", "retain_based_on": "retention_trigger",
+    "action": "action_after_retention", "disposition": "action_after_retention",
+    "behavior": "behavior_during_retention", "record_behavior": "default_record_behavior",
+    "reference": "file_plan_reference", "reference_id": "file_plan_reference"
+}
+
+# Allowed values of the enumerated columns, as Graph spells them
+_CHOICES = {
+    "retention_trigger": ("dateLabeled", "dateCreated", "dateModified", "dateOfEvent"),
+    "action_after_retention": ("none", "delete", "startDispositionReview", "relabel"),
+    "behavior_during_retention": ("doNotRetain", "retain", "retainAsRecord", "retainAsRegulatoryRecord"),
+    "default_record_behavior": ("startLocked", "startUnlocked")
+}
+
+# Columns a new label must have
+CREATE_REQUIRED = ("retention_days", "retention_trigger", "action_after_retention", "behavior_during_retention")
+
+# File-plan columns mapped to retentionLabel properties
+_LABEL_PROPERTIES = {
+    "name": "displayName",
+    "retention_trigger": "retentionTrigger",
+    "action_after_retention": "actionAfterRetentionPeriod",
+    "behavior_during_retention": "behaviorDuringRetentionPeriod",
+    "default_record_behavior": "defaultRecordBehavior",
+    "description_for_admins": "descriptionForAdmins",
+    "description_for_users": "descriptionForUsers"
+}
+
+# Descriptor columns: (template collection under /security/labels, descriptor binding)
+DESCRIPTOR_TEMPLATES = {
+    "authority": ("authorities", "authorityTemplate"),
+    "category": ("categories", "categoryTemplate"),
+    "citation": ("citations", "citationTemplate"),
+    "department": ("departments", "departmentTemplate"),
+    "file_plan_reference": ("filePlanReferences", "filePlanReferenceTemplate")
+}
+DESCRIPTOR_COLUMNS = tuple(DESCRIPTOR_TEMPLATES) + ("subcategory",)
+
+LABELS_PATH = "/security/labels"
+
+_PLAN_SYMBOLS = {"create": "+", "update": "~", "none": "="}
+
+
+class FilePlanMessages:
+    """File plan import related messages."""
+    FILE_PLAN_LOADED = "Loaded file plan {}: {} labels"
+    ROW_INVALID = "File plan row {}: {}"
+    TEMPLATES_SCANNED = "Found {} file-plan descriptor templates in the tenant"
+    PLAN_HEADER = "\n===== File plan: {} to create, {} to update, {} unchanged ====="
+    PLAN_TEMPLATE = "  + {} template: {}"
+    PLAN_ITEM = "  {} {} {}"
+    PLAN_UNMANAGED = "  ? {} is in the tenant but not in the file plan"
+    PLAN_ERROR = "  ! {}: {}"
+    PLAN_SAVED = "Plan saved to {}"
+    PLAN_HAS_ERRORS = "The file plan has {} errors; nothing was applied"
+    APPLY_START = "Applying {} label changes in batches of {} with {} workers"
+    APPLY_FAILED = "Failed to {} {}: {}"
+    APPLY_SUMMARY = "Applied {} of {} label changes"
+
+# Register message class
+if not hasattr(Messages, 'FilePlan'):
+    setattr(Messages, 'FilePlan', FilePlanMessages)
+
+
+def _import_openpyxl():
+    """Import openpyxl, explaining how to install it when it is missing."""
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportError("Reading .xlsx file plans requires openpyxl: pip install openpyxl") from None
+    return openpyxl
+
+
+def _read_rows(path):
+    """Read the rows of a CSV or XLSX file (first sheet) as dicts keyed by header."""
+    if str(path).lower().endswith(('.xlsx', '.xlsm')):
+        openpyxl = _import_openpyxl()
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            headers = [str(value) if value is not None else "" for value in next(rows, ())]
+            return [dict(zip(headers, row)) for row in rows if any(value is not None for value in row)]
+        finally:
+            workbook.close()
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return [row for row in csv.DictReader(f) if any((value or "").strip() for value in row.values())]
+
+
+def _column_name(header):
+    """Normalize a header to a file-plan column name (None if unknown)."""
+    name = str(header or "").strip().lower().replace(" ", "_").replace("-", "_")
+    name = _COLUMN_ALIASES.get(name, name)
+    return name if name in FILE_PLAN_COLUMNS else None
+
+
+def _parse_value(column, value):
+    """Parse one cell; returns the value (None if blank) or raises ValueError."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    if not value:
+        return None
+
+    if column == "retention_days":
+        if value.lower() == "forever":
+            return "forever"
+        if not value.isdigit() or int(value) <= 0:
+            raise ValueError(f"retention_days must be a number of days or 'forever', not '{value}'")
+        return int(value)
+
+    if column in _CHOICES:
+        choices = {choice.lower(): choice for choice in _CHOICES[column]}
+        if value.lower() not in choices:
+            raise ValueError(f"{column} must be one of {', '.join(_CHOICES[column])}, not '{value}'")
+        return choices[value.lower()]
+
+    return value
+
+
+def load_file_plan(path):
+    """
+    Load and validate a file plan.
+
+    Every row is checked before anything is returned, so a plan with an
+    invalid row is rejected as a whole.
+
+    Returns:
+        List of entries (dicts of FILE_PLAN_COLUMNS, None for blank cells,
+        plus the spreadsheet row number)
+
+    Raises:
+        ValueError: If a row is invalid or a label is listed twice
+    """
+    entries = []
+    errors = []
+    seen = {}
+    for row_number, row in enumerate(_read_rows(path), start=2):
+        entry = dict.fromkeys(FILE_PLAN_COLUMNS)
+        entry["row"] = row_number
+        for header, value in row.items():
+            column = _column_name(header)
+            if column is None:
+                continue
+            try:
+                entry[column] = _parse_value(column, value)
+            except ValueError as e:
+                errors.append((row_number, str(e)))
+
+        name = entry["name"]
+        if not name:
+            errors.append((row_number, "name is required"))
+            continue
+        if name.casefold() in seen:
+            errors.append((row_number, f"'{name}' is already listed in row {seen[name.casefold()]}"))
+            continue
+        if entry["subcategory"] and not entry["category"]:
+            errors.append((row_number, "subcategory needs a category"))
+        seen[name.casefold()] = row_number
+        entries.append(entry)
+
+    for row_number, error in errors:
+        log_utils.error(Messages.FilePlan.ROW_INVALID, row_number, error)
+    if errors:
+        raise ValueError(f"{len(errors)} invalid rows in file plan {path}")
+
+    log_utils.info(Messages.FilePlan.FILE_PLAN_LOADED, path, len(entries))
+    return entries
+
+
+def fetch_templates(headers, categories=()):
+    """
+    List the tenant's file-plan descriptor templates.
+
+    Args:
+        headers: Graph request headers
+        categories: Category names whose subcategories are needed
+
+    Returns:
+        Dict of descriptor column to {casefolded name: template id}; the
+        "subcategory" entry maps category id to its subcategories
+    """
+    templates = {}
+    for column, (collection, _) in DESCRIPTOR_TEMPLATES.items():
+        templates[column] = {
+            template["displayName"].casefold(): template["id"]
+            for template in graph_http.iter_values(
+                f"{graph_http.GRAPH_API_ENDPOINT}{LABELS_PATH}/{collection}", headers=headers)
+            if template.get("displayName")
+        }
+
+    # Subcategories live under their category: one $batch for the categories in use
+    category_ids = sorted({templates["category"][name.casefold()] for name in categories
+                           if name.casefold() in templates["category"]})
+    templates["subcategory"] = {category_id: {} for category_id in category_ids}
+    for start in range(0, len(category_ids), graph_http.BATCH_LIMIT):
+        chunk = category_ids[start:start + graph_http.BATCH_LIMIT]
+        responses = graph_http.batch({
+            category_id: {"method": "GET", "url": f"{LABELS_PATH}/categories/{category_id}/subcategories"}
+            for category_id in chunk
+        }, headers=headers)
+        for category_id, response in responses.items():
+            if response.get("status") == 200:
+                templates["subcategory"][category_id] = {
+                    template["displayName"].casefold(): template["id"]
+                    for template in (response.get("body") or {}).get("value", [])
+                    if template.get("displayName")
+                }
+
+    log_utils.info(Messages.FilePlan.TEMPLATES_SCANNED,
+                   sum(len(templates[column]) for column in DESCRIPTOR_TEMPLATES))
+    return templates
+
+
+def _differences(entry, current):
+    """File-plan columns whose listed value differs from the label's current settings."""
+    differences = []
+    for column in FILE_PLAN_COLUMNS[1:]:
+        value, existing = entry[column], current.get(column)
+        if column in DESCRIPTOR_COLUMNS and value is not None and existing is not None:
+            # Descriptors are matched to templates by name, case-insensitively
+            value, existing = value.casefold(), existing.casefold()
+        if value is not None and value != existing:
+            differences.append(column)
+    return differences
+
+
+def build_plan(entries, catalog, templates):
+    """
+    Diff a file plan against the label catalog and the descriptor templates.
+
+    Returns:
+        Plan dict with "changes" (one per file-plan label, action create,
+        update or none), "templates" (descriptor templates to create),
+        "unmanaged" (tenant labels not in the file plan) and "errors"
+    """
+    changes = []
+    errors = []
+    for entry in entries:
+        label = catalog.find(entry["name"])
+        if label is None:
+            missing = [column for column in CREATE_REQUIRED if entry[column] is None]
+            if missing:
+                errors.append({"name": entry["name"], "error": f"new label needs {', '.join(missing)}"})
+                continue
+            action, differences = "create", [column for column in FILE_PLAN_COLUMNS[1:] if entry[column] is not None]
+        else:
+            differences = _differences(entry, purview_label_catalog.LabelCatalog.summary(label))
+            action = "update" if differences else "none"
+        changes.append({
+            "action": action,
+            "name": entry["name"],
+            "label_id": label["id"] if label else None,
+            "differences": differences,
+            "entry": entry
+        })
+
+    # Descriptor templates referenced by a change that do not exist yet
+    missing_templates = {}
+    for change in changes:
+        if change["action"] == "none" or not set(change["differences"]) & set(DESCRIPTOR_COLUMNS):
+            continue
+        entry = change["entry"]
+        for column in DESCRIPTOR_TEMPLATES:
+            if entry[column] and entry[column].casefold() not in templates[column]:
+                missing_templates.setdefault((column, "", entry[column].casefold()), (None, entry[column]))
+        if entry["subcategory"]:
+            category_id = templates["category"].get(entry["category"].casefold())
+            if entry["subcategory"].casefold() not in templates["subcategory"].get(category_id, {}):
+                missing_templates.setdefault(
+                    ("subcategory", entry["category"].casefold(), entry["subcategory"].casefold()),
+                    (entry["category"], entry["subcategory"]))
+
+    listed = {entry["name"].casefold() for entry in entries}
+    return {
+        "changes": changes,
+        "templates": [{"column": key[0], "category": category, "name": name}
+                      for key, (category, name) in sorted(missing_templates.items())],
+        "unmanaged": sorted(label.get("displayName") or label["id"] for label in catalog
+                            if (label.get("displayName") or "").casefold() not in listed),
+        "errors": errors
+    }
+
+
+def print_plan(plan):
+    """Print a plan summary."""
+    counts = {action: 0 for action in _PLAN_SYMBOLS}
+    for change in plan["changes"]:
+        counts[change["action"]] += 1
+
+    print(Messages.FilePlan.PLAN_HEADER.format(counts["create"], counts["update"], counts["none"]))
+    for template in plan["templates"]:
+        name = f"{template['category']} / {template['name']}" if template["category"] else template["name"]
+        print(Messages.FilePlan.PLAN_TEMPLATE.format(template["column"], name))
+    for change in plan["changes"]:
+        detail = ", ".join(change["differences"]) if change["action"] == "update" else ""
+        print(Messages.FilePlan.PLAN_ITEM.format(
+            _PLAN_SYMBOLS[change["action"]], change["name"], f"({detail})" if detail else "").rstrip())
+    for name in plan["unmanaged"]:
+        print(Messages.FilePlan.PLAN_UNMANAGED.format(name))
+    for error in plan["errors"]:
+        print(Messages.FilePlan.PLAN_ERROR.format(error["name"], error["error"]))
+
+
+def _template_url(collection, template_id):
+    return f"{graph_http.GRAPH_API_ENDPOINT}{LABELS_PATH}/{collection}('{template_id}')"
+
+
+def _label_body(change, templates):
+    """Request body creating a label, or updating only its changed properties."""
+    entry = change["entry"]
+    differences = set(change["differences"])
+    body = {}
+    if change["action"] == "create":
+        body["displayName"] = entry["name"]
+
+    for column, prop in _LABEL_PROPERTIES.items():
+        if column in differences:
+            body[prop] = entry[column]
+
+    if "retention_days" in differences:
+        if entry["retention_days"] == "forever":
+            body["retentionDuration"] = {"@odata.type": "#microsoft.graph.security.retentionDurationForever"}
+        else:
+            body["retentionDuration"] = {"@odata.type": "#microsoft.graph.security.retentionDurationInDays",
+                                         "days": entry["retention_days"]}
+
+    # Descriptors are set as a whole, from every descriptor the file plan lists
+    if differences & set(DESCRIPTOR_COLUMNS):
+        descriptors = {}
+        for column, (collection, binding) in DESCRIPTOR_TEMPLATES.items():
+            if entry[column]:
+                descriptors[f"{binding}@odata.bind"] = _template_url(
+                    collection, templates[column][entry[column].casefold()])
+        if entry["subcategory"]:
+            category_id = templates["category"][entry["category"].casefold()]
+            subcategory_id = templates["subcategory"][category_id][entry["subcategory"].casefold()]
+            descriptors["subcategoryTemplate@odata.bind"] = (
+                f"{_template_url('categories', category_id)}/subcategories('{subcategory_id}')")
+        body["descriptors"] = descriptors
+
+    return body
+
+
+def _send(sub_requests, headers, max_workers):
+    """
+    Send sub-requests as $batch calls of BATCH_LIMIT, max_workers at a time.
+
+    Returns:
+        Dict of request id to sub-response; a failed $batch call fails all
+        of its sub-requests with the error message
+    """
+    ids = list(sub_requests)
+    chunks = [ids[start:start + graph_http.BATCH_LIMIT] for start in range(0, len(ids), graph_http.BATCH_LIMIT)]
+    responses = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(graph_http.batch, {request_id: sub_requests[request_id] for request_id in chunk},
+                            headers): chunk
+            for chunk in chunks
+        }
+        for future in as_completed(futures):
+            try:
+                responses.update(future.result())
+            except Exception as e:
+                for request_id in futures[future]:
+                    responses[request_id] = {"status": None, "body": {"error": {"message": str(e)}}}
+    return responses
+
+
+def _error_message(response):
+    error = (response.get("body") or {}).get("error") or {}
+    return error.get("message") or f"status {response.get('status')}"
+
+
+def _create_templates(plan, templates, headers, max_workers):
+    """
+    Create the descriptor templates the plan needs, categories before
+    their subcategories, and add them to templates.
+
+    Returns:
+        List of (template name, error) for templates that could not be created
+    """
+    failed = []
+    for wave in (DESCRIPTOR_TEMPLATES, ("subcategory",)):
+        pending = {}
+        for index, template in enumerate(plan["templates"]):
+            if template["column"] not in wave:
+                continue
+            if template["column"] == "subcategory":
+                category_id = templates["category"].get(template["category"].casefold())
+                if category_id is None:
+                    # Its category could not be created
+                    continue
+                url = f"{LABELS_PATH}/categories/{category_id}/subcategories"
+            else:
+                url = f"{LABELS_PATH}/{DESCRIPTOR_TEMPLATES[template['column']][0]}"
+            pending[str(index)] = {"method": "POST", "url": url, "body": {"displayName": template["name"]}}
+
+        for request_id, response in _send(pending, headers, max_workers).items():
+            template = plan["templates"][int(request_id)]
+            if response.get("status") not in (200, 201):
+                failed.append((template["name"], _error_message(response)))
+                continue
+            template_id = response["body"]["id"]
+            if template["column"] == "subcategory":
+                category_id = templates["category"][template["category"].casefold()]
+                templates["subcategory"].setdefault(category_id, {})[template["name"].casefold()] = template_id
+            else:
+                templates[template["column"]][template["name"].casefold()] = template_id
+    return failed
+
+
+def apply_plan(plan, templates, headers, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Create the missing descriptor templates, then create and update labels
+    in $batch requests with bounded parallelism.
+
+    Returns:
+        Tuple of (applied count, list of (label name, error) for failures)
+    """
+    pending = [change for change in plan["changes"] if change["action"] != "none"]
+    if not pending:
+        return 0, []
+
+    failed = []
+    for name, error in _create_templates(plan, templates, headers, max_workers):
+        log_utils.error(Messages.FilePlan.APPLY_FAILED, "create template", name, error)
+        failed.append((name, error))
+
+    log_utils.info(Messages.FilePlan.APPLY_START, len(pending), graph_http.BATCH_LIMIT, max_workers)
+    sub_requests = {}
+    for index, change in enumerate(pending):
+        try:
+            body = _label_body(change, templates)
+        except KeyError:
+            error = "a descriptor template could not be created"
+            log_utils.error(Messages.FilePlan.APPLY_FAILED, change["action"], change["name"], error)
+            failed.append((change["name"], error))
+            continue
+        if change["action"] == "create":
+            sub_requests[str(index)] = {"method": "POST", "url": f"{LABELS_PATH}/retentionLabels", "body": body}
+        else:
+            sub_requests[str(index)] = {"method": "PATCH", "url": f"{LABELS_PATH}/retentionLabels/{change['label_id']}",
+                                    "body": body}
+
+    applied = 0
+    for request_id, response in _send(sub_requests, headers, max_workers).items():
+        change = pending[int(request_id)]
+        if response.get("status") in (200, 201, 204):
+            applied += 1
+        else:
+            error = _error_message(response)
+            log_utils.error(Messages.FilePlan.APPLY_FAILED, change["action"], change["name"], error)
+            failed.append((change["name"], error))
+
+    log_utils.info(Messages.FilePlan.APPLY_SUMMARY, applied, len(pending))
+    return applied, failed
+
+
+def plan_file_plan(path, cache_path=purview_label_catalog.DEFAULT_CACHE_PATH, token_provider=None):
+    """
+    Load a file plan and build its plan against the tenant.
+
+    The label catalog is revalidated first, so the plan is built from the
+    tenant's current labels; if that fails the plan is not built, since a
+    stale catalog would create duplicate labels or update outdated ones.
+
+    Returns:
+        Tuple of (plan, descriptor templates, Graph request headers)
+    """
+    entries = load_file_plan(path)
+    catalog = purview_label_catalog.sync_catalog(cache_path, force=True, strict=True, token_provider=token_provider)
+    token = (token_provider or sp.get_access_token)()
+    if not token:
+        raise RuntimeError("Failed to get access token")
+    headers = graph_http.auth_headers(token)
+    templates = fetch_templates(headers, {entry["category"] for entry in entries if entry["subcategory"]})
+    return build_plan(entries, catalog, templates), templates, headers
+
+
+def main():
+    """Import a file plan as retention labels."""
+    parser = argparse.ArgumentParser(
+        description='Purview File Plan Import - Create and update retention labels from a file plan',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Show what importing the records schedule would change
+  python purview_file_plan.py --plan records_schedule.csv
+
+  # Create and update the labels, 4 batches of 20 at a time
+  python purview_file_plan.py --apply records_schedule.xlsx --app purview_api_access
+
+  # Save the plan for review
+  python purview_file_plan.py --plan records_schedule.csv --plan-output plan.json
+        """
+    )
+
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--plan', metavar='FILE', help='Show the changes a file plan (CSV or XLSX) would make')
+    action.add_argument('--apply', metavar='FILE', help='Create and update labels from a file plan')
+    parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help=f'$batch requests in flight with --apply (default: {DEFAULT_MAX_WORKERS})')
+    parser.add_argument('--plan-output', metavar='JSON', help='Write the plan to a JSON file')
+    parser.add_argument('--cache', default=purview_label_catalog.DEFAULT_CACHE_PATH,
+                        help=f'Label catalog cache (default: {purview_label_catalog.DEFAULT_CACHE_PATH})')
+    parser.add_argument('--app', help='App registration to authenticate with (default: the SharePoint app)')
+
+    args = parser.parse_args()
+
+    token_provider = purview_label_catalog.app_token_provider(args.app) if args.app else None
+    try:
+        plan, templates, headers = plan_file_plan(args.plan or args.apply, args.cache, token_provider)
+    except (ImportError, ValueError, RuntimeError, OSError) as e:
+        log_utils.error(str(e))
+        return 1
+
+    print_plan(plan)
+    if args.plan_output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.plan_output)) or '.', exist_ok=True)
+        with open(args.plan_output, 'w') as f:
+            json.dump(plan, f, indent=2)
+        log_utils.info(Messages.FilePlan.PLAN_SAVED, args.plan_output)
+
+    if not args.apply:
+        return 0
+    if plan["errors"]:
+        log_utils.error(Messages.FilePlan.PLAN_HAS_ERRORS, len(plan["errors"]))
+        return 1
+
+    applied, failed = apply_plan(plan, templates, headers, max_workers=args.workers)
+    if applied:
+        # Refresh the shared catalog so the next plan starts from the new labels
+        purview_label_catalog.forget_catalogs()
+        purview_label_catalog.sync_catalog(args.cache, force=True, token_provider=token_provider)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# file: workflows/common/purview_label_catalog.py
+"""
+Purview Retention Label Catalog - Local cache of the tenant's retention
+labels (/security/labels/retentionLabels).
+
+The catalog is synced once into a JSON cache file and shared by every
+script that needs label ids, names, retention settings or file-plan
+descriptors. A cached catalog is used as is until it is older than the
+TTL; after that it is revalidated with a conditional request (If-None-Match
+on the ETag of the last sync), so an unchanged catalog is not downloaded
+again. If Graph cannot be reached, the stale cache is used with a warning.
+
+Lookups by id or display name are dictionary lookups, for crawlers and
+reports that resolve labels for millions of items:
+
+    catalog = get_catalog()
+    catalog.name_of(label_id)          # display name, or None
+    catalog.find("Keep 7 Years")       # label by name (case-insensitive)
+    catalog.summary(label)             # flat retention and file-plan settings
+
+Reading retention labels needs RecordsManagement.Read.All (application).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+
+from workflows.common import log_utils
+from workflows.common import graph_http
+from workflows.common import graph_runtime
+from workflows.common import sp_metadata_utils as sp
+from workflows.common.log_utils import Messages
+
+# Initialize logging
+log_utils.setup_logging()
+
+RETENTION_LABELS_URL = f"{graph_http.GRAPH_API_ENDPOINT}/security/labels/retentionLabels"
+DEFAULT_CACHE_PATH = "./extracted_schemas/retention_labels.json"
+
+# Seconds a synced catalog is used before it is revalidated
+DEFAULT_TTL = 6 * 3600
+
+# Seconds a stale catalog is used after a failed sync before syncing again
+SYNC_RETRY_SECONDS = 300
+
+# Catalogs already loaded in this process, by cache path
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+# Monotonic time before which a failed sync is not retried, by cache path
+_retry_after = {}
+
+
+class LabelCatalogMessages:
+    """Retention label catalog related messages."""
+    CACHE_FRESH = "Using cached retention label catalog {} ({} labels)"
+    SYNC_START = "Syncing retention label catalog"
+    SYNC_NOT_MODIFIED = "Retention label catalog unchanged ({} labels)"
+    SYNC_DONE = "Synced {} retention labels to {}"
+    SYNC_FAILED = "Error syncing retention labels: {}"
+    USING_STALE = "Using cached retention label catalog from {}"
+    LABEL_NOT_FOUND = "Retention label not found: {}"
+    LABEL_ITEM = "  • {} ({})"
+
+# Register message class
+if not hasattr(Messages, 'LabelCatalog'):
+    setattr(Messages, 'LabelCatalog', LabelCatalogMessages)
+
+
+def _retention_days(label):
+    """Retention period in days, "forever", or None if not set."""
+    duration = label.get("retentionDuration") or {}
+    if duration.get("@odata.type", "").endswith("retentionDurationForever"):
+        return "forever"
+    return duration.get("days")
+
+
+class LabelCatalog:
+    """
+    The tenant's retention labels with constant-time lookup by id and name.
+
+    Args:
+        labels: Graph retentionLabel objects
+        fetched: Unix time of the last sync (or revalidation)
+        etag: ETag of the last sync, for conditional requests
+    """
+
+    def __init__(self, labels, fetched=None, etag=None):
+        self.labels = labels
+        self.fetched = fetched
+        self.etag = etag
+        self._by_id = {label["id"]: label for label in labels}
+        self._by_name = {(label.get("displayName") or "").casefold(): label for label in labels}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __iter__(self):
+        return iter(self.labels)
+
+    def __contains__(self, label_id):
+        return label_id in self._by_id
+
+    def get(self, label_id):
+        """Label by id, or None."""
+        return self._by_id.get(label_id)
+
+    def find(self, name):
+        """Label by display name (case-insensitive), or None."""
+        return self._by_name.get(name.casefold()) if name else None
+
+    def resolve(self, value):
+        """Label by id or display name, or None."""
+        return self._by_id.get(value) or self.find(value)
+
+    def name_of(self, label_id):
+        """Display name of a label id, or None."""
+        label = self._by_id.get(label_id)
+        return label.get("displayName") if label else None
+
+    def age(self):
+        """Seconds since the catalog was last synced (None if never)."""
+        return None if self.fetched is None else time.time() - self.fetched
+
+    @staticmethod
+    def summary(label):
+        """
+        Flatten a label into its retention and file-plan settings.
+
+        Returns:
+            Dict with name, retention settings, descriptions and file-plan
+            descriptors (authority, category, subcategory, citation,
+            department, file_plan_reference)
+        """
+        descriptors = label.get("descriptors") or {}
+        category = descriptors.get("category") or {}
+        return {
+            "name": label.get("displayName"),
+            "retention_days": _retention_days(label),
+            "retention_trigger": label.get("retentionTrigger"),
+            "action_after_retention": label.get("actionAfterRetentionPeriod"),
+            "behavior_during_retention": label.get("behaviorDuringRetentionPeriod"),
+            "default_record_behavior": label.get("defaultRecordBehavior"),
+            "description_for_admins": label.get("descriptionForAdmins"),
+            "description_for_users": label.get("descriptionForUsers"),
+            "authority": (descriptors.get("authority") or {}).get("displayName"),
+            "category": category.get("displayName"),
+            "subcategory": (category.get("subcategory") or {}).get("displayName"),
+            "citation": (descriptors.get("citation") or {}).get("displayName"),
+            "department": (descriptors.get("department") or {}).get("displayName"),
+            "file_plan_reference": (descriptors.get("filePlanReference") or {}).get("displayName")
+        }
+
+    @classmethod
+    def load(cls, path=DEFAULT_CACHE_PATH):
+        """Load a cached catalog (None if there is no cache)."""
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data.get("labels", []), data.get("fetched"), data.get("etag"))
+
+    def save(self, path=DEFAULT_CACHE_PATH):
+        """Write the catalog to the cache file atomically."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "fetched": self.fetched,
+                "synced": datetime.fromtimestamp(self.fetched).isoformat() if self.fetched else None,
+                "etag": self.etag,
+                "labels": self.labels
+            }, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def fetch_labels(headers, etag=None):
+    """
+    Get all retention labels with their file-plan descriptors.
+
+    Args:
+        headers: Graph request headers
+        etag: ETag of the cached catalog; sent as If-None-Match
+
+    Returns:
+        Tuple of (labels, etag); labels is None if the catalog is unchanged
+
+    Raises:
+        RuntimeError: If a request fails
+    """
+    url = f"{RETENTION_LABELS_URL}?$expand=descriptors"
+    request_headers = dict(headers, **{"If-None-Match": etag}) if etag else headers
+    response = graph_http.request("GET", url, headers=request_headers)
+    if response.status_code == 304:
+        return None, etag
+    if response.status_code != 200:
+        raise RuntimeError(f"Status {response.status_code} - {response.text}")
+
+    data = response.json()
+    labels = [{key: value for key, value in label.items() if not key.startswith("@odata")}
+              for label in data.get("value", [])]
+    next_link = data.get("@odata.nextLink")
+    if next_link:
+        labels.extend({key: value for key, value in label.items() if not key.startswith("@odata")}
+                      for label in graph_http.iter_values(next_link, headers=headers))
+    return labels, response.headers.get("ETag")
+
+
+def sync_catalog(path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, force=False, token_provider=None, strict=False):
+    """
+    Get the retention label catalog, syncing the cache when it is stale.
+
+    Args:
+        path: Cache file
+        ttl: Seconds a synced catalog is used without revalidation
+        force: Revalidate even if the cache is fresh
+        token_provider: Callable returning a Graph access token
+                        (default: the SharePoint tools' app)
+        strict: Raise instead of using the stale cache when syncing fails
+
+    Returns:
+        LabelCatalog
+
+    Raises:
+        RuntimeError: If the catalog cannot be synced and there is no cache
+                      (or strict is set)
+    """
+    cached = LabelCatalog.load(path)
+    if cached is not None and not force and cached.age() is not None and cached.age() < ttl:
+        log_utils.debug(Messages.LabelCatalog.CACHE_FRESH, path, len(cached))
+        return cached
+
+    log_utils.info(Messages.LabelCatalog.SYNC_START)
+    try:
+        token = (token_provider or sp.get_access_token)()
+        if not token:
+            raise RuntimeError("Failed to get access token")
+        labels, etag = fetch_labels(graph_http.auth_headers(token), cached.etag if cached else None)
+    except Exception as e:
+        log_utils.error(Messages.LabelCatalog.SYNC_FAILED, e)
+        if cached is None or strict:
+            raise RuntimeError(f"Retention label catalog unavailable: {e}") from e
+        log_utils.warning(Messages.LabelCatalog.USING_STALE, path)
+        return cached
+
+    if labels is None:
+        catalog = LabelCatalog(cached.labels, time.time(), etag)
+        log_utils.info(Messages.LabelCatalog.SYNC_NOT_MODIFIED, len(catalog))
+    else:
+        catalog = LabelCatalog(labels, time.time(), etag)
+        log_utils.info(Messages.LabelCatalog.SYNC_DONE, len(catalog), path)
+    catalog.save(path)
+    return catalog
+
+
+def get_catalog(path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, token_provider=None):
+    """
+    Get the retention label catalog, loading it at most once per process
+    until it is older than the TTL.
+
+    When a sync fails and the stale cache is used, it is not tried again
+    for SYNC_RETRY_SECONDS, so lookups keep working during an outage.
+    """
+    with _catalogs_lock:
+        catalog = _catalogs.get(path)
+        now = time.monotonic()
+        stale = catalog is None or catalog.age() is None or catalog.age() >= ttl
+        if stale and (catalog is None or now >= _retry_after.get(path, 0)):
+            catalog = sync_catalog(path, ttl, token_provider=token_provider)
+            _catalogs[path] = catalog
+            if catalog.age() is None or catalog.age() >= ttl:
+                _retry_after[path] = now + SYNC_RETRY_SECONDS
+            else:
+                _retry_after.pop(path, None)
+        return catalog
+
+
+def forget_catalogs():
+    """Drop the catalogs loaded in this process (e.g. after creating labels)."""
+    with _catalogs_lock:
+        _catalogs.clear()
+        _retry_after.clear()
+
+
+def app_token_provider(app_name):
+    """Token provider for an app registered with setup_graphapi.py (e.g. a Purview app)."""
+    return graph_runtime.get_client(app_name).get_access_token
+
+
+def main():
+    """Sync and query the retention label catalog."""
+    parser = argparse.ArgumentParser(
+        description='Purview Retention Label Catalog - Sync retention labels into a local cache',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Sync the catalog if the cache is older than the TTL, and list the labels
+  python purview_label_catalog.py --list
+
+  # Revalidate now, using a separate Purview app registration
+  python purview_label_catalog.py --refresh --app purview_api_access
+
+  # Show the retention and file-plan settings of a label (by name or id)
+  python purview_label_catalog.py --find "Contracts - 7 Years"
+        """
+    )
+
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help=f'Cache file (default: {DEFAULT_CACHE_PATH})')
+    parser.add_argument('--ttl', type=int, default=DEFAULT_TTL,
+                        help=f'Seconds before the cache is revalidated (default: {DEFAULT_TTL})')
+    parser.add_argument('--refresh', action='store_true', help='Revalidate the cache now')
+    parser.add_argument('--app', help='App registration to authenticate with (default: the SharePoint app)')
+    parser.add_argument('--list', action='store_true', help='List all labels')
+    parser.add_argument('--find', metavar='NAME_OR_ID', help='Show one label')
+
+    args = parser.parse_args()
+
+    try:
+        token_provider = app_token_provider(args.app) if args.app else None
+        catalog = sync_catalog(args.cache, args.ttl, force=args.refresh, token_provider=token_provider)
+    except Exception as e:
+        log_utils.error(str(e))
+        return 1
+
+    if args.list:
+        for label in sorted(catalog, key=lambda label: label.get("displayName") or ""):
+            log_utils.info(Messages.LabelCatalog.LABEL_ITEM, label.get("displayName"), label["id"])
+
+    if args.find:
+        label = catalog.resolve(args.find)
+        if label is None:
+            log_utils.error(Messages.LabelCatalog.LABEL_NOT_FOUND, args.find)
+            return 1
+        log_utils.info(json.dumps(dict(LabelCatalog.summary(label), id=label["id"]), indent=2))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# file: workflows/common/sp_checkpoint.py
+"""
+Checkpoint journal for long-running SharePoint extractions.
+
+Progress is appended to a JSON Lines journal as the run goes: the site
+header (site id, site columns, content types, features), each page of the
+list enumeration with its @odata.nextLink cursor, every finished list
+entry and every finished site. Appending keeps the cost of a checkpoint
+constant no matter how far the run has got, and each record is flushed to
+disk so a crash, token expiry or VM restart loses at most the list that
+was in progress.
+
+On resume the journal is replayed and the extraction skips everything that
+is already recorded, producing the same final output as an uninterrupted
+run.
+"""
+
+import os
+import json
+from datetime import datetime
+
+from workflows.common import log_utils
+from workflows.common.log_utils import Messages
+
+JOURNAL_VERSION = 1
+
+
+class CheckpointMismatch(Exception):
+    """Raised when resuming with a checkpoint from a different run."""
+
+
+class CheckpointExists(Exception):
+    """Raised when starting over would discard the journal of an interrupted run."""
+
+
+class ExtractionCheckpoint:
+    """
+    Append-only progress journal for one extraction run.
+
+    Args:
+        path: Journal file path
+        run_key: JSON-serializable description of the run (sites, options);
+                 a resumed run must have the same key
+        resume: Replay an existing journal instead of starting over
+        overwrite: Start over even if a journal exists (otherwise
+                   CheckpointExists is raised instead of truncating it)
+    """
+
+    def __init__(self, path, run_key, resume=False, overwrite=False):
+        self.path = path
+        self.run_key = run_key
+        self.started = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._sites = {}
+
+        if resume and os.path.exists(path):
+            self._replay()
+            self._file = open(path, "a")
+            done_lists = sum(len(site["lists"]) for site in self._sites.values())
+            done_sites = sum(1 for site in self._sites.values() if site["output"])
+            log_utils.info(Messages.Checkpoint.RESUMED, path, done_sites, done_lists)
+        else:
+            if os.path.exists(path) and not overwrite:
+                log_utils.error(Messages.Checkpoint.EXISTS, path)
+                raise CheckpointExists(path)
+            os.makedirs(os.path.dirname(os.path.abspath(path)) or '.', exist_ok=True)
+            self._file = open(path, "w")
+            self._append({"type": "run", "version": JOURNAL_VERSION,
+                          "run_key": run_key, "started": self.started})
+            log_utils.info(Messages.Checkpoint.STARTED, path)
+
+    def _site(self, site_url):
+        return self._sites.setdefault(site_url, {
+            "header": None,
+            "list_pages": [],
+            "cursor": None,
+            "enumerated": False,
+            "lists": {},
+            "output": None
+        })
+
+    def _replay(self):
+        """Rebuild progress state from the journal."""
+        with open(self.path) as f:
+            lines = f.readlines()
+
+        for number, line in enumerate(lines):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Only the last record can be partial (crash mid-write)
+                if number == len(lines) - 1:
+                    log_utils.warning(Messages.Checkpoint.TRUNCATED, self.path)
+                    break
+                raise
+
+            kind = record["type"]
+            if kind == "run":
+                if record["run_key"] != self.run_key:
+                    log_utils.error(Messages.Checkpoint.MISMATCH, self.path, record["run_key"])
+                    raise CheckpointMismatch(self.path)
+                self.started = record["started"]
+                continue
+
+            site = self._site(record["site_url"])
+            if kind == "site":
+                site["header"] = record["header"]
+            elif kind == "list_page":
+                site["list_pages"].append(record["lists"])
+                site["cursor"] = record["next_link"]
+                site["enumerated"] = record["next_link"] is None
+            elif kind == "list":
+                site["lists"][record["list_id"]] = record["entry"]
+            elif kind == "site_done":
+                site["output"] = record["output"]
+                site["lists"] = {}
+                site["list_pages"] = []
+
+        # Drop the partial record so new records start on a clean line
+        if lines and not lines[-1].endswith("\n"):
+            with open(self.path, "w") as f:
+                f.writelines(lines[:-1])
+
+    def _append(self, record):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    # Site header (site id, site columns, content types, features)
+
+    def site_header(self, site_url):
+        """Get the recorded site header, or None."""
+        return self._sites.get(site_url, {}).get("header")
+
+    def record_site_header(self, site_url, header):
+        """Record the site-level part of the extraction."""
+        self._site(site_url)["header"] = header
+        self._append({"type": "site", "site_url": site_url, "header": header})
+
+    # List enumeration with pagination cursors
+
+    def list_enumeration(self, site_url):
+        """
+        Get the recorded list enumeration of a site.
+
+        Returns:
+            Tuple of (lists so far, cursor to continue from, enumeration complete)
+        """
+        site = self._sites.get(site_url)
+        if not site:
+            return [], None, False
+        lists = [lst for page in site["list_pages"] for lst in page]
+        return lists, site["cursor"], site["enumerated"]
+
+    def record_list_page(self, site_url, lists, next_link):
+        """Record one page of the list enumeration and its nextLink cursor."""
+        site = self._site(site_url)
+        site["list_pages"].append(lists)
+        site["cursor"] = next_link
+        site["enumerated"] = next_link is None
+        self._append({"type": "list_page", "site_url": site_url, "lists": lists, "next_link": next_link})
+
+    # Finished lists
+
+    def list_entry(self, site_url, list_id):
+        """Get the recorded output of a finished list, or None."""
+        return self._sites.get(site_url, {}).get("lists", {}).get(list_id)
+
+    def record_list(self, site_url, list_id, entry):
+        """Record the output of a finished list."""
+        self._site(site_url)["lists"][list_id] = entry
+        self._append({"type": "list", "site_url": site_url, "list_id": list_id, "entry": entry})
+
+    # Finished sites
+
+    def site_output(self, site_url):
+        """Get the output path of a finished site, or None."""
+        return self._sites.get(site_url, {}).get("output")
+
+    def record_site_done(self, site_url, output_path):
+        """Record that a site is finished and where its output was saved."""
+        site = self._site(site_url)
+        site["output"] = output_path
+        # Per-list detail is no longer needed in memory once the site is saved
+        site["lists"] = {}
+        site["list_pages"] = []
+        self._append({"type": "site_done", "site_url": site_url, "output": output_path})
+
+    def complete(self):
+        """Finish the run and remove the journal."""
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        log_utils.info(Messages.Checkpoint.COMPLETED, self.path)
+
+    def close(self):
+        """Close the journal, keeping it for a later --resume."""
+        if not self._file.closed:
+            self._file.close()
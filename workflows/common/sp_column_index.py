@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# file: workflows/common/sp_column_index.py
+"""
+SharePoint Column Usage Index - Find which sites and lists use a column.
+
+Builds an inverted index from column internal name, display name, type and
+term set to every site/list that uses the column, from extraction output
+(--comprehensive or --detailed schemas). The index is stored in SQLite so
+queries are answered from indexes without re-parsing the extraction files,
+and rebuilds only re-read files that changed.
+"""
+
+import os
+import sys
+import json
+import glob
+import sqlite3
+import argparse
+
+from workflows.common import log_utils
+from workflows.common import sp_metadata_utils as sp
+from workflows.common.log_utils import Messages
+
+# Initialize logging
+log_utils.setup_logging()
+
+DEFAULT_INDEX_PATH = "./extracted_schemas/column_index.db"
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL NOT NULL,
+    site_url TEXT
+);
+CREATE TABLE IF NOT EXISTS column_usage (
+    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+    site_url TEXT,
+    list_name TEXT,
+    internal_name TEXT COLLATE NOCASE,
+    display_name TEXT COLLATE NOCASE,
+    type TEXT COLLATE NOCASE,
+    term_set TEXT COLLATE NOCASE,
+    is_site_column INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_usage_internal_name ON column_usage(internal_name);
+CREATE INDEX IF NOT EXISTS idx_usage_display_name ON column_usage(display_name);
+CREATE INDEX IF NOT EXISTS idx_usage_type ON column_usage(type);
+CREATE INDEX IF NOT EXISTS idx_usage_term_set ON column_usage(term_set);
+CREATE INDEX IF NOT EXISTS idx_usage_source ON column_usage(source_id);
+"""
+
+
+class ColumnIndexMessages:
+    """Column usage index related messages."""
+    BUILD_START = "Indexing extraction output in {} ({} files)"
+    BUILD_FILE_ERROR = "Skipping {}: {}"
+    BUILD_SUMMARY = "Indexed {} changed files, {} unchanged, {} removed ({} column usages total)"
+    QUERY_RESULTS = "Found {} column usages in {} lists"
+    QUERY_NONE = "No matching columns found"
+    QUERY_REQUIRED = "Specify at least one of --name, --display-name, --type or --term-set"
+    INDEX_MISSING = "Index not found: {} (build it with --build)"
+
+# Register message class
+if not hasattr(Messages, 'ColumnIndex'):
+    setattr(Messages, 'ColumnIndex', ColumnIndexMessages)
+
+
+def connect(index_path=DEFAULT_INDEX_PATH):
+    """Open (and create if needed) the column usage index."""
+    os.makedirs(os.path.dirname(os.path.abspath(index_path)) or '.', exist_ok=True)
+    conn = sqlite3.connect(index_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(INDEX_SCHEMA)
+    return conn
+
+
+def _term_set_id(field):
+    """Get the term set id of a managed metadata field, if any."""
+    raw = field.get("raw_column_data") or {}
+    term_set = field.get("termSet") or raw.get("termSet") or (raw.get("term") or {}).get("termSet")
+    if isinstance(term_set, dict):
+        return term_set.get("id") or term_set.get("name")
+    return term_set
+
+
+def iter_column_usages(data):
+    """
+    Yield column usage rows from one extraction output document.
+
+    Supports comprehensive site output (site_url + lists[].columns) and
+    single-list schemas (workflow + metadata).
+
+    Yields:
+        Tuples of (site_url, list_name, internal_name, display_name, type,
+        term_set, is_site_column)
+    """
+    site_url, schemas = sp.schemas_from_extraction(data)
+    lists = [(schema["name"], schema["metadata"]) for schema in schemas]
+
+    for list_name, fields in lists:
+        for field in fields:
+            raw = field.get("raw_column_data") or {}
+            is_site_column = field.get("is_site_column")
+            yield (
+                site_url,
+                list_name,
+                field.get("internal_name") or raw.get("name"),
+                field.get("name"),
+                field.get("type"),
+                _term_set_id(field),
+                None if is_site_column is None else int(is_site_column)
+            )
+
+
+def build_index(source_dir, index_path=DEFAULT_INDEX_PATH):
+    """
+    Build or refresh the index from a directory of extraction output.
+
+    Files whose modification time is unchanged since the last build are
+    skipped, and rows for deleted files are removed.
+
+    Returns:
+        Total number of indexed column usages
+    """
+    files = sorted(glob.glob(os.path.join(source_dir, "**", "*.json"), recursive=True))
+    # Each extraction run writes new files; older extractions of a site are dropped from the index
+    files = sp.latest_extraction_files(files)
+    log_utils.info(Messages.ColumnIndex.BUILD_START, source_dir, len(files))
+
+    conn = connect(index_path)
+    known = {path: (source_id, mtime) for source_id, path, mtime in
+             conn.execute("SELECT id, path, mtime FROM sources")}
+    changed = unchanged = 0
+
+    with conn:
+        for path in files:
+            path = os.path.abspath(path)
+            mtime = os.path.getmtime(path)
+            previous = known.pop(path, None)
+            if previous and previous[1] == mtime:
+                unchanged += 1
+                continue
+
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except Exception as e:
+                log_utils.warning(Messages.ColumnIndex.BUILD_FILE_ERROR, path, e)
+                continue
+            if not isinstance(data, dict):
+                continue
+
+            if previous:
+                conn.execute("DELETE FROM sources WHERE id = ?", (previous[0],))
+            cursor = conn.execute(
+                "INSERT INTO sources (path, mtime, site_url) VALUES (?, ?, ?)",
+                (path, mtime, data.get("site_url"))
+            )
+            source_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO column_usage (source_id, site_url, list_name, internal_name, "
+                "display_name, type, term_set, is_site_column) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((source_id,) + row for row in iter_column_usages(data))
+            )
+            changed += 1
+
+        # Files that disappeared since the last build
+        for source_id, _ in known.values():
+            conn.execute("DELETE FROM sources WHERE id = ?", (source_id,))
+
+    total = conn.execute("SELECT COUNT(*) FROM column_usage").fetchone()[0]
+    conn.close()
+    log_utils.info(Messages.ColumnIndex.BUILD_SUMMARY, changed, unchanged, len(known), total)
+    return total
+
+
+def _match_clause(column, value):
+    """SQL condition for an exact or wildcard (*) match."""
+    if "*" in value:
+        # Only * is a wildcard; _ and % are common in internal names
+        escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f"{column} LIKE ? ESCAPE '\\'", escaped.replace("*", "%")
+    return f"{column} = ?", value
+
+
+def query_index(index_path=DEFAULT_INDEX_PATH, name=None, display_name=None, column_type=None,
+                term_set=None, site_columns=None):
+    """
+    Find the sites and lists that use matching columns.
+
+    Args:
+        index_path: Path of the SQLite index
+        name: Column internal name (case-insensitive, * wildcard)
+        display_name: Column display name (case-insensitive, * wildcard)
+        column_type: Schema type, e.g. "Managed Metadata"
+        term_set: Term set id
+        site_columns: True for site columns only, False for list columns only
+
+    Returns:
+        List of usage dicts ordered by site and list
+    """
+    conditions, params = [], []
+    for column, value in (("internal_name", name), ("display_name", display_name),
+                          ("type", column_type), ("term_set", term_set)):
+        if value:
+            clause, param = _match_clause(column, value)
+            conditions.append(clause)
+            params.append(param)
+    if site_columns is not None:
+        conditions.append("is_site_column = ?")
+        params.append(int(site_columns))
+
+    sql = ("SELECT site_url, list_name, internal_name, display_name, type, term_set, is_site_column "
+           "FROM column_usage")
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY site_url, list_name, display_name"
+
+    conn = sqlite3.connect(index_path)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+    keys = ("site_url", "list_name", "internal_name", "display_name", "type", "term_set", "is_site_column")
+    results = []
+    for row in rows:
+        usage = dict(zip(keys, row))
+        if usage["is_site_column"] is not None:
+            usage["is_site_column"] = bool(usage["is_site_column"])
+        results.append(usage)
+    return results
+
+
+def main():
+    """Build and query the cross-site column usage index."""
+    parser = argparse.ArgumentParser(
+        description='SharePoint Column Usage Index - Find which sites and lists use a column',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Build (or refresh) the index from extraction output
+  python sp_column_index.py --build ./extracted_schemas
+
+  # Which libraries use the shared Vendor site column?
+  python sp_column_index.py --display-name Vendor --site-columns
+
+  # Which libraries define a local Vendor column instead?
+  python sp_column_index.py --display-name Vendor --list-columns
+
+  # All managed metadata columns bound to a term set
+  python sp_column_index.py --type "Managed Metadata" --term-set 8ed8c9ea-7052-4c1d-a4d7-b9c10bffea6f --json
+        """
+    )
+
+    parser.add_argument('--index', default=DEFAULT_INDEX_PATH, help='Path of the index database')
+    parser.add_argument('--build', metavar='DIR', help='Build or refresh the index from extraction output in DIR')
+    parser.add_argument('--name', help='Column internal name (* wildcard allowed)')
+    parser.add_argument('--display-name', help='Column display name (* wildcard allowed)')
+    parser.add_argument('--type', dest='column_type', help='Column type (e.g. Choice, "Managed Metadata")')
+    parser.add_argument('--term-set', help='Term set id of managed metadata columns')
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument('--site-columns', dest='site_columns', action='store_const', const=True,
+                       help='Only site columns')
+    scope.add_argument('--list-columns', dest='site_columns', action='store_const', const=False,
+                       help='Only list-local columns')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    args = parser.parse_args()
+
+    if args.build:
+        build_index(args.build, args.index)
+        if not any([args.name, args.display_name, args.column_type, args.term_set]):
+            return 0
+
+    if not any([args.name, args.display_name, args.column_type, args.term_set]):
+        log_utils.error(Messages.ColumnIndex.QUERY_REQUIRED)
+        parser.print_help()
+        return 1
+
+    if not os.path.exists(args.index):
+        log_utils.error(Messages.ColumnIndex.INDEX_MISSING, args.index)
+        return 1
+
+    results = query_index(args.index, name=args.name, display_name=args.display_name,
+                          column_type=args.column_type, term_set=args.term_set,
+                          site_columns=args.site_columns)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    if not results:
+        log_utils.info(Messages.ColumnIndex.QUERY_NONE)
+        return 0
+
+    lists = {(r["site_url"], r["list_name"]) for r in results}
+    log_utils.info(Messages.ColumnIndex.QUERY_RESULTS, len(results), len(lists))
+    print("\nSite                                     | List                      | Column (internal)              | Type             | Source")
+    print("-----------------------------------------|---------------------------|--------------------------------|------------------|-------")
+    for r in results:
+        source = {True: "Site", False: "List", None: "?"}[r["is_site_column"]]
+        column = f"{r['display_name']} ({r['internal_name']})"
+        print(f"{(r['site_url'] or '')[-40:]:<40} | {(r['list_name'] or '')[:25]:<25} | "
+              f"{column[:30]:<30} | {(r['type'] or '')[:16]:<16} | {source}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+# file: workflows/common/sp_conformance.py
+"""
+SharePoint Schema Conformance - Check libraries across the tenant against
+their workflow target schemas.
+
+A mapping file assigns each site/library to a target metadata-schema.json
+(contracts, purchase-cards, council-meetings, ...). Current schemas are read
+from cached extraction output or the inventory database, or extracted live,
+compared in parallel with compare_schemas, and aggregated into a single
+conformance report.
+
+Mapping file format (JSON or YAML):
+
+    {
+      "libraries": [
+        {"site": "https://contoso.sharepoint.com/sites/Legal",
+         "library": "Contracts",
+         "schema": "workflows/contracts/metadata-schema.json"},
+        {"site": "https://contoso.sharepoint.com/sites/Finance*",
+         "library": "P-Card*",
+         "schema": "workflows/pcards/metadata-schema.json"}
+      ]
+    }
+
+Site and library values may use shell-style wildcards (*, ?) when checking
+cached schemas. Live extraction needs an exact site URL.
+"""
+
+import os
+import sys
+import json
+import glob
+import argparse
+from fnmatch import fnmatchcase
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from workflows.common import log_utils
+from workflows.common import graph_trace
+from workflows.common import sp_inventory
+from workflows.common import sp_metadata_utils as sp
+from workflows.common.log_utils import Messages
+
+# Initialize logging
+log_utils.setup_logging()
+
+# Per-process cache of loaded target schemas
+_target_schemas = {}
+
+
+class ConformanceMessages:
+    """Schema conformance related messages."""
+    MAPPING_LOADED = "Loaded conformance mapping: {} library rules"
+    MAPPING_ERROR = "Error loading mapping file: {}"
+    SOURCE_CACHE = "Checking cached schemas in {} ({} files)"
+    SOURCE_LIVE = "Extracting live schemas from {} sites"
+    SOURCE_INVENTORY = "Checking schemas in inventory {}"
+    SOURCE_ERROR = "Error checking {}: {}"
+    LIVE_PATTERN_SKIPPED = "Skipping '{}': live extraction needs an exact site URL"
+    SUMMARY_HEADER = "Conformance Summary:"
+    SUMMARY_LIBRARIES = "  • {} libraries checked"
+    SUMMARY_CONFORMANT = "  • {} conformant"
+    SUMMARY_NON_CONFORMANT = "  • {} need changes ({} add, {} update, {} remove)"
+    SUMMARY_NOT_FOUND = "  • {} mapped libraries not found"
+    REPORT_SAVED = "Saved conformance report to {}"
+
+# Register message class
+if not hasattr(Messages, 'Conformance'):
+    setattr(Messages, 'Conformance', ConformanceMessages)
+
+
+def load_mapping(path):
+    """
+    Load a conformance mapping file.
+
+    Returns:
+        List of rules, each a dict with site, library and schema keys
+    """
+    with open(path) as f:
+        if path.endswith(('.yml', '.yaml')):
+            import yaml
+            mapping = yaml.safe_load(f)
+        else:
+            mapping = json.load(f)
+
+    rules = mapping.get("libraries", []) if isinstance(mapping, dict) else mapping
+    for rule in rules:
+        rule.setdefault("library", "*")
+    return rules
+
+
+def _is_pattern(value):
+    """Check whether a mapping value contains wildcards."""
+    return any(ch in value for ch in "*?[")
+
+
+def _normalize_site(site_url):
+    """Normalize a site URL for matching."""
+    return (site_url or "").rstrip("/").lower()
+
+
+def match_rule(rules, site_url, library_name):
+    """Find the first rule that applies to a site/library, or None."""
+    site = _normalize_site(site_url)
+    for index, rule in enumerate(rules):
+        if fnmatchcase(site, _normalize_site(rule["site"])) and fnmatchcase(library_name, rule["library"]):
+            return index, rule
+    return None, None
+
+
+def _load_target_schema(path):
+    """Load a target schema once per process."""
+    if path not in _target_schemas:
+        with open(path) as f:
+            _target_schemas[path] = json.load(f)
+    return _target_schemas[path]
+
+
+def _summarize_fields(fields):
+    """Reduce compare_schemas field lists to name/type pairs."""
+    return [{"name": field["name"], "type": field.get("type")} for field in fields]
+
+
+def check_library(site_url, current_schema, rule):
+    """
+    Compare one library with the target schema of its mapping rule.
+
+    Returns:
+        Dict with the per-library conformance result
+    """
+    library_name = current_schema.get("name") or current_schema.get("workflow")
+    result = {
+        "site": site_url,
+        "library": library_name,
+        "schema": rule["schema"]
+    }
+
+    try:
+        target_schema = _load_target_schema(rule["schema"])
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+        return result
+
+    comparison = sp.compare_schemas(current_schema, target_schema)
+    result["counts"] = {key: len(value) for key, value in comparison.items()}
+    result["status"] = "conformant" if not any(comparison.values()) else "non_conformant"
+    for key, fields in comparison.items():
+        result[key] = _summarize_fields(fields)
+    return result
+
+
+def check_cached_file(path, rules):
+    """
+    Check every mapped library found in one cached extraction file.
+
+    Comprehensive extraction output (site_url + lists) is supported, as are
+    single-list schemas that carry a site_url and name.
+
+    Returns:
+        Tuple of (results, matched rule indexes)
+    """
+    with open(path) as f:
+        data = json.load(f)
+    return check_extraction(data, rules, path)
+
+
+def check_extraction(data, rules, source):
+    """
+    Check every mapped library of one site's extraction output.
+
+    Args:
+        data: Extraction output (from a cached file or the inventory)
+        rules: Mapping rules from load_mapping
+        source: Where the data came from, recorded on each result
+
+    Returns:
+        Tuple of (results, matched rule indexes)
+    """
+    # Data that is not extraction output (e.g. earlier reports) yields no schemas
+    site_url, schemas = sp.schemas_from_extraction(data)
+
+    results = []
+    matched = set()
+    for schema in schemas:
+        index, rule = match_rule(rules, site_url, schema["name"])
+        if rule is None:
+            continue
+        matched.add(index)
+        result = check_library(site_url, schema, rule)
+        result["source"] = source
+        results.append(result)
+    return results, matched
+
+
+def check_live_site(site_url, rules, token):
+    """
+    Extract a site's lists live and check every mapped library.
+
+    Returns:
+        Tuple of (results, matched rule indexes)
+    """
+    schemas = sp.extract_metadata_schema(site_url, token=token) or []
+    if isinstance(schemas, dict):
+        schemas = [schemas]
+
+    # extract_metadata_schema only records the workflow form of the list
+    # name, so rules are matched against that form
+    results = []
+    matched = set()
+    for schema in schemas:
+        for index, rule in enumerate(rules):
+            if _normalize_site(rule["site"]) != _normalize_site(site_url):
+                continue
+            library_pattern = rule["library"].lower().replace(" ", "_")
+            if fnmatchcase(schema["workflow"], library_pattern):
+                matched.add(index)
+                schema["name"] = schema["workflow"] if _is_pattern(rule["library"]) else rule["library"]
+                result = check_library(site_url, schema, rule)
+                result["source"] = "live"
+                results.append(result)
+                break
+    return results, matched
+
+
+def run_conformance(rules, cache_dir=None, max_workers=None, inventory=None):
+    """
+    Run the conformance check for all mapping rules.
+
+    Args:
+        rules: Mapping rules from load_mapping
+        cache_dir: Directory of cached extraction output (live extraction if None)
+        max_workers: Maximum parallel workers
+        inventory: Inventory database to read current schemas from (instead of cache_dir)
+
+    Returns:
+        Aggregated conformance report dict
+    """
+    results = []
+    matched = set()
+
+    if inventory:
+        try:
+            conn = sp_inventory.connect_readonly(inventory)
+        except FileNotFoundError:
+            return None
+        log_utils.info(Messages.Conformance.SOURCE_INVENTORY, inventory)
+        # Schemas come out of the database already parsed, so no worker pool is needed
+        try:
+            for data in sp_inventory.iter_extractions(conn):
+                site_results, site_matched = check_extraction(data, rules, inventory)
+                results.extend(site_results)
+                matched.update(site_matched)
+        finally:
+            conn.close()
+    elif cache_dir:
+        files = sorted(glob.glob(os.path.join(cache_dir, "**", "*.json"), recursive=True))
+        # Each extraction run writes new files; only the newest of each site is checked
+        files = sp.latest_extraction_files(files)
+        log_utils.info(Messages.Conformance.SOURCE_CACHE, cache_dir, len(files))
+        # Parsing large extraction files is CPU-bound, so use processes
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(check_cached_file, path, rules): path for path in files}
+            for future in as_completed(futures):
+                try:
+                    file_results, file_matched = future.result()
+                except Exception as e:
+                    log_utils.error(Messages.Conformance.SOURCE_ERROR, futures[future], e)
+                    continue
+                results.extend(file_results)
+                matched.update(file_matched)
+    else:
+        sites = []
+        for rule in rules:
+            if _is_pattern(rule["site"]):
+                log_utils.warning(Messages.Conformance.LIVE_PATTERN_SKIPPED, rule["site"])
+            elif rule["site"] not in sites:
+                sites.append(rule["site"])
+
+        log_utils.info(Messages.Conformance.SOURCE_LIVE, len(sites))
+        token = sp.get_access_token()
+        if not token:
+            log_utils.error(Messages.Auth.TOKEN_FAILURE)
+            return None
+
+        # Live extraction is network-bound, so use threads
+        with ThreadPoolExecutor(max_workers=max_workers or 8) as executor:
+            futures = {executor.submit(check_live_site, site, rules, token): site for site in sites}
+            for future in as_completed(futures):
+                try:
+                    site_results, site_matched = future.result()
+                except Exception as e:
+                    log_utils.error(Messages.Conformance.SOURCE_ERROR, futures[future], e)
+                    continue
+                results.extend(site_results)
+                matched.update(site_matched)
+
+    # Exact (non-wildcard) rules that matched nothing are reported as missing
+    for index, rule in enumerate(rules):
+        if index not in matched and not _is_pattern(rule["site"]) and not _is_pattern(rule["library"]):
+            results.append({
+                "site": rule["site"],
+                "library": rule["library"],
+                "schema": rule["schema"],
+                "status": "not_found"
+            })
+
+    results.sort(key=lambda r: (_normalize_site(r["site"]), r["library"] or ""))
+    return build_report(results)
+
+
+def build_report(results):
+    """Aggregate per-library results into a conformance report."""
+    summary = {
+        "libraries": len(results),
+        "conformant": 0,
+        "non_conformant": 0,
+        "not_found": 0,
+        "error": 0,
+        "fields_to_add": 0,
+        "fields_to_update": 0,
+        "fields_to_remove": 0,
+        "by_schema": {}
+    }
+
+    for result in results:
+        status = result["status"]
+        summary[status] += 1
+
+        schema_summary = summary["by_schema"].setdefault(result["schema"], {
+            "libraries": 0, "conformant": 0, "non_conformant": 0, "not_found": 0, "error": 0
+        })
+        schema_summary["libraries"] += 1
+        schema_summary[status] += 1
+
+        for key, count in result.get("counts", {}).items():
+            summary[f"fields_{key}"] += count
+
+    return {
+        "generated": datetime.now().isoformat(),
+        "summary": summary,
+        "libraries": results
+    }
+
+
+def main():
+    """Tenant-wide schema conformance check."""
+    parser = argparse.ArgumentParser(
+        description='SharePoint Schema Conformance - Check libraries against workflow target schemas',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Check cached comprehensive extraction output
+  python sp_conformance.py --mapping conformance.json --cache-dir ./extracted_schemas --output conformance_report.json
+
+  # Check the schemas loaded into the inventory database
+  python sp_conformance.py --mapping conformance.json --inventory ./extracted_schemas/inventory.db
+
+  # Extract the mapped sites live and check them
+  python sp_conformance.py --mapping conformance.yaml --workers 16
+        """
+    )
+
+    parser.add_argument('--mapping', required=True, help='Mapping of site/library to target schema (JSON or YAML)')
+    parser.add_argument('--cache-dir', help='Directory of cached extraction output (default: extract live)')
+    parser.add_argument('--inventory', metavar='DB', help='Inventory database to check instead of --cache-dir')
+    parser.add_argument('--output', help='Path to save the report (default: auto-generated filename)')
+    parser.add_argument('--workers', type=int, help='Maximum number of parallel workers')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='Write a Chrome trace-event timeline of all Graph requests to FILE')
+
+    args = parser.parse_args()
+
+    if args.trace:
+        graph_trace.enable(args.trace)
+
+    try:
+        rules = load_mapping(args.mapping)
+    except Exception as e:
+        log_utils.error(Messages.Conformance.MAPPING_ERROR, e)
+        return 1
+    log_utils.info(Messages.Conformance.MAPPING_LOADED, len(rules))
+
+    report = run_conformance(rules, cache_dir=args.cache_dir, max_workers=args.workers,
+                             inventory=args.inventory)
+    if report is None:
+        return 1
+
+    summary = report["summary"]
+    log_utils.info(Messages.Conformance.SUMMARY_HEADER)
+    log_utils.info(Messages.Conformance.SUMMARY_LIBRARIES, summary["libraries"])
+    log_utils.info(Messages.Conformance.SUMMARY_CONFORMANT, summary["conformant"])
+    log_utils.info(Messages.Conformance.SUMMARY_NON_CONFORMANT, summary["non_conformant"],
+                   summary["fields_to_add"], summary["fields_to_update"], summary["fields_to_remove"])
+    log_utils.info(Messages.Conformance.SUMMARY_NOT_FOUND, summary["not_found"])
+
+    output_path = args.output
+    if not output_path:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = f"./extracted_schemas/conformance_{timestamp}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)) or '.', exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    log_utils.info(Messages.Conformance.REPORT_SAVED, output_path)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
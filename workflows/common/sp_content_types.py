@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+# file: workflows/common/sp_content_types.py
+"""
+SharePoint Content Type Graph - Inheritance of hub, site and list content
+types, and the lists whose content types diverge from their site content
+type.
+
+get_content_types and get_list_settings return flat lists of content
+types. This module links them into one graph:
+
+    hub content type   (content type hub, published to every site)
+      └ site content type   (same id when published from the hub)
+          └ list content type   (parent id + "00" + GUID)
+
+Parents are found by the longest content type id prefix known in the
+parent scope or, failing that, by the parentId Graph reports. Effective
+columns are resolved once per content type and memoized, so a site content
+type used by hundreds of lists is walked once. A content type whose
+columns were not read inherits the effective columns of its parent.
+
+Content types come from the inventory (sp_inventory.py). Their columns are
+read from Graph in $batch requests of 20, only for the content types the
+report compares and their ancestors.
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+from functools import lru_cache
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+from workflows.common import log_utils
+from workflows.common import graph_http
+from workflows.common import sp_inventory
+from workflows.common import sp_metadata_utils as sp
+from workflows.common.log_utils import Messages
+
+# Initialize logging
+log_utils.setup_logging()
+
+DEFAULT_WORKERS = 4
+
+# Content type scopes, from the top of the hierarchy down
+SCOPES = ("hub", "site", "list")
+
+# Column properties compared between a content type and its parent
+COMPARED_PROPERTIES = ("display_name", "required", "hidden", "read_only")
+
+COLUMN_SELECT = "id,name,displayName,required,hidden,readOnly,sourceContentType"
+
+
+class ContentTypeGraphMessages:
+    """Content type graph related messages."""
+    GRAPH_LOADED = "Loaded {} hub, {} site and {} list content types"
+    HUB_LOADING = "Reading content types of the content type hub {}"
+    HUB_FAILED = "Could not read the content type hub: {}"
+    COLUMNS_FETCHING = "Reading the columns of {} content types"
+    COLUMNS_FAILED = "Could not read the columns of content type {} ({}): status {}"
+    SUMMARY_HEADER = "Content Type Divergence:"
+    SUMMARY_COUNTS = "  • {} list content types: {} match, {} diverged, {} orphaned, {} unknown"
+    SUMMARY_SITE = "  • {} site content types differ from their hub content type"
+    TOP_HEADER = "Site content types with the most diverged list copies:"
+    TOP_ITEM = "  • {} ({}): {} of {} lists diverged"
+    NOT_FOUND = "Content type not found: {}"
+    SHOW_CHAIN = "{} {} ({}) in {}: {}"
+    SHOW_COLUMN = "    - {}{} [from {}]"
+    REPORT_SAVED = "Saved content type report to {}"
+
+# Register message class
+if not hasattr(Messages, 'ContentTypeGraph'):
+    setattr(Messages, 'ContentTypeGraph', ContentTypeGraphMessages)
+
+
+def hub_url_for(site_url):
+    """URL of the content type hub of a site's tenant."""
+    parsed = urlparse(site_url)
+    return f"{parsed.scheme}://{parsed.netloc}/sites/contentTypeHub"
+
+
+def _column_entry(column):
+    """Column of a content type in the form used by the graph."""
+    source = column.get("sourceContentType") or {}
+    return {
+        "name": column.get("name"),
+        "display_name": column.get("displayName"),
+        "required": bool(column.get("required")),
+        "hidden": bool(column.get("hidden")),
+        "read_only": bool(column.get("readOnly")),
+        "source_content_type": source.get("id")
+    }
+
+
+def _node(scope, raw, site_url=None, site_id=None, list_id=None, list_name=None, parent_id=None):
+    content_type_id = raw.get("id") or ""
+    columns = raw.get("columns")
+    return {
+        "key": (scope, {"hub": None, "site": site_url, "list": list_id}[scope], content_type_id.lower()),
+        "scope": scope,
+        "id": content_type_id,
+        "name": raw.get("name"),
+        "group": raw.get("group"),
+        "site_url": site_url,
+        "site_id": site_id,
+        "list_id": list_id,
+        "list_name": list_name,
+        "parent_id": parent_id or raw.get("parentId") or (raw.get("base") or {}).get("id"),
+        "columns": [_column_entry(column) for column in columns] if columns is not None else None
+    }
+
+
+class ContentTypeGraph:
+    """
+    Hub, site and list content types linked to their parents.
+
+    Nodes are keyed by (scope, site URL or list id, lowercase content type
+    id). effective_columns() and origin() are memoized per graph, so each
+    content type is resolved once however many lists inherit from it.
+
+    Args:
+        nodes: Node dicts (see _node)
+    """
+
+    def __init__(self, nodes=()):
+        self.nodes = {}
+        self.children = {}
+        for node in nodes:
+            self.nodes[node["key"]] = node
+        self.effective_columns = lru_cache(maxsize=None)(self._effective_columns)
+        self.origin = lru_cache(maxsize=None)(self._origin)
+        self.link()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def add(self, node):
+        """Add a node; call link() once all nodes are added."""
+        self.nodes[node["key"]] = node
+
+    def _ids(self, scope, owner):
+        return self._scope_ids.get((scope, owner), set())
+
+    def _parent_key(self, node):
+        """Key of a node's parent, or None for roots and orphans."""
+        content_type_id = node["key"][2]
+        if node["scope"] == "list":
+            # A list content type's parent is a site content type of the same site
+            candidates = [("site", node["site_url"])]
+        elif node["scope"] == "site":
+            # A site content type published from the hub has the hub content type's id
+            if content_type_id in self._ids("hub", None):
+                return ("hub", None, content_type_id)
+            candidates = [("site", node["site_url"]), ("hub", None)]
+        else:
+            candidates = [("hub", None)]
+
+        # Content type ids extend their parent's id by two hex digits or "00" + a GUID;
+        # list content types always by "00" + a GUID, so a shorter match is not their parent
+        if node["scope"] == "list":
+            ends = [len(content_type_id) - 34] if content_type_id[-34:-32] == "00" else []
+        else:
+            ends = range(len(content_type_id) - 2, 3, -2)
+        for scope, owner in candidates:
+            ids = self._ids(scope, owner)
+            for end in ends:
+                if content_type_id[:end] in ids:
+                    return (scope, owner, content_type_id[:end])
+        parent_id = (node["parent_id"] or "").lower()
+        for scope, owner in candidates:
+            if parent_id and parent_id != content_type_id and parent_id in self._ids(scope, owner):
+                return (scope, owner, parent_id)
+        return None
+
+    def link(self):
+        """Work out the parent of every node and reset the memoized resolutions."""
+        self._scope_ids = {}
+        for scope, owner, content_type_id in self.nodes:
+            self._scope_ids.setdefault((scope, owner), set()).add(content_type_id)
+        self.children = {}
+        for key, node in self.nodes.items():
+            node["parent"] = self._parent_key(node)
+            if node["parent"]:
+                self.children.setdefault(node["parent"], []).append(key)
+        self.effective_columns.cache_clear()
+        self.origin.cache_clear()
+
+    def parent(self, key):
+        """Parent node, or None."""
+        parent_key = self.nodes[key]["parent"]
+        return self.nodes.get(parent_key) if parent_key else None
+
+    def ancestors(self, key):
+        """Keys from the node's parent up to its root."""
+        chain = []
+        key = self.nodes[key]["parent"]
+        while key and key not in chain:
+            chain.append(key)
+            key = self.nodes[key]["parent"]
+        return chain
+
+    def _effective_columns(self, key):
+        """
+        Columns of a content type by internal name. Content types whose
+        columns were not read inherit their parent's effective columns.
+
+        Returns:
+            Dict of column name to column entry, or None if no content type
+            in the chain has columns
+        """
+        node = self.nodes[key]
+        if node["columns"] is not None:
+            return {column["name"]: column for column in node["columns"]}
+        if node["parent"]:
+            return self.effective_columns(node["parent"])
+        return None
+
+    def _origin(self, key, name):
+        """Key of the topmost ancestor that has the column, i.e. where it was added."""
+        parent_key = self.nodes[key]["parent"]
+        parent_columns = self.effective_columns(parent_key) if parent_key else None
+        if parent_columns and name in parent_columns:
+            return self.origin(parent_key, name)
+        return key
+
+    def find(self, name_or_id, scopes=("hub", "site")):
+        """Nodes whose content type id or name matches, case-insensitively."""
+        wanted = name_or_id.lower()
+        return [node for node in self.nodes.values()
+                if node["scope"] in scopes and wanted in (node["key"][2], (node["name"] or "").lower())]
+
+    def compared(self):
+        """
+        Keys of the content types the report compares with their parent:
+        list content types, and site content types published from the hub.
+        """
+        return [key for key, node in self.nodes.items()
+                if node["scope"] == "list" or (node["scope"] == "site" and node["parent"]
+                                               and node["parent"][0] == "hub")]
+
+    def needed(self):
+        """Keys of the compared content types and their ancestors."""
+        keys = set()
+        for key in self.compared():
+            keys.add(key)
+            keys.update(self.ancestors(key))
+        return keys
+
+    def compare(self, key):
+        """
+        Compare a content type with its parent.
+
+        Returns:
+            Dict with status (matches, diverged, orphaned or unknown) and the
+            added, removed and changed columns and renamed flag
+        """
+        node = self.nodes[key]
+        parent = self.parent(key)
+        result = {"status": "orphaned", "renamed": False, "added": [], "removed": [], "changed": []}
+        if parent is None:
+            return result
+        columns = self.effective_columns(key) if node["columns"] is not None else None
+        parent_columns = self.effective_columns(parent["key"])
+        if columns is None or parent_columns is None:
+            result["status"] = "unknown"
+            return result
+
+        result["renamed"] = (node["name"] or "") != (parent["name"] or "")
+        result["added"] = sorted(name for name in columns if name not in parent_columns)
+        result["removed"] = sorted(name for name in parent_columns if name not in columns)
+        for name in sorted(set(columns) & set(parent_columns)):
+            for prop in COMPARED_PROPERTIES:
+                if columns[name][prop] != parent_columns[name][prop]:
+                    result["changed"].append({"column": name, "property": prop,
+                                              "parent": parent_columns[name][prop], "value": columns[name][prop]})
+        diverged = result["renamed"] or result["added"] or result["removed"] or result["changed"]
+        result["status"] = "diverged" if diverged else "matches"
+        return result
+
+    @classmethod
+    def from_inventory(cls, conn, site_url=None):
+        """Build the graph from the site and list content types in the inventory."""
+        sql = ("SELECT ct.site_url, s.site_id, ct.list_id, l.name, ct.parent_id, ct.raw FROM content_types ct "
+               "LEFT JOIN sites s ON s.site_url = ct.site_url LEFT JOIN lists l ON l.list_id = ct.list_id")
+        params = []
+        if site_url:
+            sql += " WHERE ct.site_url = ?"
+            params.append(site_url)
+        nodes = []
+        for url, site_id, list_id, list_name, parent_id, raw in conn.execute(sql, params):
+            scope = "list" if list_id else "site"
+            nodes.append(_node(scope, json.loads(raw), url, site_id, list_id, list_name, parent_id))
+        return cls(nodes)
+
+
+def add_hub(graph, token, hub_url):
+    """Add the content types of the content type hub to the graph."""
+    log_utils.info(Messages.ContentTypeGraph.HUB_LOADING, hub_url)
+    hub_id = sp.get_site_id(token, hub_url)
+    if not hub_id:
+        raise RuntimeError(f"Site not found: {hub_url}")
+    for content_type in sp.iter_content_types(token, hub_id):
+        graph.add(_node("hub", content_type, hub_url, hub_id))
+    graph.link()
+
+
+def _column_url(node):
+    list_part = f"/lists/{node['list_id']}" if node["scope"] == "list" else ""
+    return f"/sites/{node['site_id']}{list_part}/contentTypes/{node['id']}/columns?$select={COLUMN_SELECT}"
+
+
+def _column_pages(body, headers):
+    """Columns of a $batch sub-response, following its next links."""
+    yield from body.get("value", [])
+    next_link = body.get("@odata.nextLink")
+    if next_link:
+        yield from graph_http.iter_values(next_link, headers=headers)
+
+
+def fetch_columns(graph, headers, keys=None, workers=DEFAULT_WORKERS):
+    """
+    Read the columns of content types that have none yet, in parallel $batch calls.
+
+    Args:
+        graph: ContentTypeGraph
+        headers: Graph request headers
+        keys: Node keys to read (default: the compared content types and their ancestors)
+        workers: $batch requests in flight at once
+
+    Returns:
+        Number of content types whose columns were read
+    """
+    keys = graph.needed() if keys is None else keys
+    pending = [key for key in keys if graph.nodes[key]["columns"] is None and graph.nodes[key]["site_id"]]
+    if not pending:
+        return 0
+    log_utils.info(Messages.ContentTypeGraph.COLUMNS_FETCHING, len(pending))
+    batches = [pending[i:i + graph_http.BATCH_LIMIT] for i in range(0, len(pending), graph_http.BATCH_LIMIT)]
+
+    def run(batch):
+        return batch, graph_http.batch({
+            str(index): {"method": "GET", "url": _column_url(graph.nodes[key])}
+            for index, key in enumerate(batch)
+        }, headers=headers)
+
+    fetched = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for batch, results in executor.map(run, batches):
+            for index, key in enumerate(batch):
+                node = graph.nodes[key]
+                response = results.get(str(index), {})
+                if response.get("status") != 200:
+                    log_utils.warning(Messages.ContentTypeGraph.COLUMNS_FAILED, node["name"], node["id"],
+                                      response.get("status"))
+                    continue
+                node["columns"] = [_column_entry(column)
+                                   for column in _column_pages(response.get("body") or {}, headers)]
+                fetched += 1
+
+    graph.effective_columns.cache_clear()
+    graph.origin.cache_clear()
+    return fetched
+
+
+def _label(node):
+    return {"scope": node["scope"], "id": node["id"], "name": node["name"]} if node else None
+
+
+def build_report(graph, source=None):
+    """
+    Compare every list content type with its site content type, and every
+    site content type published from the hub with its hub content type.
+
+    Returns:
+        Report dict with summary, per-parent totals and the divergences
+    """
+    counts = {scope: 0 for scope in SCOPES}
+    statuses = {"matches": 0, "diverged": 0, "orphaned": 0, "unknown": 0}
+    site_diverged = 0
+    parents = {}
+    divergences = []
+
+    for key in sorted(graph.nodes, key=lambda k: (SCOPES.index(k[0]), k[1] or "", k[2])):
+        node = graph.nodes[key]
+        counts[node["scope"]] += 1
+        if node["scope"] == "hub":
+            continue
+        parent = graph.parent(key)
+        if node["scope"] == "site" and (parent is None or parent["scope"] != "hub"):
+            # Site content types are only compared with the hub content type they were published from
+            continue
+
+        result = graph.compare(key)
+        if node["scope"] == "list":
+            statuses[result["status"]] += 1
+            if parent is not None:
+                totals = parents.setdefault(parent["key"], {
+                    "site_url": parent["site_url"], "id": parent["id"], "name": parent["name"],
+                    "scope": parent["scope"], "lists": 0, "diverged": 0
+                })
+                totals["lists"] += 1
+                totals["diverged"] += result["status"] == "diverged"
+        elif result["status"] == "diverged":
+            site_diverged += 1
+
+        if result["status"] != "matches":
+            divergences.append({
+                "scope": node["scope"],
+                "site_url": node["site_url"],
+                "list_id": node["list_id"],
+                "list_name": node["list_name"],
+                "id": node["id"],
+                "name": node["name"],
+                "parent": _label(parent),
+                **result,
+                "added_from": {name: _label(graph.nodes[graph.origin(key, name)]) for name in result["added"]}
+            })
+
+    by_parent = sorted(parents.values(), key=lambda entry: (-entry["diverged"], -entry["lists"], entry["name"] or ""))
+    return {
+        "generated": datetime.now().isoformat(),
+        "source": source,
+        "summary": {
+            "content_types": counts,
+            "list_content_types": sum(statuses.values()),
+            **statuses,
+            "site_content_types_diverged": site_diverged
+        },
+        "by_parent": by_parent,
+        "divergences": divergences
+    }
+
+
+def content_type_graph(db_path=None, site_url=None, hub_url=None, fetch=True, workers=DEFAULT_WORKERS):
+    """
+    Build the content type graph from the inventory.
+
+    Args:
+        db_path: Inventory database
+        site_url: Only the content types of this site
+        hub_url: Content type hub to add (optional)
+        fetch: Read missing columns from Graph
+        workers: $batch requests in flight at once
+
+    Raises:
+        FileNotFoundError: If the inventory does not exist
+        RuntimeError: If Graph cannot be reached
+    """
+    conn = sp_inventory.connect_readonly(db_path or sp_inventory.DEFAULT_INVENTORY_PATH)
+    try:
+        graph = ContentTypeGraph.from_inventory(conn, site_url)
+    finally:
+        conn.close()
+
+    if hub_url or fetch:
+        token = sp.get_access_token()
+        if not token:
+            raise RuntimeError("Failed to get access token")
+        if hub_url:
+            try:
+                add_hub(graph, token, hub_url)
+            except RuntimeError as e:
+                log_utils.warning(Messages.ContentTypeGraph.HUB_FAILED, e)
+        if fetch:
+            fetch_columns(graph, graph_http.auth_headers(token), workers=workers)
+
+    counts = {scope: sum(1 for key in graph.nodes if key[0] == scope) for scope in SCOPES}
+    log_utils.info(Messages.ContentTypeGraph.GRAPH_LOADED, counts["hub"], counts["site"], counts["list"])
+    return graph
+
+
+def show(graph, name_or_id):
+    """Log the parent chain and effective columns of matching hub and site content types."""
+    nodes = graph.find(name_or_id)
+    if not nodes:
+        log_utils.error(Messages.ContentTypeGraph.NOT_FOUND, name_or_id)
+        return False
+    for node in nodes:
+        chain = [node["key"]] + graph.ancestors(node["key"])
+        log_utils.info(Messages.ContentTypeGraph.SHOW_CHAIN, node["scope"], node["name"], node["id"],
+                       node["site_url"], " → ".join(graph.nodes[key]["name"] or key[2] for key in chain))
+        for name, column in sorted((graph.effective_columns(node["key"]) or {}).items()):
+            origin = graph.nodes[graph.origin(node["key"], name)]
+            log_utils.info(Messages.ContentTypeGraph.SHOW_COLUMN, column["display_name"] or name,
+                           " (required)" if column["required"] else "", origin["name"])
+    return True
+
+
+def main():
+    """Content type inheritance and divergence report."""
+    parser = argparse.ArgumentParser(
+        description='SharePoint Content Type Graph - Report lists whose content types diverge from the site',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Compare the list content types in the inventory with their site content types
+  python sp_content_types.py --db ./extracted_schemas/inventory.db --output content_types.json
+
+  # Include the content type hub and one site only
+  python sp_content_types.py --site "https://contoso.sharepoint.com/sites/Finance" --hub
+
+  # Inheritance chain and effective columns of a content type
+  python sp_content_types.py --show "Invoice"
+        """
+    )
+
+    parser.add_argument('--db', default=sp_inventory.DEFAULT_INVENTORY_PATH,
+                        help=f'Inventory database (default: {sp_inventory.DEFAULT_INVENTORY_PATH})')
+    parser.add_argument('--site', help='Only the content types of this site')
+    parser.add_argument('--hub', nargs='?', const='', metavar='URL',
+                        help='Add the content type hub (default: /sites/contentTypeHub of the tenant)')
+    parser.add_argument('--offline', action='store_true',
+                        help='Do not read content type columns from Graph (only columns already in the inventory)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'$batch requests in flight at once (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--top', type=int, default=10, help='Site content types with the most diverged lists to show')
+    parser.add_argument('--show', metavar='NAME_OR_ID', help='Show the parent chain and columns of a content type')
+    parser.add_argument('--output', help='Path to save the report (default: auto-generated filename)')
+
+    args = parser.parse_args()
+
+    try:
+        hub_url = args.hub
+        if hub_url == '':
+            conn = sp_inventory.connect_readonly(args.db)
+            try:
+                row = conn.execute("SELECT site_url FROM sites LIMIT 1").fetchone()
+            finally:
+                conn.close()
+            hub_url = hub_url_for(args.site or row[0]) if (args.site or row) else None
+
+        graph = content_type_graph(args.db, args.site, hub_url, fetch=not args.offline, workers=args.workers)
+    except RuntimeError as e:
+        log_utils.error(str(e))
+        return 1
+    except FileNotFoundError:
+        return 1
+
+    if args.show:
+        return 0 if show(graph, args.show) else 1
+
+    report = build_report(graph, args.db)
+    summary = report["summary"]
+    log_utils.info(Messages.ContentTypeGraph.SUMMARY_HEADER)
+    log_utils.info(Messages.ContentTypeGraph.SUMMARY_COUNTS, summary["list_content_types"], summary["matches"],
+                   summary["diverged"], summary["orphaned"], summary["unknown"])
+    if hub_url:
+        log_utils.info(Messages.ContentTypeGraph.SUMMARY_SITE, summary["site_content_types_diverged"])
+
+    top = [entry for entry in report["by_parent"][:args.top] if entry["diverged"]]
+    if top:
+        log_utils.info(Messages.ContentTypeGraph.TOP_HEADER)
+        for entry in top:
+            log_utils.info(Messages.ContentTypeGraph.TOP_ITEM, entry["name"], entry["site_url"] or "hub",
+                           entry["diverged"], entry["lists"])
+
+    output_path = args.output
+    if not output_path:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = f"./extracted_schemas/content_types_{timestamp}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)) or '.', exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    log_utils.info(Messages.ContentTypeGraph.REPORT_SAVED, output_path)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+# file: workflows/common/sp_inventory.py
+"""
+SharePoint Inventory - Local SQLite database of sites, lists, columns,
+content types and items.
+
+Comprehensive extractions (sp_metadata_tool.py --comprehensive --inventory)
+and item crawls (sp_item_crawler.py --inventory) are loaded into one
+database with bulk inserts in large transactions, so the read-only
+analysis commands can run offline against it instead of re-parsing JSON
+files or calling Graph. The database uses WAL mode, so reports can read
+while a crawl is writing.
+
+Schema:
+
+    sites           one row per site
+        site_url        TEXT PRIMARY KEY
+        site_id         TEXT     Graph site id
+        extraction_date TEXT     ISO timestamp of the last schema extraction
+        features        TEXT     JSON of the extracted site features
+
+    lists           one row per list or library
+        list_id         TEXT PRIMARY KEY
+        site_url        TEXT     -> sites.site_url
+        name            TEXT     display name
+        is_document_library INTEGER (1/0, NULL if unknown)
+        drive_id        TEXT     set by the item crawler
+        default_label   TEXT     retention label of the library root folder
+        last_crawl      TEXT     ISO timestamp of the last item crawl
+        settings        TEXT     JSON of the list settings (detailed extractions)
+
+    columns         site columns (list_id NULL) and list columns
+        site_url, list_id, list_name
+        position        INTEGER  order of the column in its list
+        internal_name, display_name, type, term_set   (case-insensitive)
+        is_site_column  INTEGER  list column backed by a site column (1/0/NULL)
+        required        INTEGER
+        field           TEXT     JSON of the extracted field (as in --comprehensive output)
+
+    content_types   site content types (list_id NULL) and list content types
+        site_url, list_id, content_type_id, name, parent_id
+        raw             TEXT     JSON of the Graph contentType
+
+    items           one row per file, keyed by (drive_id, item_id)
+        site_url, list_id, library, list_item_id, name, folder, web_url,
+        size (INTEGER bytes), created, modified, modified_by, quick_xor_hash,
+        mime_type, content_type, retention_label (NULL when unlabeled)
+        fields          TEXT     JSON of the list item field values
+        fields_error    INTEGER  1 if the list item could not be read (no fields or label)
+        crawled         TEXT     ISO start time of the library crawl that wrote the
+                                 record (load time if the crawl is unknown)
+
+    column_usage    view with the columns of sp_column_index.py, so
+                    `sp_column_index.py --index inventory.db ...` queries
+                    the inventory directly
+"""
+
+import os
+import sys
+import json
+import glob
+import sqlite3
+import argparse
+from datetime import datetime
+
+from workflows.common import log_utils
+from workflows.common import sp_metadata_utils as sp
+from workflows.common.sp_column_index import _term_set_id
+from workflows.common.log_utils import Messages
+
+# Initialize logging
+log_utils.setup_logging()
+
+DEFAULT_INVENTORY_PATH = "./extracted_schemas/inventory.db"
+SCHEMA_VERSION = 2
+
+# Rows per transaction when bulk loading items
+ITEM_BATCH_SIZE = 50000
+
+INVENTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sites (
+    site_url TEXT PRIMARY KEY,
+    site_id TEXT,
+    extraction_date TEXT,
+    features TEXT
+);
+CREATE TABLE IF NOT EXISTS lists (
+    list_id TEXT PRIMARY KEY,
+    site_url TEXT NOT NULL,
+    name TEXT,
+    is_document_library INTEGER,
+    drive_id TEXT,
+    default_label TEXT,
+    last_crawl TEXT,
+    settings TEXT
+);
+CREATE TABLE IF NOT EXISTS columns (
+    site_url TEXT NOT NULL,
+    list_id TEXT,
+    list_name TEXT,
+    position INTEGER,
+    internal_name TEXT COLLATE NOCASE,
+    display_name TEXT COLLATE NOCASE,
+    type TEXT COLLATE NOCASE,
+    term_set TEXT COLLATE NOCASE,
+    is_site_column INTEGER,
+    required INTEGER,
+    field TEXT
+);
+CREATE TABLE IF NOT EXISTS content_types (
+    site_url TEXT NOT NULL,
+    list_id TEXT,
+    content_type_id TEXT,
+    name TEXT,
+    parent_id TEXT,
+    raw TEXT
+);
+CREATE TABLE IF NOT EXISTS items (
+    drive_id TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    site_url TEXT,
+    list_id TEXT,
+    library TEXT,
+    list_item_id TEXT,
+    name TEXT,
+    folder TEXT,
+    web_url TEXT,
+    size INTEGER,
+    created TEXT,
+    modified TEXT,
+    modified_by TEXT,
+    quick_xor_hash TEXT,
+    mime_type TEXT,
+    content_type TEXT,
+    retention_label TEXT,
+    fields TEXT,
+    fields_error INTEGER,
+    crawled TEXT,
+    PRIMARY KEY (drive_id, item_id)
+);
+CREATE INDEX IF NOT EXISTS idx_lists_site ON lists(site_url);
+CREATE INDEX IF NOT EXISTS idx_lists_drive ON lists(drive_id);
+CREATE INDEX IF NOT EXISTS idx_columns_site_list ON columns(site_url, list_id);
+CREATE INDEX IF NOT EXISTS idx_columns_internal_name ON columns(internal_name);
+CREATE INDEX IF NOT EXISTS idx_columns_display_name ON columns(display_name);
+CREATE INDEX IF NOT EXISTS idx_columns_type ON columns(type);
+CREATE INDEX IF NOT EXISTS idx_columns_term_set ON columns(term_set);
+CREATE INDEX IF NOT EXISTS idx_content_types_site_list ON content_types(site_url, list_id);
+CREATE INDEX IF NOT EXISTS idx_items_site ON items(site_url, list_id, retention_label, fields_error, size);
+CREATE INDEX IF NOT EXISTS idx_items_list ON items(list_id, retention_label);
+CREATE INDEX IF NOT EXISTS idx_items_label ON items(retention_label);
+CREATE INDEX IF NOT EXISTS idx_items_content_type ON items(content_type);
+CREATE INDEX IF NOT EXISTS idx_items_modified ON items(modified);
+CREATE VIEW IF NOT EXISTS column_usage AS
+    SELECT site_url, list_name, internal_name, display_name, type, term_set, is_site_column
+    FROM columns WHERE list_id IS NOT NULL;
+"""
+
+ITEM_COLUMNS = ("drive_id", "item_id", "site_url", "list_id", "library", "list_item_id", "name", "folder",
+                "web_url", "size", "created", "modified", "modified_by", "quick_xor_hash", "mime_type",
+                "content_type", "retention_label", "fields", "fields_error", "crawled")
+
+
+class InventoryMessages:
+    """Inventory database related messages."""
+    SITE_LOADED = "Loaded {} into the inventory ({} lists, {} columns)"
+    ITEMS_LOADED = "Loaded {} item records into the inventory ({} deleted)"
+    LOAD_START = "Loading {} extraction files from {}"
+    LOAD_FILE_ERROR = "Skipping {}: {}"
+    INVENTORY_MISSING = "Inventory not found: {}"
+    STATS = "{}: {} sites, {} lists, {} columns, {} content types, {} items"
+    SNAPSHOT_SAVED = "Saved inventory snapshot to {}"
+    SNAPSHOT_EXISTS = "Snapshot file already exists: {}"
+
+# Register message class
+if not hasattr(Messages, 'Inventory'):
+    setattr(Messages, 'Inventory', InventoryMessages)
+
+
+def _migrate(conn):
+    """Upgrade an inventory created by an older version to SCHEMA_VERSION."""
+    (version,) = conn.execute("PRAGMA user_version").fetchone()
+    items_exist = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'items'").fetchone()
+    if version < 2 and items_exist and not has_column(conn, "items", "fields_error"):
+        with conn:
+            conn.execute("ALTER TABLE items ADD COLUMN fields_error INTEGER")
+            # Recreated by INVENTORY_SCHEMA with fields_error, so coverage stays index-only
+            conn.execute("DROP INDEX IF EXISTS idx_items_site")
+
+
+def connect(path=DEFAULT_INVENTORY_PATH):
+    """Open (and create if needed) the inventory database for writing."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)) or '.', exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    _migrate(conn)
+    conn.executescript(INVENTORY_SCHEMA)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return conn
+
+
+def connect_readonly(path=DEFAULT_INVENTORY_PATH, check_same_thread=True):
+    """
+    Open the inventory for offline analysis.
+
+    Args:
+        path: Inventory database
+        check_same_thread: False to read the connection from another thread
+                           (e.g. a pyarrow writer pulling record batches)
+
+    Raises:
+        FileNotFoundError: If the inventory does not exist
+    """
+    if not os.path.exists(path):
+        log_utils.error(Messages.Inventory.INVENTORY_MISSING, path)
+        raise FileNotFoundError(path)
+    return sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True, check_same_thread=check_same_thread)
+
+
+def has_column(conn, table, column):
+    """Whether a table has a column (older inventories and snapshots may lack newer ones)."""
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
+def _dumps(value):
+    return None if value is None else json.dumps(value)
+
+
+def _flag(value):
+    return None if value is None else int(bool(value))
+
+
+def load_site_schema(conn, site_schema, all_lists=True):
+    """
+    Replace a site's schema in the inventory with a comprehensive extraction.
+
+    Args:
+        conn: Inventory connection
+        site_schema: Output of extract_comprehensive_site_schema
+        all_lists: The extraction covers every list of the site, so lists
+                   missing from it are removed (False for --list extractions)
+    """
+    site_url = site_schema["site_url"]
+    lists = site_schema.get("lists", [])
+    column_rows = []
+
+    for position, column in enumerate(site_schema.get("site_columns") or []):
+        field = {
+            "name": column.get("displayName"),
+            "type": sp.map_sp_type_to_schema(column),
+            "description": column.get("description", ""),
+            "internal_name": column.get("name"),
+            "raw_column_data": column
+        }
+        column_rows.append((site_url, None, None, position, column.get("name"), field["name"],
+                            field["type"], _term_set_id(field), None, _flag(column.get("required")),
+                            json.dumps(field)))
+
+    for lst in lists:
+        for position, field in enumerate(lst.get("columns", [])):
+            raw = field.get("raw_column_data") or {}
+            column_rows.append((site_url, lst.get("id"), lst.get("name"), position,
+                                field.get("internal_name") or raw.get("name"), field.get("name"),
+                                field.get("type"), _term_set_id(field), _flag(field.get("is_site_column")),
+                                _flag(field.get("required", raw.get("required"))), json.dumps(field)))
+
+    content_type_rows = [
+        (site_url, None, ct.get("id"), ct.get("name"), ct.get("parentId") or (ct.get("base") or {}).get("id"),
+         json.dumps(ct))
+        for ct in site_schema.get("content_types") or []
+    ]
+    for lst in lists:
+        for ct in lst.get("content_types") or (lst.get("settings") or {}).get("contentTypes") or []:
+            content_type_rows.append((site_url, lst.get("id"), ct.get("id"), ct.get("name"),
+                                      (ct.get("parentId") or (ct.get("base") or {}).get("id")), json.dumps(ct)))
+
+    with conn:
+        conn.execute(
+            "INSERT INTO sites (site_url, site_id, extraction_date, features) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(site_url) DO UPDATE SET site_id = excluded.site_id, "
+            "extraction_date = excluded.extraction_date, features = excluded.features",
+            (site_url, site_schema.get("site_id"), site_schema.get("extraction_date"),
+             _dumps(site_schema.get("features")))
+        )
+        list_ids = [lst.get("id") for lst in lists]
+        placeholders = ','.join('?' * len(list_ids))
+        if all_lists:
+            conn.execute("DELETE FROM columns WHERE site_url = ?", (site_url,))
+            conn.execute("DELETE FROM content_types WHERE site_url = ?", (site_url,))
+            # Crawl information (drive, default label) is kept for lists that still exist
+            conn.execute(f"DELETE FROM lists WHERE site_url = ? AND list_id NOT IN ({placeholders})",
+                         [site_url] + list_ids)
+        else:
+            for table, key in (("columns", "site_columns"), ("content_types", "content_types")):
+                conn.execute(f"DELETE FROM {table} WHERE site_url = ? AND list_id IN ({placeholders})",
+                             [site_url] + list_ids)
+                if key in site_schema:
+                    conn.execute(f"DELETE FROM {table} WHERE site_url = ? AND list_id IS NULL", (site_url,))
+        conn.executemany(
+            "INSERT INTO lists (list_id, site_url, name, is_document_library, settings) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(list_id) DO UPDATE SET site_url = excluded.site_url, name = excluded.name, "
+            "is_document_library = COALESCE(excluded.is_document_library, lists.is_document_library), "
+            "settings = excluded.settings",
+            [(lst.get("id"), site_url, lst.get("name"), _flag(lst.get("is_document_library")),
+              _dumps(lst.get("settings"))) for lst in lists]
+        )
+        conn.executemany("INSERT INTO columns VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", column_rows)
+        conn.executemany("INSERT INTO content_types VALUES (?, ?, ?, ?, ?, ?)", content_type_rows)
+
+    log_utils.info(Messages.Inventory.SITE_LOADED, site_url, len(lists), len(column_rows))
+
+
+class ItemLoader:
+    """
+    Bulk loader for item crawler records.
+
+    Records are buffered and written with executemany in transactions of
+    ITEM_BATCH_SIZE rows; call flush() (or use as a context manager) to
+    write the rest. With batch_size=None nothing is written until flush(),
+    so the caller decides where transactions end.
+
+    Only the last queued record of each (drive_id, item_id) is kept, so a
+    file deleted and re-added (or re-added and deleted) within one batch
+    ends up as it was last seen, as if the records were applied in order.
+
+    A "resync" record ends a full crawl of a drive: rows of the drive
+    written by earlier crawls and not written again since are removed.
+    """
+
+    def __init__(self, conn, batch_size=ITEM_BATCH_SIZE):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.loaded = 0
+        self.deleted = 0
+        # (drive_id, item_id) -> item row, or None for a delete
+        self._items = {}
+        self._libraries = []
+        # (drive_id, since) of completed full crawls, applied after the upserts
+        self._resyncs = []
+        # drive_id -> start time of its current crawl
+        self._crawled = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    @property
+    def pending(self):
+        """Records queued but not yet written."""
+        return len(self._items) + len(self._libraries) + len(self._resyncs)
+
+    def add(self, record):
+        """Queue one crawler record (library, item or deleted item)."""
+        kind = record.get("record")
+        if kind == "library":
+            self._libraries.append((record["list_id"], record["site_url"], record.get("name"), 1,
+                                    record.get("drive_id"), record.get("default_label"), record.get("crawled")))
+            self._crawled[record.get("drive_id")] = record.get("crawled")
+        elif kind == "resync":
+            self._resyncs.append((record["drive_id"], record["since"]))
+        elif record.get("deleted"):
+            self._items[(record["drive_id"], record["item_id"])] = None
+        elif kind == "item":
+            row = dict(record, fields=_dumps(record.get("fields")), fields_error=int(bool(record.get("fields_error"))),
+                       crawled=self._crawled.get(record["drive_id"]) or datetime.now().isoformat())
+            self._items[(record["drive_id"], record["item_id"])] = tuple(row.get(column) for column in ITEM_COLUMNS)
+
+        if self.batch_size and self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write all queued records in one transaction."""
+        if not (self._items or self._libraries or self._resyncs):
+            return
+        upserts = [row for row in self._items.values() if row is not None]
+        deletes = [key for key, row in self._items.items() if row is None]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO lists (list_id, site_url, name, is_document_library, drive_id, default_label, "
+                "last_crawl) VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(list_id) DO UPDATE SET "
+                "drive_id = excluded.drive_id, default_label = excluded.default_label, "
+                "last_crawl = excluded.last_crawl, is_document_library = 1",
+                self._libraries
+            )
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO items ({', '.join(ITEM_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(ITEM_COLUMNS))})",
+                upserts
+            )
+            self.conn.executemany("DELETE FROM items WHERE drive_id = ? AND item_id = ?", deletes)
+            for drive_id, since in self._resyncs:
+                self.deleted += self.conn.execute("DELETE FROM items WHERE drive_id = ? AND crawled < ?",
+                                                  (drive_id, since)).rowcount
+        self.loaded += len(upserts)
+        self.deleted += len(deletes)
+        self._items, self._libraries, self._resyncs = {}, [], []
+
+
+def load_item_files(conn, paths):
+    """
+    Load item crawler JSON Lines files in order (later records win).
+
+    Returns:
+        Tuple of (items loaded, items deleted)
+    """
+    with ItemLoader(conn) as loader:
+        for path in paths:
+            with open(path) as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        loader.add(json.loads(line))
+                    except json.JSONDecodeError as e:
+                        # A crawl killed mid-write can leave a partial last line
+                        log_utils.warning(Messages.Inventory.LOAD_FILE_ERROR, path, e)
+    log_utils.info(Messages.Inventory.ITEMS_LOADED, loader.loaded, loader.deleted)
+    return loader.loaded, loader.deleted
+
+
+def load_schema_files(conn, source_dir):
+    """Load the newest comprehensive extraction file of each site in a directory."""
+    files = sp.latest_extraction_files(sorted(glob.glob(os.path.join(source_dir, "**", "*.json"), recursive=True)))
+    log_utils.info(Messages.Inventory.LOAD_START, len(files), source_dir)
+    loaded = 0
+    for path in files:
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except Exception as e:
+            log_utils.warning(Messages.Inventory.LOAD_FILE_ERROR, path, e)
+            continue
+        if isinstance(data, dict) and "site_url" in data and "lists" in data:
+            load_site_schema(conn, data)
+            loaded += 1
+    return loaded
+
+
+def iter_extractions(conn, site_url=None):
+    """
+    Yield the inventory's sites in comprehensive extraction output form
+    (site_url, site_id and lists with their columns), for the analysis
+    commands that read extraction files.
+    """
+    sql = "SELECT site_url, site_id FROM sites"
+    params = []
+    if site_url:
+        sql += " WHERE site_url = ?"
+        params.append(site_url)
+
+    for url, site_id in conn.execute(sql + " ORDER BY site_url", params).fetchall():
+        lists = {}
+        for list_id, name in conn.execute(
+                "SELECT list_id, name FROM lists WHERE site_url = ? ORDER BY name", (url,)):
+            lists[list_id] = {"name": name, "id": list_id, "columns": []}
+        for list_id, field in conn.execute(
+                "SELECT list_id, field FROM columns WHERE site_url = ? AND list_id IS NOT NULL "
+                "ORDER BY list_id, position", (url,)):
+            if list_id in lists:
+                lists[list_id]["columns"].append(json.loads(field))
+        yield {"site_url": url, "site_id": site_id, "lists": list(lists.values())}
+
+
+def get_list_schema(conn, site_url, list_name):
+    """
+    Get one list's schema from the inventory in extract_metadata_schema form.
+
+    Returns:
+        Schema dict (workflow + metadata), or None if the list is not in the inventory
+    """
+    row = conn.execute(
+        "SELECT list_id FROM lists WHERE site_url IN (?, ?) AND name = ?",
+        (site_url.rstrip("/"), site_url.rstrip("/") + "/", list_name)
+    ).fetchone()
+    if row is None:
+        return None
+    fields = [json.loads(field) for (field,) in conn.execute(
+        "SELECT field FROM columns WHERE list_id = ? ORDER BY position", row)]
+    return {"workflow": list_name.lower().replace(" ", "_"), "metadata": fields}
+
+
+def snapshot(conn, path):
+    """
+    Write a consistent, compacted copy of the inventory to path (for
+    sp_inventory_diff.py). Works while a crawl is writing.
+    """
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)) or '.', exist_ok=True)
+    conn.execute("VACUUM INTO ?", (path,))
+    log_utils.info(Messages.Inventory.SNAPSHOT_SAVED, path)
+
+
+def inventory_stats(conn):
+    """Row counts per table."""
+    return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("sites", "lists", "columns", "content_types", "items")}
+
+
+def main():
+    """Load extraction and crawl output into the inventory database."""
+    parser = argparse.ArgumentParser(
+        description='SharePoint Inventory - Load extraction and crawl output into a local database',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Load saved --comprehensive output and crawler files
+  python sp_inventory.py --load-schemas ./extracted_schemas --load-items ./extracted_items/*.jsonl
+
+  # Show what the inventory contains
+  python sp_inventory.py --stats
+
+  # Keep a copy to compare with later (sp_inventory_diff.py)
+  python sp_inventory.py --snapshot ./snapshots/inventory_2026-10-19.db
+        """
+    )
+
+    parser.add_argument('--db', default=DEFAULT_INVENTORY_PATH,
+                        help=f'Inventory database (default: {DEFAULT_INVENTORY_PATH})')
+    parser.add_argument('--load-schemas', metavar='DIR', help='Load comprehensive extraction output from DIR')
+    parser.add_argument('--load-items', metavar='FILE', nargs='+',
+                        help='Load item crawler JSON Lines files (in the order given)')
+    parser.add_argument('--stats', action='store_true', help='Show row counts')
+    parser.add_argument('--snapshot', metavar='FILE', help='Write a copy of the inventory to FILE')
+
+    args = parser.parse_args()
+
+    if not (args.load_schemas or args.load_items or args.stats or args.snapshot):
+        parser.print_help()
+        return 1
+
+    if args.load_schemas or args.load_items:
+        conn = connect(args.db)
+        if args.load_schemas:
+            load_schema_files(conn, args.load_schemas)
+        if args.load_items:
+            load_item_files(conn, args.load_items)
+        conn.close()
+
+    if args.snapshot:
+        conn = connect_readonly(args.db)
+        try:
+            snapshot(conn, args.snapshot)
+        except FileExistsError:
+            log_utils.error(Messages.Inventory.SNAPSHOT_EXISTS, args.snapshot)
+            return 1
+        finally:
+            conn.close()
+
+    if args.stats:
+        conn = connect_readonly(args.db)
+        counts = inventory_stats(conn)
+        conn.close()
+        log_utils.info(Messages.Inventory.STATS, args.db, counts["sites"], counts["lists"],
+                       counts["columns"], counts["content_types"], counts["items"])
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# file: workflows/common/sp_inventory_diff.py
+"""
+SharePoint Inventory Diff - Report what changed between two inventory
+snapshots (e.g. last week's and this week's crawl).
+
+Both snapshots are read in key order (site URL, list id, drive id + item
+id), which the inventory's primary keys and indexes provide, and compared
+with a merge join. Only the current row of each side is held in memory, or
+the columns of one list for field changes, so two tenant-sized snapshots
+are compared in constant memory.
+
+Changes are written as JSON Lines, one record per change:
+
+    {"level": "site",  "change": "added|removed", "site_url": ...}
+    {"level": "list",  "change": "added|removed|changed", "site_url": ..., "list_id": ..., "name": ...,
+     "changes": {"default_label": [old, new], ...}}
+    {"level": "field", "change": "added|removed|changed", "site_url": ..., "list_id": ..., "list_name": ...,
+     "field": ..., "old": {...}, "new": {...}}
+    {"level": "item",  "change": "added|removed|changed", "site_url": ..., "drive_id": ..., "item_id": ...,
+     "name": ..., "changes": {"retention_label": [old, new], ...}, "fields": [changed field names]}
+
+Field changes follow compare_schemas: fields are matched by display name
+and a field has changed when its type, description or options differ.
+Fields of lists that were added or removed as a whole are not repeated.
+
+Take snapshots with `sp_inventory.py --snapshot FILE`.
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+from itertools import groupby
+
+from workflows.common import log_utils
+from workflows.common import sp_inventory
+from workflows.common import sp_metadata_utils as sp
+from workflows.common.log_utils import Messages
+
+# Initialize logging
+log_utils.setup_logging()
+
+DIFF_LEVELS = ("sites", "lists", "fields", "items")
+
+# Item attributes compared between snapshots (crawl timestamps are not)
+ITEM_ATTRIBUTES = ("name", "folder", "size", "modified", "modified_by", "quick_xor_hash",
+                   "content_type", "retention_label")
+
+# Field properties written with field changes
+FIELD_SUMMARY_KEYS = ("name", "internal_name", "type", "description", "options", "required")
+
+# Rows fetched from each snapshot at a time
+FETCH_ROWS = 10000
+
+
+class DiffMessages:
+    """Inventory diff related messages."""
+    DIFF_START = "Comparing inventory {} with {}"
+    LEVEL_DONE = "  • {}: {} added, {} removed, {} changed"
+    DIFF_SAVED = "Saved {} changes to {}"
+
+# Register message class
+if not hasattr(Messages, 'Diff'):
+    setattr(Messages, 'Diff', DiffMessages)
+
+
+def _rows(conn, sql):
+    """Stream the rows of a query."""
+    cursor = conn.execute(sql)
+    while True:
+        rows = cursor.fetchmany(FETCH_ROWS)
+        if not rows:
+            return
+        yield from rows
+
+
+def merge_join(old_rows, new_rows, key):
+    """
+    Pair up two streams sorted by key.
+
+    Yields:
+        Tuples of (old, new); old is None for added and new is None for
+        removed entries
+    """
+    sentinel = object()
+    old_rows, new_rows = iter(old_rows), iter(new_rows)
+    old, new = next(old_rows, sentinel), next(new_rows, sentinel)
+    while old is not sentinel or new is not sentinel:
+        if new is sentinel or (old is not sentinel and key(old) < key(new)):
+            yield old, None
+            old = next(old_rows, sentinel)
+        elif old is sentinel or key(new) < key(old):
+            yield None, new
+            new = next(new_rows, sentinel)
+        else:
+            yield old, new
+            old, new = next(old_rows, sentinel), next(new_rows, sentinel)
+
+
+def _diff_sites(old_conn, new_conn):
+    sql = "SELECT site_url FROM sites ORDER BY site_url"
+    for old, new in merge_join(_rows(old_conn, sql), _rows(new_conn, sql), key=lambda row: row[0]):
+        if old is None:
+            yield {"level": "site", "change": "added", "site_url": new[0]}
+        elif new is None:
+            yield {"level": "site", "change": "removed", "site_url": old[0]}
+
+
+_LIST_COLUMNS = ("list_id", "site_url", "name", "is_document_library", "drive_id", "default_label")
+
+
+def _diff_lists(old_conn, new_conn):
+    sql = f"SELECT {', '.join(_LIST_COLUMNS)} FROM lists ORDER BY list_id"
+    for old, new in merge_join(_rows(old_conn, sql), _rows(new_conn, sql), key=lambda row: row[0]):
+        row = new or old
+        record = {"level": "list", "site_url": row[1], "list_id": row[0], "name": row[2]}
+        if old is None:
+            yield dict(record, change="added")
+        elif new is None:
+            yield dict(record, change="removed")
+        elif old != new:
+            changes = {column: [old[i], new[i]] for i, column in enumerate(_LIST_COLUMNS) if old[i] != new[i]}
+            yield dict(record, change="changed", changes=changes)
+
+
+def _list_schemas(conn):
+    """Yield ((list key, site_url), list name, schema) per list, site columns under list key ''."""
+    sql = ("SELECT COALESCE(list_id, ''), site_url, list_name, field FROM columns "
+           "ORDER BY COALESCE(list_id, ''), site_url, position")
+    for key, rows in groupby(_rows(conn, sql), key=lambda row: (row[0], row[1])):
+        rows = list(rows)
+        yield key, rows[0][2], {"metadata": [json.loads(row[3]) for row in rows]}
+
+
+def _field_summary(field):
+    return {key: field[key] for key in FIELD_SUMMARY_KEYS if key in field}
+
+
+def _diff_fields(old_conn, new_conn):
+    for old, new in merge_join(_list_schemas(old_conn), _list_schemas(new_conn), key=lambda entry: entry[0]):
+        if old is None or new is None:
+            continue
+        (list_key, site_url), list_name, old_schema = old
+        new_schema = new[2]
+        comparison = sp.compare_schemas(old_schema, new_schema)
+        if not any(comparison.values()):
+            continue
+
+        record = {"level": "field", "site_url": site_url, "list_id": list_key or None, "list_name": list_name}
+        old_fields = {field["name"]: field for field in old_schema["metadata"]}
+        for field in comparison["to_add"]:
+            yield dict(record, change="added", field=field["name"], new=_field_summary(field))
+        for field in comparison["to_remove"]:
+            yield dict(record, change="removed", field=field["name"], old=_field_summary(field))
+        for field in comparison["to_update"]:
+            yield dict(record, change="changed", field=field["name"],
+                       old=_field_summary(old_fields[field["name"]]), new=_field_summary(field))
+
+
+def _changed_field_names(old_json, new_json):
+    old_fields = json.loads(old_json) if old_json else {}
+    new_fields = json.loads(new_json) if new_json else {}
+    return sorted(name for name in old_fields.keys() | new_fields.keys()
+                  if old_fields.get(name) != new_fields.get(name))
+
+
+def _diff_items(old_conn, new_conn):
+    columns = ("drive_id", "item_id", "site_url") + ITEM_ATTRIBUTES + ("fields",)
+    sql = f"SELECT {', '.join(columns)} FROM items ORDER BY drive_id, item_id"
+    compared = columns.index("name")
+
+    for old, new in merge_join(_rows(old_conn, sql), _rows(new_conn, sql), key=lambda row: (row[0], row[1])):
+        row = new or old
+        record = {"level": "item", "site_url": row[2], "drive_id": row[0], "item_id": row[1], "name": row[3]}
+        if old is None:
+            yield dict(record, change="added")
+        elif new is None:
+            yield dict(record, change="removed")
+        elif old[compared:] != new[compared:]:
+            changes = {column: [old[i], new[i]] for i, column in enumerate(columns[:-1])
+                       if i >= compared and old[i] != new[i]}
+            fields = _changed_field_names(old[-1], new[-1]) if old[-1] != new[-1] else []
+            # The same values serialized in another key order are not a change
+            if changes or fields:
+                yield dict(record, change="changed", changes=changes, fields=fields)
+
+
+_LEVEL_DIFFS = {"sites": _diff_sites, "lists": _diff_lists, "fields": _diff_fields, "items": _diff_items}
+
+
+def diff_inventories(old_path, new_path, levels=DIFF_LEVELS):
+    """
+    Compare two inventory snapshots.
+
+    Args:
+        old_path: Earlier inventory database
+        new_path: Later inventory database
+        levels: Levels to compare (sites, lists, fields, items)
+
+    Returns:
+        Iterator of change records, in level order
+
+    Raises:
+        FileNotFoundError: If a snapshot does not exist
+    """
+    old_conn = sp_inventory.connect_readonly(old_path)
+    new_conn = sp_inventory.connect_readonly(new_path)
+
+    def changes():
+        try:
+            for level in DIFF_LEVELS:
+                if level in levels:
+                    yield from _LEVEL_DIFFS[level](old_conn, new_conn)
+        finally:
+            old_conn.close()
+            new_conn.close()
+
+    return changes()
+
+
+def main():
+    """Streaming diff of two inventory snapshots."""
+    parser = argparse.ArgumentParser(
+        description='SharePoint Inventory Diff - Report changes between two inventory snapshots',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Keep a snapshot of this week's inventory
+  python sp_inventory.py --snapshot ./snapshots/inventory_2026-10-19.db
+
+  # Everything that changed since last week
+  python sp_inventory_diff.py ./snapshots/inventory_2026-10-12.db ./snapshots/inventory_2026-10-19.db --output changes.jsonl
+
+  # Schema changes only
+  python sp_inventory_diff.py old.db new.db --levels lists fields
+        """
+    )
+
+    parser.add_argument('old', help='Earlier inventory snapshot')
+    parser.add_argument('new', help='Later inventory snapshot')
+    parser.add_argument('--levels', nargs='+', choices=DIFF_LEVELS, default=list(DIFF_LEVELS),
+                        help='Levels to compare (default: all)')
+    parser.add_argument('--output', help='JSON Lines file for the changes (default: auto-generated filename)')
+
+    args = parser.parse_args()
+
+    output_path = args.output
+    if not output_path:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = f"./extracted_schemas/inventory_diff_{timestamp}.jsonl"
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)) or '.', exist_ok=True)
+
+    try:
+        changes = diff_inventories(args.old, args.new, args.levels)
+    except FileNotFoundError:
+        return 1
+
+    log_utils.info(Messages.Diff.DIFF_START, args.old, args.new)
+    counts = {level: {"added": 0, "removed": 0, "changed": 0} for level in ("site", "list", "field", "item")}
+    with open(output_path, 'w') as f:
+        for change in changes:
+            f.write(json.dumps(change) + "\n")
+            counts[change["level"]][change["change"]] += 1
+
+    for level, level_counts in counts.items():
+        if f"{level}s" in args.levels:
+            log_utils.info(Messages.Diff.LEVEL_DONE, f"{level}s", level_counts["added"],
+                           level_counts["removed"], level_counts["changed"])
+    log_utils.info(Messages.Diff.DIFF_SAVED, sum(sum(c.values()) for c in counts.values()), output_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# file: workflows/common/sp_inventory_export.py
+"""
+SharePoint Inventory Export - Write the inventory database as columnar
+Parquet or Arrow IPC datasets for dataframe analysis.
+
+Each table is exported to its own directory under the output directory:
+
+    sites/      site_url, site_id, extraction_date
+    lists/      list_id, site_url, name, is_document_library, drive_id,
+                default_label, last_crawl
+    fields/     one row per site or list column, partitioned by site_url;
+                choices is a list<string> with choice_count next to it, and
+                field holds the full extracted field as JSON
+    items/      one row per file, partitioned by site_url; size is int64,
+                created/modified are UTC timestamps, fields holds the
+                list item field values as JSON and fields_error marks
+                files whose list item could not be read
+
+Repeated strings (site URLs, list names, column types, content types,
+retention labels, ...) are dictionary-encoded, so they load as pandas
+categoricals. Rows are streamed from SQLite in record batches, so the
+export runs in constant memory whatever the size of the inventory.
+
+pyarrow is an optional dependency, needed only for the export:
+
+    pip install pyarrow
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+from datetime import datetime, timezone
+
+from workflows.common import log_utils
+from workflows.common import sp_inventory
+from workflows.common.log_utils import Messages
+
+# Initialize logging
+log_utils.setup_logging()
+
+DEFAULT_EXPORT_DIR = "./extracted_schemas/export"
+EXPORT_TABLES = ("sites", "lists", "fields", "items")
+
+# Rows read from SQLite per record batch
+BATCH_ROWS = 100000
+
+# Tables written as one partition directory per site
+PARTITIONED_TABLES = ("fields", "items")
+
+# Partition files kept open at once. Rows arrive ordered by site_url, so a
+# site's file is complete once the next site starts; closing the least
+# recently used file only costs a new file for a site that comes back.
+MAX_OPEN_FILES = 512
+
+
+class ExportMessages:
+    """Inventory export related messages."""
+    EXPORT_START = "Exporting {} to {} ({})"
+    TABLE_EXPORTED = "  • {}: {} rows"
+    EXPORT_DONE = "Export complete: {}"
+
+# Register message class
+if not hasattr(Messages, 'Export'):
+    setattr(Messages, 'Export', ExportMessages)
+
+
+def _import_pyarrow():
+    """Import pyarrow, explaining how to install it when it is missing."""
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+    except ImportError:
+        raise ImportError("The inventory export requires pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def _table_schema(pa, table):
+    """Arrow schema of an exported table."""
+    text = pa.string()
+    category = pa.dictionary(pa.int32(), pa.string())
+    local_time = pa.timestamp("us")
+    utc_time = pa.timestamp("us", tz="UTC")
+
+    schemas = {
+        "sites": [
+            ("site_url", text), ("site_id", text), ("extraction_date", local_time)
+        ],
+        "lists": [
+            ("list_id", text), ("site_url", category), ("name", category), ("is_document_library", pa.bool_()),
+            ("drive_id", text), ("default_label", category), ("last_crawl", local_time)
+        ],
+        "fields": [
+            ("site_url", category), ("list_id", category), ("list_name", category), ("position", pa.int32()),
+            ("internal_name", category), ("display_name", category), ("type", category),
+            ("required", pa.bool_()), ("is_site_column", pa.bool_()), ("term_set", category),
+            ("choice_count", pa.int32()), ("choices", pa.list_(text)), ("lookup_list_id", text), ("field", text)
+        ],
+        "items": [
+            ("site_url", category), ("list_id", category), ("library", category), ("drive_id", category),
+            ("item_id", text), ("list_item_id", text), ("name", text), ("folder", category), ("web_url", text),
+            ("size", pa.int64()), ("created", utc_time), ("modified", utc_time), ("modified_by", category),
+            ("quick_xor_hash", text), ("mime_type", category), ("content_type", category),
+            ("retention_label", category), ("fields", text), ("fields_error", pa.bool_())
+        ]
+    }
+    return pa.schema(schemas[table])
+
+
+# SELECTs returning the columns of _table_schema in order
+_QUERIES = {
+    "sites": "SELECT site_url, site_id, extraction_date FROM sites ORDER BY site_url",
+    "lists": "SELECT list_id, site_url, name, is_document_library, drive_id, default_label, last_crawl "
+             "FROM lists ORDER BY site_url, name",
+    "fields": "SELECT site_url, list_id, list_name, position, internal_name, display_name, type, required, "
+              "is_site_column, term_set, field FROM columns ORDER BY site_url, list_id, position",
+    "items": "SELECT site_url, list_id, library, drive_id, item_id, list_item_id, name, folder, web_url, size, "
+             "created, modified, modified_by, quick_xor_hash, mime_type, content_type, retention_label, fields, "
+             "fields_error FROM items ORDER BY site_url"
+}
+
+
+def _fields_row(row):
+    """Expand a columns row with the choice and lookup details of its field JSON."""
+    field = json.loads(row[-1]) if row[-1] else {}
+    choices = field.get("options")
+    if not isinstance(choices, list):
+        choices = None
+    lookup_list_id = (field.get("lookup") or {}).get("listId") or (field.get("lookup_target") or {}).get("list_id")
+    return row[:-1] + (len(choices) if choices is not None else None, choices, lookup_list_id, row[-1])
+
+
+def _parse_timestamp(value, tz):
+    """Parse one ISO timestamp that Arrow's cast rejected (None if unparseable)."""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    if tz is None:
+        return parsed.replace(tzinfo=None)
+    if parsed.tzinfo is None:
+        # Graph timestamps without an offset are UTC
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _column_array(pa, values, arrow_type):
+    """Build a typed Arrow array from one column of SQLite values."""
+    if pa.types.is_boolean(arrow_type):
+        return pa.array([None if value is None else bool(value) for value in values], type=arrow_type)
+    if pa.types.is_timestamp(arrow_type):
+        strings = pa.array(values, type=pa.string())
+        try:
+            return pa.compute.cast(strings, arrow_type)
+        except pa.ArrowInvalid:
+            # Mixed formats (no offset, 7 fractional digits, ...): parse per value
+            return pa.array([_parse_timestamp(value, arrow_type.tz) for value in values], type=arrow_type)
+    return pa.array(values, type=arrow_type)
+
+
+def iter_record_batches(conn, table, batch_rows=BATCH_ROWS):
+    """
+    Yield an inventory table as Arrow record batches.
+
+    Args:
+        conn: Inventory connection
+        table: One of EXPORT_TABLES
+        batch_rows: Rows per record batch
+    """
+    pa = _import_pyarrow()
+    schema = _table_schema(pa, table)
+    query = _QUERIES[table]
+    if table == "items" and not sp_inventory.has_column(conn, "items", "fields_error"):
+        # Inventory not opened for writing since fields_error was added
+        query = query.replace("fields_error", "NULL")
+    cursor = conn.execute(query)
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            return
+        if table == "fields":
+            rows = [_fields_row(row) for row in rows]
+        columns = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays(
+            [_column_array(pa, column, field.type) for column, field in zip(columns, schema)],
+            schema=schema
+        )
+
+
+def export_table(conn, table, output_dir, file_format="parquet", batch_rows=BATCH_ROWS):
+    """
+    Export one inventory table, replacing an earlier export of it.
+
+    Returns:
+        Number of rows written
+    """
+    pa = _import_pyarrow()
+    schema = _table_schema(pa, table)
+    table_dir = os.path.join(output_dir, table)
+    shutil.rmtree(table_dir, ignore_errors=True)
+
+    rows = 0
+
+    def counted(batches):
+        nonlocal rows
+        for batch in batches:
+            rows += batch.num_rows
+            yield batch
+
+    reader = pa.RecordBatchReader.from_batches(schema, counted(iter_record_batches(conn, table, batch_rows)))
+    partitioning = None
+    if table in PARTITIONED_TABLES:
+        partitioning = pa.dataset.partitioning(pa.schema([schema.field("site_url")]), flavor="hive")
+
+    pa.dataset.write_dataset(
+        reader, table_dir,
+        format="ipc" if file_format == "arrow" else "parquet",
+        partitioning=partitioning,
+        basename_template="part-{i}." + ("arrow" if file_format == "arrow" else "parquet"),
+        max_rows_per_group=batch_rows,
+        # pyarrow refuses batches spanning more than 1024 partitions by default;
+        # a batch cannot span more sites than it has rows
+        max_partitions=max(batch_rows, 1024),
+        max_open_files=MAX_OPEN_FILES,
+        existing_data_behavior="overwrite_or_ignore"
+    )
+    return rows
+
+
+def export_inventory(db_path, output_dir=DEFAULT_EXPORT_DIR, file_format="parquet", tables=EXPORT_TABLES):
+    """
+    Export inventory tables as columnar datasets.
+
+    Args:
+        db_path: Inventory database
+        output_dir: Directory to write one dataset directory per table into
+        file_format: "parquet" or "arrow" (Arrow IPC)
+        tables: Tables to export
+
+    Returns:
+        Dict of table name to rows written
+    """
+    _import_pyarrow()
+    # The dataset writer reads the batches on its own thread
+    conn = sp_inventory.connect_readonly(db_path, check_same_thread=False)
+    log_utils.info(Messages.Export.EXPORT_START, db_path, output_dir, file_format)
+    counts = {}
+    try:
+        for table in tables:
+            counts[table] = export_table(conn, table, output_dir, file_format)
+            log_utils.info(Messages.Export.TABLE_EXPORTED, table, counts[table])
+    finally:
+        conn.close()
+    log_utils.info(Messages.Export.EXPORT_DONE, output_dir)
+    return counts
+
+
+def main():
+    """Export the inventory database as Parquet or Arrow datasets."""
+    parser = argparse.ArgumentParser(
+        description='SharePoint Inventory Export - Write the inventory as Parquet or Arrow datasets',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Export every table as Parquet
+  python sp_inventory_export.py --db ./extracted_schemas/inventory.db --output ./extracted_schemas/export
+
+  # Export only the fields as Arrow IPC files
+  python sp_inventory_export.py --tables fields --format arrow
+
+  # Then, in Python: all Choice fields with more than 50 options
+  import pyarrow.dataset as ds, pyarrow.compute as pc
+  fields = ds.dataset("./extracted_schemas/export/fields", partitioning="hive")
+  fields.to_table(filter=(pc.field("type") == "Choice") & (pc.field("choice_count") > 50)).to_pandas()
+        """
+    )
+
+    parser.add_argument('--db', default=sp_inventory.DEFAULT_INVENTORY_PATH,
+                        help=f'Inventory database (default: {sp_inventory.DEFAULT_INVENTORY_PATH})')
+    parser.add_argument('--output', default=DEFAULT_EXPORT_DIR,
+                        help=f'Export directory (default: {DEFAULT_EXPORT_DIR})')
+    parser.add_argument('--format', choices=['parquet', 'arrow'], default='parquet',
+                        help='File format (default: parquet)')
+    parser.add_argument('--tables', nargs='+', choices=EXPORT_TABLES, default=list(EXPORT_TABLES),
+                        help='Tables to export (default: all)')
+
+    args = parser.parse_args()
+
+    try:
+        export_inventory(args.db, args.output, args.format, args.tables)
+    except ImportError as e:
+        log_utils.error(str(e))
+        return 1
+    except FileNotFoundError:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+# file: workflows/common/sp_item_crawler.py
+"""
+SharePoint Item Crawler - Inventory every file in document libraries.
+
+Walks each document library with the drive delta query
+(/drives/{drive-id}/root/delta) and writes one JSON Lines record per file:
+name, folder, size, modified date and author, quickXorHash, content type,
+retention label (_ComplianceTag) and the listItem field values. Field
+values are read in $batch requests of 20 items, several batches at a time.
+
+Records are appended to the output file page by page, so memory stays
+bounded by one delta page regardless of library size. After every page
+the delta cursor is saved to a state file:
+
+- an interrupted crawl continues from the last saved page (a page may be
+  written twice; records are keyed by drive_id + item_id)
+- once a library is complete its @odata.deltaLink is kept, and the next
+  crawl receives only files added, changed or deleted since then
+  (deleted files are written as records with "deleted": true)
+- when the delta link has expired (or with --full) the library is listed
+  again in full; deleted files are not reported then, so the crawl ends
+  with a "resync" record: files of the drive not written since it started
+  are gone, and the inventory drops them
+
+Each crawl of a library also writes a "library" record with the
+library's default retention label (the label of its root folder).
+
+With --resolve-terms, Managed Metadata values are also resolved to their
+current term paths from the local term store cache (sp_term_store.py) and
+written as "term_paths": {field: [path, ...]}.
+
+With --inventory the records are also loaded into the SQLite inventory
+(sp_inventory.py) in transactions of ITEM_BATCH_SIZE rows; the cursor is
+then saved only after a transaction commits, so the inventory never falls
+behind the state file.
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor
+
+from workflows.common import log_utils
+from workflows.common import graph_http
+from workflows.common import graph_trace
+from workflows.common import graph_stream
+from workflows.common import sp_inventory
+from workflows.common import sp_term_store
+from workflows.common import sp_metadata_utils as sp
+from workflows.common.log_utils import Messages
+
+# Initialize logging
+log_utils.setup_logging()
+
+DEFAULT_STATE_PATH = "./extracted_items/.crawl_state.json"
+DEFAULT_OUTPUT_DIR = "./extracted_items"
+DEFAULT_WORKERS = 4
+STATE_VERSION = 1
+
+# Graph allows at most 20 requests per $batch
+BATCH_SIZE = graph_http.BATCH_LIMIT
+
+DELTA_SELECT = ("id,name,size,file,folder,root,deleted,webUrl,parentReference,"
+                "createdDateTime,lastModifiedDateTime,lastModifiedBy")
+
+
+class CrawlerMessages:
+    """Item crawler related messages."""
+    CRAWL_START = "Crawling {} libraries in {}"
+    LIBRARY_FULL = "Full crawl of {} (no stored delta link)"
+    LIBRARY_RESUME = "Resuming crawl of {} from its last saved page"
+    LIBRARY_INCREMENTAL = "Incremental crawl of {}"
+    DELTA_EXPIRED = "Delta link for {} expired, crawling it again in full"
+    RESYNC_DONE = "{}: files not listed by the full crawl are marked as removed"
+    PAGE_DONE = "{}: {} files written ({} deleted) so far"
+    LIBRARY_DONE = "Finished {}: {} files, {} deleted"
+    FIELDS_FAILED = "Could not read list item fields of {} in {}: status {}"
+    LIBRARY_NOT_FOUND = "Library '{}' not found in {}"
+    CRAWL_SUMMARY = "Crawl complete: {} files, {} deleted, written to {}"
+
+# Register message class
+if not hasattr(Messages, 'Crawler'):
+    setattr(Messages, 'Crawler', CrawlerMessages)
+
+
+class CrawlState:
+    """
+    Delta cursors per drive, saved atomically after every page.
+
+    Per drive: the @odata.nextLink of an unfinished crawl ("next_link") and
+    the @odata.deltaLink of the last finished one ("delta_link").
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {"version": STATE_VERSION, "output": None, "drives": {}}
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == STATE_VERSION:
+                self.data = data
+
+    def drive(self, drive_id):
+        return self.data["drives"].setdefault(drive_id, {})
+
+    @property
+    def unfinished(self):
+        """Whether some library has a crawl in progress."""
+        return any(drive.get("next_link") for drive in self.data["drives"].values())
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def fetch_list_items(headers, drive_id, item_ids, executor):
+    """
+    Read the listItem (fields and content type) of drive items in parallel $batch calls.
+
+    Returns:
+        Dict of drive item id to listItem dict (missing when it could not be read)
+    """
+    batches = [item_ids[i:i + BATCH_SIZE] for i in range(0, len(item_ids), BATCH_SIZE)]
+
+    def run(batch):
+        return graph_http.batch({
+            str(index): {"method": "GET", "url": f"/drives/{drive_id}/items/{item_id}/listItem?$expand=fields"}
+            for index, item_id in enumerate(batch)
+        }, headers=headers), batch
+
+    list_items = {}
+    for results, batch in executor.map(run, batches):
+        for index, item_id in enumerate(batch):
+            sub_response = results.get(str(index), {})
+            if sub_response.get("status") == 200:
+                list_items[item_id] = sub_response.get("body") or {}
+            else:
+                log_utils.warning(Messages.Crawler.FIELDS_FAILED, item_id, drive_id, sub_response.get("status"))
+    return list_items
+
+
+def _folder_path(web_url, drive_url, name):
+    """Folder of an item relative to the library root, e.g. "/2024/Invoices"."""
+    if not web_url or not drive_url:
+        return None
+    relative = unquote(web_url)[len(unquote(drive_url)):]
+    folder = relative[:-len(name)] if name and relative.endswith(name) else relative.rsplit("/", 1)[0]
+    return folder.rstrip("/") or "/"
+
+
+def _term_paths(fields, terms):
+    """Term paths of the Managed Metadata values among an item's fields."""
+    paths = {}
+    for key, value in fields.items():
+        entry = value[0] if isinstance(value, list) and value else value
+        if isinstance(entry, dict) and "TermGuid" in entry:
+            paths[key] = terms.resolve_value(value)
+    return paths
+
+
+def item_record(item, list_item, library, terms=None):
+    """
+    Build the inventory record of a file (with term paths if a TermResolver is given).
+
+    A list_item of None means its listItem could not be read: the record is
+    marked with fields_error and has no fields or retention label, so it is
+    not mistaken for an unlabeled file.
+    """
+    fields_error = list_item is None
+    fields = {key: value for key, value in ((list_item or {}).get("fields") or {}).items()
+              if not key.startswith("@odata")}
+    modified_by = ((item.get("lastModifiedBy") or {}).get("user") or {})
+    record = {
+        "record": "item",
+        "site_url": library["site_url"],
+        "drive_id": library["drive_id"],
+        "list_id": library["list_id"],
+        "library": library["name"],
+        "item_id": item["id"],
+        "list_item_id": (list_item or {}).get("id"),
+        "name": item.get("name"),
+        "folder": _folder_path(item.get("webUrl"), library["web_url"], item.get("name")),
+        "web_url": item.get("webUrl"),
+        "size": item.get("size"),
+        "created": item.get("createdDateTime"),
+        "modified": item.get("lastModifiedDateTime"),
+        "modified_by": modified_by.get("email") or modified_by.get("displayName"),
+        "quick_xor_hash": ((item.get("file") or {}).get("hashes") or {}).get("quickXorHash"),
+        "mime_type": (item.get("file") or {}).get("mimeType"),
+        "content_type": ((list_item or {}).get("contentType") or {}).get("name"),
+        "retention_label": fields.get("_ComplianceTag") or None,
+        "fields": None if fields_error else fields,
+        "fields_error": fields_error,
+        "deleted": False
+    }
+    if terms is not None and not fields_error:
+        record["term_paths"] = _term_paths(fields, terms)
+    return record
+
+
+def deleted_record(item, library):
+    """Build the record of a file deleted since the last crawl."""
+    return {
+        "record": "item",
+        "site_url": library["site_url"],
+        "drive_id": library["drive_id"],
+        "list_id": library["list_id"],
+        "library": library["name"],
+        "item_id": item["id"],
+        "deleted": True
+    }
+
+
+def resync_record(library, since):
+    """
+    Build the record ending a full crawl that replaces earlier ones: files
+    of the drive not written since `since` no longer exist.
+    """
+    return {
+        "record": "resync",
+        "site_url": library["site_url"],
+        "drive_id": library["drive_id"],
+        "list_id": library["list_id"],
+        "library": library["name"],
+        "since": since
+    }
+
+
+def get_library_drive(headers, site_id, site_url, lst):
+    """
+    Get the drive of a document library and its default retention label.
+
+    Returns:
+        Library dict (site_url, list_id, drive_id, name, web_url, default_label)
+    """
+    response = graph_http.get(
+        f"{graph_http.GRAPH_API_ENDPOINT}/sites/{site_id}/lists/{lst['id']}/drive?$select=id,webUrl",
+        headers=headers
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"Error retrieving drive of {lst.get('displayName')}: Status {response.status_code}")
+    drive = response.json()
+
+    # The library default label is the label applied to its root folder
+    label_response = graph_http.get(
+        f"{graph_http.GRAPH_API_ENDPOINT}/drives/{drive['id']}/root/retentionLabel", headers=headers
+    )
+    default_label = label_response.json().get("name") if label_response.status_code == 200 else None
+
+    return {
+        "site_url": site_url,
+        "list_id": lst["id"],
+        "drive_id": drive["id"],
+        "name": lst.get("displayName"),
+        "web_url": drive.get("webUrl") or lst.get("webUrl"),
+        "default_label": default_label
+    }
+
+
+def crawl_library(library, state, writer, executor, full=False, loader=None, terms=None):
+    """
+    Crawl one library from its saved cursor, writing records page by page.
+
+    Args:
+        library: Library dict from get_library_drive
+        state: CrawlState
+        writer: Open JSON Lines output file
+        executor: Thread pool for $batch requests
+        full: Ignore the stored cursors
+        loader: sp_inventory.ItemLoader (batch_size=None) to load records into (optional)
+        terms: sp_term_store.TermResolver to resolve Managed Metadata values with (optional)
+
+    Returns:
+        Tuple of (files written, deleted files written)
+    """
+    drive_state = state.drive(library["drive_id"])
+    drive_state.update(site_url=library["site_url"], library=library["name"])
+    name = f"{library['site_url']} / {library['name']}"
+
+    initial_url = f"{graph_http.GRAPH_API_ENDPOINT}/drives/{library['drive_id']}/root/delta?$select={DELTA_SELECT}"
+    crawled = datetime.now().isoformat()
+    if full:
+        drive_state.pop("next_link", None)
+        drive_state.pop("delta_link", None)
+        drive_state["resync_since"] = crawled
+    if drive_state.get("next_link"):
+        log_utils.info(Messages.Crawler.LIBRARY_RESUME, name)
+        url = drive_state["next_link"]
+    elif drive_state.get("delta_link"):
+        log_utils.info(Messages.Crawler.LIBRARY_INCREMENTAL, name)
+        url = drive_state["delta_link"]
+    else:
+        log_utils.info(Messages.Crawler.LIBRARY_FULL, name)
+        url = initial_url
+
+    def emit(record):
+        writer.write(json.dumps(record) + "\n")
+        if loader is not None:
+            loader.add(record)
+
+    emit(dict(library, record="library", crawled=crawled))
+
+    files = deleted = 0
+    while url:
+        token = sp.get_access_token()
+        headers = graph_http.auth_headers(token)
+
+        response = graph_http.request("GET", url, headers=headers, stream=True)
+        if response.status_code == 410:
+            response.close()
+            log_utils.warning(Messages.Crawler.DELTA_EXPIRED, name)
+            drive_state.pop("delta_link", None)
+            # Files deleted while the link was invalid are not reported by the full crawl
+            drive_state["resync_since"] = crawled
+            url = initial_url
+            continue
+        if response.status_code != 200:
+            text = response.text
+            response.close()
+            raise RuntimeError(f"Delta query failed for {name}: Status {response.status_code} - {text}")
+
+        page = graph_stream.ValueStream(response)
+        changed_files = []
+        for item in page:
+            if "deleted" in item:
+                if "folder" not in item:
+                    emit(deleted_record(item, library))
+                    deleted += 1
+            elif "file" in item:
+                changed_files.append(item)
+
+        list_items = fetch_list_items(headers, library["drive_id"], [item["id"] for item in changed_files], executor)
+        for item in changed_files:
+            emit(item_record(item, list_items.get(item["id"]), library, terms))
+        files += len(changed_files)
+        url = page.next_link
+        if not url and drive_state.get("resync_since"):
+            emit(resync_record(library, drive_state["resync_since"]))
+            log_utils.info(Messages.Crawler.RESYNC_DONE, name)
+        writer.flush()
+
+        # Records of this page are on disk; move the cursor past it
+        if url:
+            drive_state["next_link"] = url
+        else:
+            drive_state.pop("next_link", None)
+            drive_state.pop("resync_since", None)
+            drive_state["delta_link"] = page.properties.get("@odata.deltaLink")
+            drive_state["last_crawl"] = datetime.now().isoformat()
+
+        if loader is not None:
+            if url and loader.pending < sp_inventory.ITEM_BATCH_SIZE:
+                # Saved after the next inventory transaction
+                continue
+            loader.flush()
+        state.save()
+        log_utils.debug(Messages.Crawler.PAGE_DONE, name, files, deleted)
+
+    log_utils.info(Messages.Crawler.LIBRARY_DONE, name, files, deleted)
+    return files, deleted
+
+
+def crawl_sites(sites, library_name=None, output=None, state_path=DEFAULT_STATE_PATH,
+                full=False, workers=DEFAULT_WORKERS, inventory=None, terms=None):
+    """
+    Crawl the document libraries of one or more sites.
+
+    Args:
+        sites: Site URLs
+        library_name: Only crawl this library (default: all document libraries)
+        output: JSON Lines file to append records to (default: a new
+                timestamped file, or the file of the interrupted crawl)
+        state_path: Delta cursor state file
+        full: Ignore stored delta links and crawl everything again
+        workers: $batch requests in flight at once
+        inventory: Inventory database to also load the records into (optional)
+        terms: sp_term_store.TermResolver to resolve Managed Metadata values with (optional)
+
+    Returns:
+        Tuple of (output path, files written, deleted files written)
+    """
+    state = CrawlState(state_path)
+    if not output:
+        if state.unfinished and state.data.get("output") and not full:
+            output = state.data["output"]
+        else:
+            output = os.path.join(DEFAULT_OUTPUT_DIR, f"items_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+    state.data["output"] = output
+    os.makedirs(os.path.dirname(os.path.abspath(output)) or '.', exist_ok=True)
+
+    token = sp.get_access_token()
+    if not token:
+        raise RuntimeError("Failed to get access token")
+
+    loader = sp_inventory.ItemLoader(sp_inventory.connect(inventory), batch_size=None) if inventory else None
+
+    total_files = total_deleted = 0
+    with open(output, "a") as writer, ThreadPoolExecutor(max_workers=workers) as executor:
+        for site_url in sites:
+            token = sp.get_access_token() or token
+            site_id = sp.get_site_id(token, site_url)
+            if not site_id:
+                log_utils.error(Messages.Site.SITE_ID_FAILURE, site_url)
+                continue
+
+            libraries = sp.list_document_libraries(token, site_id)
+            if library_name:
+                libraries = [lib for lib in libraries if lib.get('displayName') == library_name]
+                if not libraries:
+                    log_utils.warning(Messages.Crawler.LIBRARY_NOT_FOUND, library_name, site_url)
+                    continue
+            log_utils.info(Messages.Crawler.CRAWL_START, len(libraries), site_url)
+
+            headers = graph_http.auth_headers(token)
+            for lst in libraries:
+                library = get_library_drive(headers, site_id, site_url, lst)
+                files, deleted = crawl_library(library, state, writer, executor, full=full, loader=loader,
+                                               terms=terms)
+                total_files += files
+                total_deleted += deleted
+
+    if loader is not None:
+        loader.conn.close()
+
+    log_utils.info(Messages.Crawler.CRAWL_SUMMARY, total_files, total_deleted, output)
+    return output, total_files, total_deleted
+
+
+def main():
+    """Crawl document library items into a JSON Lines inventory."""
+    parser = argparse.ArgumentParser(
+        description='SharePoint Item Crawler - Inventory every file in document libraries',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # First crawl of every library in a site (continue with the same command if interrupted)
+  python sp_item_crawler.py --site "https://contoso.sharepoint.com/sites/Legal"
+
+  # Daily re-crawl of many sites: only changes since the last crawl are fetched
+  python sp_item_crawler.py --sites-file tenant_sites.txt --output ./extracted_items/changes.jsonl
+
+  # One library, ignoring stored delta links
+  python sp_item_crawler.py --site "https://contoso.sharepoint.com/sites/Legal" --library Contracts --full
+
+  # Also record the term paths of Managed Metadata values
+  python sp_item_crawler.py --site "https://contoso.sharepoint.com/sites/Finance" --resolve-terms
+        """
+    )
+
+    parser.add_argument('--site', help='SharePoint site URL')
+    parser.add_argument('--sites-file', metavar='FILE', help='File with one site URL per line')
+    parser.add_argument('--library', help='Only crawl this document library')
+    parser.add_argument('--output', help='JSON Lines file to append records to '
+                                         '(default: new file in ./extracted_items)')
+    parser.add_argument('--state', default=DEFAULT_STATE_PATH,
+                        help=f'Delta cursor state file (default: {DEFAULT_STATE_PATH})')
+    parser.add_argument('--full', action='store_true', help='Ignore stored delta links and crawl everything')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'$batch requests in flight at once (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--inventory', metavar='DB',
+                        help='Also load the records into this inventory database (see sp_inventory.py)')
+    parser.add_argument('--resolve-terms', nargs='?', const=sp_term_store.DEFAULT_CACHE_PATH, metavar='CACHE',
+                        help='Add the term paths of Managed Metadata values, from the term store cache '
+                             f'(default: {sp_term_store.DEFAULT_CACHE_PATH}; exported if missing or stale)')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='Write a Chrome trace-event timeline of all Graph requests to FILE')
+
+    args = parser.parse_args()
+
+    if args.trace:
+        graph_trace.enable(args.trace)
+
+    if args.sites_file:
+        with open(args.sites_file) as f:
+            sites = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    elif args.site:
+        sites = [args.site]
+    else:
+        log_utils.error(Messages.Tool.SITE_REQUIRED)
+        parser.print_help()
+        return 1
+
+    terms = None
+    if args.resolve_terms:
+        try:
+            terms = sp_term_store.get_resolver(args.resolve_terms)
+        except RuntimeError as e:
+            log_utils.error(str(e))
+            return 1
+
+    crawl_sites(sites, library_name=args.library, output=args.output, state_path=args.state,
+                full=args.full, workers=args.workers, inventory=args.inventory, terms=terms)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,671 @@
+#!/usr/bin/env python3
+# file: workflows/common/sp_item_validator.py
+"""
+SharePoint Item Validator - Check the metadata values of crawled items
+against a target metadata-schema.json.
+
+A target schema is compiled once per library into a checker: each schema
+field is resolved to the internal name it has in the item field values
+(from the inventory's columns when available), and its checks are fixed up
+front:
+
+    missing          a required field has no value
+    invalid_choice   a Choice (or Managed Metadata with options) value is
+                     not one of the schema's options
+    invalid_date     a Date/DateTime value does not parse as an ISO date
+    invalid_number   a Number/Currency value is not numeric
+    unknown_lookup   a Lookup id is not an item of the target list (when
+                     that list is in the inventory), or is not an id at all
+    unknown_term     a Managed Metadata term GUID is not in the term store
+                     (with --terms; options are then matched against the
+                     term's current label rather than the label stored
+                     with the value)
+
+A field is required when the target schema marks it "required", when the
+library's column is required (inventory), or with --require-all.
+
+Items are read from crawler JSON Lines files (sp_item_crawler.py) or from
+the inventory database, split into byte ranges or rowid ranges and checked
+in a process pool; each worker parses its own slice, so only the per-library
+counts and a few sample violations travel back. JSON Lines files with
+several crawls appended hold a record per crawl of each item; the inventory
+holds only the current one.
+
+Libraries are matched to schemas with --schema (one schema for every
+library, optionally filtered by --site/--library) or with a conformance
+mapping file (--mapping, see sp_conformance.py).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from fnmatch import fnmatchcase
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from workflows.common import log_utils
+from workflows.common import sp_inventory
+from workflows.common import sp_term_store
+from workflows.common import sp_conformance
+from workflows.common.log_utils import Messages
+
+# Initialize logging
+log_utils.setup_logging()
+
+VIOLATIONS = ("missing", "invalid_choice", "invalid_date", "invalid_number", "unknown_lookup", "unknown_term")
+
+# Sample violations kept per library
+DEFAULT_SAMPLES = 20
+
+# Work unit per worker task
+CHUNK_BYTES = 32 * 1024 * 1024
+CHUNK_ROWS = 100000
+
+_CHOICE_TYPES = {"choice", "multichoice"}
+_TERM_TYPES = {"managed metadata", "taxonomy"}
+_DATE_TYPES = {"date", "datetime", "date and time"}
+_NUMBER_TYPES = {"number", "currency"}
+_LOOKUP_TYPES = {"lookup", "person", "person or group", "user"}
+
+# Validator of the current worker process
+_validator = None
+
+
+class ValidatorMessages:
+    """Item validation related messages."""
+    VALIDATE_START = "Validating items from {} ({} chunks, {} workers)"
+    CHUNK_FAILED = "Error validating {}: {}"
+    LINE_SKIPPED = "Skipping unreadable line at byte {} of {}: {}"
+    SUMMARY_BAD_LINES = "  • {} unreadable lines skipped"
+    SUMMARY_FAILED_CHUNKS = "  • {} chunks could not be validated; the report is incomplete"
+    COLUMNS_MISSING = "{} / {}: schema fields not in the library: {}"
+    SUMMARY_HEADER = "Validation Summary:"
+    SUMMARY_ITEMS = "  • {} items in {} libraries checked ({:.0f} items/s)"
+    SUMMARY_INVALID = "  • {} items with violations"
+    SUMMARY_VIOLATION = "    - {}: {}"
+    SUMMARY_LIBRARY = "  • {} / {}: {} of {} items invalid"
+    REPORT_SAVED = "Saved validation report to {}"
+
+# Register message class
+if not hasattr(Messages, 'Validator'):
+    setattr(Messages, 'Validator', ValidatorMessages)
+
+
+def _internal_name_candidates(display_name):
+    """Internal names SharePoint may have given a column created with this display name."""
+    encoded = "".join(ch if ch.isalnum() or ch == "_" else f"_x{ord(ch):04x}_" for ch in display_name)
+    compact = "".join(ch for ch in display_name if ch.isalnum())
+    return list(dict.fromkeys([encoded, compact, display_name]))
+
+
+def target_fields(schema):
+    """
+    Normalize the fields of a target schema.
+
+    Both forms in use are accepted: "metadata" entries with options, and
+    "fields" entries with internal_name and choices.
+    """
+    fields = []
+    for field in schema.get("metadata") or schema.get("fields") or []:
+        if not field.get("name"):
+            continue
+        fields.append({
+            "name": field["name"],
+            "internal_name": field.get("internal_name"),
+            "type": (field.get("type") or "Text").lower(),
+            "options": field.get("options") or field.get("choices"),
+            "required": bool(field.get("required"))
+        })
+    return fields
+
+
+def _parse_date(value):
+    """True if value is an ISO date or timestamp."""
+    if not isinstance(value, str):
+        return False
+    try:
+        datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_number(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return True
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+class ItemChecker:
+    """
+    A target schema compiled for one library.
+
+    Args:
+        fields: Fields from target_fields
+        columns: The library's columns by casefolded display name, as
+                 (internal name, required, lookup list id) (None if unknown)
+        lookup_ids: Callable returning the known item ids of a list id
+                    (None if that list is not inventoried)
+        require_all: Treat every schema field as required
+        terms: sp_term_store.TermResolver to check Managed Metadata values with (optional)
+    """
+
+    def __init__(self, fields, columns=None, lookup_ids=None, require_all=False, terms=None):
+        self.terms = terms
+        self.rules = []
+        self.missing_columns = []
+        for field in fields:
+            column = columns.get(field["name"].casefold()) if columns is not None else None
+            if columns is not None and column is None and field["internal_name"]:
+                column = next((c for c in columns.values() if c[0] == field["internal_name"]), None)
+            if columns is not None and column is None:
+                # Schema conformance issue, not an item issue: reported once per library
+                self.missing_columns.append(field["name"])
+                continue
+
+            names = [column[0]] if column else (
+                [field["internal_name"]] if field["internal_name"] else _internal_name_candidates(field["name"]))
+            field_type = field["type"]
+            kind = allowed = known_ids = None
+            if field_type in _CHOICE_TYPES and field["options"]:
+                kind, allowed = "choice", frozenset(field["options"])
+            elif field_type in _TERM_TYPES and (field["options"] or terms is not None):
+                kind, allowed = "term", frozenset(field["options"] or ())
+            elif field_type in _DATE_TYPES:
+                kind = "date"
+            elif field_type in _NUMBER_TYPES:
+                kind = "number"
+            elif field_type in _LOOKUP_TYPES:
+                kind = "lookup"
+                # Single-value lookups and people are returned as {name}LookupId
+                names = [f"{name}LookupId" for name in names] + names
+                if field_type == "lookup" and column and column[2] and lookup_ids is not None:
+                    known_ids = lookup_ids(column[2])
+
+            required = field["required"] or require_all or bool(column and column[1])
+            self.rules.append((field["name"], tuple(names), required, kind, allowed, known_ids))
+
+    def check(self, fields):
+        """
+        Check the field values of one item.
+
+        Returns:
+            List of (field name, violation, value) tuples (empty if valid)
+        """
+        violations = []
+        for name, keys, required, kind, allowed, known_ids in self.rules:
+            value = None
+            for key in keys:
+                value = fields.get(key)
+                if value is not None:
+                    break
+            if value is None or value == "" or value == []:
+                if required:
+                    violations.append((name, "missing", None))
+                continue
+            if kind is None:
+                continue
+
+            if kind == "choice":
+                for entry in (value if isinstance(value, list) else (value,)):
+                    label = entry.get("Label") if isinstance(entry, dict) else entry
+                    if label not in allowed:
+                        violations.append((name, "invalid_choice", label))
+                        break
+            elif kind == "term":
+                for entry in (value if isinstance(value, list) else (value,)):
+                    label = entry.get("Label") if isinstance(entry, dict) else entry
+                    if self.terms is not None and isinstance(entry, dict):
+                        guid = entry.get("TermGuid")
+                        if guid not in self.terms:
+                            violations.append((name, "unknown_term", guid))
+                            break
+                        label = self.terms.label(guid)
+                    if allowed and label not in allowed:
+                        violations.append((name, "invalid_choice", label))
+                        break
+            elif kind == "date":
+                if not _parse_date(value):
+                    violations.append((name, "invalid_date", value))
+            elif kind == "number":
+                if not _is_number(value):
+                    violations.append((name, "invalid_number", value))
+            else:
+                for entry in (value if isinstance(value, list) else (value,)):
+                    lookup_id = str(entry.get("LookupId")) if isinstance(entry, dict) else str(entry)
+                    if not lookup_id.isdigit() or (known_ids is not None and lookup_id not in known_ids):
+                        violations.append((name, "unknown_lookup", lookup_id))
+                        break
+        return violations
+
+
+class Validator:
+    """
+    Per-process state: schemas, compiled checkers and the inventory
+    connection, each loaded once and reused for every chunk.
+
+    Args:
+        schema_path: Target schema for every library (or None with rules)
+        rules: Conformance mapping rules (or None with schema_path)
+        inventory: Inventory database for column names, required flags and
+                   lookup targets (optional)
+        site_pattern, library_pattern: Filters used with schema_path
+        require_all: Treat every schema field as required
+        samples: Sample violations kept per library
+        terms: Term store cache to check Managed Metadata values against (optional)
+    """
+
+    def __init__(self, schema_path=None, rules=None, inventory=None, site_pattern=None, library_pattern=None,
+                 require_all=False, samples=DEFAULT_SAMPLES, terms=None):
+        self.schema_path = schema_path
+        self.rules = rules
+        self.inventory = inventory
+        self.site_pattern = site_pattern.rstrip("/").lower() if site_pattern else None
+        self.library_pattern = library_pattern
+        self.require_all = require_all
+        self.samples = samples
+        self.terms = sp_term_store.TermResolver.load(terms) if terms else None
+        self._conn = None
+        self._schemas = {}
+        self._checkers = {}
+        self._lookup_ids = {}
+
+    @property
+    def conn(self):
+        if self._conn is None and self.inventory:
+            self._conn = sp_inventory.connect_readonly(self.inventory)
+        return self._conn
+
+    def _schema(self, path):
+        if path not in self._schemas:
+            with open(path) as f:
+                self._schemas[path] = target_fields(json.load(f))
+        return self._schemas[path]
+
+    def _columns(self, list_id):
+        """The columns of a list from the inventory, or None if it is not there."""
+        if self.conn is None or not list_id:
+            return None
+        rows = self.conn.execute(
+            "SELECT display_name, internal_name, required, field FROM columns WHERE list_id = ?", (list_id,)
+        ).fetchall()
+        if not rows:
+            return None
+        columns = {}
+        for display_name, internal_name, required, field_json in rows:
+            field = json.loads(field_json) if field_json else {}
+            lookup_list_id = ((field.get("lookup") or {}).get("listId")
+                              or (field.get("lookup_target") or {}).get("list_id")
+                              or ((field.get("raw_column_data") or {}).get("lookup") or {}).get("listId"))
+            columns[(display_name or "").casefold()] = (internal_name, bool(required), lookup_list_id)
+        return columns
+
+    def lookup_ids(self, list_id):
+        """Item ids of an inventoried list (None if none of its items are in the inventory)."""
+        if list_id not in self._lookup_ids:
+            ids = frozenset(row[0] for row in self.conn.execute(
+                "SELECT list_item_id FROM items WHERE list_id = ? AND list_item_id IS NOT NULL", (list_id,)))
+            self._lookup_ids[list_id] = ids or None
+        return self._lookup_ids[list_id]
+
+    def checker(self, site_url, library, list_id):
+        """
+        The compiled checker of a library, or None if no schema applies.
+
+        Returns:
+            Tuple of (schema path, ItemChecker), or None
+        """
+        key = (site_url, list_id or library)
+        if key not in self._checkers:
+            schema_path = None
+            if self.rules is not None:
+                _, rule = sp_conformance.match_rule(self.rules, site_url, library or "")
+                schema_path = rule["schema"] if rule else None
+            elif ((self.site_pattern is None or fnmatchcase((site_url or "").rstrip("/").lower(), self.site_pattern))
+                  and (self.library_pattern is None or fnmatchcase(library or "", self.library_pattern))):
+                schema_path = self.schema_path
+
+            compiled = None
+            if schema_path:
+                compiled = (schema_path, ItemChecker(
+                    self._schema(schema_path), self._columns(list_id),
+                    self.lookup_ids if self.conn is not None else None, self.require_all, self.terms))
+            self._checkers[key] = compiled
+        return self._checkers[key]
+
+    def validate(self, records):
+        """
+        Check item records (dicts with site_url, library, list_id, item_id,
+        name, web_url and fields).
+
+        Returns:
+            Dict of (site_url, library) to library results
+        """
+        results = {}
+        for record in records:
+            site_url, library, list_id = record.get("site_url"), record.get("library"), record.get("list_id")
+            compiled = self.checker(site_url, library, list_id)
+            if compiled is None:
+                continue
+            schema_path, checker = compiled
+
+            result = results.get((site_url, library))
+            if result is None:
+                result = results[(site_url, library)] = _new_result(site_url, library, list_id, schema_path,
+                                                                    checker.missing_columns)
+            fields = record.get("fields")
+            if not fields:
+                # The list item could not be read during the crawl
+                result["skipped"] += 1
+                continue
+
+            result["items"] += 1
+            violations = checker.check(fields)
+            if not violations:
+                continue
+            result["invalid"] += 1
+            for field_name, violation, value in violations:
+                field_counts = result["violations"].setdefault(field_name, {})
+                field_counts[violation] = field_counts.get(violation, 0) + 1
+                if len(result["samples"]) < self.samples:
+                    result["samples"].append({
+                        "item_id": record.get("item_id"), "name": record.get("name"),
+                        "web_url": record.get("web_url"), "field": field_name,
+                        "violation": violation, "value": value
+                    })
+        return results
+
+
+def _new_result(site_url, library, list_id, schema_path, missing_columns):
+    return {
+        "site_url": site_url, "library": library, "list_id": list_id, "schema": schema_path,
+        "items": 0, "invalid": 0, "skipped": 0, "violations": {}, "samples": [],
+        "missing_columns": list(missing_columns)
+    }
+
+
+def _merge(results, partial, samples):
+    """Add the results of one chunk to the totals."""
+    for key, part in partial.items():
+        total = results.get(key)
+        if total is None:
+            results[key] = part
+            continue
+        for counter in ("items", "invalid", "skipped"):
+            total[counter] += part[counter]
+        for field_name, counts in part["violations"].items():
+            field_counts = total["violations"].setdefault(field_name, {})
+            for violation, count in counts.items():
+                field_counts[violation] = field_counts.get(violation, 0) + count
+        total["samples"].extend(part["samples"][:max(0, samples - len(total["samples"]))])
+
+
+def _init_worker(options):
+    global _validator
+    _validator = Validator(**options)
+
+
+def _jsonl_records(path, start, end, bad_lines):
+    """
+    Item records of the lines starting in the byte range [start, end).
+
+    Lines that are not a JSON object (e.g. the partial last line of a crawl
+    killed mid-write) are skipped and appended to bad_lines.
+    """
+    with open(path, "rb") as f:
+        if start:
+            # A line belongs to the chunk it starts in
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            offset = f.tell()
+            line = f.readline()
+            if not line:
+                return
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                record = e
+            if not isinstance(record, dict):
+                log_utils.warning(Messages.Validator.LINE_SKIPPED, offset, path, record)
+                bad_lines.append(offset)
+                continue
+            if record.get("record", "item") == "item" and not record.get("deleted"):
+                yield record
+
+
+def _validate_jsonl_chunk(path, start, end):
+    """Validate one chunk of a JSON Lines file; returns (results, unreadable lines)."""
+    bad_lines = []
+    results = _validator.validate(_jsonl_records(path, start, end, bad_lines))
+    return results, len(bad_lines)
+
+
+def _inventory_records(conn, first, last):
+    rows = conn.execute(
+        "SELECT site_url, library, list_id, item_id, name, web_url, fields FROM items "
+        "WHERE rowid BETWEEN ? AND ?", (first, last))
+    for site_url, library, list_id, item_id, name, web_url, fields in rows:
+        yield {"site_url": site_url, "library": library, "list_id": list_id, "item_id": item_id,
+               "name": name, "web_url": web_url, "fields": json.loads(fields) if fields else None}
+
+
+def _validate_inventory_chunk(first, last):
+    """Validate one rowid range of the inventory; returns (results, unreadable lines)."""
+    return _validator.validate(_inventory_records(_validator.conn, first, last)), 0
+
+
+def _chunks(items_files, inventory):
+    """Work units: (task function, args, description)."""
+    if items_files:
+        for path in items_files:
+            size = os.path.getsize(path)
+            for start in range(0, size, CHUNK_BYTES):
+                yield _validate_jsonl_chunk, (path, start, min(start + CHUNK_BYTES, size)), path
+        return
+
+    conn = sp_inventory.connect_readonly(inventory)
+    try:
+        first, last = conn.execute("SELECT MIN(rowid), MAX(rowid) FROM items").fetchone()
+    finally:
+        conn.close()
+    if first is None:
+        return
+    for start in range(first, last + 1, CHUNK_ROWS):
+        yield _validate_inventory_chunk, (start, min(start + CHUNK_ROWS - 1, last)), inventory
+
+
+def validate_items(items_files=None, inventory=None, schema_path=None, rules=None, site_pattern=None,
+                   library_pattern=None, require_all=False, samples=DEFAULT_SAMPLES, max_workers=None,
+                   terms=None):
+    """
+    Validate crawled items against target schemas in a process pool.
+
+    Args:
+        items_files: Crawler JSON Lines files (items are read from the
+                     inventory if None)
+        inventory: Inventory database; also used for column names, required
+                   flags and lookup targets when validating JSON Lines files
+        schema_path: Target schema applied to every (filtered) library
+        rules: Conformance mapping rules, instead of schema_path
+        site_pattern, library_pattern: Wildcard filters used with schema_path
+        require_all: Treat every schema field as required
+        samples: Sample violations kept per library
+        max_workers: Worker processes (default: CPU count)
+        terms: Term store cache (sp_term_store.py) to check Managed Metadata
+               values against; exported first if missing or stale
+
+    Returns:
+        Validation report dict; chunks that could not be validated are
+        listed in "failed_chunks"
+    """
+    started = time.time()
+    if terms:
+        # Workers load the cache file; make sure it is current first
+        sp_term_store.get_resolver(terms)
+    options = {"schema_path": schema_path, "rules": rules, "inventory": inventory, "site_pattern": site_pattern,
+               "library_pattern": library_pattern, "require_all": require_all, "samples": samples,
+               "terms": terms}
+    chunks = list(_chunks(items_files, inventory))
+    max_workers = max_workers or os.cpu_count() or 1
+    log_utils.info(Messages.Validator.VALIDATE_START, ", ".join(items_files or [inventory]), len(chunks),
+                   max_workers)
+
+    results = {}
+    bad_lines = 0
+    failed_chunks = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(options,)) as executor:
+        futures = {executor.submit(task, *args): (source, args) for task, args, source in chunks}
+        for future in as_completed(futures):
+            source, args = futures[future]
+            try:
+                partial, chunk_bad_lines = future.result()
+            except Exception as e:
+                log_utils.error(Messages.Validator.CHUNK_FAILED, source, e)
+                failed_chunks.append({"source": source, "range": list(args[-2:]), "error": str(e)})
+                continue
+            _merge(results, partial, samples)
+            bad_lines += chunk_bad_lines
+
+    failed_chunks.sort(key=lambda chunk: (chunk["source"], chunk["range"]))
+    return build_report(list(results.values()), time.time() - started, bad_lines, failed_chunks)
+
+
+def build_report(libraries, elapsed, bad_lines=0, failed_chunks=()):
+    """
+    Aggregate per-library results into a validation report.
+
+    Args:
+        libraries: Library results
+        elapsed: Seconds the validation took
+        bad_lines: Unreadable JSON Lines lines that were skipped
+        failed_chunks: Chunks that could not be validated (source, byte or
+                       rowid range, error)
+    """
+    libraries.sort(key=lambda lib: (-(lib["invalid"] / lib["items"] if lib["items"] else 0),
+                                    lib["site_url"] or "", lib["library"] or ""))
+    violations = {violation: 0 for violation in VIOLATIONS}
+    for library in libraries:
+        for counts in library["violations"].values():
+            for violation, count in counts.items():
+                violations[violation] += count
+
+    items = sum(library["items"] for library in libraries)
+    return {
+        "generated": datetime.now().isoformat(),
+        "summary": {
+            "libraries": len(libraries),
+            "items": items,
+            "invalid": sum(library["invalid"] for library in libraries),
+            "skipped": sum(library["skipped"] for library in libraries),
+            "bad_lines": bad_lines,
+            "failed_chunks": len(failed_chunks),
+            "violations": violations,
+            "seconds": round(elapsed, 2),
+            "items_per_second": round(items / elapsed) if elapsed else None
+        },
+        "libraries": libraries,
+        "failed_chunks": list(failed_chunks)
+    }
+
+
+def main():
+    """Validate crawled item metadata against target schemas."""
+    parser = argparse.ArgumentParser(
+        description='SharePoint Item Validator - Check item metadata values against target schemas',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Check every crawled contract against the contracts schema
+  python sp_item_validator.py --items ./extracted_items/items_20261019.jsonl \\
+      --schema workflows/contracts/metadata-schema.json --library Contracts
+
+  # Check the whole inventory, each library against its mapped schema
+  python sp_item_validator.py --inventory ./extracted_schemas/inventory.db --mapping conformance.json
+
+  # Treat every schema field as required
+  python sp_item_validator.py --inventory ./extracted_schemas/inventory.db \\
+      --schema workflows/pcards/metadata-schema.json --require-all --workers 8
+        """
+    )
+
+    parser.add_argument('--items', nargs='+', metavar='FILE', help='Crawler JSON Lines files to validate')
+    parser.add_argument('--inventory', metavar='DB',
+                        help='Inventory database (validated when --items is not given; '
+                             'otherwise used for column names, required flags and lookups)')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--schema', help='Target schema for every library (metadata-schema.json)')
+    target.add_argument('--mapping', help='Mapping of site/library to target schema (see sp_conformance.py)')
+    parser.add_argument('--site', help='Only libraries of sites matching this pattern (with --schema)')
+    parser.add_argument('--library', help='Only libraries matching this pattern (with --schema)')
+    parser.add_argument('--require-all', action='store_true', help='Treat every schema field as required')
+    parser.add_argument('--terms', nargs='?', const=sp_term_store.DEFAULT_CACHE_PATH, metavar='CACHE',
+                        help='Check Managed Metadata values against the term store cache '
+                             f'(default: {sp_term_store.DEFAULT_CACHE_PATH})')
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES,
+                        help=f'Sample violations kept per library (default: {DEFAULT_SAMPLES})')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--output', help='Path to save the report (default: auto-generated filename)')
+
+    args = parser.parse_args()
+
+    if not args.items and not args.inventory:
+        parser.error("--items or --inventory is required")
+
+    try:
+        rules = sp_conformance.load_mapping(args.mapping) if args.mapping else None
+    except Exception as e:
+        log_utils.error(Messages.Conformance.MAPPING_ERROR, e)
+        return 1
+
+    try:
+        report = validate_items(args.items, args.inventory, args.schema, rules, args.site, args.library,
+                                args.require_all, args.samples, args.workers, args.terms)
+    except (FileNotFoundError, RuntimeError):
+        return 1
+
+    summary = report["summary"]
+    log_utils.info(Messages.Validator.SUMMARY_HEADER)
+    log_utils.info(Messages.Validator.SUMMARY_ITEMS, summary["items"], summary["libraries"],
+                   summary["items_per_second"] or 0)
+    log_utils.info(Messages.Validator.SUMMARY_INVALID, summary["invalid"])
+    if summary["bad_lines"]:
+        log_utils.warning(Messages.Validator.SUMMARY_BAD_LINES, summary["bad_lines"])
+    if summary["failed_chunks"]:
+        log_utils.error(Messages.Validator.SUMMARY_FAILED_CHUNKS, summary["failed_chunks"])
+    for violation, count in summary["violations"].items():
+        if count:
+            log_utils.info(Messages.Validator.SUMMARY_VIOLATION, violation, count)
+    for library in report["libraries"]:
+        if library["missing_columns"]:
+            log_utils.warning(Messages.Validator.COLUMNS_MISSING, library["site_url"], library["library"],
+                              ", ".join(library["missing_columns"]))
+        if library["invalid"]:
+            log_utils.info(Messages.Validator.SUMMARY_LIBRARY, library["site_url"], library["library"],
+                           library["invalid"], library["items"])
+
+    output_path = args.output
+    if not output_path:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = f"./extracted_schemas/item_validation_{timestamp}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)) or '.', exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    log_utils.info(Messages.Validator.REPORT_SAVED, output_path)
+
+    # An incomplete report must not pass as a clean run
+    return 1 if summary["failed_chunks"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# file: workflows/common/sp_label_coverage.py
+"""
+SharePoint Retention Label Coverage - Measure how many crawled documents
+carry a Purview retention label.
+
+Items from the inventory are aggregated by site, library, content type
+and/or folder. Each group reports its item count and bytes, how much of it
+is unlabeled, and the count and bytes per retention label. Document
+libraries without a default retention label are flagged separately. Items
+whose list item fields the crawler could not read have no known label;
+they are counted as fields_unavailable_items and left out of the totals.
+
+The aggregation runs where the data is: a GROUP BY over the SQLite
+inventory (an index on site, library, retention label and size answers
+the default site/library report without reading the items table), or a
+vectorized pyarrow group_by over the columnar export. Only the grouped
+totals reach Python, so a 20M-item tenant reports in seconds.
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+from workflows.common import log_utils
+from workflows.common import sp_inventory
+from workflows.common import purview_label_catalog
+from workflows.common.log_utils import Messages
+
+# Initialize logging
+log_utils.setup_logging()
+
+# Report dimensions and the item column each groups by
+DIMENSIONS = {
+    "site": "site_url",
+    "library": "list_id",
+    "content_type": "content_type",
+    "folder": "folder"
+}
+DEFAULT_GROUP_BY = ("site", "library")
+
+
+class CoverageMessages:
+    """Retention label coverage related messages."""
+    SOURCE_INVENTORY = "Aggregating items in inventory {}"
+    SOURCE_EXPORT = "Aggregating items in columnar export {}"
+    SUMMARY_HEADER = "Retention Label Coverage:"
+    SUMMARY_ITEMS = "  • {} of {} items labeled ({:.1%})"
+    SUMMARY_BYTES = "  • {} of {} bytes labeled ({:.1%})"
+    SUMMARY_LABEL = "    - {}: {} items"
+    SUMMARY_FIELDS_UNAVAILABLE = "  • {} items left out: their list item fields could not be read (re-crawl with --full)"
+    SUMMARY_NO_DEFAULT = "  • {} of {} crawled libraries have no default retention label"
+    UNKNOWN_LABELS = "Labels not in the retention label catalog: {}"
+    TOP_HEADER = "Most unlabeled items:"
+    TOP_ITEM = "  • {}: {} unlabeled of {} ({:.1%} coverage)"
+    REPORT_SAVED = "Saved label coverage report to {}"
+
+# Register message class
+if not hasattr(Messages, 'Coverage'):
+    setattr(Messages, 'Coverage', CoverageMessages)
+
+
+def _import_pyarrow():
+    """Import pyarrow, explaining how to install it when it is missing."""
+    try:
+        import pyarrow.dataset
+    except ImportError:
+        raise ImportError("Reading a columnar export requires pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def _item_columns(group_by):
+    """Item columns to aggregate on: site and library (for per-library totals) plus the other dimensions."""
+    columns = ["site_url", "list_id"]
+    for dimension in group_by:
+        column = DIMENSIONS[dimension]
+        if column not in columns:
+            columns.append(column)
+    return columns
+
+
+def aggregate_inventory(conn, columns):
+    """
+    Aggregate items with SQL.
+
+    Returns:
+        Rows of (*columns, retention_label, fields_error, items, bytes)
+    """
+    column_list = ", ".join(columns) + ", retention_label"
+    if sp_inventory.has_column(conn, "items", "fields_error"):
+        column_list += ", fields_error"
+        select_list = column_list
+    else:
+        # Inventory not opened for writing since fields_error was added
+        select_list = column_list + ", NULL"
+    return conn.execute(
+        f"SELECT {select_list}, COUNT(*), COALESCE(SUM(size), 0) FROM items GROUP BY {column_list}"
+    ).fetchall()
+
+
+def aggregate_export(export_dir, columns):
+    """
+    Aggregate the items dataset of sp_inventory_export.py with pyarrow.
+
+    Returns:
+        Rows of (*columns, retention_label, fields_error, items, bytes)
+    """
+    pa = _import_pyarrow()
+    dataset = pa.dataset.dataset(os.path.join(export_dir, "items"), partitioning="hive")
+    # Exports written before fields_error was added do not have it
+    group_columns = columns + ["retention_label"]
+    if "fields_error" in dataset.schema.names:
+        group_columns.append("fields_error")
+    table = dataset.to_table(columns=group_columns + ["size"]).unify_dictionaries()
+    grouped = table.group_by(group_columns).aggregate([("size", "sum"), ([], "count_all")])
+    keys = [grouped.column(name).to_pylist() for name in group_columns]
+    if "fields_error" not in group_columns:
+        keys.append([False] * grouped.num_rows)
+    counts = grouped.column("count_all").to_pylist()
+    sizes = grouped.column("size_sum").to_pylist()
+    return [tuple(key) + (count, size or 0) for key, count, size in zip(zip(*keys), counts, sizes)]
+
+
+def _inventory_libraries(conn):
+    rows = conn.execute("SELECT list_id, site_url, name, drive_id, default_label FROM lists").fetchall()
+    return {row[0]: {"site_url": row[1], "name": row[2], "crawled": row[3] is not None, "default_label": row[4]}
+            for row in rows}
+
+
+def _export_libraries(export_dir):
+    pa = _import_pyarrow()
+    path = os.path.join(export_dir, "lists")
+    if not os.path.isdir(path):
+        return {}
+    rows = pa.dataset.dataset(path).to_table(
+        columns=["list_id", "site_url", "name", "drive_id", "default_label"]).to_pylist()
+    return {row["list_id"]: {"site_url": row["site_url"], "name": row["name"], "crawled": row["drive_id"] is not None,
+                             "default_label": row["default_label"]} for row in rows}
+
+
+def _new_totals():
+    return {"items": 0, "bytes": 0, "unlabeled_items": 0, "unlabeled_bytes": 0, "labels": {},
+            "fields_unavailable_items": 0}
+
+
+def _add(totals, label, fields_error, items, size):
+    if fields_error:
+        # Label unknown: neither labeled nor unlabeled
+        totals["fields_unavailable_items"] += items
+        return
+    totals["items"] += items
+    totals["bytes"] += size
+    if label is None:
+        totals["unlabeled_items"] += items
+        totals["unlabeled_bytes"] += size
+    else:
+        label_totals = totals["labels"].setdefault(label, {"items": 0, "bytes": 0})
+        label_totals["items"] += items
+        label_totals["bytes"] += size
+
+
+def _coverage(totals):
+    if not totals["items"]:
+        return None
+    return round(1 - totals["unlabeled_items"] / totals["items"], 4)
+
+
+def build_report(rows, columns, libraries, group_by=DEFAULT_GROUP_BY, source=None, catalog=None):
+    """
+    Roll aggregated rows up into the coverage report.
+
+    Args:
+        rows: Rows of (*columns, retention_label, fields_error, items, bytes)
+        columns: Item columns of the rows (from _item_columns)
+        libraries: Library details by list id
+        group_by: Report dimensions
+        source: Inventory or export path, recorded in the report
+        catalog: LabelCatalog to add label ids and retention settings from (optional)
+    """
+    index = {column: i for i, column in enumerate(columns)}
+    total = _new_totals()
+    groups = {}
+    per_library = {}
+
+    for row in rows:
+        label, fields_error, items, size = row[-4:]
+        list_id = row[index["list_id"]]
+
+        key = tuple(row[index[DIMENSIONS[dimension]]] for dimension in group_by)
+
+        _add(total, label, fields_error, items, size)
+        _add(groups.setdefault(key, _new_totals()), label, fields_error, items, size)
+        _add(per_library.setdefault(list_id, _new_totals()), label, fields_error, items, size)
+
+    group_entries = []
+    for key, totals in groups.items():
+        entry = {}
+        for dimension, value in zip(group_by, key):
+            if dimension == "library":
+                library = libraries.get(value, {})
+                entry.update(list_id=value, library=library.get("name"), default_label=library.get("default_label"))
+            else:
+                entry[DIMENSIONS[dimension]] = value
+        entry.update(totals, coverage=_coverage(totals))
+        group_entries.append(entry)
+    group_entries.sort(key=lambda entry: (-entry["unlabeled_items"], -entry["items"]))
+
+    without_default = []
+    crawled = 0
+    for list_id, library in libraries.items():
+        if not library["crawled"]:
+            continue
+        crawled += 1
+        if library["default_label"]:
+            continue
+        totals = per_library.get(list_id, _new_totals())
+        without_default.append({
+            "site_url": library["site_url"], "library": library["name"], "list_id": list_id,
+            "items": totals["items"], "unlabeled_items": totals["unlabeled_items"]
+        })
+    without_default.sort(key=lambda entry: (-entry["unlabeled_items"], entry["site_url"] or "", entry["library"] or ""))
+
+    labels = dict(sorted(total["labels"].items(), key=lambda item: -item[1]["items"]))
+    unknown_labels = []
+    if catalog is not None:
+        for name, totals in labels.items():
+            label = catalog.find(name)
+            if label is None:
+                unknown_labels.append(name)
+                continue
+            summary = catalog.summary(label)
+            totals.update(id=label["id"], retention_days=summary["retention_days"],
+                          action_after_retention=summary["action_after_retention"])
+
+    report = {
+        "generated": datetime.now().isoformat(),
+        "source": source,
+        "group_by": list(group_by),
+        "summary": {
+            "items": total["items"],
+            "bytes": total["bytes"],
+            "labeled_items": total["items"] - total["unlabeled_items"],
+            "labeled_bytes": total["bytes"] - total["unlabeled_bytes"],
+            "item_coverage": _coverage(total),
+            "byte_coverage": round(1 - total["unlabeled_bytes"] / total["bytes"], 4) if total["bytes"] else None,
+            "fields_unavailable_items": total["fields_unavailable_items"],
+            "crawled_libraries": crawled,
+            "libraries_without_default_label": len(without_default)
+        },
+        "labels": labels,
+        "groups": group_entries,
+        "libraries_without_default_label": without_default
+    }
+    if catalog is not None:
+        # Labels on items that are not (or no longer) in the tenant's catalog
+        report["summary"]["unknown_labels"] = unknown_labels
+    return report
+
+
+def label_coverage(db_path=None, export_dir=None, group_by=DEFAULT_GROUP_BY, catalog=None):
+    """
+    Build the retention label coverage report.
+
+    Args:
+        db_path: Inventory database (used unless export_dir is given)
+        export_dir: Columnar export directory of sp_inventory_export.py
+        group_by: Report dimensions (site, library, content_type, folder)
+        catalog: LabelCatalog to annotate the labels with (optional)
+
+    Raises:
+        FileNotFoundError: If the inventory does not exist
+    """
+    columns = _item_columns(group_by)
+    if export_dir:
+        log_utils.info(Messages.Coverage.SOURCE_EXPORT, export_dir)
+        rows = aggregate_export(export_dir, columns)
+        libraries = _export_libraries(export_dir)
+        source = export_dir
+    else:
+        conn = sp_inventory.connect_readonly(db_path or sp_inventory.DEFAULT_INVENTORY_PATH)
+        log_utils.info(Messages.Coverage.SOURCE_INVENTORY, db_path)
+        try:
+            rows = aggregate_inventory(conn, columns)
+            libraries = _inventory_libraries(conn)
+        finally:
+            conn.close()
+        source = db_path
+    return build_report(rows, columns, libraries, group_by, source, catalog)
+
+
+def _group_name(entry, group_by):
+    parts = []
+    for dimension in group_by:
+        if dimension == "library":
+            parts.append(entry.get("library") or entry.get("list_id") or "(unknown library)")
+        else:
+            parts.append(entry.get(DIMENSIONS[dimension]) or f"(no {dimension.replace('_', ' ')})")
+    return " / ".join(parts)
+
+
+def main():
+    """Retention label coverage report."""
+    parser = argparse.ArgumentParser(
+        description='SharePoint Retention Label Coverage - Report labeled and unlabeled documents',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Coverage per site and library from the inventory database
+  python sp_label_coverage.py --db ./extracted_schemas/inventory.db --output label_coverage.json
+
+  # Coverage per library and content type from the columnar export
+  python sp_label_coverage.py --export ./extracted_schemas/export --by site library content_type
+
+  # Folders of one tenant with the most unlabeled documents
+  python sp_label_coverage.py --by site library folder --top 25
+        """
+    )
+
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--db', default=sp_inventory.DEFAULT_INVENTORY_PATH,
+                        help=f'Inventory database (default: {sp_inventory.DEFAULT_INVENTORY_PATH})')
+    source.add_argument('--export', metavar='DIR', help='Columnar export of sp_inventory_export.py to read instead')
+    parser.add_argument('--by', nargs='+', choices=list(DIMENSIONS), default=list(DEFAULT_GROUP_BY),
+                        help='Dimensions to group by (default: site library)')
+    parser.add_argument('--top', type=int, default=10, help='Groups with the most unlabeled items to show')
+    parser.add_argument('--catalog', nargs='?', const=purview_label_catalog.DEFAULT_CACHE_PATH, metavar='CACHE',
+                        help='Add label ids and retention settings from the retention label catalog '
+                             f'(default cache: {purview_label_catalog.DEFAULT_CACHE_PATH})')
+    parser.add_argument('--output', help='Path to save the report (default: auto-generated filename)')
+
+    args = parser.parse_args()
+
+    try:
+        catalog = purview_label_catalog.get_catalog(args.catalog) if args.catalog else None
+        report = label_coverage(args.db, args.export, args.by, catalog)
+    except (ImportError, RuntimeError) as e:
+        log_utils.error(str(e))
+        return 1
+    except FileNotFoundError:
+        return 1
+
+    summary = report["summary"]
+    log_utils.info(Messages.Coverage.SUMMARY_HEADER)
+    log_utils.info(Messages.Coverage.SUMMARY_ITEMS, summary["labeled_items"], summary["items"],
+                   summary["item_coverage"] or 0)
+    log_utils.info(Messages.Coverage.SUMMARY_BYTES, summary["labeled_bytes"], summary["bytes"],
+                   summary["byte_coverage"] or 0)
+    for label, totals in report["labels"].items():
+        log_utils.info(Messages.Coverage.SUMMARY_LABEL, label, totals["items"])
+    if summary["fields_unavailable_items"]:
+        log_utils.warning(Messages.Coverage.SUMMARY_FIELDS_UNAVAILABLE, summary["fields_unavailable_items"])
+    log_utils.info(Messages.Coverage.SUMMARY_NO_DEFAULT, summary["libraries_without_default_label"],
+                   summary["crawled_libraries"])
+    if summary.get("unknown_labels"):
+        log_utils.warning(Messages.Coverage.UNKNOWN_LABELS, ", ".join(summary["unknown_labels"]))
+
+    top = [entry for entry in report["groups"][:args.top] if entry["unlabeled_items"]]
+    if top:
+        log_utils.info(Messages.Coverage.TOP_HEADER)
+        for entry in top:
+            log_utils.info(Messages.Coverage.TOP_ITEM, _group_name(entry, args.by), entry["unlabeled_items"],
+                           entry["items"], entry["coverage"] or 0)
+
+    output_path = args.output
+    if not output_path:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = f"./extracted_schemas/label_coverage_{timestamp}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)) or '.', exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    log_utils.info(Messages.Coverage.REPORT_SAVED, output_path)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# file: workflows/common/sp_library_clusters.py
+"""
+SharePoint Library Clusters - Find near-duplicate library designs.
+
+Each extracted list schema is turned into a set of column signatures
+(name, type, options). Libraries are clustered with MinHash and
+locality-sensitive hashing, so only libraries that land in the same LSH
+bucket are compared instead of every pair. Each cluster is reported with
+its shared columns, per-library differences and the differences from the
+closest workflow target schema.
+"""
+
+import os
+import sys
+import json
+import glob
+import random
+import hashlib
+import argparse
+from datetime import datetime
+from collections import Counter, defaultdict
+
+from workflows.common import log_utils
+from workflows.common import sp_inventory
+from workflows.common import sp_metadata_utils as sp
+from workflows.common.log_utils import Messages
+
+# Initialize logging
+log_utils.setup_logging()
+
+DEFAULT_TARGETS = "workflows/*/metadata-schema.json"
+DEFAULT_NUM_PERM = 128
+DEFAULT_THRESHOLD = 0.8
+
+# Mersenne prime used for the universal hash permutations
+_PRIME = (1 << 61) - 1
+
+
+class ClusterMessages:
+    """Library clustering related messages."""
+    LOAD_START = "Loading list schemas from {} ({} files)"
+    LOAD_INVENTORY = "Loading library schemas from inventory {}"
+    LOAD_FILE_ERROR = "Skipping {}: {}"
+    LOAD_SUMMARY = "Loaded {} list schemas ({} distinct column signatures)"
+    TARGETS_LOADED = "Loaded {} target schemas"
+    LSH_PARAMS = "MinHash with {} permutations, LSH with {} bands x {} rows (threshold {})"
+    CLUSTERS_FOUND = "Found {} clusters covering {} libraries"
+    CLUSTER_ITEM = "  • {} libraries, closest target {} ({:.0%} similar)"
+    REPORT_SAVED = "Saved cluster report to {}"
+
+# Register message class
+if not hasattr(Messages, 'Clusters'):
+    setattr(Messages, 'Clusters', ClusterMessages)
+
+
+def column_signature(field):
+    """Build a comparable signature for one schema field."""
+    name = (field.get("name") or "").strip().lower()
+    options = "|".join(sorted(str(option) for option in field.get("options") or []))
+    return f"{name}\x1f{field.get('type')}\x1f{options}"
+
+
+def schema_signatures(schema):
+    """Get the set of column signatures of a schema."""
+    return frozenset(column_signature(field) for field in schema.get("metadata", []))
+
+
+def jaccard(a, b):
+    """Exact Jaccard similarity of two sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """
+    MinHash signatures over string tokens.
+
+    The permutation values of each distinct token are computed once and
+    cached; library designs repeat the same columns over and over, so a
+    library's signature is mostly an element-wise min over cached vectors.
+    """
+
+    def __init__(self, num_perm=DEFAULT_NUM_PERM, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        self._token_cache = {}
+
+    def _token_vector(self, token):
+        vector = self._token_cache.get(token)
+        if vector is None:
+            value = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+            vector = tuple((a * value + b) % _PRIME for a, b in self._params)
+            self._token_cache[token] = vector
+        return vector
+
+    def signature(self, tokens):
+        """MinHash signature of a set of tokens."""
+        if not tokens:
+            return (_PRIME,) * self.num_perm
+        vectors = [self._token_vector(token) for token in tokens]
+        if len(vectors) == 1:
+            return vectors[0]
+        return tuple(map(min, *vectors))
+
+
+def lsh_parameters(num_perm, threshold):
+    """
+    Choose LSH bands and rows whose similarity threshold is closest to threshold.
+
+    Returns:
+        Tuple of (bands, rows)
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        estimate = (1 / bands) ** (1 / rows)
+        error = abs(estimate - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class _UnionFind:
+    """Disjoint sets over library indexes."""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+
+def load_libraries(source_dir):
+    """
+    Load list schemas from a directory of extraction output.
+
+    Returns:
+        List of dicts with site, name and schema
+    """
+    files = sorted(glob.glob(os.path.join(source_dir, "**", "*.json"), recursive=True))
+    # Each extraction run writes new files; only the newest of each site is clustered
+    files = sp.latest_extraction_files(files)
+    log_utils.info(Messages.Clusters.LOAD_START, source_dir, len(files))
+
+    libraries = []
+    for path in files:
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except Exception as e:
+            log_utils.warning(Messages.Clusters.LOAD_FILE_ERROR, path, e)
+            continue
+        site_url, schemas = sp.schemas_from_extraction(data)
+        for schema in schemas:
+            libraries.append({"site": site_url or path, "name": schema["name"], "schema": schema})
+    return libraries
+
+
+def load_libraries_from_inventory(path):
+    """
+    Load list schemas from an inventory database.
+
+    Returns:
+        List of dicts with site, name and schema
+    """
+    conn = sp_inventory.connect_readonly(path)
+    log_utils.info(Messages.Clusters.LOAD_INVENTORY, path)
+
+    libraries = []
+    try:
+        for data in sp_inventory.iter_extractions(conn):
+            site_url, schemas = sp.schemas_from_extraction(data)
+            for schema in schemas:
+                libraries.append({"site": site_url, "name": schema["name"], "schema": schema})
+    finally:
+        conn.close()
+    return libraries
+
+
+def load_targets(pattern=DEFAULT_TARGETS):
+    """Load workflow target schemas matching a glob pattern."""
+    targets = {}
+    for path in sorted(glob.glob(pattern)):
+        try:
+            with open(path) as f:
+                schema = json.load(f)
+        except Exception as e:
+            log_utils.warning(Messages.Clusters.LOAD_FILE_ERROR, path, e)
+            continue
+        if "metadata" in schema:
+            targets[path] = schema
+    log_utils.info(Messages.Clusters.TARGETS_LOADED, len(targets))
+    return targets
+
+
+def find_clusters(signature_sets, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM):
+    """
+    Cluster signature sets with MinHash LSH.
+
+    Libraries that share an LSH bucket are verified with exact Jaccard
+    similarity against the first library in the bucket, so buckets with
+    hundreds of identical copies cost linear rather than quadratic work.
+
+    Returns:
+        List of clusters (lists of indexes), largest first
+    """
+    bands, rows = lsh_parameters(num_perm, threshold)
+    log_utils.info(Messages.Clusters.LSH_PARAMS, num_perm, bands, rows, threshold)
+
+    hasher = MinHasher(num_perm)
+    buckets = defaultdict(list)
+    for index, tokens in enumerate(signature_sets):
+        signature = hasher.signature(tokens)
+        for band in range(bands):
+            buckets[(band, signature[band * rows:(band + 1) * rows])].append(index)
+
+    union_find = _UnionFind(len(signature_sets))
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        first = members[0]
+        for other in members[1:]:
+            if union_find.find(first) == union_find.find(other):
+                continue
+            if jaccard(signature_sets[first], signature_sets[other]) >= threshold:
+                union_find.union(first, other)
+
+    groups = defaultdict(list)
+    for index in range(len(signature_sets)):
+        groups[union_find.find(index)].append(index)
+    return sorted(groups.values(), key=len, reverse=True)
+
+
+def _field_label(signature):
+    """Human-readable form of a column signature."""
+    name, field_type, options = signature.split("\x1f")
+    return f"{name} ({field_type})" + (f" [{options}]" if options else "")
+
+
+def describe_cluster(members, libraries, signature_sets, targets):
+    """
+    Build the report entry for one cluster.
+
+    Returns:
+        Dict with shared columns, per-library differences and closest target
+    """
+    member_sets = [signature_sets[index] for index in members]
+    counts = Counter(signature for tokens in member_sets for signature in tokens)
+
+    # The most common exact design stands in for the whole cluster
+    representative_set = Counter(member_sets).most_common(1)[0][0]
+    representative = libraries[members[member_sets.index(representative_set)]]
+
+    closest_target, similarity, target_schema = None, 0.0, None
+    for path, schema in targets.items():
+        score = jaccard(representative_set, schema_signatures(schema))
+        if closest_target is None or score > similarity:
+            closest_target, similarity, target_schema = path, score, schema
+
+    shared = sorted(signature for signature, count in counts.items() if count == len(members))
+    entries = []
+    for index, tokens in zip(members, member_sets):
+        library = libraries[index]
+        entry = {
+            "site": library["site"],
+            "library": library["name"],
+            "extra_columns": sorted(_field_label(s) for s in tokens - representative_set),
+            "missing_columns": sorted(_field_label(s) for s in representative_set - tokens)
+        }
+        if target_schema is not None:
+            comparison = sp.compare_schemas(library["schema"], target_schema)
+            entry["target_changes"] = {
+                key: [field["name"] for field in fields] for key, fields in comparison.items()
+            }
+        entries.append(entry)
+
+    return {
+        "size": len(members),
+        "representative": {"site": representative["site"], "library": representative["name"]},
+        "closest_target": closest_target,
+        "target_similarity": round(similarity, 3),
+        "shared_columns": [_field_label(s) for s in shared],
+        "libraries": entries
+    }
+
+
+def cluster_libraries(libraries, targets, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM,
+                      min_size=2):
+    """
+    Cluster near-identical libraries and describe each cluster.
+
+    Returns:
+        Cluster report dict
+    """
+    signature_sets = [schema_signatures(library["schema"]) for library in libraries]
+    distinct = len({s for tokens in signature_sets for s in tokens})
+    log_utils.info(Messages.Clusters.LOAD_SUMMARY, len(libraries), distinct)
+
+    clusters = [members for members in find_clusters(signature_sets, threshold, num_perm)
+                if len(members) >= min_size]
+
+    return {
+        "generated": datetime.now().isoformat(),
+        "threshold": threshold,
+        "libraries": len(libraries),
+        "clusters": [describe_cluster(members, libraries, signature_sets, targets) for members in clusters]
+    }
+
+
+def main():
+    """Near-duplicate library design detection."""
+    parser = argparse.ArgumentParser(
+        description='SharePoint Library Clusters - Find near-duplicate library designs',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Cluster all libraries in cached extraction output
+  python sp_library_clusters.py --source ./extracted_schemas --output clusters.json
+
+  # Cluster the libraries loaded into the inventory database
+  python sp_library_clusters.py --inventory ./extracted_schemas/inventory.db
+
+  # Only report larger groups of very similar libraries
+  python sp_library_clusters.py --source ./extracted_schemas --threshold 0.9 --min-size 5
+        """
+    )
+
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--source', help='Directory of extraction output')
+    source.add_argument('--inventory', metavar='DB', help='Inventory database to read list schemas from')
+    parser.add_argument('--targets', default=DEFAULT_TARGETS,
+                        help=f'Glob of workflow target schemas (default: {DEFAULT_TARGETS})')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Minimum Jaccard similarity of column signatures (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--num-perm', type=int, default=DEFAULT_NUM_PERM,
+                        help=f'Number of MinHash permutations (default: {DEFAULT_NUM_PERM})')
+    parser.add_argument('--min-size', type=int, default=2, help='Minimum libraries per reported cluster')
+    parser.add_argument('--output', help='Path to save the report (default: auto-generated filename)')
+
+    args = parser.parse_args()
+
+    if args.inventory:
+        try:
+            libraries = load_libraries_from_inventory(args.inventory)
+        except FileNotFoundError:
+            return 1
+    else:
+        libraries = load_libraries(args.source)
+    targets = load_targets(args.targets)
+    report = cluster_libraries(libraries, targets, threshold=args.threshold,
+                               num_perm=args.num_perm, min_size=args.min_size)
+
+    clustered = sum(cluster["size"] for cluster in report["clusters"])
+    log_utils.info(Messages.Clusters.CLUSTERS_FOUND, len(report["clusters"]), clustered)
+    for cluster in report["clusters"][:10]:
+        log_utils.info(Messages.Clusters.CLUSTER_ITEM, cluster["size"],
+                       cluster["closest_target"], cluster["target_similarity"])
+
+    output_path = args.output
+    if not output_path:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_path = f"./extracted_schemas/library_clusters_{timestamp}.json"
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)) or '.', exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    log_utils.info(Messages.Clusters.REPORT_SAVED, output_path)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
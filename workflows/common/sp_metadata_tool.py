@@ -10,8 +10,8 @@ compare against target schemas, and generate reports on differences.
 import os
 import json
 import sys
+import hashlib
 import argparse
-from datetime import datetime
 
 # Add the common directory to the path so we can import the modules
 sys.path.append(os.path.dirname(__file__))
@@ -20,10 +20,116 @@ sys.path.append(os.path.dirname(__file__))
 import sp_metadata_utils as sp
 from log_utils import setup_logging, Messages
 import log_utils
+from workflows.common import graph_trace
+from workflows.common import sp_inventory
+from workflows.common.sp_checkpoint import ExtractionCheckpoint, CheckpointMismatch, CheckpointExists
+
+DEFAULT_CHECKPOINT_DIR = "./extracted_schemas"
 
 # Initialize logging
 setup_logging()
 
+def _site_file_name(site_url, timestamp):
+    """Output file name for a site's comprehensive schema."""
+    site_name = site_url.rstrip('/').split('/')[-1] if '/' in site_url else 'site'
+    return f"site_{site_name}_{timestamp}.json"
+
+def default_checkpoint_path(sites):
+    """Checkpoint file of a site list, so extractions of different sites never share one."""
+    digest = hashlib.sha256("\n".join(sites).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(DEFAULT_CHECKPOINT_DIR, f".extraction_checkpoint_{digest}.jsonl")
+
+def extract_comprehensive(args):
+    """
+    Run a comprehensive extraction of one or more sites with checkpointing.
+    
+    Progress is journaled to the checkpoint file as each list completes. If
+    the run is interrupted, --resume continues where it stopped; the
+    checkpoint is removed once every site has been saved.
+    """
+    if args.sites_file:
+        with open(args.sites_file) as f:
+            sites = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    else:
+        sites = [args.site]
+    
+    if not args.checkpoint:
+        args.checkpoint = default_checkpoint_path(sites)
+    
+    run_key = {"sites": sites, "list": args.list, "detailed": args.detailed}
+    if args.resolve_lookups:
+        run_key["resolve_lookups"] = True
+    if args.inventory:
+        run_key["inventory"] = os.path.abspath(args.inventory)
+    try:
+        checkpoint = ExtractionCheckpoint(args.checkpoint, run_key, resume=args.resume, overwrite=args.restart)
+    except (CheckpointMismatch, CheckpointExists):
+        return 1
+    
+    inventory = sp_inventory.connect(args.inventory) if args.inventory else None
+    
+    failed = 0
+    try:
+        for site_url in sites:
+            if checkpoint.site_output(site_url):
+                log_utils.info(Messages.Checkpoint.SITE_SKIPPED, site_url)
+                continue
+            
+            log_utils.info(Messages.Schema.EXTRACT_COMPREHENSIVE, site_url)
+            site_schema = sp.extract_comprehensive_site_schema(
+                site_url, 
+                specific_list=args.list,  # Optional list to focus on
+                verbose=args.verbose, 
+                detailed=args.detailed,
+                checkpoint=checkpoint,
+                resolve_lookups=args.resolve_lookups
+            )
+            
+            if not site_schema:
+                log_utils.error(Messages.Schema.EXTRACT_FAILURE)
+                failed += 1
+                continue
+                
+            log_utils.info("Successfully extracted site information:")
+            log_utils.info("  • {} site columns", len(site_schema.get('site_columns', [])))
+            log_utils.info("  • {} content types", len(site_schema.get('content_types', [])))
+            log_utils.info("  • {} site features", len(site_schema.get('features', [])))
+            log_utils.info("  • {} lists/libraries", len(site_schema.get('lists', [])))
+            
+            # Save comprehensive schema (auto-generated names use the run start
+            # time so a resumed run writes the same files as an uninterrupted one)
+            if args.sites_file:
+                output_dir = args.output or "./extracted_schemas"
+                output_path = os.path.join(output_dir, _site_file_name(site_url, checkpoint.started))
+            elif args.output:
+                output_path = args.output
+            else:
+                output_path = f"./extracted_schemas/{_site_file_name(site_url, checkpoint.started)}"
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)) or '.', exist_ok=True)
+            with open(output_path, 'w') as f:
+                json.dump(site_schema, f, indent=2)
+            log_utils.info(Messages.Schema.SCHEMA_SAVED, output_path)
+            
+            if inventory:
+                sp_inventory.load_site_schema(inventory, site_schema, all_lists=not args.list)
+            
+            checkpoint.record_site_done(site_url, output_path)
+    except BaseException:
+        checkpoint.close()
+        log_utils.error(Messages.Checkpoint.INTERRUPTED, args.checkpoint)
+        raise
+    finally:
+        if inventory:
+            inventory.close()
+    
+    if failed:
+        checkpoint.close()
+        log_utils.error(Messages.Checkpoint.INTERRUPTED, args.checkpoint)
+        return 1
+    
+    checkpoint.complete()
+    return 0
+
 def main():
     """SharePoint metadata tool for extraction and analysis."""
     parser = argparse.ArgumentParser(
@@ -42,10 +148,25 @@ Examples:
   
   # Extract and analyze against target schema
   python sp_metadata_tool.py --site "https://contoso.sharepoint.com/sites/ProjectX" --list "Documents" --analyze --schema metadata-schema.json
+  
+  # Record a timeline of every Graph request (open in chrome://tracing or Perfetto)
+  python sp_metadata_tool.py --site "https://contoso.sharepoint.com/sites/ProjectX" --comprehensive --trace extraction_trace.json
+  
+  # Extract many sites (one URL per line), continuing an interrupted run
+  python sp_metadata_tool.py --sites-file tenant_sites.txt --output ./extracted_schemas --resume
+  
+  # Also load every extracted site into the local inventory database
+  python sp_metadata_tool.py --sites-file tenant_sites.txt --output ./extracted_schemas --inventory ./extracted_schemas/inventory.db
+  
+  # Analyze a list against the target schema from the inventory, without calling SharePoint
+  python sp_metadata_tool.py --site "https://contoso.sharepoint.com/sites/ProjectX" --list "Documents" --analyze --schema metadata-schema.json --offline --inventory ./extracted_schemas/inventory.db
         """
     )
     
-    parser.add_argument('--site', required=True, help='SharePoint site URL')
+    parser.add_argument('--site', help='SharePoint site URL')
+    parser.add_argument('--sites-file', metavar='FILE',
+                        help='File with one site URL per line for multi-site comprehensive extraction '
+                             '(--output is then a directory)')
     parser.add_argument('--output', help='Path to save extracted schema (default: auto-generated filename)')
     parser.add_argument('--analyze', action='store_true', help='Compare extracted schema with target schema')
     parser.add_argument('--schema', help='Path to target schema for analysis (required with --analyze)')
@@ -54,8 +175,24 @@ Examples:
                         help='List all document libraries in the site and exit')
     parser.add_argument('--detailed', action='store_true', 
                         help='Include extended column information and site columns')
+    parser.add_argument('--resolve-lookups', action='store_true',
+                        help='Add the target list and column of Lookup fields (each referenced list is read once)')
     parser.add_argument('--comprehensive', action='store_true',
                         help='Extract comprehensive site information (columns, content types, features)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted comprehensive extraction from its checkpoint')
+    parser.add_argument('--restart', action='store_true',
+                        help='Discard the checkpoint of an interrupted extraction and start over')
+    parser.add_argument('--checkpoint',
+                        help='Checkpoint file for comprehensive extractions '
+                             f'(default: one per site list in {DEFAULT_CHECKPOINT_DIR})')
+    parser.add_argument('--inventory', metavar='DB',
+                        help='With --comprehensive, also load each site into this inventory database; '
+                             'with --offline, read the list schema from it')
+    parser.add_argument('--offline', action='store_true',
+                        help='Read the current list schema from --inventory instead of SharePoint')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='Write a Chrome trace-event timeline of all Graph requests to FILE')
     
     # List and library are now optional if using comprehensive mode
     group = parser.add_mutually_exclusive_group()
@@ -64,6 +201,17 @@ Examples:
     
     args = parser.parse_args()
     
+    if args.trace:
+        graph_trace.enable(args.trace)
+    
+    # A sites file is always a comprehensive extraction
+    if args.sites_file:
+        args.comprehensive = True
+    if not args.site and (args.list_libraries or not args.sites_file):
+        log_utils.error(Messages.Tool.SITE_REQUIRED)
+        parser.print_help()
+        return 1
+    
     # Make sure a list is provided or comprehensive mode is used or list-libraries is used
     if not (args.list or args.list_libraries or args.comprehensive):
         log_utils.error(Messages.Tool.ARG_ERROR)
@@ -102,7 +250,7 @@ Examples:
     
     log_utils.info(Messages.Tool.TOOL_HEADER)
     log_utils.info(Messages.Tool.TOOL_SEPARATOR)
-    log_utils.info(Messages.Tool.SITE_URL, args.site)
+    log_utils.info(Messages.Tool.SITE_URL, args.site or args.sites_file)
     if args.list:
         log_utils.info(Messages.Tool.LIST_NAME, args.list)
     elif args.comprehensive:
@@ -110,42 +258,7 @@ Examples:
     
     # Handle comprehensive site extraction
     if args.comprehensive:
-        log_utils.info(Messages.Schema.EXTRACT_COMPREHENSIVE, args.site)
-        site_schema = sp.extract_comprehensive_site_schema(
-            args.site, 
-            specific_list=args.list,  # Optional list to focus on
-            verbose=args.verbose, 
-            detailed=args.detailed
-        )
-        
-        if not site_schema:
-            log_utils.error(Messages.Schema.EXTRACT_FAILURE)
-            return 1
-            
-        log_utils.info("Successfully extracted site information:")
-        log_utils.info("  • {} site columns", len(site_schema.get('site_columns', [])))
-        log_utils.info("  • {} content types", len(site_schema.get('content_types', [])))
-        log_utils.info("  • {} site features", len(site_schema.get('features', [])))
-        log_utils.info("  • {} lists/libraries", len(site_schema.get('lists', [])))
-        
-        # Save comprehensive schema
-        if args.output:
-            output_path = args.output
-            os.makedirs(os.path.dirname(os.path.abspath(output_path)) or '.', exist_ok=True)
-            with open(output_path, 'w') as f:
-                json.dump(site_schema, f, indent=2)
-            log_utils.info(Messages.Schema.SCHEMA_SAVED, output_path)
-        else:
-            # Auto-generate filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            site_name = args.site.split('/')[-1] if '/' in args.site else 'site'
-            output_path = f"./extracted_schemas/site_{site_name}_{timestamp}.json"
-            os.makedirs("./extracted_schemas", exist_ok=True)
-            with open(output_path, 'w') as f:
-                json.dump(site_schema, f, indent=2)
-            log_utils.info(Messages.Schema.SCHEMA_SAVED, output_path)
-        
-        return 0
+        return extract_comprehensive(args)
     
     # Regular metadata extraction (requires list parameter)
     if not args.list:
@@ -154,17 +267,34 @@ Examples:
         log_utils.error(Messages.Tool.COMPREHENSIVE_HINT)
         return 1
     
-    # Extract current schema
-    log_utils.info(Messages.Schema.EXTRACT_START, args.site)
-    current_schema = sp.extract_metadata_schema(args.site, args.list, verbose=args.verbose, detailed=args.detailed)
-    
-    if not current_schema:
-        log_utils.error(Messages.Schema.EXTRACT_FAILURE)
-        return 1
-    
-    log_utils.info(Messages.Schema.EXTRACT_SUCCESS, len(current_schema['metadata']))
+    if args.offline:
+        # Current schema from the inventory, no Graph calls
+        if not args.inventory:
+            log_utils.error(Messages.Tool.INVENTORY_REQUIRED)
+            return 1
+        try:
+            conn = sp_inventory.connect_readonly(args.inventory)
+        except FileNotFoundError:
+            return 1
+        current_schema = sp_inventory.get_list_schema(conn, args.site, args.list)
+        conn.close()
+        if not current_schema:
+            log_utils.error(Messages.Tool.INVENTORY_LIST_MISSING, args.list, args.site, args.inventory)
+            return 1
+        log_utils.info(Messages.Schema.EXTRACT_SUCCESS, len(current_schema['metadata']))
+    else:
+        # Extract current schema
+        log_utils.info(Messages.Schema.EXTRACT_START, args.site)
+        current_schema = sp.extract_metadata_schema(args.site, args.list, verbose=args.verbose,
+                                                    detailed=args.detailed, resolve_lookups=args.resolve_lookups)
+        
+        if not current_schema:
+            log_utils.error(Messages.Schema.EXTRACT_FAILURE)
+            return 1
+        
+        log_utils.info(Messages.Schema.EXTRACT_SUCCESS, len(current_schema['metadata']))
     
-    # Save extracted schema
+    # Save extracted schema (an offline schema is already on disk in the inventory)
     if args.output:
         output_path = args.output
         # Create directory if it doesn't exist
@@ -172,7 +302,7 @@ Examples:
         with open(output_path, 'w') as f:
             json.dump(current_schema, f, indent=2)
         log_utils.info(Messages.Schema.SCHEMA_SAVED, output_path)
-    else:
+    elif not args.offline:
         # Auto-generate filename if not specified
         output_path = sp.save_schema_to_file(current_schema)
         log_utils.info(Messages.Schema.SCHEMA_SAVED, output_path)
@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
 # file: workflows/common/sp_metadata_utils.py
-import requests
 import os
+import re
 import json
 from msal import ConfidentialClientApplication
 from datetime import datetime
 
 # Import our custom logging utilities
 from workflows.common import log_utils
+from workflows.common import graph_http
+from workflows.common import graph_stream
 from workflows.common.log_utils import Messages
 
 # Initialize logging
@@ -19,8 +21,17 @@ try:
 except ImportError:
     log_utils.warning(Messages.Auth.DOTENV_MISSING)
 
+# MSAL apps by (tenant, client) so repeated calls are served from the
+# MSAL token cache and only refresh when the token is about to expire
+_msal_apps = {}
+
 def get_access_token():
-    """Get Microsoft Graph API access token."""
+    """
+    Get Microsoft Graph API access token.
+    
+    Safe to call repeatedly during long runs: a cached token is returned
+    until it nears expiry, then a new one is acquired.
+    """
     # Load environment variables from .env file if available
     try:
         load_dotenv()
@@ -37,11 +48,14 @@ def get_access_token():
         return None
         
     # Initialize the MSAL confidential client application
-    app = ConfidentialClientApplication(
-        client_id=client_id,
-        authority=f"https://login.microsoftonline.com/{tenant_id}",
-        client_credential=client_secret
-    )
+    app = _msal_apps.get((tenant_id, client_id))
+    if app is None:
+        app = ConfidentialClientApplication(
+            client_id=client_id,
+            authority=f"https://login.microsoftonline.com/{tenant_id}",
+            client_credential=client_secret
+        )
+        _msal_apps[(tenant_id, client_id)] = app
     
     # Get token for SharePoint Online scope
     scopes = ["https://graph.microsoft.com/.default"]
@@ -102,7 +116,7 @@ def get_site_id(token, site_url, verbose=False):
         log_utils.info("Using API URL: {}", api_url)
     
     # Make the API request to get site information
-    response = requests.get(api_url, headers=headers)
+    response = graph_http.get(api_url, headers=headers)
     
     if response.status_code == 200:
         site_data = response.json()
@@ -113,41 +127,59 @@ def get_site_id(token, site_url, verbose=False):
         log_utils.error("Error retrieving site: Status {} - {}", response.status_code, response.text)
         return None
 
-def get_lists(token, site_id):
-    """Get all lists in the SharePoint site."""
+def iter_list_pages(token, site_id, start_url=None):
+    """
+    Page through the lists in the SharePoint site.
+    
+    Args:
+        token: Access token
+        site_id: Site ID
+        start_url: Pagination cursor (@odata.nextLink) to resume from (optional)
+    
+    Yields:
+        Tuples of (lists on the page, nextLink cursor or None on the last page)
+    """
     headers = {
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json"
     }
     
-    url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/lists"
-    
-    response = requests.get(url, headers=headers)
+    url = start_url or f"https://graph.microsoft.com/v1.0/sites/{site_id}/lists"
     
-    if response.status_code == 200:
+    while url:
+        response = graph_http.get(url, headers=headers)
+        
+        if response.status_code != 200:
+            log_utils.error("Error retrieving lists: Status {} - {}", response.status_code, response.text)
+            raise RuntimeError(f"Error retrieving lists: Status {response.status_code}")
+        
         lists_data = response.json()
-        return lists_data.get('value', [])
-    else:
-        from workflows.common import log_utils
-        log_utils.error("Error retrieving lists: Status {} - {}", response.status_code, response.text)
+        url = lists_data.get('@odata.nextLink')
+        yield lists_data.get('value', []), url
 
-def get_list_columns(token, site_id, list_id):
-    """Get all columns (fields) for a specific list."""
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
+def get_lists(token, site_id):
+    """Get all lists in the SharePoint site."""
+    try:
+        return [lst for page, _ in iter_list_pages(token, site_id) for lst in page]
+    except RuntimeError:
+        return None
+
+def iter_list_columns(token, site_id, list_id):
+    """
+    Yield the columns (fields) of a list as they are parsed from the response stream.
     
+    Raises:
+        RuntimeError: If Graph returns an error
+    """
     url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/lists/{list_id}/columns"
-    
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        columns_data = response.json()
-        return columns_data.get('value', [])
-    else:
-        from workflows.common import log_utils
-        log_utils.error("Error retrieving columns: Status {} - {}", response.status_code, response.text)
+    return graph_stream.iter_collection(url, headers=graph_http.auth_headers(token))
+
+def get_list_columns(token, site_id, list_id):
+    """Get all columns (fields) for a specific list."""
+    try:
+        return list(iter_list_columns(token, site_id, list_id))
+    except RuntimeError as e:
+        log_utils.error("Error retrieving columns: {}", e)
 
 def map_sp_type_to_schema(column):
     """Map SharePoint column type to our schema format."""
@@ -179,25 +211,93 @@ def map_sp_type_to_schema(column):
     
     return column_type
 
-def get_site_columns(token, site_id):
-    """Get all site columns defined at the site level."""
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
+def iter_site_columns(token, site_id):
+    """
+    Yield the site columns.
+    
+    Read with coalesced GETs rather than streamed: every extraction worker
+    of a site asks for the same small collection at about the same time.
     
+    Raises:
+        RuntimeError: If Graph returns an error
+    """
     url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/columns"
+    return graph_http.iter_values(url, headers=graph_http.auth_headers(token))
+
+class LookupResolver:
+    """
+    Resolves lookup columns of a site to the list and column they point to.
     
-    response = requests.get(url, headers=headers)
+    Each referenced list (its name and columns) is fetched once and
+    remembered, so any number of lookup fields pointing at the same list
+    cost two Graph calls in total.
     
-    if response.status_code == 200:
-        columns_data = response.json()
-        return columns_data.get('value', [])
-    else:
-        from workflows.common import log_utils
-        log_utils.error("Error retrieving site columns: Status {} - {}", response.status_code, response.text)
+    Args:
+        site_id: Site ID the lookup columns belong to
+    """
+    
+    def __init__(self, site_id):
+        self.site_id = site_id
+        self._lists = {}
+    
+    def _load_list(self, token, list_id):
+        """Get the name and columns (by internal name) of a list, fetching it on first use."""
+        if list_id in self._lists:
+            return self._lists[list_id]
+        
+        target = None
+        response = graph_http.get(
+            f"https://graph.microsoft.com/v1.0/sites/{self.site_id}/lists/{list_id}?$select=id,displayName",
+            headers=graph_http.auth_headers(token)
+        )
+        if response.status_code == 200:
+            columns = get_list_columns(token, self.site_id, list_id) or []
+            target = {
+                "name": response.json().get('displayName'),
+                "columns": {column.get('name'): column for column in columns}
+            }
+        else:
+            log_utils.warning("Lookup target list {} not found: Status {}", list_id, response.status_code)
+        
+        self._lists[list_id] = target
+        return target
+    
+    def resolve(self, token, lookup):
+        """
+        Resolve a column's lookup block (listId, columnName).
+        
+        Returns:
+            Dict with list_id, list_name, column_name, column_display_name and
+            column_type (names and type are None if the target is not found)
+        """
+        list_id = lookup.get('listId') or lookup.get('lookupListId')
+        column_name = lookup.get('columnName')
+        resolved = {
+            "list_id": list_id,
+            "list_name": None,
+            "column_name": column_name,
+            "column_display_name": None,
+            "column_type": None
+        }
+        
+        target = self._load_list(token, list_id) if list_id else None
+        if target:
+            resolved["list_name"] = target["name"]
+            column = target["columns"].get(column_name)
+            if column:
+                resolved["column_display_name"] = column.get('displayName')
+                resolved["column_type"] = map_sp_type_to_schema(column)
+        return resolved
 
-def extract_metadata_schema(site_url, list_name=None, verbose=False, detailed=False):
+def get_site_columns(token, site_id):
+    """Get all site columns defined at the site level."""
+    try:
+        return list(iter_site_columns(token, site_id))
+    except RuntimeError as e:
+        log_utils.error("Error retrieving site columns: {}", e)
+
+def extract_metadata_schema(site_url, list_name=None, verbose=False, detailed=False, token=None,
+                            resolve_lookups=False):
     """
     Extract metadata schema from a SharePoint site and list.
     
@@ -206,6 +306,8 @@ def extract_metadata_schema(site_url, list_name=None, verbose=False, detailed=Fa
         list_name: Name of the list/library (optional)
         verbose: log detailed progress information
         detailed: Include extended column details and site columns
+        token: Access token to reuse (optional, acquired if not given)
+        resolve_lookups: Add the target list and column of Lookup fields
     
     Returns:
         Dict containing extracted schema or None if failed
@@ -213,7 +315,7 @@ def extract_metadata_schema(site_url, list_name=None, verbose=False, detailed=Fa
     if verbose:
         log_utils.info("Extracting metadata schema from {}", site_url)
     
-    token = get_access_token()
+    token = token or get_access_token()
     if not token:
         log_utils.error("Failed to get access token")
         return None
@@ -223,6 +325,8 @@ def extract_metadata_schema(site_url, list_name=None, verbose=False, detailed=Fa
         log_utils.error("Failed to get site ID for {}", site_url)
         return None
     
+    lookup_resolver = LookupResolver(site_id) if resolve_lookups else None
+    
     # Get site columns if detailed info is requested
     site_columns_dict = {}
     if detailed:
@@ -257,8 +361,8 @@ def extract_metadata_schema(site_url, list_name=None, verbose=False, detailed=Fa
         if verbose:
             log_utils.info("Processing list: {}", list_display_name)
         
-        # Get list columns
-        columns = get_list_columns(token, site_id, list_id)
+        # List columns are mapped as they are parsed from the response stream
+        columns = iter_list_columns(token, site_id, list_id)
         
         workflow_name = list_display_name.lower().replace(" ", "_")
         schema = {
@@ -288,6 +392,10 @@ def extract_metadata_schema(site_url, list_name=None, verbose=False, detailed=Fa
             if field["type"] == "Choice" and column.get('choice', {}).get('choices'):
                 field["options"] = column.get('choice', {}).get('choices', [])
             
+            # Resolve the list and column a lookup points to
+            if lookup_resolver and field["type"] == "Lookup" and column.get('lookup'):
+                field["lookup_target"] = lookup_resolver.resolve(token, column['lookup'])
+            
             # Add additional details if requested
             if detailed:
                 # Include the raw column data for reference
@@ -403,47 +511,119 @@ def save_schema_to_file(schema, filename=None):
         
     return filename
 
+def schemas_from_extraction(data):
+    """
+    Get per-list schemas from saved extraction output.
+
+    Args:
+        data: Loaded JSON from --comprehensive output (site_url + lists) or
+              from a single-list extraction (workflow + metadata)
+
+    Returns:
+        Tuple of (site_url, list of schemas with name, workflow and metadata);
+        the list is empty if data is not extraction output
+    """
+    if not isinstance(data, dict):
+        return None, []
+
+    site_url = data.get("site_url")
+    if "lists" in data:
+        schemas = []
+        for list_entry in data["lists"]:
+            name = list_entry.get("name") or ""
+            schemas.append({
+                "name": name,
+                "workflow": name.lower().replace(" ", "_"),
+                "metadata": list_entry.get("columns", [])
+            })
+        return site_url, schemas
+
+    if "metadata" in data:
+        schema = dict(data)
+        schema.setdefault("name", data.get("workflow") or "")
+        return site_url, [schema]
+
+    return site_url, []
+
+# Top-level site_url and extraction_date of extraction output saved with indent=2
+_EXTRACTION_HEADER = re.compile(r'^  "(site_url|extraction_date)": ("(?:[^"\\]|\\.)*")', re.M)
+
+def _extraction_header(path, head_size=65536):
+    """Site URL and extraction date of a saved extraction, read from the start of the file."""
+    with open(path) as f:
+        head = f.read(head_size)
+    header = {}
+    for match in _EXTRACTION_HEADER.finditer(head):
+        header.setdefault(match.group(1), json.loads(match.group(2)))
+    if "site_url" not in header:
+        # Not written by the extraction tools; parse the whole file
+        with open(path) as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            header = {key: data.get(key) for key in ("site_url", "extraction_date")}
+    return header.get("site_url"), header.get("extraction_date")
+
+def latest_extraction_files(paths):
+    """
+    Keep the newest extraction file of each site.
+
+    Every run of sp_metadata_tool.py writes new timestamped files, so a
+    directory of extraction output holds several extractions of a site.
+    Files are compared by extraction_date (then modification time); files
+    without a site_url (single-list schemas) are all kept.
+
+    Returns:
+        The kept paths, in their original order
+    """
+    newest = {}
+    keep = []
+    for path in paths:
+        try:
+            site_url, extraction_date = _extraction_header(path)
+        except Exception:
+            # Unreadable files are reported by the caller when it loads them
+            keep.append(path)
+            continue
+        if not site_url:
+            keep.append(path)
+            continue
+        key = (extraction_date or "", os.path.getmtime(path))
+        if site_url not in newest or key > newest[site_url][0]:
+            newest[site_url] = (key, path)
+
+    latest = {path for _, path in newest.values()}
+    skipped = len(paths) - len(keep) - len(latest)
+    if skipped:
+        log_utils.info("Skipping {} older extraction files of the same sites", skipped)
+    return [path for path in paths if path in latest or path in keep]
+
 def list_document_libraries(token, site_id):
-    """Get all document libraries in the SharePoint site."""
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-    
-    url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/lists"
+    """Get all document libraries in the SharePoint site, following every page of lists."""
+    try:
+        return [lst for page, _ in iter_list_pages(token, site_id) for lst in page
+                if lst.get('list', {}).get('template') == 'documentLibrary']
+    except RuntimeError:
+        return []
+
+def iter_content_types(token, site_id):
+    """
+    Yield the site content types.
     
-    response = requests.get(url, headers=headers)
+    Read with coalesced GETs rather than streamed: every extraction worker
+    of a site asks for the same small collection at about the same time.
     
-    if response.status_code == 200:
-        lists_data = response.json()
-        # Filter to only show document libraries
-        libraries = []
-        for list_item in lists_data.get('value', []):
-            # Check for documentLibrary template
-            if list_item.get('list', {}).get('template') == 'documentLibrary':
-                libraries.append(list_item)
-        return libraries
-    else:
-        log_utils.error("Error retrieving lists: Status {} - {}", response.status_code, response.text)
-        return []
+    Raises:
+        RuntimeError: If Graph returns an error
+    """
+    url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/contentTypes"
+    return graph_http.iter_values(url, headers=graph_http.auth_headers(token))
 
 def get_content_types(token, site_id):
     """Get all content types in the site."""
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-    
-    url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/contentTypes"
-    
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200:
-        data = response.json()
-        return data.get('value', [])
-    else:
-        from workflows.common import log_utils
-        log_utils.error("Error retrieving content types: Status {} - {}", response.status_code, response.text)
+    try:
+        return list(iter_content_types(token, site_id))
+    except RuntimeError as e:
+        log_utils.error("Error retrieving content types: {}", e)
 
 def get_site_features(token, site_id):
     """Get site features information."""
@@ -457,7 +637,7 @@ def get_site_features(token, site_id):
     # expose all SharePoint features but gives some site properties
     url = f"https://graph.microsoft.com/v1.0/sites/{site_id}"
     
-    response = requests.get(url, headers=headers)
+    response = graph_http.get(url, headers=headers)
     
     if response.status_code == 200:
         data = response.json()
@@ -493,14 +673,14 @@ def get_list_settings(token, site_id, list_id):
     # Get list properties
     url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/lists/{list_id}"
     
-    response = requests.get(url, headers=headers)
+    response = graph_http.get(url, headers=headers)
     
     if response.status_code == 200:
         list_data = response.json()
         
         # Get list content types
         content_types_url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/lists/{list_id}/contentTypes"
-        ct_response = requests.get(content_types_url, headers=headers)
+        ct_response = graph_http.get(content_types_url, headers=headers)
         
         if ct_response.status_code == 200:
             list_data['contentTypes'] = ct_response.json().get('value', [])
@@ -510,7 +690,8 @@ def get_list_settings(token, site_id, list_id):
         from workflows.common import log_utils
         log_utils.error("Error retrieving list settings: Status {} - {}", response.status_code, response.text)
 
-def extract_comprehensive_site_schema(site_url, specific_list=None, verbose=False, detailed=False):
+def extract_comprehensive_site_schema(site_url, specific_list=None, verbose=False, detailed=False, checkpoint=None,
+                                      resolve_lookups=False):
     """
     Extract comprehensive site information including columns, content types, features, and lists.
     
@@ -519,6 +700,8 @@ def extract_comprehensive_site_schema(site_url, specific_list=None, verbose=Fals
         specific_list: Name of a specific list to focus on (optional)
         verbose: log detailed progress information
         detailed: Include raw SharePoint API data
+        checkpoint: ExtractionCheckpoint to record progress in and resume from (optional)
+        resolve_lookups: Add the target list and column of Lookup fields
     
     Returns:
         Dict containing comprehensive site schema or None if failed
@@ -531,51 +714,70 @@ def extract_comprehensive_site_schema(site_url, specific_list=None, verbose=Fals
         log_utils.error("Failed to get access token")
         return None
     
-    site_id = get_site_id(token, site_url, verbose)
-    if not site_id:
-        log_utils.error("Failed to get site ID for {}", site_url)
-        return None
-    
-    # Prepare the comprehensive schema
-    comprehensive_schema = {
-        "site_url": site_url,
-        "site_id": site_id,
-        "extraction_date": datetime.now().isoformat(),
-        "site_columns": [],
-        "content_types": [],
-        "features": [],
-        "lists": []
-    }
-    
-    # 1. Get site columns
-    if verbose:
-        log_utils.info("Extracting site columns...")
-    site_columns = get_site_columns(token, site_id)
-    comprehensive_schema["site_columns"] = site_columns
-    if verbose:
-        log_utils.info("Found {} site columns", len(site_columns))
-    
-    # 2. Get content types
-    if verbose:
-        log_utils.info("Extracting content types...")
-    content_types = get_content_types(token, site_id)
-    comprehensive_schema["content_types"] = content_types
-    if verbose:
-        log_utils.info("Found {} content types", len(content_types))
+    header = checkpoint.site_header(site_url) if checkpoint else None
     
-    # 3. Get site features
-    if verbose:
-        log_utils.info("Extracting site features...")
-    features = get_site_features(token, site_id)
-    comprehensive_schema["features"] = features
-    if verbose:
-        log_utils.info("Found {} site features/properties", len(features))
+    if header:
+        # Site-level information was already extracted before the restart
+        comprehensive_schema = dict(header, lists=[])
+        site_id = header["site_id"]
+        site_columns = header["site_columns"]
+    else:
+        site_id = get_site_id(token, site_url, verbose)
+        if not site_id:
+            log_utils.error("Failed to get site ID for {}", site_url)
+            return None
+        
+        # Prepare the comprehensive schema
+        comprehensive_schema = {
+            "site_url": site_url,
+            "site_id": site_id,
+            "extraction_date": datetime.now().isoformat(),
+            "site_columns": [],
+            "content_types": [],
+            "features": [],
+            "lists": []
+        }
+        
+        # 1. Get site columns
+        if verbose:
+            log_utils.info("Extracting site columns...")
+        site_columns = get_site_columns(token, site_id)
+        comprehensive_schema["site_columns"] = site_columns
+        if verbose:
+            log_utils.info("Found {} site columns", len(site_columns))
+        
+        # 2. Get content types
+        if verbose:
+            log_utils.info("Extracting content types...")
+        content_types = get_content_types(token, site_id)
+        comprehensive_schema["content_types"] = content_types
+        if verbose:
+            log_utils.info("Found {} content types", len(content_types))
+        
+        # 3. Get site features
+        if verbose:
+            log_utils.info("Extracting site features...")
+        features = get_site_features(token, site_id)
+        comprehensive_schema["features"] = features
+        if verbose:
+            log_utils.info("Found {} site features/properties", len(features))
+        
+        if checkpoint:
+            checkpoint.record_site_header(site_url, {k: v for k, v in comprehensive_schema.items() if k != "lists"})
     
     # 4. Get lists and their settings
     if verbose:
         log_utils.info("Extracting lists and libraries...")
     
-    lists = get_lists(token, site_id)
+    if checkpoint:
+        # Continue the list enumeration from the last recorded page cursor
+        lists, cursor, enumerated = checkpoint.list_enumeration(site_url)
+        if not enumerated:
+            for page, next_link in iter_list_pages(token, site_id, start_url=cursor):
+                checkpoint.record_list_page(site_url, page, next_link)
+                lists.extend(page)
+    else:
+        lists = get_lists(token, site_id)
     
     # If specific list is provided, filter to just that list
     if specific_list:
@@ -589,19 +791,32 @@ def extract_comprehensive_site_schema(site_url, specific_list=None, verbose=Fals
             return None
         lists = filtered_lists
     
+    lookup_resolver = LookupResolver(site_id) if resolve_lookups else None
+    
     processed_lists = []
     for lst in lists:
         list_id = lst.get('id')
         list_name = lst.get('displayName')
         
+        if checkpoint:
+            list_entry = checkpoint.list_entry(site_url, list_id)
+            if list_entry is not None:
+                if verbose:
+                    log_utils.info(Messages.Checkpoint.LIST_SKIPPED, list_name)
+                processed_lists.append(list_entry)
+                continue
+        
         if verbose:
             log_utils.info("Processing list: {}", list_name)
         
+        # Long sites outlive a single token, so refresh it (served from cache until near expiry)
+        token = get_access_token() or token
+        
         # Get detailed list settings
         list_settings = get_list_settings(token, site_id, list_id)
         
-        # Get list columns
-        columns = get_list_columns(token, site_id, list_id)
+        # List columns are mapped as they are parsed from the response stream
+        columns = iter_list_columns(token, site_id, list_id)
         
         # Process columns to match our schema format
         processed_columns = []
@@ -627,6 +842,10 @@ def extract_comprehensive_site_schema(site_url, specific_list=None, verbose=Fals
             if field["type"] == "Choice" and column.get('choice', {}).get('choices'):
                 field["options"] = column.get('choice', {}).get('choices', [])
             
+            # Resolve the list and column a lookup points to
+            if lookup_resolver and field["type"] == "Lookup" and column.get('lookup'):
+                field["lookup_target"] = lookup_resolver.resolve(token, column['lookup'])
+            
             # Add detailed metadata if requested
             if detailed:
                 field["raw_column_data"] = column
@@ -665,6 +884,8 @@ def extract_comprehensive_site_schema(site_url, specific_list=None, verbose=Fals
                 list_entry["content_types"] = list_settings['contentTypes']
         
         processed_lists.append(list_entry)
+        if checkpoint:
+            checkpoint.record_list(site_url, list_id, list_entry)
     
     comprehensive_schema["lists"] = processed_lists
     
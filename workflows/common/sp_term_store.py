@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+# file: workflows/common/sp_term_store.py
+"""
+SharePoint Term Store Export - Local cache of the managed metadata term
+store (groups, term sets and terms with their hierarchy and synonyms).
+
+Managed Metadata values in list items carry a term GUID and the label the
+term had when the value was set:
+
+    {"Label": "Invoices", "TermGuid": "3f2c...", "WssId": 12}
+
+The term store is exported once into a JSON cache file and shared by the
+item crawler and reports, which resolve GUIDs to the term's current label
+and path without a Graph call per term occurrence:
+
+    terms = get_resolver()
+    terms.label(guid)                  # current default label, or None
+    terms.path(guid)                   # "Finance;Accounts Payable;Invoices"
+    terms.resolve_value(field_value)   # paths of a (multi-value) taxonomy field
+
+Resolved paths are kept in an LRU cache, so taxonomy-heavy libraries
+resolve each distinct term once. The export walks each term set level by
+level, reading the children of up to 20 terms per $batch request.
+
+Reading the term store needs TermStore.Read.All (application).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+from workflows.common import log_utils
+from workflows.common import graph_http
+from workflows.common import sp_metadata_utils as sp
+from workflows.common.log_utils import Messages
+
+# Initialize logging
+log_utils.setup_logging()
+
+DEFAULT_CACHE_PATH = "./extracted_schemas/term_store.json"
+
+# Seconds an exported term store is used before it is exported again
+DEFAULT_TTL = 24 * 3600
+
+# Seconds a stale term store is used after a failed export before exporting again
+EXPORT_RETRY_SECONDS = 300
+
+# Term paths remembered per resolver
+DEFAULT_CACHE_SIZE = 65536
+
+DEFAULT_WORKERS = 4
+
+# Separator of term path levels, as in SharePoint term paths
+PATH_SEPARATOR = ";"
+
+# Resolvers already loaded in this process, by cache path
+_resolvers = {}
+_resolvers_lock = threading.Lock()
+# Monotonic time before which a failed export is not retried, by cache path
+_retry_after = {}
+
+
+class TermStoreMessages:
+    """Term store related messages."""
+    CACHE_FRESH = "Using cached term store {} ({} terms)"
+    EXPORT_START = "Exporting term store of {}"
+    GROUP_EXPORTED = "  • {}: {} term sets, {} terms"
+    EXPORT_DONE = "Exported {} groups, {} term sets, {} terms to {}"
+    EXPORT_FAILED = "Error exporting term store: {}"
+    USING_STALE = "Using cached term store from {}"
+    CHILDREN_FAILED = "Could not read the children of term {}: status {}"
+    TERM_NOT_FOUND = "Term not found: {}"
+    TERM_ITEM = "  • {} ({})"
+
+# Register message class
+if not hasattr(Messages, 'TermStore'):
+    setattr(Messages, 'TermStore', TermStoreMessages)
+
+
+def _term_entry(term, set_id, parent_id, language):
+    """Reduce a Graph term to its cached form."""
+    labels = term.get("labels") or []
+    default = next((label for label in labels if label.get("isDefault") and label.get("languageTag") == language),
+                   None) or next((label for label in labels if label.get("isDefault")), None) or \
+        (labels[0] if labels else {})
+    return {
+        "id": term["id"].lower(),
+        "set_id": set_id,
+        "parent_id": parent_id,
+        "label": default.get("name"),
+        "synonyms": [label["name"] for label in labels
+                     if not label.get("isDefault") and label.get("name")],
+        "translations": {label["languageTag"]: label["name"] for label in labels
+                         if label.get("isDefault") and label.get("languageTag") != default.get("languageTag")}
+    }
+
+
+def _set_name(term_set, language):
+    names = term_set.get("localizedNames") or []
+    name = next((entry for entry in names if entry.get("languageTag") == language), None) or \
+        (names[0] if names else {})
+    return name.get("name") or term_set.get("displayName")
+
+
+def _children_pages(body, headers):
+    """Terms of a children response, following its next links."""
+    yield from body.get("value", [])
+    next_link = body.get("@odata.nextLink")
+    if next_link:
+        yield from graph_http.iter_values(next_link, headers=headers)
+
+
+def export_term_set(headers, store_path, term_set, language, executor):
+    """
+    Export the terms of one term set, level by level.
+
+    Args:
+        headers: Graph request headers
+        store_path: Relative URL of the term store (e.g. /sites/root/termStore)
+        term_set: Graph set object
+        language: Default language of the term store
+        executor: Thread pool for $batch requests
+
+    Returns:
+        List of cached term entries
+    """
+    set_id = term_set["id"].lower()
+    terms = [_term_entry(term, set_id, None, language)
+             for term in graph_http.iter_values(
+                 f"{graph_http.GRAPH_API_ENDPOINT}{store_path}/sets/{term_set['id']}/children", headers=headers)]
+    level = [term["id"] for term in terms]
+
+    while level:
+        batches = [level[i:i + graph_http.BATCH_LIMIT] for i in range(0, len(level), graph_http.BATCH_LIMIT)]
+
+        def run(batch):
+            return batch, graph_http.batch({
+                str(index): {"method": "GET", "url": f"{store_path}/sets/{set_id}/terms/{term_id}/children"}
+                for index, term_id in enumerate(batch)
+            }, headers=headers)
+
+        next_level = []
+        for batch, results in executor.map(run, batches):
+            for index, parent_id in enumerate(batch):
+                response = results.get(str(index), {})
+                if response.get("status") != 200:
+                    log_utils.warning(Messages.TermStore.CHILDREN_FAILED, parent_id, response.get("status"))
+                    continue
+                for child in _children_pages(response.get("body") or {}, headers):
+                    entry = _term_entry(child, set_id, parent_id, language)
+                    terms.append(entry)
+                    next_level.append(entry["id"])
+        level = next_level
+    return terms
+
+
+def export_term_store(headers, site_id="root", workers=DEFAULT_WORKERS):
+    """
+    Export the groups, term sets and terms visible from a site.
+
+    The root site sees the tenant-wide groups; another site also sees its
+    site collection groups.
+
+    Returns:
+        Term store data dict (groups, sets, terms)
+    """
+    store_path = f"/sites/{site_id}/termStore"
+    response = graph_http.get(f"{graph_http.GRAPH_API_ENDPOINT}{store_path}", headers=headers)
+    if response.status_code != 200:
+        raise RuntimeError(f"Status {response.status_code} - {response.text}")
+    store = response.json()
+    language = store.get("defaultLanguageTag")
+
+    groups, sets, terms = [], [], []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for group in graph_http.iter_values(f"{graph_http.GRAPH_API_ENDPOINT}{store_path}/groups", headers=headers):
+            groups.append({"id": group["id"], "name": group.get("displayName"), "scope": group.get("scope")})
+            group_sets = list(graph_http.iter_values(
+                f"{graph_http.GRAPH_API_ENDPOINT}{store_path}/groups/{group['id']}/sets", headers=headers))
+            group_terms = 0
+            for term_set in group_sets:
+                sets.append({"id": term_set["id"].lower(), "name": _set_name(term_set, language),
+                             "group_id": group["id"]})
+                set_terms = export_term_set(headers, store_path, term_set, language, executor)
+                terms.extend(set_terms)
+                group_terms += len(set_terms)
+            log_utils.info(Messages.TermStore.GROUP_EXPORTED, group.get("displayName"), len(group_sets), group_terms)
+
+    return {"store_id": store.get("id"), "default_language": language, "groups": groups, "sets": sets,
+            "terms": terms}
+
+
+class TermResolver:
+    """
+    Resolves term GUIDs from a term store export to labels and paths.
+
+    Each term GUID's path is worked out once and kept in an LRU cache
+    (parents are cached along the way), so resolving the same terms for
+    millions of item values costs a dictionary lookup each.
+
+    Args:
+        data: Term store data from export_term_store
+        fetched: Unix time of the export
+        cache_size: Term paths kept in the LRU cache
+    """
+
+    def __init__(self, data, fetched=None, cache_size=DEFAULT_CACHE_SIZE):
+        self.data = data
+        self.fetched = fetched
+        self.groups = {group["id"]: group for group in data.get("groups", [])}
+        self.sets = {term_set["id"]: term_set for term_set in data.get("sets", [])}
+        # A term reused in several sets keeps the position of its first set
+        self.terms = {}
+        for term in data.get("terms", []):
+            self.terms.setdefault(term["id"], term)
+        self._by_label = None
+        self.path = lru_cache(maxsize=cache_size)(self._path)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, guid):
+        return bool(guid) and guid.lower() in self.terms
+
+    def term(self, guid):
+        """Cached term entry by GUID, or None."""
+        return self.terms.get(guid.lower()) if guid else None
+
+    def label(self, guid):
+        """Current default label of a term, or None."""
+        term = self.term(guid)
+        return term["label"] if term else None
+
+    def _path(self, guid, include_set=False):
+        """Labels from the top of the term set down to the term, or None if unknown."""
+        term = self.term(guid)
+        if term is None:
+            return None
+        if term["parent_id"]:
+            parent = self.path(term["parent_id"], include_set)
+            if parent is not None:
+                return f"{parent}{PATH_SEPARATOR}{term['label']}"
+        if include_set:
+            term_set = self.sets.get(term["set_id"]) or {}
+            return f"{term_set.get('name')}{PATH_SEPARATOR}{term['label']}"
+        return term["label"]
+
+    def term_set(self, guid):
+        """Name of the term set of a term, or None."""
+        term = self.term(guid)
+        return (self.sets.get(term["set_id"]) or {}).get("name") if term else None
+
+    def resolve_value(self, value, include_set=False):
+        """
+        Resolve a Managed Metadata field value (one or many terms).
+
+        Returns:
+            List of paths (None for GUIDs not in the term store)
+        """
+        values = value if isinstance(value, list) else [value]
+        return [self.path(entry.get("TermGuid"), include_set) for entry in values
+                if isinstance(entry, dict) and entry.get("TermGuid")]
+
+    def find(self, name):
+        """Terms whose label or a synonym matches name (case-insensitive)."""
+        if self._by_label is None:
+            by_label = {}
+            for term in self.terms.values():
+                for label in [term["label"]] + term["synonyms"] + list(term["translations"].values()):
+                    if label:
+                        by_label.setdefault(label.casefold(), []).append(term)
+            self._by_label = by_label
+        return list(self._by_label.get(name.casefold(), [])) if name else []
+
+    def age(self):
+        """Seconds since the term store was exported (None if never)."""
+        return None if self.fetched is None else time.time() - self.fetched
+
+    @classmethod
+    def load(cls, path=DEFAULT_CACHE_PATH):
+        """Load a cached term store (None if there is no cache)."""
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data, data.get("fetched"))
+
+    def save(self, path=DEFAULT_CACHE_PATH):
+        """Write the term store to the cache file atomically."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(dict(self.data, fetched=self.fetched,
+                           exported=datetime.fromtimestamp(self.fetched).isoformat() if self.fetched else None), f)
+        os.replace(tmp_path, path)
+
+
+def sync_term_store(path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, force=False, site_url=None, workers=DEFAULT_WORKERS):
+    """
+    Get the term store, exporting it again when the cache is stale.
+
+    Args:
+        path: Cache file
+        ttl: Seconds an export is used before exporting again
+        force: Export even if the cache is fresh
+        site_url: Site whose term store to export (default: the root site)
+        workers: $batch requests in flight at once
+
+    Returns:
+        TermResolver
+
+    Raises:
+        RuntimeError: If the term store cannot be exported and there is no cache
+    """
+    cached = TermResolver.load(path)
+    if cached is not None and not force and cached.age() is not None and cached.age() < ttl:
+        log_utils.debug(Messages.TermStore.CACHE_FRESH, path, len(cached))
+        return cached
+
+    log_utils.info(Messages.TermStore.EXPORT_START, site_url or "the root site")
+    try:
+        token = sp.get_access_token()
+        if not token:
+            raise RuntimeError("Failed to get access token")
+        site_id = sp.get_site_id(token, site_url) if site_url else "root"
+        if not site_id:
+            raise RuntimeError(f"Site not found: {site_url}")
+        data = export_term_store(graph_http.auth_headers(token), site_id, workers)
+    except Exception as e:
+        log_utils.error(Messages.TermStore.EXPORT_FAILED, e)
+        if cached is None:
+            raise RuntimeError(f"Term store unavailable: {e}") from e
+        log_utils.warning(Messages.TermStore.USING_STALE, path)
+        return cached
+
+    data["site_url"] = site_url
+    resolver = TermResolver(data, time.time())
+    resolver.save(path)
+    log_utils.info(Messages.TermStore.EXPORT_DONE, len(data["groups"]), len(data["sets"]), len(resolver), path)
+    return resolver
+
+
+def get_resolver(path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL):
+    """
+    Get the term resolver, loading the term store at most once per process
+    until it is older than the TTL.
+
+    When an export fails and the stale cache is used, it is not tried again
+    for EXPORT_RETRY_SECONDS, so resolving keeps working during an outage.
+    """
+    with _resolvers_lock:
+        resolver = _resolvers.get(path)
+        now = time.monotonic()
+        stale = resolver is None or resolver.age() is None or resolver.age() >= ttl
+        if stale and (resolver is None or now >= _retry_after.get(path, 0)):
+            resolver = sync_term_store(path, ttl)
+            _resolvers[path] = resolver
+            if resolver.age() is None or resolver.age() >= ttl:
+                _retry_after[path] = now + EXPORT_RETRY_SECONDS
+            else:
+                _retry_after.pop(path, None)
+        return resolver
+
+
+def forget_resolvers():
+    """Drop the term resolvers loaded in this process."""
+    with _resolvers_lock:
+        _resolvers.clear()
+        _retry_after.clear()
+
+
+def main():
+    """Export and query the managed metadata term store."""
+    parser = argparse.ArgumentParser(
+        description='SharePoint Term Store Export - Export managed metadata terms into a local cache',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Export the tenant term store if the cache is older than the TTL
+  python sp_term_store.py
+
+  # Export now, including the site collection term groups of a site
+  python sp_term_store.py --refresh --site "https://contoso.sharepoint.com/sites/Finance"
+
+  # Look up a term by GUID, label or synonym
+  python sp_term_store.py --find "Accounts Payable"
+        """
+    )
+
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help=f'Cache file (default: {DEFAULT_CACHE_PATH})')
+    parser.add_argument('--ttl', type=int, default=DEFAULT_TTL,
+                        help=f'Seconds before the term store is exported again (default: {DEFAULT_TTL})')
+    parser.add_argument('--refresh', action='store_true', help='Export the term store now')
+    parser.add_argument('--site', help='Site whose term store to export (default: the root site)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'$batch requests in flight at once (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--find', metavar='GUID_OR_LABEL', help='Show the terms matching a GUID, label or synonym')
+
+    args = parser.parse_args()
+
+    try:
+        resolver = sync_term_store(args.cache, args.ttl, force=args.refresh, site_url=args.site,
+                                   workers=args.workers)
+    except Exception as e:
+        log_utils.error(str(e))
+        return 1
+
+    if args.find:
+        terms = [resolver.term(args.find)] if args.find in resolver else resolver.find(args.find)
+        if not terms:
+            log_utils.error(Messages.TermStore.TERM_NOT_FOUND, args.find)
+            return 1
+        for term in terms:
+            log_utils.info(Messages.TermStore.TERM_ITEM, resolver.path(term["id"], include_set=True), term["id"])
+            if term["synonyms"]:
+                log_utils.info("    synonyms: {}", ", ".join(term["synonyms"]))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())